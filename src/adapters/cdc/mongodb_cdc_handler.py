@@ -5,13 +5,12 @@ This module implements a handler for MongoDB Change Data Capture events,
 converting database change events into domain events and publishing them
 through the message broker.
 """
-import asyncio
+import functools
 import json
 import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-import motor.motor_asyncio
 from pymongo.errors import PyMongoError
 
 from src.domain.events.device_shadow_events import (
@@ -26,6 +25,9 @@ from src.domain.events.water_heater_events import (
     WaterHeaterUpdatedEvent,
 )
 from src.gateways.message_broker import MessageBroker
+from src.infrastructure.device_shadow.change_stream_multiplexer import (
+    get_change_stream_multiplexer,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -61,40 +63,33 @@ class MongoDBCDCHandler:
             "device_shadows",
         ]
 
-        self.client = None
-        self.watches = {}
+        self.multiplexer = None
+        self.watches = {}  # collection name -> batch handler
         self.is_watching = False
 
     async def start(self) -> None:
         """Start watching for MongoDB change events.
 
-        This method initializes the MongoDB client and starts watching for change events
-        on the specified collections.
+        This method subscribes to the process-wide change-stream multiplexer for
+        the specified collections, which shares one cursor per database and
+        resumes from the last dispatched event after a restart.
         """
         if self.is_watching:
             return
 
         try:
-            self.client = motor.motor_asyncio.AsyncIOMotorClient(self.connection_string)
-            db = self.client[self.database_name]
+            self.multiplexer = get_change_stream_multiplexer(
+                self.connection_string, self.database_name
+            )
+            self.is_watching = True
 
-            # Start a watch for each collection
-            tasks = []
             for collection_name in self.collections_to_watch:
-                collection = db[collection_name]
-                pipeline = []  # Empty pipeline to capture all changes
-
-                # Create a change stream for the collection
-                change_stream = collection.watch(pipeline, full_document="updateLookup")
-
-                # Start a task to process events from this stream
-                task = asyncio.create_task(
-                    self._process_change_stream(collection_name, change_stream)
+                handler = functools.partial(
+                    self._process_change_batch, collection_name
                 )
-                tasks.append(task)
-                self.watches[collection_name] = (change_stream, task)
+                await self.multiplexer.subscribe(collection_name, handler)
+                self.watches[collection_name] = handler
 
-            self.is_watching = True
             logger.info(f"Started watching collections: {self.collections_to_watch}")
 
         except PyMongoError as e:
@@ -105,101 +100,36 @@ class MongoDBCDCHandler:
     async def stop(self) -> None:
         """Stop watching for MongoDB change events.
 
-        This method stops all change stream watchers and cleans up resources.
+        This method unsubscribes from the multiplexer, which closes the shared
+        change stream once no other consumer needs it.
         """
         if not self.is_watching:
             return
 
-        # Cancel all watch tasks
-        for collection_name, (change_stream, task) in self.watches.items():
+        for collection_name, handler in self.watches.items():
             try:
-                change_stream.close()
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
+                await self.multiplexer.unsubscribe(collection_name, handler)
             except Exception as e:
                 logger.error(f"Error closing change stream for {collection_name}: {e}")
 
         self.watches.clear()
-
-        # Close the client connection
-        if self.client:
-            self.client.close()
-            self.client = None
-
         self.is_watching = False
         logger.info("Stopped MongoDB CDC handler")
 
-    async def _process_change_stream(self, collection_name: str, change_stream) -> None:
-        """Process changes from a MongoDB change stream.
-
-        This method continually reads from a change stream and processes the events.
+    async def _process_change_batch(
+        self, collection_name: str, change_events: List[Dict[str, Any]]
+    ) -> None:
+        """Process a coalesced batch of changes to one collection.
 
         Args:
             collection_name: Name of the collection being watched
-            change_stream: MongoDB change stream to process
+            change_events: MongoDB change events, at most one per document
         """
-        try:
-            async for change in change_stream:
-                try:
-                    await self._handle_change_event(collection_name, change)
-                except Exception as e:
-                    logger.error(
-                        f"Error handling change event for {collection_name}: {e}"
-                    )
-        except PyMongoError as e:
-            if not self.is_watching:
-                # If we're shutting down, this is expected
-                return
-
-            logger.error(f"Error in change stream for {collection_name}: {e}")
-            # Restart the watch if it was unexpected
-            await self._restart_watch(collection_name)
-        except asyncio.CancelledError:
-            # Task was cancelled, just exit
-            pass
-        except Exception as e:
-            logger.error(
-                f"Unexpected error in change stream for {collection_name}: {e}"
-            )
-            if self.is_watching:
-                await self._restart_watch(collection_name)
-
-    async def _restart_watch(self, collection_name: str) -> None:
-        """Restart a watch for a specific collection.
-
-        Args:
-            collection_name: Name of the collection to restart watching
-        """
-        try:
-            # Remove the old watch
-            if collection_name in self.watches:
-                old_stream, old_task = self.watches.pop(collection_name)
-                try:
-                    old_stream.close()
-                    old_task.cancel()
-                except:
-                    pass
-
-            # Start a new watch
-            if self.is_watching and self.client:
-                db = self.client[self.database_name]
-                collection = db[collection_name]
-                pipeline = []
-
-                # Create a new change stream
-                change_stream = collection.watch(pipeline, full_document="updateLookup")
-
-                # Start a new task
-                task = asyncio.create_task(
-                    self._process_change_stream(collection_name, change_stream)
-                )
-                self.watches[collection_name] = (change_stream, task)
-                logger.info(f"Restarted watch for collection: {collection_name}")
-        except Exception as e:
-            logger.error(f"Failed to restart watch for {collection_name}: {e}")
+        for change in change_events:
+            try:
+                await self._handle_change_event(collection_name, change)
+            except Exception as e:
+                logger.error(f"Error handling change event for {collection_name}: {e}")
 
     async def _handle_change_event(
         self, collection_name: str, change_event: Dict[str, Any]
@@ -15,6 +15,11 @@ import psycopg2
 import redis
 from psycopg2.extras import RealDictCursor
 
+from src.repositories.timescale_telemetry_repository import (
+    format_operational_summary,
+    operational_summary_sql,
+)
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -253,13 +258,20 @@ class DeviceAPI:
             logger.error(f"Error retrieving water heater details: {e}")
             return None
 
-    def get_operational_summary(self, device_ids=None, include_maintenance=True):
+    def get_operational_summary(
+        self, device_ids=None, include_maintenance=True, batch_size=500
+    ):
         """
         Get operational summary for water heaters
 
+        Operational stats and the latest maintenance assessment for every
+        device come back from one parameterized query, read through a
+        server-side cursor in batches.
+
         Args:
             device_ids (list, optional): List of device IDs to include
             include_maintenance (bool): Whether to include maintenance predictions
+            batch_size (int): Rows fetched per round trip for large fleets
 
         Returns:
             list: Operational summaries for water heaters
@@ -269,119 +281,26 @@ class DeviceAPI:
                 logger.error("No database connection available")
                 return []
 
-            # If no device IDs provided, get all water heaters
-            if not device_ids:
-                device_query = """
-                    SELECT device_id FROM device_registry
-                    WHERE device_type = 'water_heater'
-                """
-                cursor = self.db_connection.cursor(cursor_factory=RealDictCursor)
-                cursor.execute(device_query)
-                devices = cursor.fetchall()
-                device_ids = [d["device_id"] for d in devices]
-
-            if not device_ids:
-                return []
-
-            # Build query for operational data
-            device_list = ",".join([f"'{d}'" for d in device_ids])
-
-            operational_query = f"""
-                WITH daily_stats AS (
-                    SELECT
-                        device_id,
-                        AVG(temperature_current) as avg_temperature,
-                        COUNT(*) FILTER (WHERE heating_status = TRUE AND
-                                      LAG(heating_status) OVER (PARTITION BY device_id ORDER BY timestamp) = FALSE)
-                        as heating_cycles,
-                        SUM(CASE WHEN heating_status = TRUE THEN 1 ELSE 0 END) as heating_minutes,
-                        AVG(power_consumption_watts) as avg_power
-                    FROM water_heater_telemetry
-                    WHERE device_id IN ({device_list})
-                    AND timestamp > NOW() - INTERVAL '24 hours'
-                    GROUP BY device_id
-                )
-                SELECT
-                    device_id,
-                    avg_temperature,
-                    heating_cycles as heating_cycles_24h,
-                    heating_minutes as total_heating_time_24h,
-                    (heating_minutes * avg_power / 60000.0) as energy_used_24h
-                FROM daily_stats
-            """
-
-            cursor = self.db_connection.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(operational_query)
-            operational_data = cursor.fetchall()
+            # If no device IDs provided, summarize all registered water heaters
+            all_devices = not device_ids
+            query = operational_summary_sql(
+                "%(device_ids)s", all_devices, include_maintenance
+            )
+            params = {} if all_devices else {"device_ids": list(device_ids)}
 
-            # Create result with operational data
-            result = []
-            for device_data in operational_data:
-                device_summary = {
-                    "device_id": device_data["device_id"],
-                    "operational": {
-                        "avg_temperature": device_data["avg_temperature"],
-                        "heating_cycles_24h": device_data["heating_cycles_24h"],
-                        "total_heating_time_24h": device_data["total_heating_time_24h"],
-                        "energy_used_24h": device_data["energy_used_24h"],
-                    },
-                }
-                result.append(device_summary)
-
-            # Add maintenance predictions if requested
-            if include_maintenance:
-                maintenance_query = f"""
-                    SELECT device_id, health_score, estimated_remaining_life,
-                           maintenance_due, next_maintenance_date, issues
-                    FROM device_health_assessment
-                    WHERE device_id IN ({device_list})
-                    AND assessment_date > NOW() - INTERVAL '24 hours'
-                    ORDER BY assessment_date DESC
-                """
-
-                cursor.execute(maintenance_query)
-                maintenance_data = cursor.fetchall()
-
-                # Add maintenance data to results
-                maintenance_by_device = {m["device_id"]: m for m in maintenance_data}
-
-                for device_summary in result:
-                    device_id = device_summary["device_id"]
-                    if device_id in maintenance_by_device:
-                        maint = maintenance_by_device[device_id]
-
-                        # Parse issues JSON if present
-                        issues = []
-                        if maint["issues"]:
-                            try:
-                                issues = json.loads(maint["issues"])
-                            except json.JSONDecodeError:
-                                logger.error(
-                                    f"Error parsing maintenance issues for {device_id}"
-                                )
-
-                        device_summary["maintenance"] = {
-                            "health_score": maint["health_score"],
-                            "estimated_remaining_life": maint[
-                                "estimated_remaining_life"
-                            ],
-                            "maintenance_due": maint["maintenance_due"],
-                            "next_maintenance_date": maint[
-                                "next_maintenance_date"
-                            ].isoformat()
-                            if maint["next_maintenance_date"]
-                            else None,
-                            "issues": issues,
-                        }
-                    else:
-                        # No maintenance data available
-                        device_summary["maintenance"] = {
-                            "health_score": None,
-                            "estimated_remaining_life": None,
-                            "maintenance_due": None,
-                            "next_maintenance_date": None,
-                            "issues": [],
-                        }
+            # Named cursors are server-side, so large fleets stream in batches
+            cursor = self.db_connection.cursor(
+                name="operational_summary", cursor_factory=RealDictCursor
+            )
+            cursor.itersize = batch_size
+            try:
+                cursor.execute(query, params)
+                result = [
+                    format_operational_summary(row, include_maintenance)
+                    for row in cursor
+                ]
+            finally:
+                cursor.close()
 
             logger.info(
                 f"Retrieved operational summary for {len(result)} water heaters"
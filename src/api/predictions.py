@@ -5,11 +5,17 @@ from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, Path, Query
 
+from src.infrastructure.events.event_bus import global_event_bus
 from src.predictions.interfaces import PredictionResult
 from src.services.prediction import PredictionService
+from src.services.prediction_orchestrator import PredictionOrchestrator
+from src.services.telemetry_features import telemetry_feature_engine
 
 router = APIRouter(prefix="/predictions", tags=["predictions"])
-prediction_service = PredictionService()
+prediction_service = PredictionService(
+    event_bus=global_event_bus, feature_engine=telemetry_feature_engine
+)
+prediction_orchestrator = PredictionOrchestrator(prediction_service)
 
 
 @router.get(
@@ -145,20 +151,10 @@ async def get_all_predictions(
     Returns:
         List of PredictionResult objects for all prediction types
     """
-    prediction_types = [
-        "lifespan_estimation",
-        "anomaly_detection",
-        "usage_patterns",
-        "multi_factor",
-    ]
-
-    results = []
-    for prediction_type in prediction_types:
-        prediction = await prediction_service.get_prediction(
-            device_id=device_id, prediction_type=prediction_type, force_refresh=refresh
-        )
-        if prediction:
-            results.append(prediction)
+    predictions = await prediction_orchestrator.get_all_predictions(
+        device_id, force_refresh=refresh
+    )
+    results = [prediction for prediction in predictions.values() if prediction]
 
     if not results:
         raise HTTPException(
@@ -166,3 +162,14 @@ async def get_all_predictions(
         )
 
     return results
+
+
+@router.get("/cache/stats")
+async def get_prediction_cache_stats() -> Dict[str, Any]:
+    """
+    Get prediction cache statistics
+
+    Returns:
+        Cache size, hit rate and eviction/invalidation counters
+    """
+    return prediction_service.get_cache_stats()
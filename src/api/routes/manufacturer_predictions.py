@@ -11,12 +11,15 @@ from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, Path, Query
 
+from src.infrastructure.events.event_bus import global_event_bus
 from src.predictions.interfaces import (
     ActionSeverity,
     PredictionResult,
     RecommendedAction,
 )
 from src.services.prediction import PredictionService
+from src.services.prediction_orchestrator import PredictionOrchestrator
+from src.services.telemetry_features import telemetry_feature_engine
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +32,10 @@ router = APIRouter(
     },
 )
 
-prediction_service = PredictionService()
+prediction_service = PredictionService(
+    event_bus=global_event_bus, feature_engine=telemetry_feature_engine
+)
+prediction_orchestrator = PredictionOrchestrator(prediction_service)
 
 
 def create_mock_lifespan_prediction(device_id: str) -> PredictionResult:
@@ -435,35 +441,24 @@ async def get_all_predictions(
     Returns:
         List of PredictionResult objects for all prediction types
     """
-    prediction_types = [
-        "lifespan_estimation",
-        "anomaly_detection",
-        "usage_patterns",
-        "multi_factor",
-    ]
+    mock_factories = {
+        "lifespan_estimation": create_mock_lifespan_prediction,
+        "anomaly_detection": create_mock_anomaly_prediction,
+        "usage_patterns": create_mock_usage_prediction,
+        "multi_factor": create_mock_multifactor_prediction,
+    }
+
+    predictions = await prediction_orchestrator.get_all_predictions(
+        device_id, prediction_types=list(mock_factories), force_refresh=refresh
+    )
 
     results = []
-    for prediction_type in prediction_types:
-        try:
-            prediction = await prediction_service.get_prediction(
-                device_id=device_id,
-                prediction_type=prediction_type,
-                force_refresh=refresh,
-            )
-            if prediction:
-                results.append(prediction)
-        except Exception as e:
-            logger.error(f"Error getting {prediction_type} prediction: {str(e)}")
-            # In development, create mock predictions for each type
-            if os.getenv("IOTSPHERE_ENV", "development") == "development":
-                if prediction_type == "lifespan_estimation":
-                    results.append(create_mock_lifespan_prediction(device_id))
-                elif prediction_type == "anomaly_detection":
-                    results.append(create_mock_anomaly_prediction(device_id))
-                elif prediction_type == "usage_patterns":
-                    results.append(create_mock_usage_prediction(device_id))
-                elif prediction_type == "multi_factor":
-                    results.append(create_mock_multifactor_prediction(device_id))
+    for prediction_type, prediction in predictions.items():
+        if prediction:
+            results.append(prediction)
+        elif os.getenv("IOTSPHERE_ENV", "development") == "development":
+            # In development, fill in mock predictions for failed or slow models
+            results.append(mock_factories[prediction_type](device_id))
 
     # In development mode, always return mock data if no results
     if not results and os.getenv("IOTSPHERE_ENV", "development") == "development":
@@ -19,6 +19,7 @@ from src.services.configurable_water_heater_service import (
     ConfigurableWaterHeaterService,
 )
 from src.services.ensure_all_water_heaters import ensure_all_water_heaters
+from src.services.telemetry_service import TelemetryService, get_telemetry_service
 
 logger = logging.getLogger(__name__)
 
@@ -286,6 +287,58 @@ def get_supported_manufacturers():
     ]
 
 
+@router.get(
+    "/fleet/operational-summary",
+    response_model=List[Dict[str, Any]],
+    summary="Get Fleet Operational Summary",
+    description=(
+        "Get 24-hour operational statistics, and optionally the latest health "
+        "assessment, for many water heaters in one query."
+    ),
+    operation_id="get_manufacturer_water_heater_fleet_operational_summary",
+)
+async def get_fleet_operational_summary(
+    device_ids: Optional[List[str]] = Query(
+        None, description="Water heaters to include; all when omitted"
+    ),
+    include_maintenance: bool = Query(
+        True, description="Include the latest maintenance assessment"
+    ),
+    telemetry_service: TelemetryService = Depends(get_telemetry_service),
+):
+    """
+    Get operational summaries for a fleet of water heaters.
+
+    Registered before /{device_id}/operational-summary so that "fleet" is
+    not taken for a device ID.
+
+    Args:
+        device_ids: Water heaters to include; all when omitted
+        include_maintenance: Include the latest maintenance assessment
+        telemetry_service: Telemetry service backed by TimescaleDB
+
+    Returns:
+        Operational summaries ordered by device ID
+
+    Raises:
+        HTTPException: If TimescaleDB is not configured or the query fails
+    """
+    try:
+        return [
+            summary
+            async for summary in telemetry_service.iter_operational_summaries(
+                device_ids=device_ids, include_maintenance=include_maintenance
+            )
+        ]
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting fleet operational summary: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Error retrieving operational summary: {str(e)}"
+        )
+
+
 @router.get(
     "/{device_id}/operational-summary",
     response_model=OperationalSummaryResponse,
@@ -379,6 +379,13 @@ async def device_telemetry(websocket: WebSocket, device_id: str):
             # Get filter settings
             filter_metrics = message.get("metrics", metrics)
 
+            # Optional cap on telemetry messages per second for this client
+            max_rate = message.get("max_rate")
+            if isinstance(max_rate, (int, float)) and max_rate > 0:
+                telemetry_service.conflator.set_client_interval(
+                    websocket, 1.0 / max_rate
+                )
+
             # Send confirmation
             await websocket.send_text(
                 json.dumps(
@@ -562,6 +569,7 @@ async def device_telemetry(websocket: WebSocket, device_id: str):
                 pass
 
         # Unregister the connection
+        telemetry_service.conflator.remove_client(websocket)
         await manager.disconnect(websocket, device_id, "telemetry")
 
 
@@ -603,8 +611,8 @@ async def device_alerts(websocket: WebSocket, device_id: str):
             )
         )
 
-        # In a real implementation, we would subscribe to an alert service
-        # For now, we'll just wait for disconnection
+        # Anomalies are pushed by the streaming anomaly detector through the
+        # manager; just wait for disconnection
         while True:
             await asyncio.sleep(30)  # Just keep connection alive
 
@@ -19,6 +19,9 @@ from fastapi import APIRouter, HTTPException, Query, Response
 from src.services.device_shadow import get_device_shadow_service
 from src.utils.date_utils import parse_iso_datetime
 
+# Aggregated resolutions that can be served from shadow history rollups
+ROLLUP_RESOLUTION_MAP = {"hourly": "1h", "daily": "1d"}
+
 router = APIRouter(
     prefix="/api/temperature-history",
     tags=["Temperature History"],
@@ -61,7 +64,33 @@ async def get_temperature_history(
 
     try:
         # Get shadow service
-        shadow_service = get_device_shadow_service()
+        shadow_service = await get_device_shadow_service()
+
+        # Serve aggregated resolutions from pre-computed rollups when available
+        if resolution in ROLLUP_RESOLUTION_MAP:
+            rollup = await shadow_service.get_shadow_history_rollups(
+                device_id, days, resolution=ROLLUP_RESOLUTION_MAP[resolution]
+            )
+            if rollup and rollup["buckets"]:
+                processed_data = [
+                    {
+                        "timestamp": bucket["timestamp"],
+                        "temperature": round(bucket["avg"], 1),
+                        "min": bucket["min"],
+                        "max": bucket["max"],
+                    }
+                    for bucket in rollup["buckets"]
+                ]
+                return {
+                    "data": processed_data,
+                    "timeRange": {
+                        "start": start_date.isoformat(),
+                        "end": end_date.isoformat(),
+                    },
+                    "resolution": resolution,
+                    "pointCount": len(processed_data),
+                    "deviceId": device_id,
+                }
 
         # Fetch shadow history data
         try:
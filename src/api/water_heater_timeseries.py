@@ -13,6 +13,7 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 
+from src.db.sqlite_pool import run_in_sqlite_executor
 from src.models.water_heater import TemperatureReading
 from src.services.water_heater_timeseries_service import WaterHeaterTimeseriesService
 
@@ -44,7 +45,7 @@ async def get_current_temperature(
     This endpoint is used by the Details tab to display the current temperature
     without loading historical data.
     """
-    return service.get_current_reading(device_id)
+    return await run_in_sqlite_executor(service.get_current_reading, device_id)
 
 
 @router.get("/{device_id}/temperature/history")
@@ -72,7 +73,9 @@ async def get_temperature_history(
     end_datetime = datetime.fromisoformat(end_date) if end_date else None
 
     # Use get_readings to match test expectations
-    return service.get_readings(device_id, days, start_datetime, end_datetime)
+    return await run_in_sqlite_executor(
+        service.get_readings, device_id, days, start_datetime, end_datetime
+    )
 
 
 @router.get("/{device_id}/temperature/history/preprocessed")
@@ -90,7 +93,7 @@ async def get_preprocessed_temperature_history(
     with different downsampling strategies based on the time range.
     """
     # First get the readings, then apply preprocessing
-    readings = service.get_readings(device_id, days)
+    readings = await run_in_sqlite_executor(service.get_readings, device_id, days)
     # Apply preprocessing based on the amount of data
     return service.preprocess_temperature_data(readings, days)
 
@@ -116,7 +119,9 @@ async def get_archived_temperature_history(
     start_datetime = datetime.fromisoformat(start_date)
     end_datetime = datetime.fromisoformat(end_date) if end_date else None
 
-    return service.get_archived_readings(device_id, start_datetime, end_datetime)
+    return await run_in_sqlite_executor(
+        service.get_archived_readings, device_id, start_datetime, end_datetime
+    )
 
 
 @admin_router.post("/archive")
@@ -132,7 +137,7 @@ async def archive_old_readings(
     This endpoint is used by scheduled maintenance tasks to move old data
     from active to archive storage.
     """
-    archived_count = service.archive_old_readings(days)
+    archived_count = await run_in_sqlite_executor(service.archive_old_readings, days)
 
     return {
         "status": "success",
@@ -0,0 +1,425 @@
+"""
+Pooled SQLite access for the IoTSphere platform.
+
+Keeps a few long-lived connections per database file in WAL mode instead of
+opening a new connection for every query, and runs blocking SQLite work on a
+dedicated thread executor so async handlers never stall the event loop.
+
+Connections are created with a statement cache, so reusing the same SQL text
+(module-level constants rather than per-call f-strings) reuses the prepared
+statement instead of re-parsing it.
+"""
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "4"))
+
+# Connections reserved for iterate_async streams, on top of the pool size
+DEFAULT_STREAM_POOL_SIZE = int(os.environ.get("SQLITE_STREAM_POOL_SIZE", "4"))
+
+# Prepared statements cached per connection
+STATEMENT_CACHE_SIZE = 256
+
+# Applied to every pooled connection, in order
+DEFAULT_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # 16 MB
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_pools: Dict[str, "SQLiteConnectionPool"] = {}
+_pools_lock = threading.Lock()
+
+
+def get_sqlite_executor() -> ThreadPoolExecutor:
+    """
+    Get or create the thread executor dedicated to SQLite work.
+
+    Returns:
+        ThreadPoolExecutor: Shared executor sized to the connection pool
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_POOL_SIZE, thread_name_prefix="sqlite"
+            )
+        return _executor
+
+
+async def run_in_sqlite_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on the SQLite executor.
+
+    Args:
+        func: Callable doing SQLite I/O
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The callable's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_sqlite_executor(), partial(func, *args, **kwargs)
+    )
+
+
+class SQLiteConnectionPool:
+    """
+    A bounded pool of long-lived SQLite connections for one database file.
+
+    Connections are opened lazily up to `size` and handed to one thread at a
+    time, so they can be shared across the executor's worker threads.
+
+    Streams from iterate_async hold a connection across awaits, so they draw
+    on a separate budget of `stream_size` connections and wait for a slot on
+    the event loop. A worker thread waiting in acquire therefore only ever
+    waits for connections held by other running workers, never for a stream
+    that needs a worker to make progress.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = DEFAULT_POOL_SIZE,
+        timeout: float = 30.0,
+        pragmas: Optional[Dict[str, Any]] = None,
+        stream_size: int = DEFAULT_STREAM_POOL_SIZE,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            db_path: Path to the SQLite database file
+            size: Maximum number of open connections for regular queries
+            timeout: Seconds to wait for a free connection or a lock
+            pragmas: PRAGMA settings applied to each new connection
+            stream_size: Maximum number of concurrent iterate_async streams
+        """
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.stream_size = max(1, stream_size)
+        self.timeout = timeout
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Stream connections are only taken after winning a slot, so one is
+        # always idle or may still be opened
+        self._stream_idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        # One semaphore per event loop, since asyncio primitives are loop-bound
+        self._stream_slots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection and apply the configured pragmas."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, opening a new one if under the limit."""
+        if self._closed:
+            raise RuntimeError(f"SQLite pool for {self.db_path} is closed")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No SQLite connection available for {self.db_path} "
+                f"after {self.timeout}s"
+            )
+
+    def _release(
+        self, conn: sqlite3.Connection, idle: Optional[queue.LifoQueue] = None
+    ) -> None:
+        """Return a connection to the pool, discarding it if the pool closed."""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        (self._idle if idle is None else idle).put(conn)
+
+    def _get_stream_slots(self) -> asyncio.Semaphore:
+        """Get the stream semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        slots = self._stream_slots.get(loop)
+        if slots is None:
+            slots = self._stream_slots[loop] = asyncio.Semaphore(self.stream_size)
+        return slots
+
+    def _acquire_stream(self) -> sqlite3.Connection:
+        """Take an idle stream connection or open one; called holding a slot."""
+        if self._closed:
+            raise RuntimeError(f"SQLite pool for {self.db_path} is closed")
+        try:
+            return self._stream_idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release_stream(self, conn: sqlite3.Connection) -> None:
+        """Return a stream connection, closing any beyond the stream budget."""
+        if self._stream_idle.qsize() >= self.stream_size:
+            # Only reachable when streams run on several event loops
+            conn.close()
+            return
+        self._release(conn, self._stream_idle)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection for the duration of a with-block.
+
+        Any transaction left open by the block is rolled back on release.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection and commit on success or roll back on error."""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """
+        Execute a write statement in its own transaction.
+
+        Returns:
+            int: Number of rows affected
+        """
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        """
+        Execute a write statement for many parameter rows in one transaction.
+
+        Returns:
+            int: Number of rows affected
+        """
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def fetchone(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        row_factory: Optional[Callable] = None,
+    ) -> Optional[Any]:
+        """
+        Run a query and return its first row.
+
+        Args:
+            sql: Query text
+            params: Query parameters
+            row_factory: Optional row factory, e.g. sqlite3.Row
+
+        Returns:
+            The first row, or None
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory
+            return cursor.execute(sql, params).fetchone()
+
+    def fetchall(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        row_factory: Optional[Callable] = None,
+    ) -> List[Any]:
+        """
+        Run a query and return all rows.
+
+        Args:
+            sql: Query text
+            params: Query parameters
+            row_factory: Optional row factory, e.g. sqlite3.Row
+
+        Returns:
+            List of rows
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory
+            return cursor.execute(sql, params).fetchall()
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable on the SQLite executor."""
+        return await run_in_sqlite_executor(func, *args, **kwargs)
+
+    async def execute_async(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Async variant of execute()."""
+        return await self.run(self.execute, sql, params)
+
+    async def executemany_async(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        """Async variant of executemany()."""
+        return await self.run(self.executemany, sql, list(rows))
+
+    async def fetchone_async(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        row_factory: Optional[Callable] = None,
+    ) -> Optional[Any]:
+        """Async variant of fetchone()."""
+        return await self.run(self.fetchone, sql, params, row_factory)
+
+    async def fetchall_async(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        row_factory: Optional[Callable] = None,
+    ) -> List[Any]:
+        """Async variant of fetchall()."""
+        return await self.run(self.fetchall, sql, params, row_factory)
+
+    async def iterate_async(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        row_factory: Optional[Callable] = None,
+        chunk_size: int = 500,
+    ) -> AsyncIterator[Any]:
+        """
+        Stream query rows, fetching chunk_size rows per executor call.
+
+        A stream connection is held until the iteration finishes or the
+        generator is closed. At most stream_size streams run at once; others
+        wait on the event loop for a slot without occupying a worker thread.
+
+        Args:
+            sql: Query text
+            params: Query parameters
+            row_factory: Optional row factory, e.g. sqlite3.Row
+            chunk_size: Rows fetched per round trip to the executor
+
+        Yields:
+            Result rows
+        """
+        async with self._get_stream_slots():
+            conn = await self.run(self._acquire_stream)
+            cursor = None
+            try:
+                cursor = conn.cursor()
+                cursor.row_factory = row_factory
+                await self.run(cursor.execute, sql, params)
+                while True:
+                    rows = await self.run(cursor.fetchmany, chunk_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+            finally:
+                if cursor is not None:
+                    cursor.close()
+                # Rolling back may touch the disk; keep it off the loop
+                await self.run(self._release_stream, conn)
+
+    def close(self) -> None:
+        """Close idle connections; borrowed ones are closed when released."""
+        self._closed = True
+        for idle in (self._idle, self._stream_idle):
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+        logger.info(f"Closed SQLite connection pool for {self.db_path}")
+
+
+def get_sqlite_pool(
+    db_path: str, size: int = DEFAULT_POOL_SIZE
+) -> SQLiteConnectionPool:
+    """
+    Get the shared connection pool for a database file.
+
+    Args:
+        db_path: Path to the SQLite database file
+        size: Pool size used if the pool has to be created
+
+    Returns:
+        SQLiteConnectionPool: Pool shared by all users of db_path
+    """
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = SQLiteConnectionPool(key, size=size)
+            _pools[key] = pool
+        return pool
+
+
+def close_sqlite_pools() -> None:
+    """Close every shared pool and shut down the SQLite executor."""
+    global _executor
+
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -89,8 +89,124 @@ CREATE_INDEXES = [
     "CREATE INDEX IF NOT EXISTS idx_device_events_device_id_timestamp ON device_events (device_id, timestamp DESC);",
     "CREATE INDEX IF NOT EXISTS idx_device_telemetry_type ON device_telemetry (telemetry_type);",
     "CREATE INDEX IF NOT EXISTS idx_device_events_type ON device_events (event_type);",
+    # Serves the latest-assessment lookup in the operational summary; the
+    # assessment table is owned by the maintenance service and may not exist yet
+    """
+    DO $$
+    BEGIN
+        IF to_regclass('device_health_assessment') IS NOT NULL THEN
+            CREATE INDEX IF NOT EXISTS idx_device_health_assessment_device_date
+            ON device_health_assessment (device_id, assessment_date DESC);
+        END IF;
+    END
+    $$;
+    """,
 ]
 
+# Retention and compression windows, overridable per deployment
+RAW_TELEMETRY_RETENTION = os.environ.get("TELEMETRY_RAW_RETENTION", "90 days")
+HOURLY_AGGREGATE_RETENTION = os.environ.get("TELEMETRY_HOURLY_RETENTION", "1 year")
+COMPRESS_AFTER = os.environ.get("TELEMETRY_COMPRESS_AFTER", "7 days")
+
+HYPERTABLES = ["device_telemetry", "water_heater_telemetry", "device_events"]
+
+# Heating cycle starts depend on each device's previous reading, which a
+# continuous aggregate cannot see, so they are counted with lag() when the
+# summaries are queried. Earlier versions flagged them with an insert
+# trigger that cost a lookup per row and missed rows arriving out of order.
+DROP_HEATING_CYCLE_TRIGGER = [
+    "DROP TRIGGER IF EXISTS trg_flag_heating_cycle_start ON water_heater_telemetry;",
+    "DROP FUNCTION IF EXISTS flag_heating_cycle_start();",
+]
+
+EXISTING_CONTINUOUS_AGGREGATES = (
+    "SELECT view_name FROM timescaledb_information.continuous_aggregates;"
+)
+
+# Sums and counts rather than averages are stored so buckets can be combined
+# into correct averages over any window
+WATER_HEATER_AGGREGATE_SELECT = """
+    SELECT
+        device_id,
+        time_bucket(INTERVAL '{interval}', timestamp) AS bucket,
+        SUM(temperature_current) AS temperature_sum,
+        COUNT(temperature_current) AS temperature_count,
+        MIN(temperature_current) AS temperature_min,
+        MAX(temperature_current) AS temperature_max,
+        SUM(power_consumption_watts) AS power_sum,
+        COUNT(power_consumption_watts) AS power_count,
+        MAX(power_consumption_watts) AS power_max,
+        SUM(water_flow_gpm) AS flow_sum,
+        COUNT(water_flow_gpm) AS flow_count,
+        SUM(CASE WHEN heating_status THEN 1 ELSE 0 END) AS heating_samples,
+        COUNT(*) AS sample_count
+    FROM water_heater_telemetry
+    GROUP BY device_id, bucket
+    WITH NO DATA;
+"""
+
+# (view name, bucket width, refresh start offset, end offset, schedule)
+CONTINUOUS_AGGREGATES = [
+    ("water_heater_telemetry_hourly", "1 hour", "3 hours", "1 hour", "30 minutes"),
+    ("water_heater_telemetry_daily", "1 day", "3 days", "1 hour", "1 hour"),
+]
+
+
+def continuous_aggregate_statements():
+    """Build the statements creating continuous aggregates and their policies."""
+    statements = []
+    for view, interval, start_offset, end_offset, schedule in CONTINUOUS_AGGREGATES:
+        # Real-time aggregation so the newest, unmaterialized hour is included
+        statements.append(
+            f"CREATE MATERIALIZED VIEW IF NOT EXISTS {view} "
+            "WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS"
+            + WATER_HEATER_AGGREGATE_SELECT.format(interval=interval)
+        )
+        statements.append(
+            f"SELECT add_continuous_aggregate_policy('{view}', "
+            f"start_offset => INTERVAL '{start_offset}', "
+            f"end_offset => INTERVAL '{end_offset}', "
+            f"schedule_interval => INTERVAL '{schedule}', if_not_exists => TRUE);"
+        )
+    statements.append(
+        "SELECT add_retention_policy('water_heater_telemetry_hourly', "
+        f"INTERVAL '{HOURLY_AGGREGATE_RETENTION}', if_not_exists => TRUE);"
+    )
+    return statements
+
+
+def backfill_statements(views):
+    """
+    Build the statements materializing existing history for new aggregates.
+
+    Aggregates are created WITH NO DATA and their refresh policies only look
+    back a few buckets, so history already in the raw table is materialized
+    once over the full range.
+    """
+    return [
+        f"CALL refresh_continuous_aggregate('{view}', NULL, NULL);" for view in views
+    ]
+
+
+def storage_policy_statements():
+    """Build the statements enabling compression and retention on raw data."""
+    statements = []
+    for table in HYPERTABLES:
+        statements.append(
+            f"ALTER TABLE {table} SET (timescaledb.compress, "
+            "timescaledb.compress_segmentby = 'device_id', "
+            "timescaledb.compress_orderby = 'timestamp DESC');"
+        )
+        statements.append(
+            f"SELECT add_compression_policy('{table}', "
+            f"INTERVAL '{COMPRESS_AFTER}', if_not_exists => TRUE);"
+        )
+        statements.append(
+            f"SELECT add_retention_policy('{table}', "
+            f"INTERVAL '{RAW_TELEMETRY_RETENTION}', if_not_exists => TRUE);"
+        )
+    return statements
+
 
 def create_tables():
     """Create all required tables in the TimescaleDB database"""
@@ -126,6 +242,30 @@ def create_tables():
         for query in CREATE_INDEXES:
             cursor.execute(query)
 
+        # Cycle starts are counted at query time
+        for query in DROP_HEATING_CYCLE_TRIGGER:
+            cursor.execute(query)
+
+        # Continuous aggregates must exist before raw chunks are dropped
+        cursor.execute(EXISTING_CONTINUOUS_AGGREGATES)
+        existing_views = {row[0] for row in cursor.fetchall()}
+        new_views = [
+            view for view, *_ in CONTINUOUS_AGGREGATES if view not in existing_views
+        ]
+
+        logger.info("Creating continuous aggregates...")
+        for query in continuous_aggregate_statements():
+            cursor.execute(query)
+
+        # Refreshing cannot run in a transaction; the connection autocommits
+        for view, query in zip(new_views, backfill_statements(new_views)):
+            logger.info(f"Materializing existing history into {view}...")
+            cursor.execute(query)
+
+        logger.info("Adding compression and retention policies...")
+        for query in storage_policy_statements():
+            cursor.execute(query)
+
         logger.info("TimescaleDB setup completed successfully!")
 
     except Exception as e:
@@ -0,0 +1,655 @@
+"""
+Shared MongoDB change-stream multiplexer.
+
+One change stream per database is opened for the whole process and fanned out
+to the handlers subscribed to each collection. Events are drained in batches,
+updates to the same document inside a short window are coalesced into a single
+event, and the resume token of the last dispatched event is persisted so a
+restarted process picks up where it stopped instead of from "now".
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import motor.motor_asyncio
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+ChangeBatchHandler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+# Server errors meaning the stored resume token can no longer be used
+# (InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost)
+RESUME_TOKEN_LOST_CODES = {260, 280, 286}
+
+RESUME_TOKENS_COLLECTION = "change_stream_resume_tokens"
+
+# Identifies this app instance in resume token keys, so instances watching
+# the same database each resume from their own position. Must be stable
+# across restarts of the same instance.
+CHANGE_STREAM_CONSUMER_ID = os.environ.get(
+    "CHANGE_STREAM_CONSUMER_ID", socket.gethostname()
+)
+
+
+class ResumeTokenStore:
+    """
+    Keeps the last dispatched resume token of each stream in memory.
+
+    Subclasses persist tokens somewhere that survives a restart.
+    """
+
+    def __init__(self):
+        """Initialize the token store."""
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+
+    async def load(self, stream_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the saved resume token for a stream.
+
+        Args:
+            stream_name: Name identifying the change stream
+
+        Returns:
+            The resume token, or None if nothing has been saved
+        """
+        return self._tokens.get(stream_name)
+
+    async def save(self, stream_name: str, token: Dict[str, Any]) -> None:
+        """
+        Save the resume token for a stream.
+
+        Args:
+            stream_name: Name identifying the change stream
+            token: Resume token of the last dispatched event
+        """
+        self._tokens[stream_name] = token
+
+    async def clear(self, stream_name: str) -> None:
+        """
+        Forget the resume token for a stream.
+
+        Args:
+            stream_name: Name identifying the change stream
+        """
+        self._tokens.pop(stream_name, None)
+
+
+class MongoResumeTokenStore(ResumeTokenStore):
+    """Persists resume tokens in a MongoDB collection, one document per stream."""
+
+    def __init__(self, collection):
+        """
+        Initialize the token store.
+
+        Args:
+            collection: Motor collection holding the tokens
+        """
+        super().__init__()
+        self.collection = collection
+
+    async def load(self, stream_name: str) -> Optional[Dict[str, Any]]:
+        document = await self.collection.find_one({"_id": stream_name})
+        return document.get("token") if document else None
+
+    async def save(self, stream_name: str, token: Dict[str, Any]) -> None:
+        await self.collection.update_one(
+            {"_id": stream_name},
+            {"$set": {"token": token, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    async def clear(self, stream_name: str) -> None:
+        await self.collection.delete_one({"_id": stream_name})
+
+
+def _overlaps(path: str, other: str) -> bool:
+    """Whether two dotted paths are equal or one is nested under the other."""
+    return (
+        path == other
+        or path.startswith(other + ".")
+        or other.startswith(path + ".")
+    )
+
+
+def _merge_update_descriptions(
+    previous: Dict[str, Any], change: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Combine the update descriptions of two consecutive updates.
+
+    Args:
+        previous: updateDescription of the earlier update
+        change: updateDescription of the later update
+
+    Returns:
+        An updateDescription with the same net effect as applying both
+    """
+    later_updated = change.get("updatedFields") or {}
+    later_removed = change.get("removedFields") or []
+    later_paths = list(later_updated) + list(later_removed)
+
+    # Earlier writes at or below a path the later update touches are superseded
+    updated = {
+        path: value
+        for path, value in (previous.get("updatedFields") or {}).items()
+        if not any(path == p or path.startswith(p + ".") for p in later_paths)
+    }
+    updated.update(later_updated)
+
+    # A later write to, above or below a removed path makes the removal stale
+    removed = [
+        path
+        for path in previous.get("removedFields") or []
+        if not any(_overlaps(path, p) for p in later_updated)
+    ]
+    removed.extend(path for path in later_removed if path not in removed)
+
+    return {"updatedFields": updated, "removedFields": removed}
+
+
+def merge_change_events(
+    previous: Dict[str, Any], change: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Fold a later change event for a document into an earlier one.
+
+    The result carries the later event's resume token, cluster time and full
+    document. Updates after an insert or replace stay an insert or replace,
+    consecutive updates merge their updated and removed fields, a delete
+    wins over anything before it, and an insert after a delete becomes a
+    replace.
+
+    Args:
+        previous: The earlier (possibly already merged) change event
+        change: The later change event for the same document
+
+    Returns:
+        A single change event with the net effect of both
+    """
+    previous_op = previous.get("operationType")
+    operation = change.get("operationType")
+    merged = dict(change)
+
+    if operation == "update":
+        if previous_op in ("insert", "replace"):
+            merged["operationType"] = previous_op
+            merged.pop("updateDescription", None)
+        elif previous_op == "update":
+            merged["updateDescription"] = _merge_update_descriptions(
+                previous.get("updateDescription") or {},
+                change.get("updateDescription") or {},
+            )
+    elif operation == "insert" and previous_op == "delete":
+        merged["operationType"] = "replace"
+
+    return merged
+
+
+def coalesce_change_events(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Collapse the changes to each document into one event.
+
+    Events keep the position of the first change to their document.
+
+    Args:
+        changes: Change events in the order they were read
+
+    Returns:
+        One change event per (collection, document)
+    """
+    coalesced: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    for change in changes:
+        key = (
+            (change.get("ns") or {}).get("coll"),
+            repr((change.get("documentKey") or {}).get("_id")),
+        )
+        previous = coalesced.get(key)
+        coalesced[key] = (
+            change if previous is None else merge_change_events(previous, change)
+        )
+    return list(coalesced.values())
+
+
+def _event_time(change: Dict[str, Any]) -> Optional[float]:
+    """Server time of a change event as a Unix timestamp, if known."""
+    wall_time = change.get("wallTime")
+    if isinstance(wall_time, datetime):
+        if wall_time.tzinfo is None:
+            wall_time = wall_time.replace(tzinfo=timezone.utc)
+        return wall_time.timestamp()
+
+    cluster_time = change.get("clusterTime")
+    if cluster_time is not None and hasattr(cluster_time, "time"):
+        return float(cluster_time.time)
+    return None
+
+
+class ChangeStreamMultiplexer:
+    """
+    Fans one database change stream out to per-collection handlers.
+
+    Handlers are awaited with a list of coalesced change events. A reader
+    task keeps the cursor moving while handlers run; batches are cut at
+    max_batch_size events or coalesce_window seconds after the first event,
+    whichever comes first. The resume token is saved after every handler has
+    seen a batch, so delivery is at-least-once across restarts. If a handler
+    fails, the saved token stops before the first event of that handler's
+    collection in the batch and is not advanced again until a restart, which
+    replays from there.
+
+    The stream starts with the first subscription and stops when the last
+    handler unsubscribes. Subscribing to a new collection reopens the cursor
+    from the last read position, so no events are skipped.
+    """
+
+    def __init__(
+        self,
+        database,
+        stream_name: Optional[str] = None,
+        consumer_id: str = CHANGE_STREAM_CONSUMER_ID,
+        token_store: Optional[ResumeTokenStore] = None,
+        max_batch_size: int = 500,
+        coalesce_window: float = 0.05,
+        max_pending: int = 10000,
+        retry_delay: float = 1.0,
+    ):
+        """
+        Initialize the multiplexer.
+
+        Args:
+            database: Motor database to watch
+            stream_name: Key for the stored resume token (defaults to the
+                database name and consumer_id)
+            consumer_id: Identifies this app instance among the consumers of
+                the database
+            token_store: Where resume tokens are kept (defaults to in-memory)
+            max_batch_size: Number of read events that triggers a dispatch
+            coalesce_window: Seconds to gather more events after the first one
+            max_pending: Read events above which the reader waits for dispatch
+            retry_delay: Seconds to wait before reopening a failed stream
+        """
+        self.database = database
+        self.stream_name = stream_name or f"{database.name}:{consumer_id}"
+        self.token_store = token_store or ResumeTokenStore()
+        self.max_batch_size = max_batch_size
+        self.coalesce_window = coalesce_window
+        self.retry_delay = retry_delay
+
+        self._handlers: Dict[str, List[ChangeBatchHandler]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(max_pending, 1))
+        self._reader_task: Optional[asyncio.Task] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self._batch: List[Dict[str, Any]] = []
+        self._in_flight: Optional[asyncio.Future] = None
+        self._running = False
+        self._lock = asyncio.Lock()
+
+        # Token of the last event read (reopen point) and dispatched (saved)
+        self._read_token: Optional[Dict[str, Any]] = None
+        self._dispatched_token: Optional[Dict[str, Any]] = None
+        # Set once a handler fails; the saved token then stays put
+        self._token_pinned = False
+
+        # Counters
+        self.events_received = 0
+        self.events_dispatched = 0
+        self.events_coalesced = 0
+        self.batches_dispatched = 0
+        self.handler_errors = 0
+        self.restarts = 0
+        self.last_lag_seconds: Optional[float] = None
+        self.max_lag_seconds = 0.0
+        self.last_dispatch_at: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the change stream is open."""
+        return self._running
+
+    @property
+    def collections(self) -> List[str]:
+        """Collections that currently have handlers."""
+        return sorted(self._handlers)
+
+    async def subscribe(self, collection_name: str, handler: ChangeBatchHandler) -> None:
+        """
+        Register a handler for changes to a collection and start the stream.
+
+        Args:
+            collection_name: Collection to receive changes for
+            handler: Coroutine function awaited with each batch of changes
+        """
+        async with self._lock:
+            handlers = self._handlers.setdefault(collection_name, [])
+            if handler in handlers:
+                return
+            handlers.append(handler)
+
+            if not self._running:
+                await self._start()
+            elif len(handlers) == 1:
+                # The stream filters by collection, so widen it
+                await self._restart_reader()
+
+        logger.info(f"Change stream subscription added for {collection_name}")
+
+    async def unsubscribe(
+        self, collection_name: str, handler: ChangeBatchHandler
+    ) -> None:
+        """
+        Remove a handler, stopping the stream once no handlers are left.
+
+        Args:
+            collection_name: Collection the handler was registered for
+            handler: The handler to remove
+        """
+        async with self._lock:
+            handlers = self._handlers.get(collection_name, [])
+            if handler not in handlers:
+                return
+            handlers.remove(handler)
+            if not handlers:
+                del self._handlers[collection_name]
+
+            if not self._handlers:
+                await self._stop()
+
+        logger.info(f"Change stream subscription removed for {collection_name}")
+
+    async def stop(self) -> None:
+        """Stop the stream, dispatching events already read."""
+        async with self._lock:
+            await self._stop()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get throughput and lag metrics for the stream.
+
+        Lag is the time between the server applying a change and its batch
+        being handed to the handlers.
+
+        Returns:
+            Dictionary of counters, queue depth and lag figures
+        """
+        return {
+            "stream_name": self.stream_name,
+            "running": self._running,
+            "collections": self.collections,
+            "events_received": self.events_received,
+            "events_dispatched": self.events_dispatched,
+            "events_coalesced": self.events_coalesced,
+            "batches_dispatched": self.batches_dispatched,
+            "handler_errors": self.handler_errors,
+            "restarts": self.restarts,
+            "resume_token_pinned": self._token_pinned,
+            "pending_events": self._queue.qsize(),
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_dispatch_at": self.last_dispatch_at,
+        }
+
+    async def _start(self) -> None:
+        """Load the saved resume token and start the reader and dispatcher."""
+        try:
+            self._read_token = await self.token_store.load(self.stream_name)
+        except Exception as e:
+            logger.error(f"Failed to load resume token for {self.stream_name}: {e}")
+            self._read_token = None
+        self._dispatched_token = self._read_token
+
+        self._running = True
+        self._reader_task = asyncio.create_task(self._read_loop())
+        self._dispatch_task = asyncio.create_task(self._dispatch_loop())
+        logger.info(
+            f"Change stream {self.stream_name} started "
+            f"({'resuming' if self._read_token else 'from now'})"
+        )
+
+    async def _stop(self) -> None:
+        """Stop reading, then dispatch what was read and save the token."""
+        if not self._running:
+            return
+
+        self._running = False
+        await self._cancel_reader()
+
+        if self._dispatch_task:
+            self._dispatch_task.cancel()
+            try:
+                await self._dispatch_task
+            except asyncio.CancelledError:
+                pass
+            self._dispatch_task = None
+        if self._in_flight is not None:
+            await self._in_flight
+            self._in_flight = None
+
+        # Hand over everything already read so the saved token covers it
+        batch, self._batch = self._batch, []
+        batch.extend(self._take_ready(self._queue.qsize()))
+        for start in range(0, len(batch), self.max_batch_size):
+            await self._dispatch(batch[start : start + self.max_batch_size])
+
+        logger.info(
+            f"Change stream {self.stream_name} stopped "
+            f"({self.events_dispatched} events dispatched)"
+        )
+
+    async def _cancel_reader(self) -> None:
+        """Cancel the reader task and wait for it to close its cursor."""
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+
+    async def _restart_reader(self) -> None:
+        """Reopen the cursor from the last read event with the current filter."""
+        await self._cancel_reader()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self) -> None:
+        """Read events into the queue, reopening the stream after failures."""
+        while self._running:
+            try:
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in RESUME_TOKEN_LOST_CODES:
+                    logger.warning(
+                        f"Resume token for {self.stream_name} is no longer valid, "
+                        f"continuing from now: {e}"
+                    )
+                    self._read_token = None
+                    try:
+                        await self.token_store.clear(self.stream_name)
+                    except Exception as clear_error:
+                        logger.error(f"Failed to clear resume token: {clear_error}")
+                else:
+                    logger.error(f"Change stream {self.stream_name} failed: {e}")
+            except Exception as e:
+                logger.error(f"Change stream {self.stream_name} failed: {e}")
+
+            if self._running:
+                self.restarts += 1
+                await asyncio.sleep(self.retry_delay)
+
+    async def _watch(self) -> None:
+        """Open the change stream and queue its events until cancelled."""
+        pipeline = [{"$match": {"ns.coll": {"$in": self.collections}}}]
+        options: Dict[str, Any] = {"full_document": "updateLookup"}
+        if self._read_token is not None:
+            options["resume_after"] = self._read_token
+
+        async with self.database.watch(pipeline, **options) as stream:
+            async for change in stream:
+                await self._queue.put(change)
+                self._read_token = change.get("_id", self._read_token)
+                self.events_received += 1
+
+    async def _dispatch_loop(self) -> None:
+        """Cut batches from the queue and hand them to the handlers."""
+        loop = asyncio.get_running_loop()
+
+        while self._running:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + self.coalesce_window
+
+            while len(self._batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    self._batch.extend(
+                        self._take_ready(self.max_batch_size - len(self._batch))
+                    )
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(
+                        await asyncio.wait_for(self._queue.get(), remaining)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self._batch = self._batch, []
+            # Shielded so stopping waits for handlers instead of interrupting them
+            self._in_flight = asyncio.ensure_future(self._dispatch(batch))
+            await asyncio.shield(self._in_flight)
+            self._in_flight = None
+
+    def _take_ready(self, limit: int) -> List[Dict[str, Any]]:
+        """Take up to limit events that are already queued."""
+        events = []
+        while len(events) < limit and not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+    async def _dispatch(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Coalesce a batch, run the handlers and save the resume token.
+
+        Args:
+            batch: Change events in the order they were read
+        """
+        if not batch:
+            return
+
+        changes = coalesce_change_events(batch)
+        by_collection: Dict[str, List[Dict[str, Any]]] = {}
+        for change in changes:
+            collection_name = (change.get("ns") or {}).get("coll")
+            by_collection.setdefault(collection_name, []).append(change)
+
+        calls, call_collections = [], []
+        for collection_name, collection_changes in by_collection.items():
+            for handler in list(self._handlers.get(collection_name, ())):
+                calls.append(handler(collection_changes))
+                call_collections.append(collection_name)
+
+        failed = set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for collection_name, result in zip(call_collections, results):
+            if isinstance(result, Exception):
+                self.handler_errors += 1
+                failed.add(collection_name)
+                logger.error(f"Change stream handler failed: {result}")
+
+        self._record_dispatch(batch, len(changes))
+
+        if self._token_pinned:
+            return
+        if failed:
+            # Keep the token before the first event a handler did not process
+            first_failed = next(
+                i
+                for i, event in enumerate(batch)
+                if (event.get("ns") or {}).get("coll") in failed
+            )
+            batch = batch[:first_failed]
+            self._token_pinned = True
+            logger.warning(
+                f"Resume token for {self.stream_name} held back after a handler "
+                "failure; events from there are replayed on restart"
+            )
+            if not batch:
+                return
+
+        token = batch[-1].get("_id")
+        if token is not None and token != self._dispatched_token:
+            try:
+                await self.token_store.save(self.stream_name, token)
+                self._dispatched_token = token
+            except Exception as e:
+                logger.error(f"Failed to save resume token for {self.stream_name}: {e}")
+
+    def _record_dispatch(self, batch: List[Dict[str, Any]], dispatched: int) -> None:
+        """Update counters and lag after a batch was dispatched."""
+        self.batches_dispatched += 1
+        self.events_dispatched += dispatched
+        self.events_coalesced += len(batch) - dispatched
+
+        now = datetime.now(timezone.utc)
+        self.last_dispatch_at = now.isoformat()
+        event_time = _event_time(batch[-1])
+        if event_time is not None:
+            self.last_lag_seconds = max(now.timestamp() - event_time, 0.0)
+            self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+
+
+# Shared multiplexers, one per (mongo_uri, db_name)
+_multiplexers: Dict[Tuple[str, str], ChangeStreamMultiplexer] = {}
+_clients: Dict[str, Any] = {}
+
+
+def get_change_stream_multiplexer(
+    mongo_uri: str = "mongodb://localhost:27017/", db_name: str = "iotsphere"
+) -> ChangeStreamMultiplexer:
+    """
+    Get the process-wide change-stream multiplexer for a database.
+
+    The multiplexer uses its own client so consumers can close theirs, and
+    keeps resume tokens in the database's change_stream_resume_tokens
+    collection.
+
+    Args:
+        mongo_uri: MongoDB connection URI
+        db_name: Database to watch
+
+    Returns:
+        The shared ChangeStreamMultiplexer for that database
+    """
+    key = (mongo_uri, db_name)
+    multiplexer = _multiplexers.get(key)
+    if multiplexer is None:
+        client = _clients.get(mongo_uri)
+        if client is None:
+            client = motor.motor_asyncio.AsyncIOMotorClient(mongo_uri)
+            _clients[mongo_uri] = client
+        database = client[db_name]
+        multiplexer = ChangeStreamMultiplexer(
+            database,
+            token_store=MongoResumeTokenStore(database[RESUME_TOKENS_COLLECTION]),
+        )
+        _multiplexers[key] = multiplexer
+    return multiplexer
+
+
+async def shutdown_change_stream_multiplexers() -> None:
+    """Stop all shared multiplexers and close their clients."""
+    for multiplexer in list(_multiplexers.values()):
+        try:
+            await multiplexer.stop()
+        except Exception as e:
+            logger.error(f"Error stopping change stream {multiplexer.stream_name}: {e}")
+    _multiplexers.clear()
+
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
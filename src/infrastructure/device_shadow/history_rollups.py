@@ -0,0 +1,277 @@
+"""
+Pre-aggregated rollups of shadow history.
+
+Maintains min/max/sum/count buckets per device and metric at several
+resolutions as history is written, so long chart windows read a few hundred
+buckets instead of scanning raw time series points.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Rollup resolutions, finest first, with their bucket width in seconds
+ROLLUP_RESOLUTIONS: Dict[str, int] = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# Upper bound on chart points a history endpoint should return
+DEFAULT_MAX_POINTS = 1000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def select_rollup_resolution(
+    days: float, max_points: int = DEFAULT_MAX_POINTS
+) -> str:
+    """
+    Pick the finest resolution that keeps a window under max_points buckets.
+
+    Args:
+        days: Length of the requested window in days
+        max_points: Maximum number of buckets to return
+
+    Returns:
+        str: Resolution key from ROLLUP_RESOLUTIONS
+    """
+    window_seconds = days * 86400
+    for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+        if window_seconds / seconds <= max_points:
+            return resolution
+    return next(reversed(ROLLUP_RESOLUTIONS))
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    """
+    Floor a timestamp to the start of its rollup bucket.
+
+    Args:
+        timestamp: Naive UTC timestamp
+        resolution: Resolution key from ROLLUP_RESOLUTIONS
+
+    Returns:
+        datetime: Start of the bucket containing timestamp
+    """
+    seconds = ROLLUP_RESOLUTIONS[resolution]
+    offset = int((timestamp - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+
+def extract_metric(entry: Dict[str, Any], metric: str) -> Optional[float]:
+    """
+    Read a numeric metric from a history entry.
+
+    History entries carry readings under "metrics", "reported" or at the top
+    level depending on the writer, so all three are checked.
+
+    Args:
+        entry: History document
+        metric: Metric name
+
+    Returns:
+        float value, or None if the entry has no numeric value for metric
+    """
+    for container in (entry.get("metrics"), entry.get("reported"), entry):
+        if isinstance(container, dict):
+            value = container.get(metric)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return float(value)
+    return None
+
+
+class ShadowHistoryRollups:
+    """
+    Maintains bucketed aggregates of shadow history in a MongoDB collection.
+
+    Each rollup document covers one device, resolution and bucket, and holds
+    count/sum/min/max per metric so averages can be derived on read.
+    """
+
+    def __init__(
+        self,
+        collection,
+        metrics: Sequence[str] = ("temperature",),
+        resolutions: Sequence[str] = tuple(ROLLUP_RESOLUTIONS),
+    ):
+        """
+        Initialize the rollup maintainer.
+
+        Args:
+            collection: Motor collection storing rollup buckets
+            metrics: Metric names to aggregate
+            resolutions: Resolution keys to maintain
+        """
+        self.collection = collection
+        self.metrics = tuple(metrics)
+        self.resolutions = tuple(resolutions)
+
+    async def create_indexes(self) -> None:
+        """Create the unique bucket index used by upserts and range reads."""
+        await self.collection.create_index(
+            [("device_id", 1), ("resolution", 1), ("bucket", 1)], unique=True
+        )
+
+    def _aggregate(
+        self, entries: Iterable[Dict[str, Any]]
+    ) -> Dict[Tuple[str, str, datetime], Dict[str, List[float]]]:
+        """Group metric values from entries by device, resolution and bucket."""
+        buckets: Dict[Tuple[str, str, datetime], Dict[str, List[float]]]
+        buckets = defaultdict(lambda: defaultdict(list))
+        for entry in entries:
+            device_id = entry.get("device_id")
+            timestamp = entry.get("timestamp")
+            if not device_id or not isinstance(timestamp, datetime):
+                continue
+
+            values = {}
+            for metric in self.metrics:
+                value = extract_metric(entry, metric)
+                if value is not None:
+                    values[metric] = value
+            if not values:
+                continue
+
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.replace(tzinfo=None) - timestamp.utcoffset()
+
+            for resolution in self.resolutions:
+                key = (device_id, resolution, bucket_start(timestamp, resolution))
+                for metric, value in values.items():
+                    buckets[key][metric].append(value)
+        return buckets
+
+    async def record(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """
+        Fold a batch of history entries into the rollup buckets.
+
+        Values are pre-aggregated in memory so each touched bucket costs one
+        upsert, and all upserts go out in a single unordered bulk write.
+
+        Args:
+            entries: History documents with device_id and datetime timestamp
+
+        Returns:
+            int: Number of buckets updated
+        """
+        operations = []
+        for (device_id, resolution, bucket), metrics in self._aggregate(
+            entries
+        ).items():
+            inc: Dict[str, float] = {}
+            minimums: Dict[str, float] = {}
+            maximums: Dict[str, float] = {}
+            for metric, values in metrics.items():
+                inc[f"metrics.{metric}.count"] = len(values)
+                inc[f"metrics.{metric}.sum"] = sum(values)
+                minimums[f"metrics.{metric}.min"] = min(values)
+                maximums[f"metrics.{metric}.max"] = max(values)
+
+            operations.append(
+                UpdateOne(
+                    {
+                        "device_id": device_id,
+                        "resolution": resolution,
+                        "bucket": bucket,
+                    },
+                    {"$inc": inc, "$min": minimums, "$max": maximums},
+                    upsert=True,
+                )
+            )
+
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+            logger.debug(f"Updated {len(operations)} shadow history rollup buckets")
+        return len(operations)
+
+    async def get_buckets(
+        self,
+        device_id: str,
+        resolution: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        metric: str = "temperature",
+    ) -> List[Dict[str, Any]]:
+        """
+        Read rollup buckets for a device, oldest first.
+
+        Args:
+            device_id: Device identifier
+            resolution: Resolution key from ROLLUP_RESOLUTIONS
+            start_time: Optional start of the window
+            end_time: Optional end of the window
+            metric: Metric to return
+
+        Returns:
+            List of dicts with timestamp, min, max, avg and count
+        """
+        query: Dict[str, Any] = {"device_id": device_id, "resolution": resolution}
+        if start_time or end_time:
+            query["bucket"] = {}
+            if start_time:
+                query["bucket"]["$gte"] = bucket_start(start_time, resolution)
+            if end_time:
+                query["bucket"]["$lte"] = end_time
+
+        cursor = self.collection.find(
+            query, {"_id": False, "bucket": True, f"metrics.{metric}": True}
+        ).sort("bucket", 1)
+
+        result = []
+        async for doc in cursor:
+            stats = doc.get("metrics", {}).get(metric)
+            if not stats or not stats.get("count"):
+                continue
+            result.append(
+                {
+                    "timestamp": doc["bucket"],
+                    "min": stats["min"],
+                    "max": stats["max"],
+                    "avg": stats["sum"] / stats["count"],
+                    "count": stats["count"],
+                }
+            )
+        return result
+
+    async def rebuild(
+        self,
+        history_collection,
+        device_id: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> int:
+        """
+        Recompute rollups from raw history, e.g. after enabling rollups.
+
+        Existing buckets in scope are dropped first so the rebuild can be
+        re-run safely; it should run while history ingest is paused.
+
+        Args:
+            history_collection: Raw shadow history collection
+            device_id: Optional device to rebuild; all devices when omitted
+            batch_size: Raw entries folded per bulk write
+
+        Returns:
+            int: Number of raw entries processed
+        """
+        query = {"device_id": device_id} if device_id else {}
+        await self.collection.delete_many(query)
+
+        processed = 0
+        batch: List[Dict[str, Any]] = []
+        async for entry in history_collection.find(query).batch_size(batch_size):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                await self.record(batch)
+                processed += len(batch)
+                batch = []
+        if batch:
+            await self.record(batch)
+            processed += len(batch)
+
+        logger.info(f"Rebuilt shadow history rollups from {processed} entries")
+        return processed
+
+    async def delete_device(self, device_id: str) -> None:
+        """Remove all rollup buckets for a device."""
+        await self.collection.delete_many({"device_id": device_id})
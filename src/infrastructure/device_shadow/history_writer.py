@@ -0,0 +1,204 @@
+"""
+Write-behind buffer for shadow history.
+
+History points from all devices are collected in memory and written to the
+time series collection in batches, so ingest throughput is bounded by batch
+size rather than by per-document round-trip latency.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowHistoryWriter:
+    """
+    Coalesces shadow history entries across devices into insert_many batches.
+
+    A batch is flushed when it reaches max_batch_size entries or when
+    flush_interval seconds have passed. Producers are held back once
+    max_pending entries are waiting, which applies backpressure when MongoDB
+    is slower than the incoming history rate.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        rollups=None,
+    ):
+        """
+        Initialize the history writer.
+
+        Args:
+            collection: Motor collection receiving history documents
+            max_batch_size: Number of entries that triggers an immediate flush
+            flush_interval: Max seconds an entry waits before being flushed
+            max_pending: Buffered entries above which add() waits for a flush
+            rollups: Optional ShadowHistoryRollups updated with each written batch
+        """
+        self.collection = collection
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, max_batch_size)
+        self.rollups = rollups
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_requested = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._space_available.set()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        # Counters
+        self.entries_written = 0
+        self.entries_failed = 0
+        self.batches_written = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of entries waiting to be written."""
+        return len(self._buffer)
+
+    async def start(self) -> None:
+        """Start the background flush loop."""
+        if self._running:
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(
+            f"Shadow history writer started (batch: {self.max_batch_size}, "
+            f"interval: {self.flush_interval}s)"
+        )
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out everything still buffered."""
+        if not self._running:
+            return
+
+        self._running = False
+        self._flush_requested.set()
+        if self._task:
+            try:
+                await self._task
+            except Exception as e:
+                logger.error(f"Shadow history flush loop failed: {e}")
+            self._task = None
+
+        # Drain anything added while the loop was winding down
+        await self.flush()
+        logger.info(
+            f"Shadow history writer stopped ({self.entries_written} written, "
+            f"{self.entries_failed} failed)"
+        )
+
+    async def add(self, entry: Dict[str, Any]) -> None:
+        """
+        Queue a history entry for writing.
+
+        Waits while the buffer is full so producers slow down to the rate
+        MongoDB can absorb.
+
+        Args:
+            entry: History document to insert
+        """
+        while len(self._buffer) >= self.max_pending:
+            if not self._running:
+                await self.flush()
+                continue
+            self._space_available.clear()
+            self._flush_requested.set()
+            await self._space_available.wait()
+
+        self._buffer.append(entry)
+        if len(self._buffer) >= self.max_batch_size:
+            self._flush_requested.set()
+
+    async def add_many(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """
+        Queue several history entries for writing.
+
+        Args:
+            entries: History documents to insert
+        """
+        for entry in entries:
+            await self.add(entry)
+
+    async def flush(self) -> int:
+        """
+        Write all currently buffered entries.
+
+        Returns:
+            int: Number of entries successfully written
+        """
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[: self.max_batch_size]
+                del self._buffer[: self.max_batch_size]
+                self._space_available.set()
+                written += await self._write_batch(batch)
+        return written
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> int:
+        """Insert a batch, counting partially failed writes."""
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            inserted = len(batch)
+        except Exception as e:
+            # With ordered=False the server still inserts every valid document
+            details = getattr(e, "details", None) or {}
+            inserted = details.get("nInserted", 0)
+            logger.error(
+                f"Error writing shadow history batch "
+                f"({len(batch) - inserted} of {len(batch)} entries lost): {e}"
+            )
+
+        self.entries_written += inserted
+        self.entries_failed += len(batch) - inserted
+        self.batches_written += 1
+
+        # Partially failed batches are left for a rollup rebuild
+        if self.rollups is not None and inserted == len(batch):
+            try:
+                await self.rollups.record(batch)
+            except Exception as e:
+                logger.error(f"Error updating shadow history rollups: {e}")
+
+        logger.debug(f"Wrote {inserted} shadow history entries")
+        return inserted
+
+    async def _flush_loop(self) -> None:
+        """Flush on size or time thresholds until stopped."""
+        while self._running:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing shadow history: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get writer statistics.
+
+        Returns:
+            Dict with pending, written, failed and batch counts
+        """
+        return {
+            "pending": self.pending,
+            "entries_written": self.entries_written,
+            "entries_failed": self.entries_failed,
+            "batches_written": self.batches_written,
+        }
@@ -4,10 +4,13 @@ MongoDB Shadow Listener - Listens for MongoDB shadow changes.
 This component uses MongoDB Change Streams to detect changes in device shadows
 and publishes those changes to MQTT for real-time distribution.
 """
-import asyncio
 import json
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+from src.infrastructure.device_shadow.change_stream_multiplexer import (
+    get_change_stream_multiplexer,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -17,25 +20,31 @@ class MongoDBShadowListener:
     
     This class leverages MongoDB Change Streams to detect shadow updates
     and publishes them to MQTT for real-time distribution to clients.
+    Changes come from the process-wide change-stream multiplexer, so bursts
+    of updates to one shadow are published once with its latest state.
     
     Responsibilities:
-    - Set up and maintain MongoDB change stream
+    - Subscribe to the shared change stream for the shadows collection
     - Process change events
     - Extract updated shadow data
+    - Invalidate stale entries in the storage's shadow cache
     - Publish changes to MQTT
     """
     
-    def __init__(self, shadow_storage, mqtt_client):
+    def __init__(self, shadow_storage, mqtt_client, multiplexer=None):
         """
         Initialize the shadow listener.
         
         Args:
             shadow_storage: Storage implementation for device shadows
             mqtt_client: MQTT client for publishing
+            multiplexer: Change-stream multiplexer to subscribe to (defaults
+                to the shared one for the storage's database)
         """
         self.shadow_storage = shadow_storage
         self.mqtt_client = mqtt_client
-        self.change_stream = None
+        self.multiplexer = multiplexer
+        self.collection_name = None
         self.running = False
         self.connected = False
         logger.info("MongoDB Shadow Listener initialized")
@@ -61,8 +70,8 @@ class MongoDBShadowListener:
         """
         Start listening for shadow changes.
         
-        This method sets up a MongoDB change stream to monitor changes
-        to shadow documents and starts processing change events.
+        This method subscribes to the shared MongoDB change stream for the
+        shadows collection; change events are processed as they are dispatched.
         """
         if self.running:
             return
@@ -71,24 +80,20 @@ class MongoDBShadowListener:
             await self.connect()
             
         try:
-            # Get collection from shadow storage
+            # Watch the storage's shadows collection through the shared stream
             collection = self.shadow_storage.shadows
-            
-            # Set up change stream
-            self.change_stream = collection.watch(
-                pipeline=[
-                    # Only watch for inserts and updates
-                    {"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}
-                ],
-                full_document="updateLookup"
+            self.collection_name = collection.name
+            if self.multiplexer is None:
+                self.multiplexer = get_change_stream_multiplexer(
+                    self.shadow_storage.mongo_uri, self.shadow_storage.db_name
+                )
+            await self.multiplexer.subscribe(
+                self.collection_name, self._on_shadow_changes
             )
             
             self.running = True
             logger.info("Started listening for shadow changes")
             
-            # Start processing change events in the background
-            asyncio.create_task(self._process_changes())
-            
         except Exception as e:
             logger.error(f"Failed to start shadow listener: {str(e)}")
             self.running = False
@@ -99,36 +104,43 @@ class MongoDBShadowListener:
             return
             
         try:
-            # Close change stream
-            if self.change_stream:
-                await self.change_stream.close()
-                self.change_stream = None
-                
+            await self.multiplexer.unsubscribe(
+                self.collection_name, self._on_shadow_changes
+            )
             self.running = False
             logger.info("Stopped listening for shadow changes")
             
         except Exception as e:
             logger.error(f"Error stopping shadow listener: {str(e)}")
             
-    async def _process_changes(self) -> None:
+    async def _on_shadow_changes(self, change_events: List[Dict[str, Any]]) -> None:
         """
-        Process change events from the change stream.
+        Handle a coalesced batch of shadow change events.
         
-        This method runs in a background task and processes change events
-        as they arrive from MongoDB.
+        Args:
+            change_events: MongoDB change events, at most one per shadow
         """
-        if not self.change_stream:
-            logger.error("Cannot process changes, change stream not initialized")
-            return
-            
-        try:
-            # Process change events as they arrive
-            async for change in self.change_stream:
-                await self._on_shadow_change(change)
-                
-        except Exception as e:
-            logger.error(f"Error processing shadow changes: {str(e)}")
-            self.running = False
+        for change_event in change_events:
+            operation = change_event.get("operationType")
+            if operation in ("insert", "update", "replace"):
+                await self._on_shadow_change(change_event)
+            elif operation == "delete":
+                # Deletes have no shadow state to publish, but a shadow
+                # deleted by another instance must not stay cached here
+                self._on_shadow_delete(change_event)
+
+    def _on_shadow_delete(self, change_event: Dict[str, Any]) -> None:
+        """
+        Evict a deleted shadow from the storage's cache.
+
+        Args:
+            change_event: MongoDB delete change event
+        """
+        document_id = change_event.get("documentKey", {}).get("_id")
+        if document_id is not None and hasattr(
+            self.shadow_storage, "invalidate_document"
+        ):
+            self.shadow_storage.invalidate_document(document_id)
             
     async def _on_shadow_change(self, change_event: Dict[str, Any]) -> None:
         """
@@ -157,7 +169,22 @@ class MongoDBShadowListener:
             if "_id" in full_document:
                 device_id = full_document["_id"]
                 full_document = {k: v for k, v in full_document.items() if k != "_id"}
+
+            # Map the document to its device so a later delete can be evicted
+            if "device_id" in full_document and hasattr(
+                self.shadow_storage, "track_document_id"
+            ):
+                self.shadow_storage.track_document_id(
+                    device_id, full_document["device_id"]
+                )
                 
+            # Keep this instance's shadow cache coherent with writes made elsewhere
+            if hasattr(self.shadow_storage, "invalidate_cache"):
+                self.shadow_storage.invalidate_cache(
+                    full_document.get("device_id", device_id),
+                    full_document.get("version"),
+                )
+
             # Publish to MQTT
             topic = f"shadows/{device_id}"
             message = {
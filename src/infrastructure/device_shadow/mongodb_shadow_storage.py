@@ -6,10 +6,12 @@ following the pattern defined in ADR-0005.
 """
 import logging
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
 
 import motor.motor_asyncio
 
+from src.infrastructure.device_shadow.shadow_projection import build_mongo_projection
+
 logger = logging.getLogger(__name__)
 
 
@@ -146,6 +148,62 @@ class MongoDBShadowStorage:
 
         return shadow
 
+    async def get_shadows(
+        self, device_ids: Sequence[str], fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get several shadow documents in a single $in query.
+
+        Args:
+            device_ids: Device identifiers
+            fields: Optional field names or dotted paths to return
+
+        Returns:
+            Dict mapping device_id to shadow; missing devices are omitted
+        """
+        cursor = self.shadows.find(
+            {"device_id": {"$in": list(dict.fromkeys(device_ids))}},
+            build_mongo_projection(fields),
+        )
+        return {shadow["device_id"]: shadow async for shadow in cursor}
+
+    async def iter_shadows(
+        self, fields: Optional[Sequence[str]] = None, batch_size: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream all shadow documents without loading them into memory at once.
+
+        Args:
+            fields: Optional field names or dotted paths to return
+            batch_size: Documents fetched per cursor round trip
+
+        Yields:
+            Shadow documents
+        """
+        cursor = self.shadows.find({}, build_mongo_projection(fields)).batch_size(
+            batch_size
+        )
+        async for shadow in cursor:
+            yield shadow
+
+    async def list_all_shadows(
+        self, fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get all shadow documents.
+
+        Args:
+            fields: Optional field names or dotted paths to return
+
+        Returns:
+            Dictionary mapping device_id to shadow document
+        """
+        return {
+            shadow["device_id"]: shadow
+            async for shadow in self.iter_shadows(fields)
+            if "device_id" in shadow
+        }
+
     async def save_shadow(self, device_id: str, shadow: Dict[str, Any]) -> None:
         """
         Save the shadow document.
@@ -4,17 +4,28 @@ Optimized MongoDB implementation of shadow storage.
 This implementation provides enhanced performance through:
 1. Connection pooling
 2. Time series collections for history data
-3. Reduced logging overhead
-4. Improved document structure
+3. Batched write-behind history ingest
+4. Pre-aggregated history rollups for long time windows
+5. Reduced logging overhead
+6. Improved document structure
 """
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from functools import lru_cache
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
 
 import motor.motor_asyncio
+from pymongo import ReturnDocument
 from pymongo.operations import InsertOne
 
+from src.infrastructure.device_shadow.history_rollups import ShadowHistoryRollups
+from src.infrastructure.device_shadow.history_writer import ShadowHistoryWriter
+from src.infrastructure.device_shadow.shadow_cache import ShadowCache
+from src.infrastructure.device_shadow.shadow_projection import (
+    build_mongo_projection,
+    project_shadow,
+)
+
 logger = logging.getLogger(__name__)
 
 # Ensure MongoDB driver logging is set to WARNING level
@@ -34,7 +45,14 @@ class OptimizedMongoDBShadowStorage:
         db_name: str = "iotsphere",
         shadows_collection: str = "device_shadows",
         history_collection: str = "temperature_history",
+        rollups_collection: str = "temperature_history_rollups",
         pool_size: int = 10,
+        cache_size: int = 1024,
+        cache_ttl: float = 30.0,
+        cache: Optional[ShadowCache] = None,
+        history_batch_size: int = 500,
+        history_flush_interval: float = 1.0,
+        history_max_pending: int = 10000,
     ):
         """
         Initialize MongoDB storage with connection pooling.
@@ -44,12 +62,20 @@ class OptimizedMongoDBShadowStorage:
             db_name: Database name
             shadows_collection: Collection name for current shadows
             history_collection: Collection name for time series shadow history
+            rollups_collection: Collection name for bucketed history rollups
             pool_size: Max size of the connection pool
+            cache_size: Max number of shadows kept in the read cache
+            cache_ttl: Seconds a cached shadow stays valid
+            cache: Optional cache instance to use instead of a default ShadowCache
+            history_batch_size: History entries per insert_many batch
+            history_flush_interval: Max seconds a history entry stays buffered
+            history_max_pending: Buffered history entries before writers wait
         """
         self.mongo_uri = mongo_uri
         self.db_name = db_name
         self.shadows_collection_name = shadows_collection
         self.history_collection_name = history_collection
+        self.rollups_collection_name = rollups_collection
         self.pool_size = pool_size
 
         # These will be initialized in initialize()
@@ -57,12 +83,23 @@ class OptimizedMongoDBShadowStorage:
         self.db = None
         self.shadows = None
         self.history = None
+        self.rollups: Optional[ShadowHistoryRollups] = None
+
+        # LRU read cache with per-entry expiry
+        self.cache = (
+            cache
+            if cache is not None
+            else ShadowCache(max_size=cache_size, ttl=cache_ttl)
+        )
+        # Mongo _id -> device_id, so delete events, which only carry the
+        # document key, can evict the right cache entry
+        self._document_ids: "OrderedDict[str, str]" = OrderedDict()
 
-        # Cache configuration - only cache the most recent shadow documents
-        self._shadow_cache = {}
-        self._cache_size = 32
-        self._cache_ttl = 30  # seconds
-        self._last_cache_clear = datetime.now()
+        # Write-behind history buffer, created once the collection exists
+        self.history_batch_size = history_batch_size
+        self.history_flush_interval = history_flush_interval
+        self.history_max_pending = history_max_pending
+        self.history_writer: Optional[ShadowHistoryWriter] = None
 
         logger.info(f"Initialized optimized MongoDB shadow storage (DB: {db_name})")
 
@@ -124,20 +161,75 @@ class OptimizedMongoDBShadowStorage:
         await self.shadows.create_index("device_id", unique=True)
         await self.history.create_index([("device_id", 1), ("timestamp", -1)])
 
+        # Rollups are maintained from each written history batch
+        self.rollups = ShadowHistoryRollups(self.db[self.rollups_collection_name])
+        await self.rollups.create_indexes()
+
+        # Start batching history writes across devices
+        self.history_writer = ShadowHistoryWriter(
+            self.history,
+            max_batch_size=self.history_batch_size,
+            flush_interval=self.history_flush_interval,
+            max_pending=self.history_max_pending,
+            rollups=self.rollups,
+        )
+        await self.history_writer.start()
+
         logger.info("Optimized MongoDB shadow storage initialized successfully")
 
     async def close(self):
-        """Close MongoDB connection."""
+        """Drain buffered history and close MongoDB connection."""
+        if self.history_writer is not None:
+            await self.history_writer.stop()
+            self.history_writer = None
+
         if self.client is not None:
             self.client.close()
             logger.info("MongoDB connection closed")
 
-    def _check_cache_expiry(self):
-        """Check and clear cache if TTL has expired"""
-        now = datetime.now()
-        if (now - self._last_cache_clear).total_seconds() > self._cache_ttl:
-            self._shadow_cache.clear()
-            self._last_cache_clear = now
+    def invalidate_cache(self, device_id: str, version: Optional[int] = None) -> None:
+        """
+        Drop a cached shadow after it was changed elsewhere.
+
+        Args:
+            device_id: Device identifier
+            version: Version of the change; newer cached entries are kept
+        """
+        if self.cache.invalidate(device_id, version):
+            logger.debug(f"Invalidated cached shadow for {device_id}")
+
+    def track_document_id(self, document_id: Any, device_id: str) -> None:
+        """
+        Remember which device a shadow document belongs to.
+
+        Args:
+            document_id: MongoDB _id of the shadow document
+            device_id: Device identifier
+        """
+        key = str(document_id)
+        self._document_ids[key] = device_id
+        self._document_ids.move_to_end(key)
+        while len(self._document_ids) > self.cache.max_size:
+            self._document_ids.popitem(last=False)
+
+    def invalidate_document(self, document_id: Any) -> None:
+        """
+        Drop the cached shadow of a document deleted elsewhere.
+
+        Args:
+            document_id: MongoDB _id from the delete event's documentKey
+        """
+        key = str(document_id)
+        device_id = self._document_ids.pop(key, None)
+        if device_id is None and self.cache.contains(key):
+            # Documents keyed by their device id
+            device_id = key
+        if device_id is not None:
+            self.invalidate_cache(device_id)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get shadow cache hit/miss/eviction statistics."""
+        return self.cache.stats()
 
     async def shadow_exists(self, device_id: str) -> bool:
         """
@@ -150,8 +242,7 @@ class OptimizedMongoDBShadowStorage:
             bool: True if shadow exists, False otherwise
         """
         # Check cache first
-        self._check_cache_expiry()
-        if device_id in self._shadow_cache:
+        if self.cache.contains(device_id):
             return True
 
         # Not in cache, check database
@@ -172,10 +263,10 @@ class OptimizedMongoDBShadowStorage:
             ValueError: If shadow doesn't exist
         """
         # Check cache first
-        self._check_cache_expiry()
-        if device_id in self._shadow_cache:
+        cached = self.cache.get(device_id)
+        if cached is not None:
             logger.debug(f"Shadow cache hit for {device_id}")
-            return self._shadow_cache[device_id]
+            return cached
 
         # Not in cache, get from database
         shadow = await self.shadows.find_one({"device_id": device_id})
@@ -184,19 +275,90 @@ class OptimizedMongoDBShadowStorage:
 
         # Convert MongoDB _id to string and remove from result
         if "_id" in shadow:
-            shadow["_id"] = str(shadow["_id"])
+            self.track_document_id(shadow["_id"], device_id)
             del shadow["_id"]
 
         # Add to cache
-        if len(self._shadow_cache) >= self._cache_size:
-            # If cache is full, remove oldest entry
-            # This is a simple implementation - a real LRU cache would be better
-            if self._shadow_cache:
-                self._shadow_cache.pop(next(iter(self._shadow_cache)))
-
-        self._shadow_cache[device_id] = shadow
+        self.cache.put(device_id, shadow)
         return shadow
 
+    async def get_shadows(
+        self, device_ids: Sequence[str], fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get several shadow documents in a single query.
+
+        Cached shadows are served from memory; the rest are fetched with one
+        $in query, projected to the requested fields.
+
+        Args:
+            device_ids: Device identifiers
+            fields: Optional field names or dotted paths to return
+
+        Returns:
+            Dict mapping device_id to shadow; missing devices are omitted
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for device_id in dict.fromkeys(device_ids):
+            cached = self.cache.get(device_id)
+            if cached is not None:
+                result[device_id] = project_shadow(cached, fields)
+            else:
+                missing.append(device_id)
+
+        if missing:
+            cursor = self.shadows.find(
+                {"device_id": {"$in": missing}}, build_mongo_projection(fields)
+            )
+            async for shadow in cursor:
+                device_id = shadow["device_id"]
+                # Only complete documents are safe to cache
+                if not fields:
+                    if "_id" in shadow:
+                        self.track_document_id(shadow.pop("_id"), device_id)
+                    self.cache.put(device_id, shadow)
+                result[device_id] = shadow
+
+        return result
+
+    async def iter_shadows(
+        self, fields: Optional[Sequence[str]] = None, batch_size: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream all shadow documents without loading them into memory at once.
+
+        Args:
+            fields: Optional field names or dotted paths to return
+            batch_size: Documents fetched per cursor round trip
+
+        Yields:
+            Shadow documents
+        """
+        cursor = self.shadows.find({}, build_mongo_projection(fields)).batch_size(
+            batch_size
+        )
+        async for shadow in cursor:
+            yield shadow
+
+    async def list_all_shadows(
+        self, fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get all shadow documents.
+
+        Args:
+            fields: Optional field names or dotted paths to return
+
+        Returns:
+            Dictionary mapping device_id to shadow document
+        """
+        return {
+            shadow["device_id"]: shadow
+            async for shadow in self.iter_shadows(fields)
+            if "device_id" in shadow
+        }
+
     async def save_shadow(self, device_id: str, shadow: Dict[str, Any]) -> None:
         """
         Save the shadow document with optimized history storage.
@@ -220,39 +382,88 @@ class OptimizedMongoDBShadowStorage:
         await self.shadows.replace_one({"device_id": device_id}, shadow, upsert=True)
 
         # Update cache
-        self._shadow_cache[device_id] = shadow
+        self.cache.put(device_id, shadow)
 
         logger.debug(f"Saved shadow for {device_id} version {shadow.get('version', 0)}")
 
-        # Save history entries to time series collection
+        # Queue history entries for the time series collection
         if history:
-            bulk_ops = []
             for entry in history:
                 # Ensure each history entry has device_id
                 entry["device_id"] = device_id
+                entry["timestamp"] = self._parse_history_timestamp(
+                    entry.get("timestamp")
+                )
 
-                # Convert string timestamp to datetime if needed
-                if isinstance(entry.get("timestamp"), str):
-                    try:
-                        # Remove Z and parse
-                        ts_str = entry["timestamp"].rstrip("Z")
-                        entry["timestamp"] = datetime.fromisoformat(ts_str)
-                    except ValueError:
-                        # If parsing fails, use current time
-                        entry["timestamp"] = datetime.now()
-
-                # Add to bulk operation
-                bulk_ops.append(InsertOne(entry))
-
-            # Execute bulk insert if we have operations
-            if bulk_ops:
-                try:
-                    await self.history.bulk_write(bulk_ops, ordered=False)
-                    logger.debug(
-                        f"Saved {len(bulk_ops)} history entries for {device_id}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error saving history entries: {e}")
+            try:
+                await self._write_history(history)
+                logger.debug(f"Queued {len(history)} history entries for {device_id}")
+            except Exception as e:
+                logger.error(f"Error saving history entries: {e}")
+
+    async def apply_shadow_patch(
+        self,
+        device_id: str,
+        reported: Optional[Dict[str, Any]] = None,
+        desired: Optional[Dict[str, Any]] = None,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Merge state changes into a shadow in a single atomic update.
+
+        The merge, version increment and optimistic version check all happen
+        server-side in one find_one_and_update, so concurrent writers cannot
+        overwrite each other's changes.
+
+        Args:
+            device_id: Device identifier
+            reported: Reported state fields to merge
+            desired: Desired state fields to merge
+            expected_version: Version the caller expects the shadow to be at
+
+        Returns:
+            Dict: Shadow document after the update
+
+        Raises:
+            ValueError: If shadow doesn't exist or the version doesn't match
+        """
+        now = datetime.utcnow().isoformat() + "Z"
+
+        # Top-level keys are replaced, matching dict.update() semantics
+        set_fields = {"metadata.last_updated": now, "timestamp": now}
+        for key, value in (reported or {}).items():
+            set_fields[f"reported.{key}"] = value
+        for key, value in (desired or {}).items():
+            set_fields[f"desired.{key}"] = value
+
+        query = {"device_id": device_id}
+        if expected_version is not None:
+            query["version"] = expected_version
+
+        shadow = await self.shadows.find_one_and_update(
+            query,
+            {"$set": set_fields, "$inc": {"version": 1}},
+            projection={"_id": False},
+            return_document=ReturnDocument.AFTER,
+        )
+
+        if shadow is None:
+            # Only the failure path pays for a second lookup
+            self.cache.invalidate(device_id)
+            current = await self.shadows.find_one(
+                {"device_id": device_id}, projection={"version": True}
+            )
+            if current is None:
+                raise ValueError(f"No shadow found for device {device_id}")
+            raise ValueError(
+                f"Version conflict: Document has been modified. Current version: {current.get('version')}, provided version: {expected_version}"
+            )
+
+        # Update cache
+        self.cache.put(device_id, shadow)
+
+        logger.debug(f"Patched shadow for {device_id} version {shadow.get('version', 0)}")
+        return shadow
 
     async def delete_shadow(self, device_id: str) -> bool:
         """
@@ -271,12 +482,14 @@ class OptimizedMongoDBShadowStorage:
         # Delete from current shadows
         result = await self.shadows.delete_one({"device_id": device_id})
 
-        # Delete from history collection
+        # Delete from history collection, including entries still buffered
+        await self.flush_history()
         await self.history.delete_many({"device_id": device_id})
+        if self.rollups is not None:
+            await self.rollups.delete_device(device_id)
 
         # Remove from cache
-        if device_id in self._shadow_cache:
-            del self._shadow_cache[device_id]
+        self.cache.invalidate(device_id)
 
         logger.info(f"Deleted shadow and history for {device_id}")
         return result.deleted_count > 0
@@ -291,6 +504,9 @@ class OptimizedMongoDBShadowStorage:
         """
         Get shadow history with time range support.
 
+        Entries still in the write-behind buffer become visible after the
+        next flush (at most history_flush_interval seconds).
+
         Args:
             device_id: Device identifier
             limit: Maximum number of history entries
@@ -341,23 +557,95 @@ class OptimizedMongoDBShadowStorage:
             metrics: Metrics data to store
         """
         # Create history entry document
-        history_entry = {"device_id": device_id, "metrics": metrics}
+        history_entry = {
+            "device_id": device_id,
+            "metrics": metrics,
+            "timestamp": self._parse_history_timestamp(timestamp),
+        }
+
+        # Queue for the time series collection
+        await self._write_history([history_entry])
+        logger.debug(f"Added history entry for {device_id} at {timestamp}")
 
-        # Convert string timestamp to datetime if needed
-        if isinstance(timestamp, str):
-            try:
-                # Remove Z and parse
-                ts_str = timestamp.rstrip("Z")
-                history_entry["timestamp"] = datetime.fromisoformat(ts_str)
-            except ValueError:
-                # If parsing fails, use current time
-                history_entry["timestamp"] = datetime.now()
+    async def flush_history(self) -> None:
+        """Write out all buffered history entries immediately."""
+        if self.history_writer is not None:
+            await self.history_writer.flush()
+
+    async def _write_history(self, entries: List[Dict[str, Any]]) -> None:
+        """Send history entries through the write-behind buffer when running."""
+        if self.history_writer is not None:
+            await self.history_writer.add_many(entries)
+            return
+
+        if len(entries) == 1:
+            await self.history.insert_one(entries[0])
         else:
-            history_entry["timestamp"] = timestamp
+            await self.history.insert_many(entries, ordered=False)
+        if self.rollups is not None:
+            await self.rollups.record(entries)
 
-        # Insert into time series collection
-        await self.history.insert_one(history_entry)
-        logger.debug(f"Added history entry for {device_id} at {timestamp}")
+    async def get_shadow_history_rollups(
+        self,
+        device_id: str,
+        resolution: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        metric: str = "temperature",
+    ) -> List[Dict[str, Any]]:
+        """
+        Get pre-aggregated history buckets for a device.
+
+        Args:
+            device_id: Device identifier
+            resolution: Bucket resolution ("1m", "1h" or "1d")
+            start_time: Optional start time for filtering
+            end_time: Optional end time for filtering
+            metric: Metric to return
+
+        Returns:
+            List[Dict]: Buckets with timestamp, min, max, avg and count (oldest first)
+        """
+        if self.rollups is None:
+            return []
+
+        buckets = await self.rollups.get_buckets(
+            device_id, resolution, start_time, end_time, metric
+        )
+        for bucket in buckets:
+            bucket["timestamp"] = bucket["timestamp"].isoformat() + "Z"
+        return buckets
+
+    async def rebuild_history_rollups(self, device_id: str = None) -> int:
+        """
+        Recompute history rollups from the raw time series collection.
+
+        Args:
+            device_id: Optional device ID to rebuild. If None, rebuilds all devices.
+
+        Returns:
+            int: Number of raw history entries processed; 0 if the storage has
+                not been initialized
+        """
+        if self.rollups is None:
+            logger.warning("Cannot rebuild history rollups before initialize()")
+            return 0
+
+        await self.flush_history()
+        return await self.rollups.rebuild(self.history, device_id)
+
+    @staticmethod
+    def _parse_history_timestamp(timestamp: Any) -> Any:
+        """Convert an ISO timestamp string to datetime for the time series."""
+        if not isinstance(timestamp, str):
+            return timestamp if timestamp is not None else datetime.now()
+
+        try:
+            # Remove Z and parse
+            return datetime.fromisoformat(timestamp.rstrip("Z"))
+        except ValueError:
+            # If parsing fails, use current time
+            return datetime.now()
 
     async def migrate_from_legacy(self, device_id: str = None):
         """
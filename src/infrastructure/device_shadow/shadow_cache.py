@@ -0,0 +1,153 @@
+"""
+In-process cache for device shadow documents.
+
+Provides a bounded LRU cache with per-entry TTL used by the MongoDB shadow
+storage to avoid a database round trip for hot shadows.
+"""
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowCache:
+    """
+    Bounded LRU cache of shadow documents with per-entry expiry.
+
+    Entries are copied on the way in and on the way out so callers can
+    freely mutate the documents they receive without corrupting the cache.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the shadow cache.
+
+        Args:
+            max_size: Maximum number of shadows to keep
+            ttl: Seconds an entry stays valid after it was stored
+            clock: Monotonic time source (injectable for testing)
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Return the live entry for a device, dropping it if it has expired."""
+        entry = self._entries.get(device_id)
+        if entry is None:
+            return None
+
+        expires_at, shadow = entry
+        if self._clock() >= expires_at:
+            del self._entries[device_id]
+            self.expirations += 1
+            return None
+
+        return shadow
+
+    def get(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a copy of the cached shadow for a device.
+
+        Args:
+            device_id: Device identifier
+
+        Returns:
+            Copy of the shadow document, or None if not cached or expired
+        """
+        shadow = self._lookup(device_id)
+        if shadow is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(device_id)
+        self.hits += 1
+        return copy.deepcopy(shadow)
+
+    def contains(self, device_id: str) -> bool:
+        """Check whether a live entry exists without affecting LRU order or stats."""
+        return self._lookup(device_id) is not None
+
+    def put(self, device_id: str, shadow: Dict[str, Any]) -> None:
+        """
+        Store a copy of a shadow document, evicting the least recently used entry.
+
+        Args:
+            device_id: Device identifier
+            shadow: Shadow document to cache
+        """
+        self._entries[device_id] = (self._clock() + self.ttl, copy.deepcopy(shadow))
+        self._entries.move_to_end(device_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, device_id: str, version: Optional[int] = None) -> bool:
+        """
+        Drop a cached shadow.
+
+        Args:
+            device_id: Device identifier
+            version: If given, only drop the entry when it is older than this
+                version, so an instance's own fresher write is kept
+
+        Returns:
+            bool: True if an entry was removed
+        """
+        entry = self._entries.get(device_id)
+        if entry is None:
+            return False
+
+        if version is not None and entry[1].get("version", 0) >= version:
+            return False
+
+        del self._entries[device_id]
+        self.invalidations += 1
+        return True
+
+    def clear(self) -> None:
+        """Remove all cached shadows."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict with size, configuration and hit/miss/eviction counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
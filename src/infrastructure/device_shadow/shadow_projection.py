@@ -0,0 +1,66 @@
+"""
+Field projection for shadow documents.
+
+Mirrors MongoDB inclusion projections (including dotted paths) so in-memory
+and cached shadows can be trimmed the same way as documents read from MongoDB.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def build_mongo_projection(fields: Optional[Sequence[str]]) -> Dict[str, bool]:
+    """
+    Build a MongoDB projection for the requested shadow fields.
+
+    Args:
+        fields: Field names or dotted paths to include, or None for all fields
+
+    Returns:
+        Dict: Projection that always includes device_id and excludes _id
+    """
+    projection = {"_id": False}
+    if fields:
+        projection["device_id"] = True
+        for field in fields:
+            projection[field] = True
+    return projection
+
+
+def project_shadow(
+    shadow: Dict[str, Any], fields: Optional[Sequence[str]]
+) -> Dict[str, Any]:
+    """
+    Return a copy of a shadow containing only the requested fields.
+
+    Args:
+        shadow: Full shadow document
+        fields: Field names or dotted paths to include, or None for all fields
+
+    Returns:
+        Dict: Projected shadow; device_id is always kept
+    """
+    if not fields:
+        return {k: v for k, v in shadow.items() if k != "_id"}
+
+    result: Dict[str, Any] = {}
+    if "device_id" in shadow:
+        result["device_id"] = shadow["device_id"]
+
+    for field in fields:
+        _copy_path(shadow, result, field.split("."))
+
+    return result
+
+
+def _copy_path(source: Dict[str, Any], target: Dict[str, Any], path: List[str]) -> None:
+    """Copy the value at a dotted path from source into target, if present."""
+    key = path[0]
+    if key not in source:
+        return
+
+    if len(path) == 1:
+        target[key] = source[key]
+        return
+
+    value = source[key]
+    if isinstance(value, dict):
+        _copy_path(value, target.setdefault(key, {}), path[1:])
@@ -6,10 +6,142 @@ loose coupling between components while maintaining real-time responsiveness.
 """
 import asyncio
 import logging
-from typing import Any, Callable, Coroutine, Dict, List, Set
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.infrastructure.messaging.topic_trie import TopicTrie
 
 logger = logging.getLogger(__name__)
 
+# Topic levels are separated by '.', '*' matches one level and '#' the rest
+TOPIC_SEPARATOR = "."
+SINGLE_LEVEL_WILDCARD = "*"
+MULTI_LEVEL_WILDCARD = "#"
+
+
+class _Subscriber:
+    """
+    One callback subscribed to one topic pattern.
+
+    Events are queued and delivered in order by a dedicated worker task, so a
+    slow callback only delays its own events. When the queue is full the
+    oldest waiting event is dropped.
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        callback: Callable,
+        max_queue_size: int,
+        executor: Optional[Executor],
+    ):
+        self.pattern = pattern
+        self.callback = callback
+        self.is_async = asyncio.iscoroutinefunction(callback)
+        self.executor = executor
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.worker: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.delivered = 0
+        self.errors = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def name(self) -> str:
+        """Readable name of the callback for logs and metrics."""
+        return getattr(self.callback, "__qualname__", repr(self.callback))
+
+    def enqueue(self, item: Tuple[str, Any, float, Optional[asyncio.Future]]) -> None:
+        """Queue an event, dropping the oldest one if the queue is full."""
+        loop = asyncio.get_running_loop()
+        if self.worker is not None and self.worker.get_loop() is not loop:
+            # The previous loop is gone along with anything queued on it
+            self.queue = asyncio.Queue(maxsize=self.queue.maxsize)
+            self.worker = None
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+
+        if self.queue.full():
+            _, _, _, done = self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+            if done is not None and not done.done():
+                done.set_result(False)
+            logger.warning(
+                f"Event queue full for subscriber {self.name} of {self.pattern}, "
+                "dropped oldest event"
+            )
+        self.queue.put_nowait(item)
+
+    async def _run(self) -> None:
+        """Deliver queued events to the callback one at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            topic, data, published_at, done = await self.queue.get()
+            delivered = True
+            try:
+                if self.is_async:
+                    await self.callback(data)
+                else:
+                    await loop.run_in_executor(self.executor, self.callback, data)
+            except asyncio.CancelledError:
+                delivered = False
+                raise
+            except Exception as e:
+                delivered = False
+                self.errors += 1
+                logger.error(f"Error calling subscriber for topic {topic}: {e}")
+            finally:
+                latency = time.monotonic() - published_at
+                if delivered:
+                    self.delivered += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+                if done is not None and not done.done():
+                    done.set_result(delivered)
+                self.queue.task_done()
+
+    def cancel(self) -> None:
+        """Cancel the worker and release publishers waiting on queued events."""
+        if self.worker is not None:
+            self.worker.cancel()
+        while not self.queue.empty():
+            _, _, _, done = self.queue.get_nowait()
+            self.queue.task_done()
+            if done is not None and not done.done():
+                done.set_result(False)
+
+    async def stop(self) -> None:
+        """Cancel the worker task and wait for it to finish."""
+        worker = self.worker
+        self.cancel()
+        if worker is not None:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get delivery counters, backlog and latency for this subscriber."""
+        handled = self.delivered + self.errors
+        return {
+            "pattern": self.pattern,
+            "callback": self.name,
+            "backlog": self.queue.qsize(),
+            "delivered": self.delivered,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "avg_latency_ms": (
+                self.total_latency / handled * 1000 if handled else 0.0
+            ),
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
 
 class EventBus:
     """
@@ -21,68 +153,132 @@ class EventBus:
     1. Real-time notifications
     2. Asynchronous processing
     3. Multiple subscribers for a single event
+
+    Publishing only queues the event for each matching subscriber; every
+    subscriber has its own bounded queue and worker task, so callers do not
+    wait for downstream work. Sync callbacks run in an executor. Topics are
+    dot-separated and subscriptions may use '*' for one level and '#' for
+    any remaining levels, e.g. 'shadow.*' or 'asset.#'.
     """
 
-    def __init__(self):
-        """Initialize the event bus."""
+    def __init__(
+        self, max_queue_size: int = 1000, executor: Optional[Executor] = None
+    ):
+        """
+        Initialize the event bus.
+
+        Args:
+            max_queue_size: Events each subscriber can have waiting
+            executor: Executor for sync callbacks (defaults to the loop's)
+        """
+        self.max_queue_size = max_queue_size
+        self.executor = executor
         self.subscribers: Dict[str, Set[Callable]] = {}
+        self._index = TopicTrie(
+            separator=TOPIC_SEPARATOR,
+            single_wildcard=SINGLE_LEVEL_WILDCARD,
+            multi_wildcard=MULTI_LEVEL_WILDCARD,
+        )
+        self._subscribers: Dict[Tuple[str, Callable], _Subscriber] = {}
         logger.info("Event Bus initialized")
 
-    async def publish(self, topic: str, data: Dict[str, Any]) -> None:
+    async def publish(
+        self, topic: str, data: Dict[str, Any], wait: bool = False
+    ) -> None:
         """
         Publish an event to all subscribers of the specified topic.
 
         Args:
             topic: The topic/channel name to publish to
             data: Event data to be sent to subscribers
+            wait: Wait until every subscriber has handled the event
         """
-        if topic not in self.subscribers:
+        keys = self._index.match(topic)
+        if not keys:
             logger.debug(f"No subscribers for topic: {topic}")
             return
 
-        tasks = []
-        for callback in self.subscribers[topic]:
-            try:
-                if asyncio.iscoroutinefunction(callback):
-                    tasks.append(asyncio.create_task(callback(data)))
-                else:
-                    callback(data)
-            except Exception as e:
-                logger.error(f"Error calling subscriber for topic {topic}: {e}")
+        loop = asyncio.get_running_loop()
+        published_at = time.monotonic()
+        pending = []
+        for key in keys:
+            done = loop.create_future() if wait else None
+            self._subscribers[key].enqueue((topic, data, published_at, done))
+            if done is not None:
+                pending.append(done)
 
-        # Wait for all async callbacks to complete
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        if pending:
+            await asyncio.gather(*pending)
 
     def subscribe(self, topic: str, callback: Callable) -> None:
         """
         Subscribe to a topic to receive events.
 
         Args:
-            topic: The topic/channel name to subscribe to
+            topic: The topic/channel name or wildcard pattern to subscribe to
             callback: Function to call when an event is published to the topic
+
+        Raises:
+            ValueError: If the pattern is invalid
         """
-        if topic not in self.subscribers:
-            self.subscribers[topic] = set()
+        key = (topic, callback)
+        if key in self._subscribers:
+            return
 
-        self.subscribers[topic].add(callback)
+        self._index.add(topic, key)
+        self._subscribers[key] = _Subscriber(
+            topic, callback, self.max_queue_size, self.executor
+        )
+        self.subscribers.setdefault(topic, set()).add(callback)
         logger.debug(f"Added subscriber to topic: {topic}")
 
     def unsubscribe(self, topic: str, callback: Callable) -> None:
         """
         Unsubscribe from a topic.
 
+        Events already queued for the callback are discarded.
+
         Args:
             topic: The topic/channel name to unsubscribe from
             callback: Function to remove from subscribers
         """
-        if topic in self.subscribers and callback in self.subscribers[topic]:
-            self.subscribers[topic].remove(callback)
-            logger.debug(f"Removed subscriber from topic: {topic}")
+        subscriber = self._subscribers.pop((topic, callback), None)
+        if subscriber is None:
+            return
+
+        self._index.remove(topic, (topic, callback))
+        subscriber.cancel()
+
+        self.subscribers[topic].discard(callback)
+        logger.debug(f"Removed subscriber from topic: {topic}")
+
+        # Clean up empty subscriber sets
+        if not self.subscribers[topic]:
+            del self.subscribers[topic]
+
+    async def drain(self) -> None:
+        """Wait until every queued event has been handled."""
+        for subscriber in list(self._subscribers.values()):
+            if subscriber.worker is not None:
+                await subscriber.queue.join()
 
-            # Clean up empty subscriber sets
-            if not self.subscribers[topic]:
-                del self.subscribers[topic]
+    async def close(self) -> None:
+        """Deliver queued events, then stop all subscriber workers."""
+        await self.drain()
+        for subscriber in self._subscribers.values():
+            await subscriber.stop()
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """
+        Get per-subscriber metrics.
+
+        Latency runs from publish to the end of the callback, so it includes
+        time spent waiting in the queue.
+
+        Returns:
+            One dict per subscription with backlog, counters and latency
+        """
+        return [subscriber.get_metrics() for subscriber in self._subscribers.values()]
 
 
 # Global event bus instance for application-wide events
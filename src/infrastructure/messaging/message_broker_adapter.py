@@ -17,6 +17,8 @@ from typing import Any, Callable, Dict, List, Optional, Set
 import aio_pika
 from aio_pika import ExchangeType, Message
 
+from src.infrastructure.messaging.topic_trie import amqp_topic_trie, levels_match
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +29,9 @@ class TopicPattern:
     Handles AMQP-style topic patterns with wildcards:
     - '*' matches exactly one word
     - '#' matches zero or more words
+
+    The pattern is split into levels once, so matching a topic does not build
+    or compile anything.
     """
 
     def __init__(self, pattern: str):
@@ -37,6 +42,8 @@ class TopicPattern:
             pattern: The topic pattern string (e.g., "devices.*.shadow.#")
         """
         self.pattern = pattern
+        self.levels = pattern.split(".")
+        self.has_wildcards = "*" in self.levels or "#" in self.levels
 
     def single_wildcard_pattern(self) -> str:
         """
@@ -91,26 +98,10 @@ class TopicPattern:
             True if the topic matches the pattern, False otherwise
         """
         # For direct matching without wildcards
-        if "*" not in self.pattern and "#" not in self.pattern:
+        if not self.has_wildcards:
             return self.pattern == topic
 
-        # Create a regex pattern by splitting the pattern into parts and joining them
-        parts = self.pattern.split(".")
-        regex_parts = []
-
-        for part in parts:
-            if part == "*":
-                regex_parts.append("[^.]+")  # Match exactly one segment
-            elif part == "#":
-                regex_parts.append(".*")  # Match zero or more segments
-            else:
-                regex_parts.append(re.escape(part))  # Match literal segment
-
-        # Join parts with escaped dots
-        regex = "^" + "\\.".join(regex_parts) + "$"
-
-        # Test if the topic matches the pattern
-        return bool(re.match(regex, topic))
+        return levels_match(self.levels, topic.split("."))
 
 
 @dataclass
@@ -183,6 +174,8 @@ class MessageBrokerAdapter:
         self.channel = None
         self.exchange = None
         self.subscribers = {}  # consumer_tag -> MessageSubscription
+        # Topic pattern -> consumer tags, for routing by a message's routing key
+        self._routes = amqp_topic_trie()
 
     async def initialize(self) -> None:
         """
@@ -327,6 +320,7 @@ class MessageBrokerAdapter:
             callback=request.callback,
             consumer_tag=consumer_tag,
         )
+        self._routes.add(request.topic_pattern.pattern, consumer_tag)
 
         logger.debug(
             f"Subscribed to {request.topic_pattern.pattern} with queue {request.queue_name}"
@@ -353,7 +347,8 @@ class MessageBrokerAdapter:
             await self.channel.basic_cancel(consumer_tag)
 
             # Remove the subscription
-            del self.subscribers[consumer_tag]
+            subscription = self.subscribers.pop(consumer_tag)
+            self._routes.remove(subscription.topic_pattern.pattern, consumer_tag)
 
             logger.debug(f"Unsubscribed from consumer {consumer_tag}")
 
@@ -363,7 +358,10 @@ class MessageBrokerAdapter:
         """
         Process a message received from the message broker.
 
-        Invokes the appropriate callback for the message.
+        Invokes the callback of every subscription on the receiving queue
+        whose pattern matches the message's routing key. Several
+        subscriptions can share a queue, and the broker delivers each message
+        to only one of their consumers.
 
         Args:
             message: The AMQP message
@@ -391,8 +389,9 @@ class MessageBrokerAdapter:
             else:
                 data = message.body.decode()
 
-            # Invoke the callback
-            await self.subscribers[consumer_tag].callback(data)
+            # Invoke the callbacks
+            for subscription in self._route(message, consumer_tag):
+                await subscription.callback(data)
 
             # Acknowledge the message
             await message.ack()
@@ -401,3 +400,28 @@ class MessageBrokerAdapter:
             logger.error(f"Error processing message: {e}")
             # Negative acknowledgement to retry or handle later
             await message.nack(requeue=True)
+
+    def _route(self, message: Message, consumer_tag: str) -> List[MessageSubscription]:
+        """
+        Find the subscriptions a received message is meant for.
+
+        Args:
+            message: The AMQP message
+            consumer_tag: The consumer tag that received the message
+
+        Returns:
+            Matching subscriptions on the receiving queue, or the receiving
+            subscription if the routing key matches none of them
+        """
+        receiver = self.subscribers[consumer_tag]
+        routing_key = getattr(message, "routing_key", None)
+        if not isinstance(routing_key, str):
+            return [receiver]
+
+        matched = [
+            self.subscribers[tag]
+            for tag in self._routes.match(routing_key)
+            if tag in self.subscribers
+            and self.subscribers[tag].queue_name == receiver.queue_name
+        ]
+        return matched or [receiver]
@@ -313,6 +313,13 @@ class MessageBrokerIntegrator:
                 except Exception as e:
                     logger.error(f"Error while cancelling task {name}: {str(e)}")
         
+        # Forward messages the bridge already queued and stop its consumers
+        if self.mqtt_websocket_bridge:
+            try:
+                await self.mqtt_websocket_bridge.disconnect()
+            except Exception as e:
+                logger.error(f"Error stopping MQTT-WebSocket bridge: {str(e)}")
+        
         # Disconnect MQTT client
         if self.mqtt_client:
             try:
@@ -331,7 +338,14 @@ class MessageBrokerIntegrator:
         
     def get_health_status(self) -> Dict[str, Any]:
         """Get the current health status of the message broker."""
-        return self.health_check.get_status()
+        status = self.health_check.get_status()
+
+        # Include change stream throughput and lag when the listener is running
+        multiplexer = getattr(self.shadow_listener, "multiplexer", None)
+        if multiplexer is not None:
+            status["change_stream"] = multiplexer.get_metrics()
+
+        return status
 
 
 def register_events(app: FastAPI) -> None:
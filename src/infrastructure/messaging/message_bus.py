@@ -9,7 +9,9 @@ import json
 import logging
 import os
 import threading
+import time
 import uuid
+from collections import deque
 from datetime import datetime
 
 import pika
@@ -28,6 +30,17 @@ RABBITMQ_USER = os.environ.get("RABBITMQ_USER", "iotsphere")
 RABBITMQ_PASSWORD = os.environ.get("RABBITMQ_PASSWORD", "iotsphere")
 RABBITMQ_VHOST = os.environ.get("RABBITMQ_VHOST", "/")
 
+# Publisher tuning: channels in the pool, messages per confirmed batch, max
+# seconds a message waits for its batch, and buffered messages per channel
+RABBITMQ_PUBLISH_CHANNELS = int(os.environ.get("RABBITMQ_PUBLISH_CHANNELS", 2))
+RABBITMQ_PUBLISH_BATCH_SIZE = int(os.environ.get("RABBITMQ_PUBLISH_BATCH_SIZE", 200))
+RABBITMQ_PUBLISH_FLUSH_INTERVAL = float(
+    os.environ.get("RABBITMQ_PUBLISH_FLUSH_INTERVAL", 0.05)
+)
+RABBITMQ_OUTBOX_SIZE = int(os.environ.get("RABBITMQ_OUTBOX_SIZE", 10000))
+
+EXCHANGE_NAME = "iotsphere"
+
 
 class LocalMessageBus:
     """
@@ -116,6 +129,227 @@ class LocalMessageBus:
         return True
 
 
+class RabbitMqPublisherChannel:
+    """
+    One publishing channel in the RabbitMqMessageBus pool.
+
+    pika connections are not thread-safe, so each channel owns its connection
+    and is only used from its own worker thread. Messages wait in an
+    in-memory outbox and are sent in batches of up to batch_size, or after
+    flush_interval seconds. Each batch is published in one AMQP transaction,
+    so the broker confirms the whole batch with a single round trip. A batch
+    that fails goes back to the front of the outbox and is retried after
+    reconnecting, so buffered messages survive a lost connection (a batch
+    whose commit was lost in flight may be delivered twice).
+    """
+
+    def __init__(
+        self,
+        index,
+        connection_params,
+        batch_size=RABBITMQ_PUBLISH_BATCH_SIZE,
+        flush_interval=RABBITMQ_PUBLISH_FLUSH_INTERVAL,
+        max_outbox=RABBITMQ_OUTBOX_SIZE,
+        reconnect_delay=1.0,
+    ):
+        """
+        Initialize a publisher channel
+
+        Args:
+            index (int): Position in the pool, used in the thread name
+            connection_params: pika connection parameters
+            batch_size (int): Messages per transaction
+            flush_interval (float): Max seconds a message waits for its batch
+            max_outbox (int): Buffered messages above which publishes are refused
+            reconnect_delay (float): Seconds between reconnect attempts
+        """
+        self.index = index
+        self.connection_params = connection_params
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.max_outbox = max(max_outbox, self.batch_size)
+        self.reconnect_delay = reconnect_delay
+
+        self.connection = None
+        self.channel = None
+        self.outbox = deque()
+        self.outbox_ready = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.start_lock = threading.Lock()
+
+        # Counters
+        self.published = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.rejected = 0
+        self.reconnects = 0
+
+    def enqueue(self, topic, body):
+        """
+        Add a message to the outbox
+
+        Args:
+            topic (str): Routing key
+            body (str): Encoded message
+
+        Returns:
+            bool: False if the outbox is full
+        """
+        with self.outbox_ready:
+            if len(self.outbox) >= self.max_outbox:
+                self.rejected += 1
+                return False
+            self.outbox.append((topic, body))
+            # Wake the worker to start the flush timer or send a full batch
+            if len(self.outbox) == 1 or len(self.outbox) >= self.batch_size:
+                self.outbox_ready.notify()
+        return True
+
+    def start(self):
+        """Start the worker thread"""
+        with self.start_lock:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(
+                target=self._run, name=f"rabbitmq-publisher-{self.index}", daemon=True
+            )
+            self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Flush the outbox and stop the worker thread
+
+        Args:
+            timeout (float): Max seconds to wait for the flush
+        """
+        with self.outbox_ready:
+            self.running = False
+            self.outbox_ready.notify()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+        if self.outbox:
+            logger.warning(
+                f"RabbitMQ publisher {self.index} stopped with "
+                f"{len(self.outbox)} unsent messages"
+            )
+
+    def _take_batch(self):
+        """
+        Wait for a full batch or the flush interval, then take the batch
+
+        Returns:
+            list: (topic, body) pairs; empty once stopped and drained
+        """
+        with self.outbox_ready:
+            deadline = None
+            while len(self.outbox) < self.batch_size:
+                if not self.running:
+                    break
+                if self.outbox:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.outbox_ready.wait(remaining)
+                else:
+                    deadline = None
+                    self.outbox_ready.wait()
+
+            count = min(len(self.outbox), self.batch_size)
+            return [self.outbox.popleft() for _ in range(count)]
+
+    def _requeue(self, batch):
+        """Put a failed batch back at the front of the outbox"""
+        with self.outbox_ready:
+            self.outbox.extendleft(reversed(batch))
+
+    def _connect(self):
+        """Open this channel's connection in transaction mode"""
+        self.connection = pika.BlockingConnection(self.connection_params)
+        self.channel = self.connection.channel()
+        self.channel.exchange_declare(
+            exchange=EXCHANGE_NAME, exchange_type="topic", durable=True
+        )
+        self.channel.tx_select()
+
+    def _close(self):
+        """Drop the connection after an error"""
+        try:
+            if self.connection and self.connection.is_open:
+                self.connection.close()
+        except Exception:
+            pass
+        self.connection = None
+        self.channel = None
+
+    def _publish_batch(self, batch):
+        """Publish a batch in one transaction"""
+        if self.channel is None:
+            self._connect()
+
+        properties = pika.BasicProperties(
+            delivery_mode=2,  # Make message persistent
+            content_type="application/json",
+        )
+        for topic, body in batch:
+            self.channel.basic_publish(
+                exchange=EXCHANGE_NAME,
+                routing_key=topic,
+                body=body,
+                properties=properties,
+            )
+        self.channel.tx_commit()
+
+    def _run(self):
+        """Publish batches until stopped and the outbox is empty"""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                break
+
+            try:
+                self._publish_batch(batch)
+                self.published += len(batch)
+                self.batches += 1
+            except Exception as e:
+                logger.error(
+                    f"RabbitMQ publisher {self.index} failed to send "
+                    f"{len(batch)} messages: {e}"
+                )
+                self.failed_batches += 1
+                self._requeue(batch)
+                self._close()
+                if not self.running:
+                    # Shutting down; keep the messages for a later start()
+                    break
+                self.reconnects += 1
+                time.sleep(self.reconnect_delay)
+
+        self._close()
+
+    def get_metrics(self):
+        """
+        Get publishing counters for this channel
+
+        Returns:
+            dict: Outbox depth and counters
+        """
+        return {
+            "channel": self.index,
+            "connected": self.channel is not None,
+            "outbox": len(self.outbox),
+            "published": self.published,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "rejected": self.rejected,
+            "reconnects": self.reconnects,
+        }
+
+
 class RabbitMqMessageBus:
     """
     RabbitMQ implementation of message bus for production use.
@@ -124,10 +358,25 @@ class RabbitMqMessageBus:
     - Uses RabbitMQ for reliable message delivery
     - Supports multiple consumers for horizontal scaling
     - Handles reconnection to RabbitMQ automatically
+    - Publishes through a pool of batching channels without blocking callers
     """
 
-    def __init__(self):
-        """Initialize RabbitMQ message bus"""
+    def __init__(
+        self,
+        publish_channels=RABBITMQ_PUBLISH_CHANNELS,
+        batch_size=RABBITMQ_PUBLISH_BATCH_SIZE,
+        flush_interval=RABBITMQ_PUBLISH_FLUSH_INTERVAL,
+        max_outbox=RABBITMQ_OUTBOX_SIZE,
+    ):
+        """
+        Initialize RabbitMQ message bus
+
+        Args:
+            publish_channels (int): Publisher channels in the pool
+            batch_size (int): Messages per confirmed batch
+            flush_interval (float): Max seconds a message waits for its batch
+            max_outbox (int): Messages buffered per channel before publishes fail
+        """
         # RabbitMQ connection parameters
         self.credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASSWORD)
         self.connection_params = pika.ConnectionParameters(
@@ -137,7 +386,7 @@ class RabbitMqMessageBus:
             credentials=self.credentials,
         )
 
-        # Connection and channel
+        # Connection and channel used for consuming
         self.connection = None
         self.channel = None
 
@@ -152,6 +401,19 @@ class RabbitMqMessageBus:
         self.connection_thread = None
         self.running = False
 
+        # Publisher pool; a topic always maps to the same channel so its
+        # messages keep their order
+        self.publishers = [
+            RabbitMqPublisherChannel(
+                index,
+                self.connection_params,
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+                max_outbox=max_outbox,
+            )
+            for index in range(max(publish_channels, 1))
+        ]
+
         logger.info(
             f"Initialized RabbitMQ message bus ({RABBITMQ_HOST}:{RABBITMQ_PORT})"
         )
@@ -170,7 +432,7 @@ class RabbitMqMessageBus:
 
             # Create exchange for topic-based routing
             self.channel.exchange_declare(
-                exchange="iotsphere", exchange_type="topic", durable=True
+                exchange=EXCHANGE_NAME, exchange_type="topic", durable=True
             )
 
             self.connected = True
@@ -210,7 +472,7 @@ class RabbitMqMessageBus:
 
             # Bind queue to exchange with topic routing key
             self.channel.queue_bind(
-                exchange="iotsphere", queue=queue_name, routing_key=topic
+                exchange=EXCHANGE_NAME, queue=queue_name, routing_key=topic
             )
 
             # Set up consumer
@@ -275,39 +537,44 @@ class RabbitMqMessageBus:
         """
         Publish message to topic
 
+        The message is queued on a publisher channel and sent with the next
+        batch, so this returns without waiting for the broker.
+
         Args:
             topic (str): Message topic
             message (dict): Message content
 
         Returns:
-            bool: Success status
+            bool: False if the message could not be queued
         """
         try:
-            if not self.connected:
-                logger.warning("Not connected to RabbitMQ, attempting to reconnect...")
-                if not self._connect():
-                    return False
-
-            # Convert message to JSON
             body = json.dumps(message)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Error encoding message for topic {topic}: {e}")
+            return False
 
-            # Publish to exchange with topic routing key
-            self.channel.basic_publish(
-                exchange="iotsphere",
-                routing_key=topic,
-                body=body,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Make message persistent
-                    content_type="application/json",
-                ),
-            )
+        publisher = self.publishers[hash(topic) % len(self.publishers)]
+        publisher.start()
+        if not publisher.enqueue(topic, body):
+            logger.warning(f"RabbitMQ outbox full, dropping message for topic {topic}")
+            return False
+        return True
 
-            return True
+    def get_metrics(self):
+        """
+        Get publishing metrics for the channel pool
 
-        except Exception as e:
-            logger.error(f"Error publishing message to topic {topic}: {e}")
-            self.connected = False
-            return False
+        Returns:
+            dict: Totals and per-channel outbox depth and counters
+        """
+        channels = [publisher.get_metrics() for publisher in self.publishers]
+        return {
+            "outbox": sum(c["outbox"] for c in channels),
+            "published": sum(c["published"] for c in channels),
+            "failed_batches": sum(c["failed_batches"] for c in channels),
+            "rejected": sum(c["rejected"] for c in channels),
+            "channels": channels,
+        }
 
     def subscribe(self, topic, callback):
         """
@@ -370,6 +637,9 @@ class RabbitMqMessageBus:
             if not self.connected:
                 self._connect()
 
+            for publisher in self.publishers:
+                publisher.start()
+
             # Start connection monitor thread
             self.running = True
             self.connection_thread = threading.Thread(
@@ -393,6 +663,10 @@ class RabbitMqMessageBus:
             if self.connection_thread:
                 self.connection_thread.join(timeout=2.0)
 
+            # Flush buffered messages before closing
+            for publisher in self.publishers:
+                publisher.stop()
+
             # Close connection
             if self.connection and self.connection.is_open:
                 self.connection.close()
@@ -407,12 +681,14 @@ class RabbitMqMessageBus:
 
 
 # Factory function to create appropriate message bus
-def create_message_bus(bus_type="rabbitmq"):
+def create_message_bus(bus_type="rabbitmq", **options):
     """
     Create message bus instance
 
     Args:
         bus_type (str): Type of message bus ('local' or 'rabbitmq')
+        **options: RabbitMqMessageBus publisher settings (publish_channels,
+            batch_size, flush_interval, max_outbox)
 
     Returns:
         MessageBus: Message bus instance
@@ -420,4 +696,4 @@ def create_message_bus(bus_type="rabbitmq"):
     if bus_type.lower() == "local":
         return LocalMessageBus()
     else:
-        return RabbitMqMessageBus()
+        return RabbitMqMessageBus(**options)
@@ -5,7 +5,6 @@ MQTT Adapter for IoTSphere
 This module provides an adapter between MQTT protocol and the internal message bus,
 bridging IoT devices using MQTT protocol with the event-driven architecture of IoTSphere.
 """
-import json
 import logging
 import os
 import uuid
@@ -13,6 +12,9 @@ from datetime import datetime
 
 import paho.mqtt.client as mqtt
 
+from src.infrastructure.messaging.mqtt_ingest import MqttIngestQueue
+from src.utils import json_codec
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -36,6 +38,10 @@ class MqttAdapter:
     - Translates MQTT messages to internal event format
     - Publishes events to the internal message bus
     - Sends commands to devices via MQTT
+
+    Once start_ingest() has been awaited, on_message only queues the raw
+    message and asyncio consumers do the decoding and message bus fan-out, so
+    the paho network thread is never held up.
     """
 
     def __init__(self, mqtt_client=None, message_bus=None):
@@ -60,6 +66,9 @@ class MqttAdapter:
         # Store message bus
         self.message_bus = message_bus
 
+        # Optional hand-off from the paho thread to asyncio consumers
+        self.ingest = None
+
         # Topic patterns
         self.device_telemetry_topic = "iotsphere/devices/+/telemetry"
         self.device_event_topic = "iotsphere/devices/+/events"
@@ -102,6 +111,25 @@ class MqttAdapter:
             logger.error(f"Error stopping MQTT adapter: {e}")
             return False
 
+    async def start_ingest(self, **kwargs):
+        """
+        Process incoming messages on asyncio consumers instead of the paho thread
+
+        Args:
+            **kwargs: MqttIngestQueue options, e.g. consumers or max_queue_size
+        """
+        if self.ingest is None:
+            self.ingest = MqttIngestQueue(
+                lambda frame: self.process_message(frame.topic, frame.payload),
+                **kwargs,
+            )
+        await self.ingest.start()
+
+    async def stop_ingest(self):
+        """Drain queued messages and stop the ingestion consumers"""
+        if self.ingest is not None:
+            await self.ingest.stop()
+
     def on_connect(self, client, userdata, flags, rc):
         """Handle connection to MQTT broker"""
         if rc == 0:
@@ -123,11 +151,23 @@ class MqttAdapter:
             userdata: User data (not used)
             message: MQTT message object
         """
+        if self.ingest is not None and self.ingest.running:
+            self.ingest.submit(message.topic, message.payload)
+            return
+
+        self.process_message(message.topic, message.payload)
+
+    def process_message(self, topic, payload):
+        """
+        Decode an MQTT message and forward it to the message bus
+
+        Args:
+            topic (str): MQTT topic
+            payload (bytes): Raw message payload
+        """
         try:
             # Decode message payload
-            payload = message.payload.decode("utf-8")
-            data = json.loads(payload)
-            topic = message.topic
+            data = json_codec.loads(payload)
 
             # Extract device ID from topic
             # Topic format: iotsphere/devices/{device_id}/{message_type}
@@ -147,8 +187,8 @@ class MqttAdapter:
             else:
                 logger.warning(f"Received message with invalid topic format: {topic}")
 
-        except json.JSONDecodeError:
-            logger.error(f"Failed to decode JSON message: {message.payload}")
+        except json_codec.JSONDecodeError:
+            logger.error(f"Failed to decode JSON message: {payload}")
         except Exception as e:
             logger.error(f"Error processing MQTT message: {e}")
 
@@ -168,15 +208,20 @@ class MqttAdapter:
         if "device_id" in data and data["device_id"] != device_id:
             logger.warning(f"Device ID mismatch: {device_id} vs {data['device_id']}")
 
+        # Readings may be flat or already wrapped in a "data" object
+        readings = data.get("data")
+        if not isinstance(readings, dict):
+            readings = {
+                k: v for k, v in data.items() if k not in ["device_id", "timestamp"]
+            }
+
         # Create event for internal message bus
         event = {
             "event_id": str(uuid.uuid4()),
             "event_type": "device.telemetry",
             "device_id": device_id,
             "timestamp": data.get("timestamp", datetime.utcnow().isoformat()),
-            "data": {
-                k: v for k, v in data.items() if k not in ["device_id", "timestamp"]
-            },
+            "data": readings,
             "simulated": data.get("simulated", False),
         }
 
@@ -279,7 +324,7 @@ class MqttAdapter:
 
             # Publish to device command topic
             topic = f"iotsphere/devices/{device_id}/commands"
-            payload = json.dumps(command)
+            payload = json_codec.dumps(command)
             self.mqtt_client.publish(topic, payload)
 
             logger.info(f"Sent command to device {device_id}: {command.get('command')}")
@@ -0,0 +1,223 @@
+"""
+MQTT ingestion stage for the IoTSphere messaging layer.
+
+Paho runs its callbacks on its own network thread, where touching the event
+loop directly is unsafe and slow work delays keepalives. MqttIngestQueue
+gives those callbacks a cheap, thread-safe hand-off: frames are scheduled onto
+the event loop with call_soon_threadsafe, buffered in bounded queues and
+decoded and dispatched by a pool of asyncio consumers. Each topic is pinned
+to one consumer so messages on a topic are handled in the order received.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INGEST_QUEUE_SIZE = int(os.environ.get("MQTT_INGEST_QUEUE_SIZE", "10000"))
+DEFAULT_INGEST_CONSUMERS = int(os.environ.get("MQTT_INGEST_CONSUMERS", "4"))
+
+# What to do when the queue is full
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST)
+
+
+class MqttFrame(NamedTuple):
+    """A raw MQTT message as received on the network thread."""
+
+    topic: str
+    payload: bytes
+    received_at: float
+
+
+FrameHandler = Callable[[MqttFrame], Union[None, Awaitable[None]]]
+
+
+class MqttIngestQueue:
+    """
+    Bounded, thread-safe queue between paho callbacks and asyncio consumers.
+
+    on_message() can be installed directly as a paho on_message callback.
+    Frames are partitioned across the consumers by topic, each consumer with
+    its own share of max_queue_size, so per-topic order is kept. Frames that wait in the queue longer than late_after seconds are still
+    delivered but counted as late; when the queue is full the overflow policy
+    drops either the oldest queued frame or the incoming one.
+    """
+
+    def __init__(
+        self,
+        handler: FrameHandler,
+        max_queue_size: int = DEFAULT_INGEST_QUEUE_SIZE,
+        consumers: int = DEFAULT_INGEST_CONSUMERS,
+        overflow_policy: str = OVERFLOW_DROP_OLDEST,
+        late_after: float = 1.0,
+    ):
+        """
+        Initialize the ingestion queue.
+
+        Args:
+            handler: Sync or async callable that decodes and dispatches a frame
+            max_queue_size: Frames buffered, split evenly across the consumers
+            consumers: Number of consumer tasks
+            overflow_policy: drop_oldest or drop_newest
+            late_after: Queue wait in seconds after which a frame counts as late
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy '{overflow_policy}', expected one of "
+                f"{', '.join(OVERFLOW_POLICIES)}"
+            )
+        if consumers < 1:
+            raise ValueError("At least one consumer is required")
+
+        self.handler = handler
+        self.max_queue_size = max_queue_size
+        self.consumers = consumers
+        self.overflow_policy = overflow_policy
+        self.late_after = late_after
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+        # Counters
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.late = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether consumers are running and frames are accepted."""
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Bind to the running event loop and start the consumers."""
+        if self.running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        partition_size = max(1, self.max_queue_size // self.consumers)
+        self._queues = [
+            asyncio.Queue(maxsize=partition_size) for _ in range(self.consumers)
+        ]
+        self._tasks = [
+            asyncio.create_task(self._consume(queue), name=f"mqtt-ingest-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+        logger.info(f"MQTT ingestion started with {self.consumers} consumers")
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        """
+        Stop the consumers.
+
+        Args:
+            drain_timeout: Seconds to wait for queued frames to be processed
+        """
+        if not self.running:
+            return
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout=drain_timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Stopping MQTT ingestion with {self._queue_depth()} frames queued"
+            )
+
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("MQTT ingestion stopped")
+
+    def on_message(self, client, userdata, message) -> None:
+        """Paho on_message callback; safe to call from the network thread."""
+        self.submit(message.topic, message.payload)
+
+    def submit(self, topic: Union[str, bytes], payload: Any) -> bool:
+        """
+        Hand a raw message to the event loop without blocking.
+
+        Args:
+            topic: Message topic
+            payload: Raw message payload
+
+        Returns:
+            bool: False if the stage is not running and the frame was dropped
+        """
+        loop = self._loop
+        if not self.running or loop is None or loop.is_closed():
+            self.dropped += 1
+            logger.warning("MQTT ingestion not running, dropping message")
+            return False
+
+        if isinstance(topic, bytes):
+            topic = topic.decode("utf-8")
+        frame = MqttFrame(topic, payload, time.monotonic())
+        try:
+            loop.call_soon_threadsafe(self._enqueue, frame)
+        except RuntimeError:
+            # Loop closed between the check and the call
+            self.dropped += 1
+            return False
+        return True
+
+    def _enqueue(self, frame: MqttFrame) -> None:
+        """Put a frame on its topic's queue; runs on the event loop thread."""
+        self.received += 1
+        queue = self._queues[hash(frame.topic) % len(self._queues)]
+        if queue.full():
+            self.dropped += 1
+            if self.overflow_policy == OVERFLOW_DROP_NEWEST:
+                return
+            queue.get_nowait()
+            queue.task_done()
+        queue.put_nowait(frame)
+
+    async def _consume(self, queue: asyncio.Queue) -> None:
+        """Decode and dispatch frames from one partition until cancelled."""
+        while True:
+            frame = await queue.get()
+            try:
+                if time.monotonic() - frame.received_at > self.late_after:
+                    self.late += 1
+                result = self.handler(frame)
+                if asyncio.iscoroutine(result):
+                    await result
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error processing MQTT message on {frame.topic}: {e}")
+            finally:
+                queue.task_done()
+
+    def _queue_depth(self) -> int:
+        """Total frames waiting across all partitions."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get ingestion statistics.
+
+        Returns:
+            Dict with queue depth and received, processed, dropped, late and
+            failed counts
+        """
+        return {
+            "queue_depth": self._queue_depth(),
+            "consumers": len(self._tasks),
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "late": self.late,
+            "failed": self.failed,
+        }
@@ -0,0 +1,304 @@
+"""
+Topic subscription index for the IoTSphere messaging layer.
+
+Stores subscription patterns in a trie keyed by topic level, so finding every
+subscriber of a published topic walks the topic's levels once instead of
+testing each pattern in turn. Wildcards follow MQTT by default:
+- '+' matches exactly one level
+- '#' matches the parent level and any number of levels below it
+
+amqp_topic_trie() builds a trie with AMQP topic-exchange rules instead, where
+'.' separates levels, '*' matches one level and '#' matches zero or more
+levels anywhere in the pattern.
+"""
+import logging
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+
+class _TrieNode:
+    """One topic level in the trie."""
+
+    __slots__ = ("children", "values", "multi_values", "repeats")
+
+    def __init__(self, repeats: bool = False):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Set for an inner multi-level wildcard, which can absorb any levels
+        self.repeats = repeats
+        # Subscribers whose pattern ends at this level
+        self.values: Set[Hashable] = set()
+        # Subscribers whose pattern ends with the multi-level wildcard here
+        self.multi_values: Set[Hashable] = set()
+
+    def is_empty(self) -> bool:
+        """Whether the node holds no subscribers and no children."""
+        return not (self.children or self.values or self.multi_values)
+
+
+class TopicTrie:
+    """
+    Maps topic patterns to subscribers and resolves published topics to the
+    set of matching subscribers.
+
+    Subscribers can be any hashable value, e.g. client IDs or pattern keys.
+    The index is updated incrementally by add() and remove().
+    """
+
+    def __init__(
+        self,
+        separator: str = "/",
+        single_wildcard: str = "+",
+        multi_wildcard: str = "#",
+        inner_multi_wildcard: bool = False,
+    ):
+        """
+        Initialize an empty trie.
+
+        Args:
+            separator: Topic level separator
+            single_wildcard: Level that matches exactly one topic level
+            multi_wildcard: Level that matches zero or more topic levels
+            inner_multi_wildcard: Allow multi_wildcard at any level (AMQP)
+                instead of only as the last level (MQTT)
+        """
+        self.separator = separator
+        self.single_wildcard = single_wildcard
+        self.multi_wildcard = multi_wildcard
+        self.inner_multi_wildcard = inner_multi_wildcard
+        self._root = _TrieNode()
+        self._patterns: Dict[str, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        """Number of distinct patterns in the index."""
+        return len(self._patterns)
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self._patterns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._patterns)
+
+    def _split(self, pattern: str) -> List[str]:
+        """
+        Split and validate a subscription pattern.
+
+        Raises:
+            ValueError: If the multi-level wildcard is not a whole level, or
+                not the last level when inner wildcards are disabled
+        """
+        levels = pattern.split(self.separator)
+        for i, level in enumerate(levels):
+            if self.multi_wildcard not in level:
+                continue
+            if level != self.multi_wildcard:
+                raise ValueError(
+                    f"Invalid topic pattern '{pattern}': '{self.multi_wildcard}' "
+                    "must be a whole level"
+                )
+            if i != len(levels) - 1 and not self.inner_multi_wildcard:
+                raise ValueError(
+                    f"Invalid topic pattern '{pattern}': '{self.multi_wildcard}' "
+                    "must be the whole last level"
+                )
+        return levels
+
+    def add(self, pattern: str, value: Hashable) -> bool:
+        """
+        Subscribe a value to a pattern.
+
+        Args:
+            pattern: Topic pattern, possibly with wildcards
+            value: Subscriber to return for matching topics
+
+        Returns:
+            bool: True if the subscription is new
+
+        Raises:
+            ValueError: If the pattern is invalid
+        """
+        levels = self._split(pattern)
+        subscribers = self._patterns.setdefault(pattern, set())
+        if value in subscribers:
+            return False
+
+        node = self._root
+        for level in levels[:-1]:
+            child = node.children.get(level)
+            if child is None:
+                child = _TrieNode(repeats=level == self.multi_wildcard)
+                node.children[level] = child
+            node = child
+
+        if levels[-1] == self.multi_wildcard:
+            node.multi_values.add(value)
+        else:
+            node.children.setdefault(levels[-1], _TrieNode()).values.add(value)
+
+        subscribers.add(value)
+        return True
+
+    def remove(self, pattern: str, value: Hashable) -> bool:
+        """
+        Unsubscribe a value from a pattern, pruning empty branches.
+
+        Args:
+            pattern: Topic pattern the value was added with
+            value: Subscriber to remove
+
+        Returns:
+            bool: True if the subscription existed
+        """
+        subscribers = self._patterns.get(pattern)
+        if not subscribers or value not in subscribers:
+            return False
+
+        levels = pattern.split(self.separator)
+        path = [self._root]
+        for level in levels[:-1]:
+            path.append(path[-1].children[level])
+
+        if levels[-1] == self.multi_wildcard:
+            path[-1].multi_values.discard(value)
+        else:
+            path.append(path[-1].children[levels[-1]])
+            path[-1].values.discard(value)
+
+        # Drop nodes left without subscribers or children, deepest first
+        for depth in range(len(path) - 1, 0, -1):
+            if not path[depth].is_empty():
+                break
+            del path[depth - 1].children[levels[depth - 1]]
+
+        subscribers.discard(value)
+        if not subscribers:
+            del self._patterns[pattern]
+        return True
+
+    def subscribers(self, pattern: str) -> Set[Hashable]:
+        """Get the values subscribed to exactly this pattern."""
+        return set(self._patterns.get(pattern, ()))
+
+    def match(self, topic: str) -> Set[Hashable]:
+        """
+        Find every value subscribed to a pattern matching the topic.
+
+        Args:
+            topic: Concrete topic a message was published on
+
+        Returns:
+            Set of matching subscribers
+        """
+        levels = topic.split(self.separator)
+        matched: Set[Hashable] = set()
+        nodes = self._expand([self._root])
+
+        for level in levels:
+            next_nodes = []
+            for node in nodes:
+                matched |= node.multi_values
+                child = node.children.get(level)
+                if child is not None:
+                    next_nodes.append(child)
+                wildcard = node.children.get(self.single_wildcard)
+                if wildcard is not None:
+                    next_nodes.append(wildcard)
+                if node.repeats:
+                    # An inner '#' also consumes this level
+                    next_nodes.append(node)
+            if not next_nodes:
+                return matched
+            nodes = self._expand(next_nodes)
+
+        for node in nodes:
+            # '#' also matches the parent level itself
+            matched |= node.values | node.multi_values
+        return matched
+
+    def _expand(self, nodes: List[_TrieNode]) -> List[_TrieNode]:
+        """
+        Add the inner multi-level wildcard nodes reachable without consuming
+        a level, since '#' may match zero levels.
+        """
+        if not self.inner_multi_wildcard:
+            return nodes
+
+        expanded: Dict[int, _TrieNode] = {}
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if id(node) in expanded:
+                continue
+            expanded[id(node)] = node
+            wildcard = node.children.get(self.multi_wildcard)
+            if wildcard is not None:
+                stack.append(wildcard)
+        return list(expanded.values())
+
+    def clear(self, value: Optional[Hashable] = None) -> None:
+        """
+        Remove subscriptions.
+
+        Args:
+            value: Only remove this subscriber's patterns; everything if None
+        """
+        if value is None:
+            self._root = _TrieNode()
+            self._patterns.clear()
+            return
+
+        for pattern in [p for p, values in self._patterns.items() if value in values]:
+            self.remove(pattern, value)
+
+
+def amqp_topic_trie() -> TopicTrie:
+    """Create a trie using AMQP topic-exchange separator and wildcards."""
+    return TopicTrie(
+        separator=".",
+        single_wildcard="*",
+        multi_wildcard="#",
+        inner_multi_wildcard=True,
+    )
+
+
+def levels_match(
+    pattern: Sequence[str],
+    topic: Sequence[str],
+    single_wildcard: str = "*",
+    multi_wildcard: str = "#",
+) -> bool:
+    """
+    Match one split pattern against a split topic without building an index.
+
+    '#' may appear at any level and matches zero or more levels.
+
+    Args:
+        pattern: Pattern levels
+        topic: Topic levels
+        single_wildcard: Level that matches exactly one topic level
+        multi_wildcard: Level that matches zero or more topic levels
+
+    Returns:
+        True if the topic matches the pattern
+    """
+    p = t = 0
+    # Position of the last '#' seen and the topic level it resumes from
+    star_p, star_t = -1, 0
+
+    while t < len(topic):
+        if p < len(pattern) and pattern[p] == multi_wildcard:
+            star_p, star_t = p, t
+            p += 1
+        elif p < len(pattern) and pattern[p] in (topic[t], single_wildcard):
+            p += 1
+            t += 1
+        elif star_p >= 0:
+            # Let the last '#' absorb one more level and retry
+            star_t += 1
+            p, t = star_p + 1, star_t
+        else:
+            return False
+
+    while p < len(pattern) and pattern[p] == multi_wildcard:
+        p += 1
+    return p == len(pattern)
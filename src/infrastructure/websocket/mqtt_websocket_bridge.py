@@ -7,18 +7,48 @@ advanced resilience features such as auto-reconnection, connection state
 management, and improved error handling.
 """
 import asyncio
-import json
 import logging
 import time
 from datetime import datetime
 from enum import Enum, auto
 from typing import Any, Dict, List, Optional, Set, Callable, Tuple, Union
 
+from src.infrastructure.messaging.mqtt_ingest import MqttIngestQueue
+from src.infrastructure.messaging.topic_trie import TopicTrie
 # Import the existing WebSocket manager
 from src.infrastructure.websocket.websocket_manager import WebSocketServiceManager
+from src.utils import json_codec
 
 logger = logging.getLogger(__name__)
 
+# How JSON payloads are enriched with "_meta" before forwarding
+FORWARD_SPLICE = "splice"
+FORWARD_PARSE = "parse"
+FORWARD_MODES = (FORWARD_SPLICE, FORWARD_PARSE)
+
+# MQTT topic filters forwarded to a WebSocket client following a device;
+# {device_id} is "+" for clients following every device
+DEVICE_TOPIC_FILTERS = ("devices/{device_id}/#", "shadows/{device_id}/#")
+
+
+def device_topic_patterns(device_ids: Set[str]) -> List[str]:
+    """
+    Map the device IDs a WebSocket client follows to MQTT topic filters.
+    
+    Args:
+        device_ids: Device IDs; empty or containing "*" means every device
+        
+    Returns:
+        Topic filters for the client's bridge subscriptions
+    """
+    if not device_ids or "*" in device_ids:
+        device_ids = {"+"}
+    return [
+        topic_filter.format(device_id=device_id)
+        for device_id in sorted(device_ids)
+        for topic_filter in DEVICE_TOPIC_FILTERS
+    ]
+
 
 class ConnectionState(Enum):
     """Connection states for the MQTT-WebSocket bridge."""
@@ -50,14 +80,20 @@ class MQTTWebSocketBridge:
     - Maintain connection state and recover from failures
     """
     
-    def __init__(self, mqtt_client):
+    def __init__(self, mqtt_client, forward_mode: str = FORWARD_SPLICE):
         """
         Initialize the MQTT-WebSocket bridge.
         
         Args:
             mqtt_client: MQTT client for subscribing to topics
+            forward_mode: "splice" to add metadata to the original JSON payload
+                bytes, or "parse" to decode and re-encode them
         """
+        if forward_mode not in FORWARD_MODES:
+            raise ValueError(f"Unknown forward mode '{forward_mode}', expected one of {', '.join(FORWARD_MODES)}")
+            
         self.mqtt_client = mqtt_client
+        self.forward_mode = forward_mode
         self.websocket_manager = WebSocketServiceManager.get_instance()
         self.connection_state = ConnectionState.DISCONNECTED
         self._subscribed_topics: Set[str] = set()
@@ -71,9 +107,22 @@ class MQTTWebSocketBridge:
         self._last_error_time: Optional[float] = None
         self._message_counter = 0
         self._message_handlers: Dict[str, List[Callable]] = {}
+        # Topic tries resolving a message topic to handler patterns and client IDs
+        self._handler_index = TopicTrie()
+        self._client_index = TopicTrie()
+        self._client_subscriptions: Dict[str, Set[str]] = {}
+        # Hands messages from the paho network thread to asyncio consumers
+        self._ingest = MqttIngestQueue(self._handle_mqtt_message)
+        # Loop the tries are used on; subscription changes reported from the
+        # WebSocket server thread are applied there
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         # Configure MQTT client callbacks
         self._setup_mqtt_callbacks()
+        
+        # Follow the subscriptions of clients as they connect and disconnect
+        if self.websocket_manager is not None:
+            self.websocket_manager.add_subscription_listener(self._on_client_subscriptions)
         logger.info("MQTT-WebSocket bridge initialized")
         
     def _setup_mqtt_callbacks(self) -> None:
@@ -164,6 +213,10 @@ class MQTTWebSocketBridge:
         logger.info("Connecting to MQTT broker...")
         
         try:
+            # Consumers must be running before the network thread delivers messages
+            self._loop = asyncio.get_running_loop()
+            await self._ingest.start()
+            
             # Connect using the MQTT client
             self.mqtt_client.connect(
                 host=self.mqtt_client._host,
@@ -286,21 +339,30 @@ class MQTTWebSocketBridge:
             return False
             
     async def disconnect(self) -> None:
-        """Disconnect from MQTT broker."""
-        if self.connected:
+        """
+        Disconnect from MQTT broker and stop the ingestion consumers.
+        
+        Messages already queued by the network thread are forwarded before
+        the consumers stop.
+        """
+        if self.connection_state == ConnectionState.CONNECTED:
             try:
-                await self.mqtt_client.disconnect()
-                self.connected = False
+                self.mqtt_client.disconnect()
+                self.mqtt_client.loop_stop()
+                self.connection_state = ConnectionState.DISCONNECTED
                 logger.info("Disconnected from MQTT broker")
             except Exception as e:
                 logger.error(f"Error disconnecting from MQTT broker: {str(e)}")
                 
+        await self._ingest.stop()
+                
     def _on_mqtt_message(self, client, userdata, message) -> None:
         """
-        Callback for MQTT messages - creates async task to handle the message.
+        Callback for MQTT messages - queues the message for the event loop.
         
-        This callback is executed in the MQTT client thread, so we create an asyncio
-        task to handle the message in the event loop.
+        This callback is executed in the MQTT client thread, so it only hands
+        the raw frame to the ingestion queue; asyncio consumers decode and
+        forward it.
         
         Args:
             client: MQTT client instance
@@ -310,8 +372,11 @@ class MQTTWebSocketBridge:
         # Increment message counter for monitoring
         self._message_counter += 1
         
-        # Create a task to handle the message asynchronously
-        asyncio.create_task(self._handle_mqtt_message(message))
+        self._ingest.on_message(client, userdata, message)
+        
+    def get_ingest_stats(self) -> Dict[str, Any]:
+        """Get queue depth and dropped/late counters of the MQTT ingestion queue."""
+        return self._ingest.get_stats()
         
     async def _handle_mqtt_message(self, message) -> None:
         """
@@ -321,59 +386,45 @@ class MQTTWebSocketBridge:
             message: MQTT message object
         """
         try:
-            # Extract topic and payload
+            # Extract topic; the payload stays raw until something needs it
             topic = message.topic.decode() if isinstance(message.topic, bytes) else message.topic
-            payload = message.payload.decode() if isinstance(message.payload, bytes) else message.payload
-            
-            # Try to parse payload as JSON if possible
-            try:
-                payload_json = json.loads(payload)
-                formatted_payload = json.dumps(payload_json)
-            except (json.JSONDecodeError, TypeError):
-                # Not JSON or couldn't be parsed, use as is
-                formatted_payload = payload
-                payload_json = None
+            raw_payload = message.payload
+            payload_json = None
             
             logger.debug(f"Processing MQTT message on topic: {topic}")
             
-            # Add timestamp and topic to message if it's JSON
-            if payload_json and isinstance(payload_json, dict):
-                enriched_payload = {
-                    **payload_json,
-                    "_meta": {
-                        "topic": topic,
-                        "received_at": datetime.now().isoformat(),
-                        "bridge_message_id": self._message_counter
-                    }
-                }
-                formatted_payload = json.dumps(enriched_payload)
-            
-            # Get WebSocket service
-            websocket_service = self.websocket_manager.get_websocket_service()
+            # WebSocketServiceManager.get_instance() returns the service itself
+            websocket_service = self.websocket_manager
             if not websocket_service:
                 logger.warning("WebSocket service not available")
                 return
                 
-            # Call any registered handlers for this topic
-            await self._call_topic_handlers(topic, payload_json or payload)
+            # Call any registered handlers for this topic, parsing the payload once
+            if self._message_handlers and self._handler_index.match(topic):
+                payload_json = self._decode_payload(raw_payload)
+                await self._call_topic_handlers(
+                    topic, payload_json if payload_json is not None else self._payload_text(raw_payload)
+                )
                 
-            # Forward to all connected clients that have subscribed to this topic
+            recipients = self._client_index.match(topic)
+            if not recipients:
+                return
+            formatted_payload = self._format_for_clients(topic, raw_payload, payload_json)
+                
+            # Forward to the connected clients subscribed to this topic
             clients_forwarded = 0
-            for client_id, client_info in websocket_service.connected_clients.items():
-                websocket = client_info.get("websocket")
-                subscriptions = client_info.get("subscriptions", [])
+            for client_id in recipients:
+                client = websocket_service.clients.get(client_id)
                 
-                # Skip if client has no active websocket
-                if not websocket:
+                # Skip clients that disconnected since subscribing
+                if client is None or not client.is_connected:
                     continue
                     
-                # Check if client has subscribed to this topic
-                if self._topic_matches_subscription(topic, subscriptions):
-                    try:
-                        await websocket.send_text(formatted_payload)
-                        clients_forwarded += 1
-                    except Exception as e:
-                        logger.error(f"Error sending message to client {client_id}: {str(e)}")
+                try:
+                    await self._send_to_client(websocket_service, client, formatted_payload)
+                    clients_forwarded += 1
+                except Exception as e:
+                    logger.error(f"Error sending message to client {client_id}: {str(e)}")
             
             if clients_forwarded > 0:
                 logger.debug(f"Forwarded message on topic '{topic}' to {clients_forwarded} WebSocket clients")
@@ -383,19 +434,84 @@ class MQTTWebSocketBridge:
             logger.error(error_message)
             self._record_error(error_message)
     
+    @staticmethod
+    async def _send_to_client(websocket_service, client, text: str) -> None:
+        """
+        Send a frame to a WebSocket client on the loop that owns its socket.
+        
+        The WebSocket server runs its own event loop on a separate thread;
+        frames for its clients are scheduled there without waiting.
+        
+        Args:
+            websocket_service: The WebSocket service owning the client
+            client: Connected WebSocketClient
+            text: Frame to send
+        """
+        server_loop = getattr(websocket_service, "loop", None)
+        if server_loop is not None and server_loop is not asyncio.get_running_loop():
+            asyncio.run_coroutine_threadsafe(client.send(text), server_loop)
+        else:
+            await client.send(text)
+            
+    @staticmethod
+    def _payload_text(raw_payload: Union[str, bytes]) -> str:
+        """Get an MQTT payload as text."""
+        return raw_payload.decode() if isinstance(raw_payload, (bytes, bytearray)) else raw_payload
+        
+    @staticmethod
+    def _decode_payload(raw_payload: Union[str, bytes]) -> Any:
+        """Parse an MQTT payload as JSON, returning None if it is not JSON."""
+        try:
+            return json_codec.loads(raw_payload)
+        except (json_codec.JSONDecodeError, TypeError, UnicodeDecodeError):
+            return None
+            
+    def _format_for_clients(self, topic: str, raw_payload: Union[str, bytes], payload_json: Any = None) -> str:
+        """
+        Build the text frame forwarded to WebSocket clients.
+        
+        JSON objects get a "_meta" member with the topic, receive time and
+        bridge message ID. In splice mode it is inserted into the original
+        payload bytes, which are only checked to be brace-delimited, never
+        parsed or re-encoded; in parse mode the payload is decoded once (or
+        reused from the handlers) and re-encoded. Anything else is forwarded
+        unchanged.
+        
+        Args:
+            topic: MQTT topic
+            raw_payload: Payload as received
+            payload_json: Already parsed payload, if any
+            
+        Returns:
+            Text to send to clients
+        """
+        meta = {
+            "topic": topic,
+            "received_at": datetime.now().isoformat(),
+            "bridge_message_id": self._message_counter
+        }
+        
+        if self.forward_mode == FORWARD_SPLICE and payload_json is None:
+            spliced = json_codec.splice_meta(raw_payload, meta)
+            if spliced is not None:
+                return spliced.decode()
+            return self._payload_text(raw_payload)
+            
+        if payload_json is None:
+            payload_json = self._decode_payload(raw_payload)
+        if isinstance(payload_json, dict):
+            return json_codec.dumps({**payload_json, "_meta": meta})
+        return self._payload_text(raw_payload)
+        
     async def _call_topic_handlers(self, topic: str, payload: Any) -> None:
         """Call registered handlers for a specific topic."""
-        # Find handlers that match this topic
-        matching_handlers = []
-        
-        # Exact topic handlers
-        if topic in self._message_handlers:
-            matching_handlers.extend(self._message_handlers[topic])
+        matching_patterns = self._handler_index.match(topic)
         
-        # Pattern-based handlers
-        for pattern, handlers in self._message_handlers.items():
-            if pattern != topic and self._topic_matches_pattern(topic, pattern):
-                matching_handlers.extend(handlers)
+        # Exact topic handlers first, then pattern-based handlers
+        matching_handlers = list(self._message_handlers.get(topic, []))
+        for pattern in matching_patterns:
+            if pattern != topic:
+                matching_handlers.extend(self._message_handlers.get(pattern, []))
         
         # Call all matching handlers
         for handler in matching_handlers:
@@ -404,79 +520,101 @@ class MQTTWebSocketBridge:
             except Exception as e:
                 logger.error(f"Error in message handler for topic {topic}: {str(e)}")
             
-    def _topic_matches_subscription(self, topic: str, subscriptions: List[str]) -> bool:
+    def add_client_subscription(self, client_id: str, topic_pattern: str) -> bool:
         """
-        Check if a topic matches any of the client's subscriptions.
+        Subscribe a WebSocket client to an MQTT topic pattern.
         
         Args:
-            topic: MQTT topic
-            subscriptions: List of subscription patterns
+            client_id: ID of the client in the WebSocket service's clients
+            topic_pattern: MQTT topic pattern (can include wildcards)
             
         Returns:
-            True if topic matches any subscription, False otherwise
+            True if the subscription was added, False if invalid or already present
         """
-        for subscription in subscriptions:
-            if self._topic_matches_pattern(topic, subscription):
-                return True
-        return False
-                
-    def _topic_matches_pattern(self, topic: str, pattern: str) -> bool:
-        """
-        Check if a topic matches a specific pattern with MQTT wildcards.
+        try:
+            added = self._client_index.add(topic_pattern, client_id)
+        except ValueError as e:
+            logger.warning(f"Ignoring subscription for client {client_id}: {e}")
+            return False
+            
+        if added:
+            self._client_subscriptions.setdefault(client_id, set()).add(topic_pattern)
+            logger.debug(f"Client {client_id} subscribed to {topic_pattern}")
+        return added
         
-        This method follows the MQTT specification for topic filtering with wildcards.
-        See: https://docs.oasis-open.org/mqtt/mqtt/v5.0/os/mqtt-v5.0-os.html#_Toc3901242
+    def remove_client_subscription(self, client_id: str, topic_pattern: str) -> bool:
+        """
+        Unsubscribe a WebSocket client from an MQTT topic pattern.
         
         Args:
-            topic: The actual topic of the message
-            pattern: The subscription pattern with potential wildcards
+            client_id: ID of the client
+            topic_pattern: Pattern passed to add_client_subscription
             
         Returns:
-            True if topic matches the pattern, False otherwise
+            True if the subscription existed, False otherwise
         """
-        # Exact match
-        if pattern == topic:
-            return True
-        
-        # Multi-level wildcard (#) can only appear at the end
-        if '#' in pattern and not pattern.endswith('#'):
-            logger.warning(f"Invalid MQTT topic pattern: {pattern} - '#' can only appear at the end")
+        if not self._client_index.remove(topic_pattern, client_id):
             return False
             
-        # Extract parts of the topic and pattern
-        topic_parts = topic.split('/')
-        pattern_parts = pattern.split('/')
+        patterns = self._client_subscriptions[client_id]
+        patterns.discard(topic_pattern)
+        if not patterns:
+            del self._client_subscriptions[client_id]
+        logger.debug(f"Client {client_id} unsubscribed from {topic_pattern}")
+        return True
         
-        # Handle pattern ending with #
-        if pattern.endswith('#'):
-            # Remove the # from the pattern
-            pattern_parts = pattern_parts[:-1] if pattern_parts[-1] == '#' else pattern_parts[:-1] + [pattern_parts[-1][:-1]]
-            
-            # Pattern must be shorter than or equal to topic
-            if len(pattern_parts) > len(topic_parts):
-                return False
-                
-            # Check all parts before the #
-            for i, p_part in enumerate(pattern_parts):
-                # Skip + wildcard
-                if p_part == '+':
-                    continue
-                # Match exact part
-                if i >= len(topic_parts) or p_part != topic_parts[i]:
-                    return False
-                    
-            return True
+    def set_client_subscriptions(self, client_id: str, topic_patterns: List[str]) -> None:
+        """
+        Replace a client's subscriptions, applying only the difference.
         
-        # Without multi-level wildcard, parts must be same length
-        if len(pattern_parts) != len(topic_parts):
-            return False
+        Args:
+            client_id: ID of the client
+            topic_patterns: The client's complete list of topic patterns
+        """
+        current = self._client_subscriptions.get(client_id, set())
+        wanted = set(topic_patterns)
+        for pattern in current - wanted:
+            self.remove_client_subscription(client_id, pattern)
+        for pattern in wanted - current:
+            self.add_client_subscription(client_id, pattern)
+            
+    def remove_client(self, client_id: str) -> None:
+        """Drop all subscriptions of a disconnected client."""
+        for pattern in list(self._client_subscriptions.get(client_id, ())):
+            self.remove_client_subscription(client_id, pattern)
+            
+    def _on_client_subscriptions(self, client_id: str, device_ids: Optional[Set[str]]) -> None:
+        """
+        Listener for WebSocket client subscription changes.
+        
+        Called by the WebSocket service, usually from its server thread, so the
+        change is applied on the bridge's event loop.
+        
+        Args:
+            client_id: ID of the client
+            device_ids: Devices the client follows, or None once it disconnected
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(self._apply_client_devices, client_id, device_ids)
+                return
+        self._apply_client_devices(client_id, device_ids)
+        
+    def _apply_client_devices(self, client_id: str, device_ids: Optional[Set[str]]) -> None:
+        """Route the topics of the devices a client follows to that client."""
+        if device_ids is None:
+            self.remove_client(client_id)
+        else:
+            self.set_client_subscriptions(client_id, device_topic_patterns(device_ids))
             
-        # Check each part
-        for p_part, t_part in zip(pattern_parts, topic_parts):
-            if p_part != '+' and p_part != t_part:
-                return False
-                
-        return True
+    def get_client_subscriptions(self, client_id: str) -> Set[str]:
+        """Get the topic patterns a client is subscribed to."""
+        return set(self._client_subscriptions.get(client_id, ()))
         
     async def subscribe_to_topics(self, topics: Optional[List[str]] = None) -> bool:
         """
@@ -518,6 +656,8 @@ class MQTTWebSocketBridge:
             ]
         
         logger.info(f"Subscribing to {len(topics)} MQTT topics")
+        self._loop = asyncio.get_running_loop()
+        await self._ingest.start()
         
         # Group the subscriptions by priority
         high_priority = [t for t in topics if t.startswith("devices/") or t.startswith("shadows/")]
@@ -569,8 +709,12 @@ class MQTTWebSocketBridge:
         Args:
             topic_pattern: MQTT topic pattern (can include wildcards)
             handler: Async function to call with (topic, payload) when message is received
+            
+        Raises:
+            ValueError: If '#' is used anywhere but as the whole last level
         """
         if topic_pattern not in self._message_handlers:
+            self._handler_index.add(topic_pattern, topic_pattern)
             self._message_handlers[topic_pattern] = []
             
         if handler not in self._message_handlers[topic_pattern]:
@@ -593,6 +737,7 @@ class MQTTWebSocketBridge:
         if handler is None:
             # Remove all handlers for this topic
             del self._message_handlers[topic_pattern]
+            self._handler_index.remove(topic_pattern, topic_pattern)
             logger.debug(f"Unregistered all handlers for topic pattern: {topic_pattern}")
         else:
             # Remove specific handler
@@ -603,3 +748,4 @@ class MQTTWebSocketBridge:
             # Clean up empty handler lists
             if not self._message_handlers[topic_pattern]:
                 del self._message_handlers[topic_pattern]
+                self._handler_index.remove(topic_pattern, topic_pattern)
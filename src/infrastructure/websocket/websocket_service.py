@@ -6,7 +6,6 @@ This module provides a WebSocket server that bridges between the internal messag
 and browser clients, enabling real-time updates to the user interface.
 """
 import asyncio
-import json
 import logging
 import os
 import threading
@@ -31,6 +30,7 @@ from src.infrastructure.websocket.websocket_manager import (
     ENV_WS_PORT,
     ENV_WS_PORT_UNAVAILABLE,
 )
+from src.utils import json_codec
 
 # Default WebSocket server configuration
 DEFAULT_WS_HOST = os.environ.get(ENV_WS_HOST, "0.0.0.0")
@@ -50,13 +50,15 @@ class WebSocketClient:
     Manages connection state and message sending for an individual browser client.
     """
 
-    def __init__(self, websocket, client_id=None):
+    def __init__(self, websocket, client_id=None, on_subscriptions_changed=None):
         """
         Initialize WebSocket client
 
         Args:
             websocket: WebSocket connection object
             client_id: Optional client identifier (generated if not provided)
+            on_subscriptions_changed: Optional callable taking this client,
+                called after it subscribes or unsubscribes
         """
         self.websocket = websocket
         self.client_id = client_id or str(uuid.uuid4())
@@ -64,6 +66,7 @@ class WebSocketClient:
         self.subscriptions = (
             set()
         )  # Track which device IDs this client is subscribed to
+        self.on_subscriptions_changed = on_subscriptions_changed
         logger.info(f"New WebSocket client connected: {self.client_id}")
 
     async def send(self, message):
@@ -102,7 +105,7 @@ class WebSocketClient:
             async for message in self.websocket:
                 try:
                     # Parse message
-                    data = json.loads(message)
+                    data = json_codec.loads(message)
                     message_type = data.get("type")
 
                     # Process different message types
@@ -113,10 +116,11 @@ class WebSocketClient:
                             logger.info(
                                 f"Client {self.client_id} subscribed to device {device_id}"
                             )
+                            self._subscriptions_changed()
 
                             # Send acknowledgment
                             await self.send(
-                                json.dumps(
+                                json_codec.dumps(
                                     {
                                         "type": "subscribe_ack",
                                         "device_id": device_id,
@@ -132,10 +136,11 @@ class WebSocketClient:
                             logger.info(
                                 f"Client {self.client_id} unsubscribed from device {device_id}"
                             )
+                            self._subscriptions_changed()
 
                             # Send acknowledgment
                             await self.send(
-                                json.dumps(
+                                json_codec.dumps(
                                     {
                                         "type": "unsubscribe_ack",
                                         "device_id": device_id,
@@ -150,7 +155,7 @@ class WebSocketClient:
                         # which has access to the message bus for command publishing
                         pass
 
-                except json.JSONDecodeError:
+                except json_codec.JSONDecodeError:
                     logger.warning(
                         f"Received invalid JSON from client {self.client_id}"
                     )
@@ -169,6 +174,11 @@ class WebSocketClient:
             self.is_connected = False
             logger.info(f"Client disconnected: {self.client_id}")
 
+    def _subscriptions_changed(self):
+        """Report a subscription change to the owning service."""
+        if self.on_subscriptions_changed:
+            self.on_subscriptions_changed(self)
+
 
 class WebSocketService:
     """
@@ -197,6 +207,10 @@ class WebSocketService:
         # Connected clients (client_id -> WebSocketClient)
         self.clients = {}
 
+        # Callables told about client subscriptions: (client_id, device_ids),
+        # with device_ids None once the client disconnects
+        self._subscription_listeners = []
+
         # Server instance
         self.server = None
         self.loop = None
@@ -213,14 +227,17 @@ class WebSocketService:
             path: Connection path
         """
         # Create client
-        client = WebSocketClient(websocket)
+        client = WebSocketClient(
+            websocket, on_subscriptions_changed=self._notify_subscriptions
+        )
 
         # Store client
         self.clients[client.client_id] = client
+        self._notify_subscriptions(client)
 
         # Send connection acknowledgment with client ID
         await client.send(
-            json.dumps(
+            json_codec.dumps(
                 {
                     "type": "connection_ack",
                     "client_id": client.client_id,
@@ -235,6 +252,51 @@ class WebSocketService:
         # Remove client when disconnected
         if client.client_id in self.clients:
             del self.clients[client.client_id]
+        self._notify_subscriptions(client)
+
+    def add_subscription_listener(self, listener):
+        """
+        Register a callable told whenever a client's subscriptions change
+
+        The listener is called with the client ID and the set of device IDs
+        the client follows (empty meaning all devices) when the client
+        connects and on every change, and with None when it disconnects. It
+        is called from the WebSocket server thread. Clients already connected
+        are reported immediately.
+
+        Args:
+            listener: Callable taking (client_id, device_ids)
+        """
+        self._subscription_listeners.append(listener)
+        for client in list(self.clients.values()):
+            if client.is_connected:
+                listener(client.client_id, set(client.subscriptions))
+
+    def remove_subscription_listener(self, listener):
+        """
+        Stop reporting subscription changes to a listener
+
+        Args:
+            listener: Callable passed to add_subscription_listener
+        """
+        if listener in self._subscription_listeners:
+            self._subscription_listeners.remove(listener)
+
+    def _notify_subscriptions(self, client):
+        """
+        Report a client's current subscriptions to every listener
+
+        Args:
+            client: The WebSocketClient that connected, changed or disconnected
+        """
+        device_ids = set(client.subscriptions) if client.is_connected else None
+        for listener in list(self._subscription_listeners):
+            try:
+                listener(client.client_id, device_ids)
+            except Exception as e:
+                logger.error(
+                    f"Error notifying subscriptions of client {client.client_id}: {e}"
+                )
 
     async def start_server(self):
         """Start WebSocket server"""
@@ -415,7 +477,7 @@ class WebSocketService:
             }
 
             # Send to interested clients
-            self._send_to_clients(device_id, json.dumps(message))
+            self._send_to_clients(device_id, json_codec.dumps(message))
 
         except Exception as e:
             logger.error(f"Error handling device telemetry: {e}")
@@ -446,7 +508,7 @@ class WebSocketService:
             }
 
             # Send to interested clients
-            self._send_to_clients(device_id, json.dumps(message))
+            self._send_to_clients(device_id, json_codec.dumps(message))
 
         except Exception as e:
             logger.error(f"Error handling device event: {e}")
@@ -477,7 +539,7 @@ class WebSocketService:
             }
 
             # Send to interested clients
-            self._send_to_clients(device_id, json.dumps(message))
+            self._send_to_clients(device_id, json_codec.dumps(message))
 
         except Exception as e:
             logger.error(f"Error handling command response: {e}")
@@ -146,6 +146,68 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.error(f"Error stopping WebSocket service: {e}")
 
+        # Stop taking device telemetry before the consumers shut down
+        if getattr(app.state, "mqtt_adapter", None):
+            try:
+                await asyncio.to_thread(app.state.mqtt_adapter.stop)
+                await app.state.mqtt_adapter.stop_ingest()
+            except Exception as e:
+                logger.error(f"Error stopping MQTT telemetry adapter: {e}")
+
+        # Deliver anomalies already detected before the event bus closes
+        try:
+            from src.services.streaming_anomaly_detector import (
+                streaming_anomaly_detector,
+            )
+
+            await streaming_anomaly_detector.stop()
+        except Exception as e:
+            logger.error(f"Error stopping anomaly detector: {e}")
+
+        # Let event subscribers finish what was already published
+        try:
+            from src.infrastructure.events.event_bus import global_event_bus
+
+            await global_event_bus.close()
+        except Exception as e:
+            logger.error(f"Error closing event bus: {e}")
+
+        # Dispatch change events already read and save the resume tokens
+        try:
+            from src.infrastructure.device_shadow.change_stream_multiplexer import (
+                shutdown_change_stream_multiplexers,
+            )
+
+            await shutdown_change_stream_multiplexers()
+        except Exception as e:
+            logger.error(f"Error stopping change streams: {e}")
+
+        # Drain buffered shadow history writes before the connections close
+        try:
+            from src.services.device_shadow import shutdown_device_shadow_service
+
+            await shutdown_device_shadow_service()
+            shadow_storage = getattr(app.state, "shadow_storage", None)
+            if shadow_storage is not None and hasattr(shadow_storage, "close"):
+                await shadow_storage.close()
+            logger.info("Shadow storage drained and closed")
+        except Exception as e:
+            logger.error(f"Error closing shadow storage: {e}")
+
+        try:
+            from src.services.telemetry_service import shutdown_telemetry_service
+
+            await shutdown_telemetry_service()
+        except Exception as e:
+            logger.error(f"Error closing telemetry service: {e}")
+
+        try:
+            from src.db.sqlite_pool import close_sqlite_pools
+
+            close_sqlite_pools()
+        except Exception as e:
+            logger.error(f"Error closing SQLite pools: {e}")
+
 
 # Create FastAPI app with our lifespan manager
 app = FastAPI(
@@ -452,6 +514,24 @@ try:
     message_bus = create_message_bus(bus_type="local")
     app.state.message_bus = message_bus
 
+    # Keep rolling telemetry features for the advanced predictors
+    from src.infrastructure.events.event_bus import global_event_bus
+    from src.services.telemetry_features import telemetry_feature_engine
+
+    telemetry_feature_engine.subscribe(
+        event_bus=global_event_bus, message_bus=message_bus
+    )
+
+    # Surface telemetry anomalies on the event bus and the alerts channel
+    from src.api.routes.websocket import get_websocket_manager
+    from src.services.streaming_anomaly_detector import streaming_anomaly_detector
+
+    streaming_anomaly_detector.subscribe(
+        message_bus,
+        event_bus=global_event_bus,
+        websocket_manager=get_websocket_manager(),
+    )
+
     # Check environment flag for explicit disabling
     disable_infrastructure_websocket = (
         os.environ.get(ENV_WS_DISABLED, "false").lower() == "true"
@@ -726,6 +806,30 @@ async def startup_logic(app: FastAPI):
     # Set up environment configuration
     env = setup_environment_configuration()
 
+    # Deliver streaming anomalies on this event loop
+    from src.services.streaming_anomaly_detector import streaming_anomaly_detector
+
+    await streaming_anomaly_detector.start()
+
+    # Feed device telemetry published over MQTT into the local message bus
+    app.state.mqtt_adapter = None
+    message_bus = getattr(app.state, "message_bus", None)
+    if (
+        message_bus is not None
+        and os.environ.get("MQTT_ADAPTER_ENABLED", "true").lower() == "true"
+    ):
+        try:
+            from src.infrastructure.messaging.mqtt_adapter import MqttAdapter
+
+            mqtt_adapter = MqttAdapter(message_bus=message_bus)
+            await mqtt_adapter.start_ingest()
+            if await asyncio.to_thread(mqtt_adapter.start):
+                app.state.mqtt_adapter = mqtt_adapter
+            else:
+                await mqtt_adapter.stop_ingest()
+        except Exception as e:
+            logging.error(f"Error starting MQTT telemetry adapter: {e}")
+
     # Initialize database schema
     try:
         # Use db_settings for backward compatibility
@@ -817,6 +921,7 @@ async def startup_logic(app: FastAPI):
         # Create the appropriate storage provider through factory
         # This will use in-memory storage which is faster and doesn't have connection delays
         storage_provider = await create_shadow_storage_provider()
+        app.state.shadow_storage = storage_provider
 
         logging.info("✅ Shadow storage provider initialized successfully")
 
@@ -851,7 +956,11 @@ async def startup_logic(app: FastAPI):
         if not use_new_integration:
             logging.info("Using legacy Shadow Service implementation")
             # Initialize core services with legacy implementation
-            shadow_service = DeviceShadowService(storage_provider=storage_provider)
+            from src.infrastructure.events.event_bus import global_event_bus
+
+            shadow_service = DeviceShadowService(
+                storage_provider=storage_provider, event_bus=global_event_bus
+            )
             ws_manager = WebSocketManager()
             frontend_request_handler = FrontendRequestHandler(
                 shadow_service=shadow_service
@@ -97,6 +97,12 @@ class AnomalyDetectionPredictor:
         if "heating_cycle_data" in features:
             self._analyze_heating_cycles(features.get("heating_cycle_data", []), result)
 
+        # Precomputed features cover measurements without raw readings
+        if features.get("telemetry_summary"):
+            self._analyze_telemetry_summary(
+                features["telemetry_summary"], features, result
+            )
+
         # Generate recommended actions based on detected anomalies
         self._generate_recommendations(result)
 
@@ -141,7 +147,45 @@ class AnomalyDetectionPredictor:
             time_span = 1  # Avoid division by zero
 
         rate_of_change = (last_reading - first_reading) / time_span
+        self._record_temperature_trend(rate_of_change, last_reading, result)
 
+        # Check for unusual spikes or drops
+        for i in range(1, len(sorted_readings) - 1):
+            prev_value = sorted_readings[i - 1]["value"]
+            curr_value = sorted_readings[i]["value"]
+            next_value = sorted_readings[i + 1]["value"]
+
+            # Detect spike pattern (up then down)
+            if curr_value > prev_value + 5 and curr_value > next_value + 5:
+                result.raw_details["detected_anomalies"].append(
+                    {
+                        "measurement_type": "temperature",
+                        "anomaly_type": "spike",
+                        "timestamp": sorted_readings[i]["timestamp"].isoformat(),
+                        "value": curr_value,
+                        "baseline": (prev_value + next_value) / 2,
+                        "deviation_percent": (
+                            curr_value / ((prev_value + next_value) / 2) - 1
+                        )
+                        * 100,
+                        "potential_components": self._anomaly_component_mapping[
+                            "temperature"
+                        ],
+                        "probability": 0.8,
+                    }
+                )
+
+    def _record_temperature_trend(
+        self, rate_of_change: float, last_reading: float, result: PredictionResult
+    ) -> None:
+        """
+        Record a temperature trend that exceeds the rate of change threshold.
+
+        Args:
+            rate_of_change: Temperature change per day
+            last_reading: Most recent temperature
+            result: PredictionResult to update with findings
+        """
         # Detect significant temperature trend
         if abs(rate_of_change) > self._thresholds["temperature_rate_of_change"]:
             trend_direction = "increasing" if rate_of_change > 0 else "decreasing"
@@ -171,32 +215,6 @@ class AnomalyDetectionPredictor:
                 "anomaly_detected": True,
             }
 
-        # Check for unusual spikes or drops
-        for i in range(1, len(sorted_readings) - 1):
-            prev_value = sorted_readings[i - 1]["value"]
-            curr_value = sorted_readings[i]["value"]
-            next_value = sorted_readings[i + 1]["value"]
-
-            # Detect spike pattern (up then down)
-            if curr_value > prev_value + 5 and curr_value > next_value + 5:
-                result.raw_details["detected_anomalies"].append(
-                    {
-                        "measurement_type": "temperature",
-                        "anomaly_type": "spike",
-                        "timestamp": sorted_readings[i]["timestamp"].isoformat(),
-                        "value": curr_value,
-                        "baseline": (prev_value + next_value) / 2,
-                        "deviation_percent": (
-                            curr_value / ((prev_value + next_value) / 2) - 1
-                        )
-                        * 100,
-                        "potential_components": self._anomaly_component_mapping[
-                            "temperature"
-                        ],
-                        "probability": 0.8,
-                    }
-                )
-
     def _analyze_pressure(
         self, pressure_readings: List[Dict], result: PredictionResult
     ) -> None:
@@ -306,23 +324,112 @@ class AnomalyDetectionPredictor:
 
             if recent_durations:
                 recent_avg = sum(recent_durations) / len(recent_durations)
-                percent_change = (recent_avg / avg_duration - 1) * 100
+                self._record_heating_cycle_trend(avg_duration, recent_avg, result)
 
-                if abs(percent_change) > self._thresholds["heating_cycle_variation"]:
-                    cycle_trend = "longer" if percent_change > 0 else "shorter"
-                    affected_component = (
-                        "heating_element" if cycle_trend == "longer" else "thermostat"
-                    )
+    def _record_heating_cycle_trend(
+        self, avg_duration: float, recent_avg: float, result: PredictionResult
+    ) -> None:
+        """
+        Record a change in heating cycle duration that exceeds the threshold.
+
+        Args:
+            avg_duration: Average cycle duration in minutes
+            recent_avg: Duration of the most recent cycles in minutes
+            result: PredictionResult to update with findings
+        """
+        if not avg_duration:
+            return
+
+        percent_change = (recent_avg / avg_duration - 1) * 100
+
+        if abs(percent_change) > self._thresholds["heating_cycle_variation"]:
+            cycle_trend = "longer" if percent_change > 0 else "shorter"
+            affected_component = (
+                "heating_element" if cycle_trend == "longer" else "thermostat"
+            )
+
+            result.raw_details["trend_analysis"]["heating_cycle"] = {
+                "trend": cycle_trend,
+                "percent_change": percent_change,
+                "component_affected": affected_component,
+                "probability": min(0.9, 0.6 + abs(percent_change) / 30),
+                "days_until_critical": self._estimate_days_until_critical_cycle_change(
+                    percent_change
+                ),
+            }
+
+    def _analyze_telemetry_summary(
+        self,
+        summary: Dict[str, Any],
+        features: Dict[str, Any],
+        result: PredictionResult,
+    ) -> None:
+        """
+        Analyze precomputed telemetry features for anomalies and trends.
+
+        Uses the rolling statistics kept by the telemetry feature engine in
+        place of full reading lists. Measurements that were passed as raw
+        readings are left to the list-based analysis.
 
-                    result.raw_details["trend_analysis"]["heating_cycle"] = {
-                        "trend": cycle_trend,
-                        "percent_change": percent_change,
-                        "component_affected": affected_component,
-                        "probability": min(0.9, 0.6 + abs(percent_change) / 30),
-                        "days_until_critical": self._estimate_days_until_critical_cycle_change(
-                            percent_change
-                        ),
+        Args:
+            summary: Feature summary from TelemetryFeatureEngine
+            features: Dictionary containing telemetry data
+            result: PredictionResult to update with findings
+        """
+        metrics = summary.get("metrics", {})
+        anomalies = summary.get("recent_anomalies", {})
+
+        temperature = metrics.get("temperature")
+        if (
+            "temperature_readings" not in features
+            and temperature
+            and temperature["count"] >= 3
+        ):
+            self._record_temperature_trend(
+                temperature["trend_per_day"], temperature["last"], result
+            )
+            for anomaly in anomalies.get("temperature", []):
+                result.raw_details["detected_anomalies"].append(
+                    {
+                        **anomaly,
+                        "potential_components": self._anomaly_component_mapping[
+                            "temperature"
+                        ],
+                        "probability": 0.8,
                     }
+                )
+
+        if "pressure_readings" not in features:
+            for anomaly in anomalies.get("pressure", []):
+                if anomaly["anomaly_type"] == "spike":
+                    components = self._anomaly_component_mapping["pressure"]
+                    probability = min(0.95, 0.7 + anomaly["change_magnitude"] / 50)
+                else:
+                    components = (
+                        ["pressure_valve"]
+                        if anomaly["anomaly_type"] == "sustained_high"
+                        else ["tank_integrity"]
+                    )
+                    probability = min(0.9, 0.5 + anomaly["deviation_percent"] / 20)
+                result.raw_details["detected_anomalies"].append(
+                    {
+                        **anomaly,
+                        "potential_components": components,
+                        "probability": probability,
+                    }
+                )
+
+        cycles = summary.get("heating_cycles", {})
+        if (
+            "heating_cycle_data" not in features
+            and cycles.get("completed", 0) >= 3
+            and cycles.get("average_duration_minutes")
+        ):
+            self._record_heating_cycle_trend(
+                cycles["average_duration_minutes"],
+                cycles["recent_duration_minutes"],
+                result,
+            )
 
     def _calculate_days_until_critical(
         self, current_value: float, rate_of_change: float, critical_threshold: float
@@ -50,6 +50,12 @@ class MultiFactorPredictor:
             },
         }
 
+        # Daily usage considered heavy; usage at twice these levels scores 1.0
+        self._heavy_usage_thresholds = {
+            "daily_usage_liters": 250,
+            "heating_cycles_per_day": 10,
+        }
+
         # Define temperature impact thresholds
         self._temperature_thresholds = {
             "ambient_temperature": {
@@ -131,6 +137,10 @@ class MultiFactorPredictor:
         if "maintenance_history" in features:
             self._analyze_maintenance_history(features["maintenance_history"], result)
 
+        # Analyze usage from precomputed telemetry features
+        if features.get("telemetry_summary"):
+            self._analyze_usage_summary(features["telemetry_summary"], result)
+
         # Calculate combined impact score
         self._calculate_combined_score(result)
 
@@ -446,6 +456,38 @@ class MultiFactorPredictor:
         result.raw_details["maintenance_analysis"] = maintenance_analysis
         result.raw_details["factor_scores"]["maintenance_history"] = maintenance_factor
 
+    def _analyze_usage_summary(
+        self, summary: Dict[str, Any], result: PredictionResult
+    ) -> None:
+        """
+        Score usage intensity from precomputed telemetry features.
+
+        Args:
+            summary: Feature summary from TelemetryFeatureEngine
+            result: PredictionResult to update with the usage factor
+        """
+        usage_levels = {
+            "daily_usage_liters": summary.get("daily_usage", {}).get(
+                "recent_average_liters"
+            ),
+            "heating_cycles_per_day": summary.get("heating_cycles", {}).get(
+                "per_day"
+            ),
+        }
+        scores = [
+            min(1.0, value / (2 * self._heavy_usage_thresholds[name]))
+            for name, value in usage_levels.items()
+            if value is not None
+        ]
+        if not scores:
+            return
+
+        result.raw_details["usage_analysis"] = {
+            **usage_levels,
+            "temperature_spikes": summary.get("spikes", {}).get("temperature", 0),
+        }
+        result.raw_details["factor_scores"]["usage_patterns"] = max(scores)
+
     def _calculate_combined_score(self, result: PredictionResult) -> None:
         """
         Calculate combined score from all factor scores.
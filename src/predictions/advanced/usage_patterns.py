@@ -88,6 +88,8 @@ class UsagePatternPredictor:
         # Analyze weekly and daily patterns
         if "daily_usage_liters" in features:
             self._analyze_usage_patterns(features["daily_usage_liters"], result)
+        elif features.get("telemetry_summary"):
+            self._analyze_usage_summary(features["telemetry_summary"], result)
 
         # Determine impact on components
         self._calculate_component_impacts(usage_classification, features, result)
@@ -159,6 +161,15 @@ class UsagePatternPredictor:
             Average daily water usage in liters
         """
         if "daily_usage_liters" not in features:
+            # Rolling average kept by the telemetry feature engine
+            recent_average = (
+                (features.get("telemetry_summary") or {})
+                .get("daily_usage", {})
+                .get("recent_average_liters")
+            )
+            if recent_average is not None:
+                return recent_average
+
             return self._usage_thresholds["normal"][
                 "daily_usage_liters"
             ]  # Default if no data
@@ -197,6 +208,15 @@ class UsagePatternPredictor:
             recent_cycles = cycles[-10:] if len(cycles) > 10 else cycles
             return sum(entry["value"] for entry in recent_cycles) / len(recent_cycles)
 
+        # Rolling count kept by the telemetry feature engine
+        cycles_per_day = (
+            (features.get("telemetry_summary") or {})
+            .get("heating_cycles", {})
+            .get("per_day")
+        )
+        if cycles_per_day is not None:
+            return float(cycles_per_day)
+
         return self._usage_thresholds["normal"]["heating_cycles_per_day"]  # Default
 
     def _analyze_usage_patterns(
@@ -261,6 +281,44 @@ class UsagePatternPredictor:
                 "percent_change": usage_trend * 100,
             }
 
+    def _analyze_usage_summary(
+        self, summary: Dict[str, Any], result: PredictionResult
+    ) -> None:
+        """
+        Identify usage patterns from precomputed daily usage features.
+
+        Args:
+            summary: Feature summary from TelemetryFeatureEngine
+            result: PredictionResult to update with findings
+        """
+        usage = summary.get("daily_usage", {})
+        if usage.get("days", 0) < 7:
+            return
+
+        avg_weekday = usage.get("weekday_average_liters")
+        avg_weekend = usage.get("weekend_average_liters")
+        if avg_weekday is not None and avg_weekend is not None:
+            weekly_variation = (avg_weekend / avg_weekday) - 1 if avg_weekday > 0 else 0
+
+            result.raw_details["usage_patterns"]["weekly"] = {
+                "weekday_average_liters": avg_weekday,
+                "weekend_average_liters": avg_weekend,
+                "weekly_variation_percent": weekly_variation * 100,
+            }
+
+        # Compare the recent days with the whole history
+        if usage["days"] >= 14 and usage.get("average_liters"):
+            usage_trend = usage["recent_average_liters"] / usage["average_liters"] - 1
+
+            result.raw_details["usage_patterns"]["trend"] = {
+                "direction": "increasing"
+                if usage_trend > 0.05
+                else "decreasing"
+                if usage_trend < -0.05
+                else "stable",
+                "percent_change": usage_trend * 100,
+            }
+
     def _calculate_component_impacts(
         self,
         usage_classification: str,
@@ -5,6 +5,10 @@ This module implements prediction of component failures based on
 telemetry data patterns, usage information, and diagnostic code history.
 It provides enhanced predictions by utilizing water heater type information
 and historical diagnostic data.
+
+Fleets are scored with predict_batch, which loads telemetry for many devices
+into one frame and computes the per-device statistics with grouped
+operations instead of one DataFrame per device.
 """
 import logging
 from datetime import datetime, timedelta
@@ -12,12 +16,12 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.connection import get_db_session
 from src.db.models import DeviceModel, DiagnosticCodeModel, ReadingModel
-from src.models.water_heater import WaterHeater, WaterHeaterType
+from src.models.water_heater import WaterHeater
 from src.predictions.interfaces import (
     ActionSeverity,
     IActionRecommender,
@@ -26,6 +30,30 @@ from src.predictions.interfaces import (
     RecommendedAction,
 )
 
+# Telemetry metrics used by the model, stored as metric_name in readings
+TELEMETRY_COLUMNS = [
+    "temperature",
+    "pressure",
+    "energy_usage",
+    "flow_rate",
+    "heating_cycles",
+]
+
+# Default probability for components without evidence of failure
+DEFAULT_COMPONENT_PROBABILITIES = {
+    "heating_element": 0.1,
+    "thermostat": 0.1,
+    "pressure_valve": 0.1,
+    "anode_rod": 0.1,
+    "tank_integrity": 0.1,
+}
+
+# Devices per IN (...) clause when loading fleet data
+BATCH_QUERY_CHUNK_SIZE = 500
+
+# Key in DeviceModel.properties holding the latest batch prediction
+COMPONENT_FAILURE_PROPERTY = "component_failure_prediction"
+
 
 class ComponentFailurePrediction(IPredictionModel):
     """
@@ -78,40 +106,148 @@ class ComponentFailurePrediction(IPredictionModel):
             telemetry_df, features
         )
 
+        # Calculate confidence based on data quality and sufficiency
+        confidence = self._calculate_confidence(telemetry_df, features)
+
+        return self._build_result(
+            device_id, component_probabilities, confidence, features
+        )
+
+    async def predict_batch(
+        self,
+        device_ids: List[str],
+        lookback_days: int = 7,
+        features_by_device: Optional[Dict[str, Dict[str, Any]]] = None,
+        write_results: bool = True,
+    ) -> Dict[str, PredictionResult]:
+        """
+        Generate component failure predictions for many water heaters.
+
+        Telemetry, device properties and diagnostic codes for all devices are
+        loaded with a few bulk queries, scored together with score_batch, and
+        the results are written back to the devices in one bulk update.
+
+        Args:
+            device_ids: IDs of the water heaters
+            lookback_days: Days of telemetry to analyze
+            features_by_device: Optional per-device features (e.g.
+                total_operation_hours, maintenance_history) overriding the
+                values stored in device properties
+            write_results: If True, store each prediction in the device's
+                properties
+
+        Returns:
+            Dictionary mapping device IDs to their predictions
+        """
+        device_ids = list(dict.fromkeys(device_ids))
+        if not device_ids:
+            return {}
+
+        since = datetime.now() - timedelta(days=lookback_days)
+        telemetry_df, device_features, device_properties = (
+            await self._fetch_fleet_data_from_db(device_ids, since)
+        )
+
+        for device_id, features in (features_by_device or {}).items():
+            device_features.setdefault(device_id, {}).update(features)
+
+        results = self.score_batch(telemetry_df, device_features, device_ids)
+
+        if write_results and device_properties:
+            await self._write_batch_results(results, device_properties)
+
+        return results
+
+    def score_batch(
+        self,
+        telemetry_df: pd.DataFrame,
+        features_by_device: Dict[str, Dict[str, Any]],
+        device_ids: Optional[List[str]] = None,
+    ) -> Dict[str, PredictionResult]:
+        """
+        Score many devices from one columnar telemetry frame.
+
+        Args:
+            telemetry_df: Telemetry with a device_id column, a timestamp column
+                and one column per telemetry metric
+            features_by_device: Non-telemetry features per device, including
+                heater_type and diagnostic_codes
+            device_ids: Devices to score, defaults to the devices in
+                features_by_device and telemetry_df
+
+        Returns:
+            Dictionary mapping device IDs to their predictions
+        """
+        if device_ids is None:
+            device_ids = list(features_by_device)
+            if "device_id" in telemetry_df.columns:
+                device_ids += [
+                    d for d in telemetry_df["device_id"].unique()
+                    if d not in features_by_device
+                ]
+
+        stats = self._grouped_telemetry_stats(telemetry_df)
+        probabilities = self._probabilities_from_stats(
+            stats, device_ids, features_by_device
+        )
+        missing_columns = [
+            col
+            for col in ["temperature", "pressure", "energy_usage", "flow_rate"]
+            if col not in telemetry_df.columns
+        ]
+
+        results = {}
+        for device_id in device_ids:
+            features = features_by_device.get(device_id, {})
+
+            if device_id in stats.index:
+                row_count = int(stats.at[device_id, "rows"])
+                latest = stats.at[device_id, "latest"]
+            else:
+                row_count, latest = 0, None
+            confidence = self._confidence_score(
+                row_count, latest, missing_columns, features
+            )
+
+            results[device_id] = self._build_result(
+                device_id, probabilities[device_id], confidence, features
+            )
+
+        return results
+
+    def _build_result(
+        self,
+        device_id: str,
+        component_probabilities: Dict[str, float],
+        confidence: float,
+        features: Dict[str, Any],
+    ) -> PredictionResult:
+        """
+        Build the prediction result from raw component probabilities.
+
+        Args:
+            device_id: ID of the water heater
+            component_probabilities: Telemetry-based component probabilities
+            confidence: Confidence in the prediction
+            features: Feature dictionary including heater_type and diagnostic_codes
+
+        Returns:
+            PredictionResult with component failure probabilities
+        """
         # Factor in diagnostic codes to adjust component probabilities
         component_probabilities = self._adjust_with_diagnostic_codes(
             component_probabilities, features.get("diagnostic_codes", [])
         )
 
         # Calculate overall failure probability (weighted average of component probabilities)
-        component_weights = {
-            "heating_element": 0.4,
-            "thermostat": 0.2,
-            "pressure_valve": 0.2,
-            "anode_rod": 0.1,
-            "tank_integrity": 0.1,
-        }
-
-        # Adjust weights based on heater type
-        heater_type = features.get("heater_type", WaterHeaterType.RESIDENTIAL)
-        if heater_type == WaterHeaterType.COMMERCIAL:
-            # Commercial heaters have different component importance
-            component_weights = {
-                "heating_element": 0.35,
-                "thermostat": 0.15,
-                "pressure_valve": 0.25,  # More critical in commercial units
-                "anode_rod": 0.10,
-                "tank_integrity": 0.15,  # Also more important for commercial
-            }
+        heater_type = features.get("heater_type", "RESIDENTIAL")
+        component_weights = self._component_weights(heater_type)
 
         overall_probability = sum(
             probability * component_weights.get(component, 0.1)
             for component, probability in component_probabilities.items()
         )
 
-        # Calculate confidence based on data quality and sufficiency
-        confidence = self._calculate_confidence(telemetry_df, features)
-
         # Generate appropriate recommendations based on component probabilities
         recommendations = self._generate_recommendations(
             component_probabilities, device_id
@@ -128,10 +264,38 @@ class ComponentFailurePrediction(IPredictionModel):
             recommended_actions=recommendations,
             raw_details={
                 "components": component_probabilities,
-                "heater_type": str(heater_type),
+                "heater_type": str(getattr(heater_type, "value", heater_type)),
             },
         )
 
+    def _component_weights(self, heater_type: Any) -> Dict[str, float]:
+        """
+        Get the weight of each component in the overall probability.
+
+        Args:
+            heater_type: Heater type name or enum value
+
+        Returns:
+            Dictionary mapping component names to weights
+        """
+        if str(getattr(heater_type, "value", heater_type)).upper() == "COMMERCIAL":
+            # Commercial heaters have different component importance
+            return {
+                "heating_element": 0.35,
+                "thermostat": 0.15,
+                "pressure_valve": 0.25,  # More critical in commercial units
+                "anode_rod": 0.10,
+                "tank_integrity": 0.15,  # Also more important for commercial
+            }
+
+        return {
+            "heating_element": 0.4,
+            "thermostat": 0.2,
+            "pressure_valve": 0.2,
+            "anode_rod": 0.1,
+            "tank_integrity": 0.1,
+        }
+
     def get_model_info(self) -> Dict[str, Any]:
         """Return information about the model."""
         return {
@@ -196,63 +360,194 @@ class ComponentFailurePrediction(IPredictionModel):
         Returns:
             Dictionary mapping component names to failure probabilities (0-1)
         """
-        # Initialize with default low probabilities
-        probabilities = {
-            "heating_element": 0.1,
-            "thermostat": 0.1,
-            "pressure_valve": 0.1,
-            "anode_rod": 0.1,
-            "tank_integrity": 0.1,
-        }
-
         if telemetry_df.empty:
-            return probabilities
+            return dict(DEFAULT_COMPONENT_PROBABILITIES)
 
-        # Calculate features for heating element failure detection
-        if "temperature" in telemetry_df.columns and len(telemetry_df) >= 3:
-            # Detect temperature fluctuations - high fluctuations indicate possible element issues
-            temp_std = telemetry_df["temperature"].std()
-            temp_trend = self._calculate_trend(telemetry_df["temperature"])
+        # Score the device as a fleet of one
+        device_key = features.get("device_id", "")
+        stats = self._grouped_telemetry_stats(
+            telemetry_df.assign(device_id=device_key)
+        )
+        return self._probabilities_from_stats(
+            stats, [device_key], {device_key: features}
+        )[device_key]
 
-            # High fluctuation or decreasing trend indicates potential issues
-            if temp_std > 3.0 or temp_trend < -0.1:
-                probabilities["heating_element"] = min(0.3 + temp_std * 0.15, 0.9)
+    def _grouped_telemetry_stats(self, telemetry_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate per-device telemetry statistics with grouped operations.
 
-        # Calculate features for thermostat failure detection
-        if (
-            "temperature" in telemetry_df.columns
-            and "heating_cycles" in telemetry_df.columns
-        ):
-            # Correlation between temperature and heating cycles
-            # Poor correlation may indicate thermostat issues
-            try:
-                temp_cycle_corr = telemetry_df["temperature"].corr(
-                    telemetry_df["heating_cycles"]
-                )
-                if temp_cycle_corr < 0.5:
-                    probabilities["thermostat"] = min(0.9, 0.8 - temp_cycle_corr)
-            except:
-                pass
-
-            # Detect temperature overshoots
-            if len(telemetry_df) > 5:
-                temp_diffs = telemetry_df["temperature"].diff().dropna()
-                large_jumps = (temp_diffs.abs() > 5).sum()
-                if large_jumps > 2:
-                    probabilities["thermostat"] = max(
-                        probabilities["thermostat"], min(0.3 + large_jumps * 0.1, 0.9)
-                    )
+        Args:
+            telemetry_df: Telemetry with a device_id column and optional
+                timestamp and metric columns
+
+        Returns:
+            DataFrame indexed by device_id with the row count, latest
+            timestamp, temperature std/trend/jumps, temperature to heating
+            cycle correlation and pressure std/max/events
+        """
+        if telemetry_df.empty or "device_id" not in telemetry_df.columns:
+            return pd.DataFrame(
+                columns=[
+                    "rows",
+                    "latest",
+                    "temp_std",
+                    "temp_trend",
+                    "temp_cycle_corr",
+                    "temp_jumps",
+                    "pressure_std",
+                    "pressure_max",
+                    "pressure_events",
+                ]
+            )
+
+        # Missing metrics become all-NaN columns, which never cross a threshold
+        df = telemetry_df.reindex(
+            columns=["device_id", "timestamp", *TELEMETRY_COLUMNS]
+        )
+        if df["timestamp"].notna().any():
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df = df.sort_values(["device_id", "timestamp"], kind="stable")
+
+        keys = df["device_id"]
+        groups = df.groupby(keys, sort=False)
+        temperature = df["temperature"].astype(float)
+        cycles = df["heating_cycles"].astype(float)
+        pressure = df["pressure"].astype(float)
+
+        # Least squares slope of temperature against sample position
+        position = groups.cumcount().astype(float).where(temperature.notna())
+        dx = position - position.groupby(keys).transform("mean")
+        dy = temperature - temperature.groupby(keys).transform("mean")
+        sxx = (dx * dx).groupby(keys).sum()
+        slope = ((dx * dy).groupby(keys).sum() / sxx).where(sxx > 0, 0.0)
+
+        # Normalize by the mean value to get a relative trend
+        temp_mean = temperature.groupby(keys).mean()
+        temp_count = temperature.groupby(keys).count()
+        trend = (slope * temp_count / temp_mean).where(temp_mean != 0, slope)
+
+        # Pearson correlation over samples with both values present
+        paired = temperature.notna() & cycles.notna()
+        paired_temp = temperature.where(paired)
+        paired_cycles = cycles.where(paired)
+        dt = paired_temp - paired_temp.groupby(keys).transform("mean")
+        dc = paired_cycles - paired_cycles.groupby(keys).transform("mean")
+        corr = (dt * dc).groupby(keys).sum() / np.sqrt(
+            (dt * dt).groupby(keys).sum() * (dc * dc).groupby(keys).sum()
+        )
+
+        # Temperature overshoots between consecutive samples
+        jumps = temperature.groupby(keys).diff().abs().gt(5).groupby(keys).sum()
+
+        return pd.DataFrame(
+            {
+                "rows": groups.size(),
+                "latest": groups["timestamp"].max(),
+                "temp_std": temperature.groupby(keys).std(),
+                "temp_trend": trend.fillna(0.0),
+                "temp_cycle_corr": corr.replace([np.inf, -np.inf], np.nan),
+                "temp_jumps": jumps,
+                "pressure_std": pressure.groupby(keys).std(),
+                "pressure_max": pressure.groupby(keys).max(),
+                "pressure_events": pressure.gt(3.0).groupby(keys).sum(),
+            }
+        )
+
+    def _probabilities_from_stats(
+        self,
+        stats: pd.DataFrame,
+        device_ids: List[str],
+        features_by_device: Dict[str, Dict[str, Any]],
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Calculate component failure probabilities from telemetry statistics.
+
+        Args:
+            stats: Per-device statistics from _grouped_telemetry_stats
+            device_ids: Devices to calculate probabilities for
+            features_by_device: Non-telemetry features per device
 
-        # Calculate features for pressure valve failure detection
-        if "pressure" in telemetry_df.columns:
-            pressure_std = telemetry_df["pressure"].std()
-            pressure_max = telemetry_df["pressure"].max()
+        Returns:
+            Dictionary mapping device IDs to component probabilities
+        """
+        rows = stats["rows"].astype(float)
+        temp_std = stats["temp_std"].astype(float)
+        corr = stats["temp_cycle_corr"].astype(float)
+        jumps = stats["temp_jumps"].astype(float)
+        pressure_std = stats["pressure_std"].astype(float)
+        pressure_max = stats["pressure_max"].astype(float)
+
+        # High fluctuation or decreasing trend indicates heating element issues
+        heating_element = np.where(
+            (rows >= 3)
+            & ((temp_std > 3.0) | (stats["temp_trend"].astype(float) < -0.1)),
+            np.minimum(0.3 + temp_std * 0.15, 0.9),
+            0.1,
+        )
 
-            # High pressure spikes indicate valve issues
-            if pressure_max > 3.5 or pressure_std > 0.5:
-                probabilities["pressure_valve"] = min(0.4 + pressure_std * 0.8, 0.9)
+        # Poor correlation between temperature and heating cycles, or repeated
+        # temperature overshoots, may indicate thermostat issues
+        thermostat = np.where(corr < 0.5, np.minimum(0.9, 0.8 - corr), 0.1)
+        thermostat = np.where(
+            (rows > 5) & (jumps > 2),
+            np.maximum(thermostat, np.minimum(0.3 + jumps * 0.1, 0.9)),
+            thermostat,
+        )
 
-        # Calculate features for anode rod corrosion
+        # High pressure spikes indicate valve issues
+        pressure_valve = np.where(
+            (pressure_max > 3.5) | (pressure_std > 0.5),
+            np.minimum(0.4 + pressure_std * 0.8, 0.9),
+            0.1,
+        )
+
+        telemetry_probabilities = pd.DataFrame(
+            {
+                "heating_element": heating_element,
+                "thermostat": thermostat,
+                "pressure_valve": pressure_valve,
+                "pressure_events": stats["pressure_events"].astype(int),
+            },
+            index=stats.index,
+        ).to_dict("index")
+
+        probabilities = {}
+        for device_id in device_ids:
+            device_stats = telemetry_probabilities.get(device_id)
+            if device_stats is None:
+                # No telemetry for this device
+                probabilities[device_id] = dict(DEFAULT_COMPONENT_PROBABILITIES)
+                continue
+
+            features = features_by_device.get(device_id, {})
+            anode_rod, tank_integrity = self._age_probabilities(
+                features, device_stats["pressure_events"]
+            )
+            probabilities[device_id] = {
+                "heating_element": float(device_stats["heating_element"]),
+                "thermostat": float(device_stats["thermostat"]),
+                "pressure_valve": float(device_stats["pressure_valve"]),
+                "anode_rod": anode_rod,
+                "tank_integrity": tank_integrity,
+            }
+
+        return probabilities
+
+    def _age_probabilities(
+        self, features: Dict[str, Any], pressure_events: int
+    ) -> Tuple[float, float]:
+        """
+        Calculate anode rod and tank failure probabilities from unit age.
+
+        Args:
+            features: Feature dictionary with total_operation_hours and
+                maintenance_history
+            pressure_events: Number of readings with pressure above 3.0
+
+        Returns:
+            Tuple of (anode_rod, tank_integrity) probabilities
+        """
+        anode_rod = DEFAULT_COMPONENT_PROBABILITIES["anode_rod"]
         total_hours = features.get("total_operation_hours", 0)
         maintenance_history = features.get("maintenance_history", [])
 
@@ -271,65 +566,64 @@ class ComponentFailurePrediction(IPredictionModel):
         if total_hours > 8760:  # Over 1 year of operation
             # Base probability on age
             age_factor = min(total_hours / 87600, 1.0)  # 10 years = max factor
-            probabilities["anode_rod"] = 0.3 + (age_factor * 0.6)
+            anode_rod = 0.3 + (age_factor * 0.6)
 
             # Reduce if recently maintained
             if last_anode_maintenance:
                 days_since_maintenance = (datetime.now() - last_anode_maintenance).days
                 if days_since_maintenance < 365:  # Less than a year
-                    probabilities["anode_rod"] *= days_since_maintenance / 365
+                    anode_rod *= days_since_maintenance / 365
 
         # Tank integrity deterioration with age and pressure events
         tank_age_factor = min(total_hours / 131400, 1.0)  # 15 years = max factor
-        probabilities["tank_integrity"] = 0.1 + (tank_age_factor * 0.5)
+        tank_integrity = 0.1 + (tank_age_factor * 0.5)
 
         # Pressure events accelerate tank deterioration
-        if "pressure" in telemetry_df.columns:
-            pressure_events = (telemetry_df["pressure"] > 3.0).sum()
-            if pressure_events > 0:
-                probabilities["tank_integrity"] = min(
-                    probabilities["tank_integrity"] + (pressure_events * 0.05), 0.9
-                )
+        if pressure_events > 0:
+            tank_integrity = min(tank_integrity + (pressure_events * 0.05), 0.9)
 
-        return probabilities
+        return anode_rod, tank_integrity
 
-    def _calculate_trend(self, series: pd.Series) -> float:
+    def _calculate_confidence(
+        self, telemetry_df: pd.DataFrame, features: Dict[str, Any]
+    ) -> float:
         """
-        Calculate the trend in a time series.
-
-        Returns a simple linear trend coefficient.
+        Calculate confidence in prediction based on data quality.
 
         Args:
-            series: Time series data
+            telemetry_df: Processed telemetry DataFrame
+            features: Raw feature dictionary
 
         Returns:
-            Trend coefficient (positive = increasing, negative = decreasing)
+            Confidence score (0-1)
         """
-        if len(series) < 2:
-            return 0.0
-
-        try:
-            # Simple linear regression
-            x = np.arange(len(series))
-            y = series.values
+        latest_data = None
+        if not telemetry_df.empty and "timestamp" in telemetry_df.columns:
+            latest_data = telemetry_df["timestamp"].max()
 
-            # Calculate trend using least squares
-            A = np.vstack([x, np.ones(len(x))]).T
-            m, c = np.linalg.lstsq(A, y, rcond=None)[0]
+        required_columns = ["temperature", "pressure", "energy_usage", "flow_rate"]
+        missing_columns = [
+            col for col in required_columns if col not in telemetry_df.columns
+        ]
 
-            # Normalize by the mean value to get relative trend
-            return m * len(series) / series.mean() if series.mean() != 0 else m
-        except:
-            return 0.0
+        return self._confidence_score(
+            len(telemetry_df), latest_data, missing_columns, features
+        )
 
-    def _calculate_confidence(
-        self, telemetry_df: pd.DataFrame, features: Dict[str, Any]
+    def _confidence_score(
+        self,
+        row_count: int,
+        latest_data: Optional[datetime],
+        missing_columns: List[str],
+        features: Dict[str, Any],
     ) -> float:
         """
-        Calculate confidence in prediction based on data quality.
+        Calculate confidence from summary facts about a device's data.
 
         Args:
-            telemetry_df: Processed telemetry DataFrame
+            row_count: Number of telemetry rows
+            latest_data: Timestamp of the newest telemetry row, if any
+            missing_columns: Required telemetry columns that are absent
             features: Raw feature dictionary
 
         Returns:
@@ -341,16 +635,15 @@ class ComponentFailurePrediction(IPredictionModel):
         confidence_factors = []
 
         # 1. Data volume
-        if len(telemetry_df) >= 24:  # At least 24 data points
+        if row_count >= 24:  # At least 24 data points
             confidence_factors.append(0.2)
-        elif len(telemetry_df) >= 12:
+        elif row_count >= 12:
             confidence_factors.append(0.1)
         else:
             confidence_factors.append(-0.1)  # Penalty for too little data
 
         # 2. Data recency
-        if not telemetry_df.empty and "timestamp" in telemetry_df.columns:
-            latest_data = telemetry_df["timestamp"].max()
+        if latest_data is not None and not pd.isna(latest_data):
             data_age_hours = (datetime.now() - latest_data).total_seconds() / 3600
 
             if data_age_hours < 24:  # Data less than a day old
@@ -359,10 +652,6 @@ class ComponentFailurePrediction(IPredictionModel):
                 confidence_factors.append(-0.2)
 
         # 3. Data completeness
-        required_columns = ["temperature", "pressure", "energy_usage", "flow_rate"]
-        missing_columns = [
-            col for col in required_columns if col not in telemetry_df.columns
-        ]
         if not missing_columns:
             confidence_factors.append(0.1)
         else:
@@ -402,7 +691,7 @@ class ComponentFailurePrediction(IPredictionModel):
             Dictionary with device information including heater_type and diagnostic_codes
         """
         result = {
-            "heater_type": WaterHeaterType.RESIDENTIAL,  # Default
+            "heater_type": "RESIDENTIAL",  # Default
             "diagnostic_codes": [],
         }
 
@@ -423,11 +712,8 @@ class ComponentFailurePrediction(IPredictionModel):
 
                 # Get water heater type from properties
                 if device.properties and "heater_type" in device.properties:
-                    heater_type_str = device.properties.get("heater_type", "").upper()
-                    result["heater_type"] = (
-                        WaterHeaterType.COMMERCIAL
-                        if heater_type_str == "COMMERCIAL"
-                        else WaterHeaterType.RESIDENTIAL
+                    result["heater_type"] = self._heater_type_from_properties(
+                        device.properties
                     )
 
                 # Query diagnostic codes for this device
@@ -461,6 +747,183 @@ class ComponentFailurePrediction(IPredictionModel):
 
         return result
 
+    async def _fetch_fleet_data_from_db(
+        self, device_ids: List[str], since: datetime
+    ) -> Tuple[pd.DataFrame, Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Fetch telemetry, device properties and diagnostic codes for many devices.
+
+        Readings are stored one metric per row, so they are pivoted into one
+        column per metric keyed by device and timestamp.
+
+        Args:
+            device_ids: IDs of the water heaters to fetch data for
+            since: Oldest reading timestamp to include
+
+        Returns:
+            Tuple of (telemetry DataFrame, features per device, properties per
+            device found in the database)
+        """
+        readings: List[Tuple[Any, ...]] = []
+        features: Dict[str, Dict[str, Any]] = {}
+        properties: Dict[str, Dict[str, Any]] = {}
+
+        try:
+            async for session in get_db_session():
+                if session is None:
+                    self.logger.error("Could not establish database session")
+                    break
+
+                for i in range(0, len(device_ids), BATCH_QUERY_CHUNK_SIZE):
+                    chunk = device_ids[i : i + BATCH_QUERY_CHUNK_SIZE]
+
+                    stmt = select(DeviceModel.id, DeviceModel.properties).where(
+                        DeviceModel.id.in_(chunk)
+                    )
+                    for device_id, device_properties in await session.execute(stmt):
+                        device_properties = device_properties or {}
+                        properties[device_id] = device_properties
+                        features[device_id] = {
+                            "heater_type": self._heater_type_from_properties(
+                                device_properties
+                            ),
+                            "total_operation_hours": device_properties.get(
+                                "total_operation_hours", 0
+                            ),
+                            "maintenance_history": device_properties.get(
+                                "maintenance_history", []
+                            ),
+                            "diagnostic_codes": [],
+                        }
+
+                    stmt = select(DiagnosticCodeModel).where(
+                        DiagnosticCodeModel.device_id.in_(chunk)
+                    )
+                    codes = await session.execute(stmt)
+                    for code in codes.scalars():
+                        if code.device_id in features:
+                            features[code.device_id]["diagnostic_codes"].append(
+                                {
+                                    "code": code.code,
+                                    "description": code.description,
+                                    "severity": code.severity,
+                                    "timestamp": code.timestamp,
+                                }
+                            )
+
+                    stmt = select(
+                        ReadingModel.device_id,
+                        ReadingModel.timestamp,
+                        ReadingModel.metric_name,
+                        ReadingModel.value,
+                    ).where(
+                        ReadingModel.device_id.in_(chunk),
+                        ReadingModel.metric_name.in_(TELEMETRY_COLUMNS),
+                        ReadingModel.timestamp >= since,
+                    )
+                    readings.extend(tuple(row) for row in await session.execute(stmt))
+
+                self.logger.info(
+                    f"Loaded {len(readings)} readings for {len(properties)} of "
+                    f"{len(device_ids)} devices"
+                )
+
+        except Exception as e:
+            self.logger.error(f"Error fetching fleet data: {e}")
+
+        return self._pivot_readings(readings), features, properties
+
+    def _pivot_readings(self, readings: List[Tuple[Any, ...]]) -> pd.DataFrame:
+        """
+        Pivot long-format readings into one column per telemetry metric.
+
+        Args:
+            readings: (device_id, timestamp, metric_name, value) rows
+
+        Returns:
+            DataFrame with device_id, timestamp and metric columns
+        """
+        columns = ["device_id", "timestamp", *TELEMETRY_COLUMNS]
+        if not readings:
+            return pd.DataFrame(columns=columns)
+
+        long_df = pd.DataFrame(
+            readings, columns=["device_id", "timestamp", "metric_name", "value"]
+        )
+        long_df["value"] = pd.to_numeric(long_df["value"], errors="coerce")
+
+        wide_df = (
+            long_df.groupby(["device_id", "timestamp", "metric_name"], sort=False)[
+                "value"
+            ]
+            .last()
+            .unstack("metric_name")
+            .reset_index()
+        )
+        return wide_df.reindex(columns=columns)
+
+    async def _write_batch_results(
+        self,
+        results: Dict[str, PredictionResult],
+        device_properties: Dict[str, Dict[str, Any]],
+    ) -> int:
+        """
+        Store batch predictions in device properties with one bulk update.
+
+        Args:
+            results: Predictions by device ID
+            device_properties: Current properties of the devices to update
+
+        Returns:
+            Number of devices updated
+        """
+        rows = [
+            {
+                "id": device_id,
+                "properties": {
+                    **device_properties[device_id],
+                    COMPONENT_FAILURE_PROPERTY: {
+                        "probability": result.predicted_value,
+                        "confidence": result.confidence,
+                        "components": result.raw_details["components"],
+                        "timestamp": result.timestamp.isoformat(),
+                    },
+                },
+            }
+            for device_id, result in results.items()
+            if device_id in device_properties
+        ]
+        if not rows:
+            return 0
+
+        try:
+            async for session in get_db_session():
+                if session is None:
+                    self.logger.error("Could not establish database session")
+                    return 0
+
+                # ORM bulk UPDATE by primary key, executed as one executemany
+                await session.execute(update(DeviceModel), rows)
+
+        except Exception as e:
+            self.logger.error(f"Error writing component failure predictions: {e}")
+            return 0
+
+        return len(rows)
+
+    def _heater_type_from_properties(self, properties: Dict[str, Any]) -> str:
+        """
+        Get the heater type name from device properties.
+
+        Args:
+            properties: Device properties
+
+        Returns:
+            "COMMERCIAL" or "RESIDENTIAL"
+        """
+        heater_type = str(properties.get("heater_type") or "").upper()
+        return "COMMERCIAL" if heater_type == "COMMERCIAL" else "RESIDENTIAL"
+
     def _adjust_with_diagnostic_codes(
         self,
         component_probabilities: Dict[str, float],
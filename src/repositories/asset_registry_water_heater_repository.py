@@ -95,11 +95,23 @@ class AssetRegistryWaterHeaterRepository(WaterHeaterRepository):
                     f"Filtered to {len(devices)} water heaters by manufacturer: {manufacturer}"
                 )
 
+            # Load the shadow state for the whole page in one query
+            try:
+                shadows = await self.shadow_service.get_device_shadows(
+                    [d["device_id"] for d in devices if d.get("device_id")],
+                    fields=["reported", "desired"],
+                )
+            except Exception as shadow_error:
+                logger.warning(f"Error bulk loading shadows: {shadow_error}")
+                shadows = None
+
             # Convert devices to WaterHeater objects, enriched with shadow data
             water_heaters = []
             for device in devices:
                 try:
-                    water_heater = await self._device_to_water_heater(device)
+                    water_heater = await self._device_to_water_heater(
+                        device, shadows=shadows
+                    )
                     water_heaters.append(water_heater)
                 except Exception as e:
                     logger.error(f"Error converting device to water heater: {e}")
@@ -416,12 +428,18 @@ class AssetRegistryWaterHeaterRepository(WaterHeaterRepository):
             logger.error(f"Error getting readings for water heater {device_id}: {e}")
             return []
 
-    async def _device_to_water_heater(self, device: Dict[str, Any]) -> WaterHeater:
+    async def _device_to_water_heater(
+        self,
+        device: Dict[str, Any],
+        shadows: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> WaterHeater:
         """
         Convert a device from Asset Registry to a WaterHeater object, enriched with shadow data.
 
         Args:
             device: Device data from Asset Registry
+            shadows: Shadows already loaded in bulk, keyed by device_id; when
+                omitted the shadow is fetched for this device alone
 
         Returns:
             WaterHeater object
@@ -435,7 +453,10 @@ class AssetRegistryWaterHeaterRepository(WaterHeaterRepository):
 
         # Get shadow data
         try:
-            shadow = await self.shadow_service.get_device_shadow(device_id)
+            if shadows is not None:
+                shadow = shadows.get(device_id)
+            else:
+                shadow = await self.shadow_service.get_device_shadow(device_id)
             if shadow:
                 reported = shadow.get("reported", {})
                 desired = shadow.get("desired", {})
@@ -0,0 +1,351 @@
+"""
+TimescaleDB repository for device telemetry.
+
+Reads the hypertables and continuous aggregates created by
+src/infrastructure/db_migration/create_telemetry_tables.py and pushes
+time-bucketed aggregation into the database with time_bucket().
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import asyncpg
+from asyncpg import Pool
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Bucket widths per aggregation type; monthly buckets need TimescaleDB 2.8+
+BUCKET_INTERVALS = {
+    "hourly": "1 hour",
+    "daily": "1 day",
+    "weekly": "1 week",
+    "monthly": "1 month",
+}
+
+AGGREGATE_DEVICE_TELEMETRY_SQL = """
+    SELECT time_bucket($1::interval, timestamp) AS bucket,
+           AVG(value_numeric) AS avg,
+           MIN(value_numeric) AS min,
+           MAX(value_numeric) AS max,
+           COUNT(value_numeric) AS count,
+           last(value_numeric, timestamp) AS last
+    FROM device_telemetry
+    WHERE device_id = $2
+      AND telemetry_type = $3
+      AND timestamp >= $4
+      AND timestamp <= $5
+      AND value_numeric IS NOT NULL
+    GROUP BY bucket
+    ORDER BY bucket ASC
+"""
+
+# Device scopes for the operational summary; {devices} is the driver's
+# placeholder for a text[] of device IDs
+_SUMMARY_DEVICE_FILTERS = {
+    "listed": "device_id = ANY({devices})",
+    "all": (
+        "device_id IN (SELECT device_id FROM device_registry "
+        "WHERE device_type = 'water_heater')"
+    ),
+}
+
+# Heating cycle starts need each reading's predecessor, so they are counted
+# from the raw readings with lag(); everything else comes from the hourly
+# aggregate
+_SUMMARY_OPERATIONAL_SQL = """
+    SELECT
+        agg.device_id,
+        agg.avg_temperature,
+        COALESCE(cycles.heating_cycles_24h, 0) AS heating_cycles_24h,
+        agg.total_heating_time_24h,
+        agg.energy_used_24h
+    FROM (
+        SELECT
+            device_id,
+            SUM(temperature_sum) / NULLIF(SUM(temperature_count), 0)
+                AS avg_temperature,
+            SUM(heating_samples) AS total_heating_time_24h,
+            SUM(heating_samples)
+                * (SUM(power_sum) / NULLIF(SUM(power_count), 0))
+                / 60000.0 AS energy_used_24h
+        FROM water_heater_telemetry_hourly
+        WHERE {device_filter}
+          AND bucket > NOW() - INTERVAL '24 hours'
+        GROUP BY device_id
+    ) agg
+    LEFT JOIN (
+        SELECT device_id, COUNT(*) AS heating_cycles_24h
+        FROM (
+            SELECT
+                device_id,
+                COALESCE(heating_status, FALSE)
+                    AND NOT COALESCE(
+                        LAG(heating_status) OVER (
+                            PARTITION BY device_id ORDER BY timestamp
+                        ),
+                        FALSE
+                    ) AS cycle_start
+            FROM water_heater_telemetry
+            WHERE {device_filter}
+              AND timestamp > NOW() - INTERVAL '24 hours'
+        ) transitions
+        WHERE cycle_start
+        GROUP BY device_id
+    ) cycles ON cycles.device_id = agg.device_id
+"""
+
+# Only the newest assessment per device, found with one index probe each
+_SUMMARY_MAINTENANCE_SQL = """
+    SELECT ops.*,
+           m.health_score, m.estimated_remaining_life, m.maintenance_due,
+           m.next_maintenance_date, m.issues
+    FROM ({operational}) ops
+    LEFT JOIN LATERAL (
+        SELECT health_score, estimated_remaining_life, maintenance_due,
+               next_maintenance_date, issues
+        FROM device_health_assessment a
+        WHERE a.device_id = ops.device_id
+          AND a.assessment_date > NOW() - INTERVAL '24 hours'
+        ORDER BY a.assessment_date DESC
+        LIMIT 1
+    ) m ON TRUE
+"""
+
+
+def operational_summary_sql(
+    placeholder: str, all_devices: bool, include_maintenance: bool
+) -> str:
+    """
+    Build the single-round-trip operational summary query.
+
+    The SQL text depends only on the flags, never on the number of devices,
+    so the server can reuse its plan.
+
+    Args:
+        placeholder: Parameter placeholder for the device ID array, e.g. "$1"
+        all_devices: Summarize every registered water heater instead
+        include_maintenance: Join in the latest health assessment
+
+    Returns:
+        str: Query ordered by device_id
+    """
+    device_filter = _SUMMARY_DEVICE_FILTERS["all" if all_devices else "listed"]
+    query = _SUMMARY_OPERATIONAL_SQL.format(
+        device_filter=device_filter.format(devices=placeholder)
+    )
+    if include_maintenance:
+        query = _SUMMARY_MAINTENANCE_SQL.format(operational=query)
+    return f"SELECT * FROM ({query}) summary ORDER BY device_id"
+
+
+def format_operational_summary(
+    row: Dict[str, Any], include_maintenance: bool = True
+) -> Dict[str, Any]:
+    """
+    Shape an operational summary row for API responses.
+
+    Args:
+        row: Row from operational_summary_sql()
+        include_maintenance: Whether maintenance columns were selected
+
+    Returns:
+        Dict with device_id, operational and optionally maintenance sections
+    """
+    summary = {
+        "device_id": row["device_id"],
+        "operational": {
+            "avg_temperature": row["avg_temperature"],
+            "heating_cycles_24h": row["heating_cycles_24h"],
+            "total_heating_time_24h": row["total_heating_time_24h"],
+            "energy_used_24h": row["energy_used_24h"],
+        },
+    }
+    if not include_maintenance:
+        return summary
+
+    issues = []
+    if row.get("issues"):
+        try:
+            issues = (
+                json.loads(row["issues"])
+                if isinstance(row["issues"], str)
+                else row["issues"]
+            )
+        except json.JSONDecodeError:
+            logger.error(f"Error parsing maintenance issues for {row['device_id']}")
+
+    next_date = row.get("next_maintenance_date")
+    summary["maintenance"] = {
+        "health_score": row.get("health_score"),
+        "estimated_remaining_life": row.get("estimated_remaining_life"),
+        "maintenance_due": row.get("maintenance_due"),
+        "next_maintenance_date": (
+            next_date.isoformat() if hasattr(next_date, "isoformat") else next_date
+        ),
+        "issues": issues,
+    }
+    return summary
+
+
+class TimescaleTelemetryRepository:
+    """Telemetry queries against the TimescaleDB hypertables."""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 5432,
+        database: str = "iotsphere",
+        user: str = "iotsphere",
+        password: str = "iotsphere",
+    ):
+        """Initialize with TimescaleDB connection parameters."""
+        self.host = host
+        self.port = port
+        self.database = database
+        self.user = user
+        self.password = password
+        self.pool: Optional[Pool] = None
+
+    async def _get_pool(self) -> Pool:
+        """Create the connection pool on first use."""
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                host=self.host,
+                port=self.port,
+                database=self.database,
+                user=self.user,
+                password=self.password,
+                min_size=1,
+                max_size=10,
+            )
+            logger.info("TimescaleDB telemetry connection pool created")
+        return self.pool
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def iter_aggregated_telemetry(
+        self,
+        device_id: str,
+        metric: str,
+        aggregation: str,
+        start_time: datetime,
+        end_time: datetime,
+        prefetch: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream time-bucketed aggregates for one device metric.
+
+        Rows are read through a server-side cursor, so only `prefetch`
+        buckets are held in memory at a time.
+
+        Args:
+            device_id: The device ID
+            metric: Telemetry type, e.g. temperature
+            aggregation: Bucket size (hourly, daily, weekly, monthly)
+            start_time: Start of the time range
+            end_time: End of the time range
+            prefetch: Buckets fetched per round trip
+
+        Yields:
+            Dicts with the bucket timestamp and avg, min, max, count and last
+
+        Raises:
+            ValueError: If the aggregation is not supported
+        """
+        aggregation = aggregation.lower()
+        interval = BUCKET_INTERVALS.get(aggregation)
+        if interval is None:
+            raise ValueError(
+                f"Unsupported aggregation '{aggregation}', expected one of "
+                f"{', '.join(BUCKET_INTERVALS)}"
+            )
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            # Server-side cursors only live inside a transaction
+            async with conn.transaction():
+                async for row in conn.cursor(
+                    AGGREGATE_DEVICE_TELEMETRY_SQL,
+                    interval,
+                    device_id,
+                    metric,
+                    start_time,
+                    end_time,
+                    prefetch=prefetch,
+                ):
+                    yield {
+                        "device_id": device_id,
+                        "metric": metric,
+                        "timestamp": row["bucket"].isoformat(),
+                        "aggregation": aggregation,
+                        "value": row["avg"],
+                        "avg": row["avg"],
+                        "min": row["min"],
+                        "max": row["max"],
+                        "count": row["count"],
+                        "last": row["last"],
+                    }
+
+    async def iter_operational_summaries(
+        self,
+        device_ids: Optional[List[str]] = None,
+        include_maintenance: bool = True,
+        prefetch: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream 24-hour operational summaries for water heaters.
+
+        One parameterized query covers the whole fleet; rows arrive through a
+        server-side cursor `prefetch` devices at a time.
+
+        Args:
+            device_ids: Devices to summarize; all water heaters when omitted
+            include_maintenance: Whether to include the latest health assessment
+            prefetch: Summaries fetched per round trip
+
+        Yields:
+            Dicts shaped by format_operational_summary()
+        """
+        all_devices = not device_ids
+        query = operational_summary_sql("$1", all_devices, include_maintenance)
+        args = [] if all_devices else [list(device_ids)]
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                async for row in conn.cursor(query, *args, prefetch=prefetch):
+                    yield format_operational_summary(dict(row), include_maintenance)
+
+    async def get_aggregated_telemetry(
+        self,
+        device_id: str,
+        metric: str,
+        aggregation: str,
+        start_time: datetime,
+        end_time: datetime,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get time-bucketed aggregates for one device metric.
+
+        Args:
+            device_id: The device ID
+            metric: Telemetry type, e.g. temperature
+            aggregation: Bucket size (hourly, daily, weekly, monthly)
+            start_time: Start of the time range
+            end_time: End of the time range
+
+        Returns:
+            List of aggregated data points, one per bucket, oldest first
+        """
+        return [
+            bucket
+            async for bucket in self.iter_aggregated_telemetry(
+                device_id, metric, aggregation, start_time, end_time
+            )
+        ]
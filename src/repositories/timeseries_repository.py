@@ -10,12 +10,11 @@ Following TDD principles:
 
 import json
 import logging
-import os
-import sqlite3
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from src.config import get_database_path
+from src.db.sqlite_pool import get_sqlite_pool
 from src.models.water_heater import TemperatureReading
 
 # Configure logger
@@ -31,47 +30,41 @@ class TimeseriesRepository:
         self.active_db_path = get_database_path("timeseries_active.db")
         self.archive_db_path = get_database_path("timeseries_archive.db")
 
+        # Long-lived WAL connections shared with other users of these files
+        self.active_pool = get_sqlite_pool(self.active_db_path)
+        self.archive_pool = get_sqlite_pool(self.archive_db_path)
+
         # Initialize databases if they don't exist
-        self._initialize_db(self.active_db_path)
-        self._initialize_db(self.archive_db_path)
+        self._initialize_db(self.active_pool)
+        self._initialize_db(self.archive_pool)
 
         logger.info(
             "Initialized TimeseriesRepository with active and archive databases"
         )
 
-    def _initialize_db(self, db_path: str):
+    def _initialize_db(self, pool):
         """Initialize the database with required tables"""
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-
-        # Connect to database
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Create readings table if it doesn't exist
-        cursor.execute(
+        with pool.transaction() as conn:
+            # Create readings table if it doesn't exist
+            conn.execute(
+                """
+            CREATE TABLE IF NOT EXISTS temperature_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                heater_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                temperature REAL NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
             """
-        CREATE TABLE IF NOT EXISTS temperature_readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            heater_id TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            temperature REAL NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-        )
+            )
 
-        # Create index on heater_id and timestamp
-        cursor.execute(
+            # Create index on heater_id and timestamp
+            conn.execute(
+                """
+            CREATE INDEX IF NOT EXISTS idx_heater_timestamp
+            ON temperature_readings (heater_id, timestamp)
             """
-        CREATE INDEX IF NOT EXISTS idx_heater_timestamp
-        ON temperature_readings (heater_id, timestamp)
-        """
-        )
-
-        # Commit changes and close connection
-        conn.commit()
-        conn.close()
+            )
 
     def get_current_reading(self, heater_id: str) -> Optional[TemperatureReading]:
         """
@@ -85,12 +78,8 @@ class TimeseriesRepository:
         """
         logger.info(f"Getting current reading for water heater {heater_id}")
 
-        # Connect to active database
-        conn = sqlite3.connect(self.active_db_path)
-        cursor = conn.cursor()
-
-        # Query for most recent reading
-        cursor.execute(
+        # Query active database for most recent reading
+        row = self.active_pool.fetchone(
             """
         SELECT heater_id, timestamp, temperature
         FROM temperature_readings
@@ -101,9 +90,6 @@ class TimeseriesRepository:
             (heater_id,),
         )
 
-        row = cursor.fetchone()
-        conn.close()
-
         if not row:
             logger.warning(f"No current reading found for water heater {heater_id}")
             return None
@@ -184,11 +170,7 @@ class TimeseriesRepository:
                 f"Getting default (7 days) readings for water heater {heater_id} from {cutoff_date}"
             )
 
-        # Connect to active database
-        conn = sqlite3.connect(self.active_db_path)
-        cursor = conn.cursor()
-
-        # Query for readings
+        # Query active database for readings
         query = f"""
         SELECT heater_id, timestamp, temperature
         FROM temperature_readings
@@ -196,9 +178,7 @@ class TimeseriesRepository:
         ORDER BY timestamp ASC
         """
 
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        rows = self.active_pool.fetchall(query, params)
 
         logger.info(f"Retrieved {len(rows)} readings for water heater {heater_id}")
 
@@ -239,11 +219,7 @@ class TimeseriesRepository:
                 f"Getting archived readings for water heater {heater_id} from {start_date}"
             )
 
-        # Connect to archive database
-        conn = sqlite3.connect(self.archive_db_path)
-        cursor = conn.cursor()
-
-        # Query for readings
+        # Query archive database for readings
         query = f"""
         SELECT heater_id, timestamp, temperature
         FROM temperature_readings
@@ -251,9 +227,7 @@ class TimeseriesRepository:
         ORDER BY timestamp ASC
         """
 
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        rows = self.archive_pool.fetchall(query, params)
 
         logger.info(
             f"Retrieved {len(rows)} archived readings for water heater {heater_id}"
@@ -277,26 +251,14 @@ class TimeseriesRepository:
         )
 
         try:
-            # Connect to active database
-            conn = sqlite3.connect(self.active_db_path)
-            cursor = conn.cursor()
-
-            # Insert reading
-            cursor.execute(
+            self.active_pool.execute(
                 "INSERT INTO temperature_readings (heater_id, timestamp, temperature) VALUES (?, ?, ?)",
                 (reading.heater_id, reading.timestamp, reading.temperature),
             )
 
-            # Commit changes
-            conn.commit()
-
         except Exception as e:
             logger.error(f"Error adding temperature reading: {e}")
             raise
-        finally:
-            # Close connection
-            if conn:
-                conn.close()
 
     # Alias for consistency with test naming
     insert_reading = add_reading
@@ -314,17 +276,16 @@ class TimeseriesRepository:
         """
         logger.info(f"Archiving readings older than {cutoff_date}")
 
-        # Connect to both databases
-        active_conn = sqlite3.connect(self.active_db_path)
-        archive_conn = sqlite3.connect(self.archive_db_path)
+        # Borrow a pooled connection for each database
+        with self.active_pool.connection() as active_conn:
+            with self.archive_pool.connection() as archive_conn:
+                return self._move_to_archive(active_conn, archive_conn, cutoff_date)
 
+    def _move_to_archive(self, active_conn, archive_conn, cutoff_date: datetime) -> int:
+        """Copy readings before cutoff_date to the archive and delete originals."""
         active_cursor = active_conn.cursor()
         archive_cursor = archive_conn.cursor()
 
-        # Start transaction
-        active_conn.execute("BEGIN TRANSACTION")
-        archive_conn.execute("BEGIN TRANSACTION")
-
         try:
             # Get readings to archive
             active_cursor.execute(
@@ -360,16 +321,12 @@ class TimeseriesRepository:
                     (cutoff_date.isoformat(),),
                 )
 
-                # Commit transactions
-                active_conn.commit()
+                # Commit the archive copy before removing the originals
                 archive_conn.commit()
+                active_conn.commit()
 
                 logger.info(f"Successfully archived {count} readings")
             else:
-                # No data to archive
-                active_conn.rollback()
-                archive_conn.rollback()
-
                 logger.info("No readings to archive")
 
             return count
@@ -381,8 +338,3 @@ class TimeseriesRepository:
 
             logger.error(f"Error archiving readings: {str(e)}")
             raise
-
-        finally:
-            # Close connections
-            active_conn.close()
-            archive_conn.close()
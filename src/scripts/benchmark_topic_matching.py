@@ -0,0 +1,124 @@
+"""
+Benchmark AMQP topic matching as the number of subscriptions grows.
+
+Compares three ways of finding the subscriptions for a routing key:
+- regex: building a regex from each pattern on every check, as TopicPattern
+  used to
+- compiled: pre-split patterns checked one by one with levels_match
+- trie: one walk of the shared TopicTrie index
+
+Usage:
+    python src/scripts/benchmark_topic_matching.py [--topics N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+# Add the project root to the Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "../.."))
+sys.path.append(project_root)
+
+from src.infrastructure.messaging.topic_trie import amqp_topic_trie, levels_match
+
+SUBSCRIPTION_COUNTS = [10, 100, 1000, 5000]
+FIELDS = ["temperature", "pressure", "flow_rate", "energy_usage", "mode"]
+
+
+def regex_matches(pattern: str, topic: str) -> bool:
+    """Per-call regex matching, kept here as the baseline."""
+    if "*" not in pattern and "#" not in pattern:
+        return pattern == topic
+
+    regex_parts = []
+    for part in pattern.split("."):
+        if part == "*":
+            regex_parts.append("[^.]+")
+        elif part == "#":
+            regex_parts.append(".*")
+        else:
+            regex_parts.append(re.escape(part))
+    return bool(re.match("^" + "\\.".join(regex_parts) + "$", topic))
+
+
+def make_patterns(count: int, devices: int):
+    """Create a mix of exact, single-wildcard and multi-wildcard patterns."""
+    rng = random.Random(count)
+    patterns = []
+    for n in range(count):
+        device = f"wh-{rng.randrange(devices):04d}"
+        field = rng.choice(FIELDS)
+        kind = n % 4
+        if kind == 0:
+            patterns.append(f"devices.{device}.shadow.field.{field}")
+        elif kind == 1:
+            patterns.append(f"devices.*.shadow.field.{field}")
+        elif kind == 2:
+            patterns.append(f"devices.{device}.#")
+        else:
+            patterns.append(f"devices.#.{field}")
+    return patterns
+
+
+def make_topics(count: int, devices: int):
+    """Create routing keys like the ones ShadowBrokerIntegration publishes."""
+    rng = random.Random(0)
+    return [
+        f"devices.wh-{rng.randrange(devices):04d}.shadow.field.{rng.choice(FIELDS)}"
+        for _ in range(count)
+    ]
+
+
+def run(subscriptions: int, topics: list, devices: int):
+    """Time each matcher over the topics and check they agree."""
+    patterns = make_patterns(subscriptions, devices)
+    compiled = [(p, p.split(".")) for p in patterns]
+    trie = amqp_topic_trie()
+    for pattern in patterns:
+        trie.add(pattern, pattern)
+
+    results = {}
+
+    start = time.perf_counter()
+    regex_hits = [{p for p in patterns if regex_matches(p, t)} for t in topics]
+    results["regex"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled_hits = [
+        {p for p, levels in compiled if levels_match(levels, t.split("."))}
+        for t in topics
+    ]
+    results["compiled"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    trie_hits = [trie.match(t) for t in topics]
+    results["trie"] = time.perf_counter() - start
+
+    if not regex_hits == compiled_hits == trie_hits:
+        raise AssertionError(f"Matchers disagree with {subscriptions} subscriptions")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--topics", type=int, default=2000, help="Routing keys to match")
+    parser.add_argument("--devices", type=int, default=500, help="Distinct device IDs")
+    args = parser.parse_args()
+
+    topics = make_topics(args.topics, args.devices)
+    print(f"Matching {args.topics} routing keys\n")
+    print(f"{'subscriptions':>13} {'regex':>12} {'compiled':>12} {'trie':>12}")
+    for count in SUBSCRIPTION_COUNTS:
+        results = run(count, topics, args.devices)
+        per_topic = {k: v / len(topics) * 1e6 for k, v in results.items()}
+        print(
+            f"{count:>13} {per_topic['regex']:>10.1f}us "
+            f"{per_topic['compiled']:>10.1f}us {per_topic['trie']:>10.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
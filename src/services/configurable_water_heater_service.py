@@ -8,6 +8,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Type
 
 from src.config import config
+from src.infrastructure.events.event_bus import global_event_bus
 from src.models.device import DeviceStatus
 from src.models.water_heater import (
     WaterHeater,
@@ -547,7 +548,21 @@ class ConfigurableWaterHeaterService:
         )
 
         # Add reading and update water heater status
-        return await self.repository.add_reading(device_id, reading)
+        updated = await self.repository.add_reading(device_id, reading)
+        await global_event_bus.publish(
+            "water_heater.reading_added",
+            {
+                "device_id": device_id,
+                "timestamp": reading.timestamp.isoformat(),
+                "reading": {
+                    "temperature": temperature,
+                    "pressure": pressure,
+                    "energy_usage": energy_usage,
+                    "flow_rate": flow_rate,
+                },
+            },
+        )
+        return updated
 
     async def get_readings(
         self, device_id: str, limit: int = 24
@@ -9,7 +9,9 @@ import logging
 import os
 import sqlite3
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from src.db.sqlite_pool import get_sqlite_pool
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -17,6 +19,70 @@ logger = logging.getLogger(__name__)
 # Global service instance for singleton pattern
 _database_service = None
 
+# Statements are kept constant so pooled connections reuse the prepared form
+INSERT_TELEMETRY_SQL = """
+    INSERT OR REPLACE INTO telemetry
+    (device_id, metric, value, timestamp, metadata)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+SELECT_LATEST_TELEMETRY_SQL = """
+    SELECT device_id, metric, value, timestamp, metadata
+    FROM telemetry
+    WHERE device_id = ? AND metric = ?
+    ORDER BY timestamp DESC
+    LIMIT 1
+"""
+
+SELECT_RECENT_TELEMETRY_SQL = """
+    SELECT device_id, metric, value, timestamp, metadata
+    FROM telemetry
+    WHERE device_id = ? AND metric = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+
+SELECT_TELEMETRY_RANGE_SQL = """
+    SELECT device_id, metric, value, timestamp, metadata
+    FROM telemetry
+    WHERE device_id = ? AND metric = ? AND timestamp >= ? AND timestamp <= ?
+    ORDER BY timestamp ASC
+"""
+
+# Bucket start expressions per aggregation; weeks start on Monday to match
+# TimescaleDB's time_bucket alignment
+BUCKET_EXPRESSIONS = {
+    "hourly": "strftime('%Y-%m-%dT%H:00:00', timestamp)",
+    "daily": "strftime('%Y-%m-%dT00:00:00', timestamp)",
+    "weekly": "strftime('%Y-%m-%dT00:00:00', timestamp, 'weekday 0', '-6 days')",
+    "monthly": "strftime('%Y-%m-01T00:00:00', timestamp)",
+}
+
+# One fixed statement per aggregation, so each stays prepared
+AGGREGATE_TELEMETRY_SQL = {
+    aggregation: f"""
+    WITH bucketed AS (
+        SELECT {expression} AS bucket,
+               value,
+               ROW_NUMBER() OVER (
+                   PARTITION BY {expression} ORDER BY timestamp DESC
+               ) AS recency
+        FROM telemetry
+        WHERE device_id = ? AND metric = ? AND timestamp >= ? AND timestamp <= ?
+    )
+    SELECT bucket,
+           AVG(value) AS avg,
+           MIN(value) AS min,
+           MAX(value) AS max,
+           COUNT(*) AS count,
+           MAX(CASE WHEN recency = 1 THEN value END) AS last
+    FROM bucketed
+    GROUP BY bucket
+    ORDER BY bucket ASC
+"""
+    for aggregation, expression in BUCKET_EXPRESSIONS.items()
+}
+
 
 class DatabaseService:
     """
@@ -29,6 +95,8 @@ class DatabaseService:
 
     Currently uses SQLite for development and testing. For production,
     this would be replaced with PostgreSQL or another scalable database.
+    Queries go through a shared pool of WAL-mode connections and run on the
+    SQLite thread executor.
     """
 
     def __init__(self):
@@ -37,6 +105,7 @@ class DatabaseService:
             os.path.dirname(__file__), "../../data/iotsphere.db"
         )
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.pool = get_sqlite_pool(self.db_path)
 
         # Initialize database
         self._init_db()
@@ -44,43 +113,57 @@ class DatabaseService:
 
     def _init_db(self):
         """Initialize the database schema if it doesn't exist."""
-        # Connect to database and create tables if they don't exist
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create telemetry table
-        cursor.execute(
+        with self.pool.transaction() as conn:
+            # Create telemetry table
+            conn.execute(
+                """
+            CREATE TABLE IF NOT EXISTS telemetry (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_id TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                value REAL NOT NULL,
+                timestamp TEXT NOT NULL,
+                metadata TEXT,
+                UNIQUE(device_id, metric, timestamp)
+            )
             """
-        CREATE TABLE IF NOT EXISTS telemetry (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            device_id TEXT NOT NULL,
-            metric TEXT NOT NULL,
-            value REAL NOT NULL,
-            timestamp TEXT NOT NULL,
-            metadata TEXT,
-            UNIQUE(device_id, metric, timestamp)
-        )
-        """
-        )
+            )
 
-        # Create index on device_id and timestamp
-        cursor.execute(
+            # Create index on device_id and timestamp
+            conn.execute(
+                """
+            CREATE INDEX IF NOT EXISTS idx_telemetry_device_id_timestamp
+            ON telemetry (device_id, timestamp)
             """
-        CREATE INDEX IF NOT EXISTS idx_telemetry_device_id_timestamp
-        ON telemetry (device_id, timestamp)
-        """
-        )
+            )
 
-        # Create index on device_id and metric
-        cursor.execute(
+            # Create index on device_id and metric
+            conn.execute(
+                """
+            CREATE INDEX IF NOT EXISTS idx_telemetry_device_id_metric
+            ON telemetry (device_id, metric)
             """
-        CREATE INDEX IF NOT EXISTS idx_telemetry_device_id_metric
-        ON telemetry (device_id, metric)
-        """
+            )
+
+    @staticmethod
+    def _telemetry_row(data: Dict[str, Any]) -> tuple:
+        """Convert a telemetry dict into INSERT_TELEMETRY_SQL parameters."""
+        metadata = data.get("metadata")
+        return (
+            data["device_id"],
+            data["metric"],
+            data["value"],
+            data["timestamp"],
+            json.dumps(metadata) if metadata else None,
         )
 
-        conn.commit()
-        conn.close()
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a telemetry row to a dict with parsed metadata."""
+        data = dict(row)
+        if data["metadata"]:
+            data["metadata"] = json.loads(data["metadata"])
+        return data
 
     async def store_telemetry(self, data: Dict[str, Any]) -> bool:
         """
@@ -93,38 +176,36 @@ class DatabaseService:
             bool: True if successful
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            metadata = data.get("metadata")
-            if metadata:
-                metadata_json = json.dumps(metadata)
-            else:
-                metadata_json = None
-
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO telemetry
-                (device_id, metric, value, timestamp, metadata)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    data["device_id"],
-                    data["metric"],
-                    data["value"],
-                    data["timestamp"],
-                    metadata_json,
-                ),
+            await self.pool.execute_async(
+                INSERT_TELEMETRY_SQL, self._telemetry_row(data)
             )
-
-            conn.commit()
-            conn.close()
             return True
 
         except Exception as e:
             logger.error(f"Error storing telemetry data: {e}")
             return False
 
+    async def store_telemetry_batch(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Store many telemetry records in a single transaction.
+
+        Args:
+            records: Telemetry data dicts with device_id, metric, value and timestamp
+
+        Returns:
+            int: Number of records stored (0 if the transaction failed)
+        """
+        if not records:
+            return 0
+
+        rows = [self._telemetry_row(data) for data in records]
+        try:
+            await self.pool.executemany_async(INSERT_TELEMETRY_SQL, rows)
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error storing telemetry batch of {len(rows)} records: {e}")
+            return 0
+
     async def get_latest_telemetry(
         self, device_id: str, metric: str
     ) -> Optional[Dict[str, Any]]:
@@ -139,30 +220,10 @@ class DatabaseService:
             Latest telemetry data or None if not found
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Use row factory to get dict-like results
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                SELECT device_id, metric, value, timestamp, metadata
-                FROM telemetry
-                WHERE device_id = ? AND metric = ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-                """,
-                (device_id, metric),
+            row = await self.pool.fetchone_async(
+                SELECT_LATEST_TELEMETRY_SQL, (device_id, metric), sqlite3.Row
             )
-
-            row = cursor.fetchone()
-            conn.close()
-
-            if row:
-                data = dict(row)
-                if data["metadata"]:
-                    data["metadata"] = json.loads(data["metadata"])
-                return data
-            return None
+            return self._row_to_dict(row) if row else None
 
         except Exception as e:
             logger.error(f"Error retrieving latest telemetry data: {e}")
@@ -183,33 +244,10 @@ class DatabaseService:
             List of telemetry data dictionaries
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Use row factory to get dict-like results
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                SELECT device_id, metric, value, timestamp, metadata
-                FROM telemetry
-                WHERE device_id = ? AND metric = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-                """,
-                (device_id, metric, limit),
+            rows = await self.pool.fetchall_async(
+                SELECT_RECENT_TELEMETRY_SQL, (device_id, metric, limit), sqlite3.Row
             )
-
-            rows = cursor.fetchall()
-            conn.close()
-
-            # Convert rows to dictionaries and parse metadata
-            result = []
-            for row in rows:
-                data = dict(row)
-                if data["metadata"]:
-                    data["metadata"] = json.loads(data["metadata"])
-                result.append(data)
-
-            return result
+            return [self._row_to_dict(row) for row in rows]
 
         except Exception as e:
             logger.error(f"Error retrieving telemetry data: {e}")
@@ -231,36 +269,12 @@ class DatabaseService:
             List of telemetry data dictionaries
         """
         try:
-            # Convert datetime to string
-            start_str = start_time.isoformat()
-            end_str = end_time.isoformat()
-
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                SELECT device_id, metric, value, timestamp, metadata
-                FROM telemetry
-                WHERE device_id = ? AND metric = ? AND timestamp >= ? AND timestamp <= ?
-                ORDER BY timestamp ASC
-                """,
-                (device_id, metric, start_str, end_str),
+            rows = await self.pool.fetchall_async(
+                SELECT_TELEMETRY_RANGE_SQL,
+                (device_id, metric, start_time.isoformat(), end_time.isoformat()),
+                sqlite3.Row,
             )
-
-            rows = cursor.fetchall()
-            conn.close()
-
-            # Convert rows to dictionaries and parse metadata
-            result = []
-            for row in rows:
-                data = dict(row)
-                if data["metadata"]:
-                    data["metadata"] = json.loads(data["metadata"])
-                result.append(data)
-
-            return result
+            return [self._row_to_dict(row) for row in rows]
 
         except Exception as e:
             logger.error(f"Error retrieving telemetry data range: {e}")
@@ -285,6 +299,56 @@ class DatabaseService:
             device_id=device_id, metric=metric, start_time=start_time, end_time=end_time
         )
 
+    async def iter_aggregated_telemetry(
+        self,
+        device_id: str,
+        metric: str,
+        aggregation: str,
+        start_time: datetime,
+        end_time: datetime,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream time-bucketed telemetry aggregates computed in SQLite.
+
+        Only one row per bucket leaves the database, so memory and transfer
+        scale with the number of buckets rather than raw readings.
+
+        Args:
+            device_id: The device ID
+            metric: The metric name
+            aggregation: Bucket size (hourly, daily, weekly, monthly)
+            start_time: Start of the time range
+            end_time: End of the time range
+
+        Yields:
+            Dicts with the bucket timestamp and avg, min, max, count and last
+
+        Raises:
+            ValueError: If the aggregation is not supported
+        """
+        aggregation = aggregation.lower()
+        sql = AGGREGATE_TELEMETRY_SQL.get(aggregation)
+        if sql is None:
+            raise ValueError(
+                f"Unsupported aggregation '{aggregation}', expected one of "
+                f"{', '.join(AGGREGATE_TELEMETRY_SQL)}"
+            )
+
+        params = (device_id, metric, start_time.isoformat(), end_time.isoformat())
+        async for row in self.pool.iterate_async(sql, params, sqlite3.Row):
+            yield {
+                "device_id": device_id,
+                "metric": metric,
+                "timestamp": row["bucket"],
+                "aggregation": aggregation,
+                "value": row["avg"],
+                "avg": row["avg"],
+                "min": row["min"],
+                "max": row["max"],
+                "count": row["count"],
+                "last": row["last"],
+            }
+
     async def get_aggregated_telemetry(
         self,
         device_id: str,
@@ -304,42 +368,18 @@ class DatabaseService:
             end_time: End of the time range
 
         Returns:
-            List of aggregated data points
+            List of aggregated data points, one per bucket, oldest first
         """
-        # This is a simplified implementation for the prototype
-        # In a production system, this would use proper SQL aggregation
         try:
-            # Get raw data first
-            raw_data = await self.get_telemetry_range(
-                device_id=device_id,
-                metric=metric,
-                start_time=start_time,
-                end_time=end_time,
-            )
-
-            if not raw_data:
-                return []
-
-            # Simple aggregation based on the specified interval
-            result = []
-            interval_seconds = {
-                "hourly": 3600,
-                "daily": 86400,
-                "weekly": 604800,
-                "monthly": 2592000,  # Approximation
-            }.get(aggregation.lower(), 3600)
-
-            # Group by time intervals and calculate averages
-            # For the prototype, just return some basic aggregated data
             return [
-                {
-                    "device_id": device_id,
-                    "metric": metric,
-                    "value": sum(item["value"] for item in raw_data) / len(raw_data),
-                    "timestamp": start_time.isoformat(),
-                    "aggregation": aggregation,
-                    "count": len(raw_data),
-                }
+                bucket
+                async for bucket in self.iter_aggregated_telemetry(
+                    device_id=device_id,
+                    metric=metric,
+                    aggregation=aggregation,
+                    start_time=start_time,
+                    end_time=end_time,
+                )
             ]
 
         except Exception as e:
@@ -8,8 +8,10 @@ both by the device and by applications.
 import json
 import logging
 import os
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from src.infrastructure.device_shadow.shadow_projection import project_shadow
 
 logger = logging.getLogger(__name__)
 
@@ -65,12 +67,22 @@ class DeviceShadowService:
 
                         # Get connection pool size from environment or use default
                         pool_size = int(os.environ.get("MONGODB_POOL_SIZE", "10"))
+                        cache_size = int(
+                            os.environ.get("MONGODB_SHADOW_CACHE_SIZE", "1024")
+                        )
+                        cache_ttl = float(
+                            os.environ.get("MONGODB_SHADOW_CACHE_TTL", "30")
+                        )
 
                         logger.info(
                             f"Using OPTIMIZED MongoDB shadow storage: {mongo_uri}, DB: {db_name}, Pool: {pool_size}"
                         )
                         mongo_storage = OptimizedMongoDBShadowStorage(
-                            mongo_uri=mongo_uri, db_name=db_name, pool_size=pool_size
+                            mongo_uri=mongo_uri,
+                            db_name=db_name,
+                            pool_size=pool_size,
+                            cache_size=cache_size,
+                            cache_ttl=cache_ttl,
                         )
                     else:
                         # Use regular MongoDB storage
@@ -204,6 +216,35 @@ class DeviceShadowService:
 
         return await self.storage_provider.get_shadow(device_id)
 
+    async def get_device_shadows(
+        self, device_ids: Sequence[str], fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve shadows for several devices at once.
+
+        Args:
+            device_ids: Unique identifiers of the devices
+            fields: Optional field names or dotted paths to return
+
+        Returns:
+            Dict mapping device_id to shadow; devices without a shadow are omitted
+        """
+        # Ensure MongoDB is initialized before use
+        await self.ensure_initialized()
+
+        if hasattr(self.storage_provider, "get_shadows"):
+            return await self.storage_provider.get_shadows(device_ids, fields)
+
+        # Fall back to one lookup per device for older storage providers
+        shadows = {}
+        for device_id in dict.fromkeys(device_ids):
+            try:
+                shadow = await self.storage_provider.get_shadow(device_id)
+            except ValueError:
+                continue
+            shadows[device_id] = project_shadow(shadow, fields)
+        return shadows
+
     async def update_device_shadow(
         self,
         device_id: str,
@@ -229,6 +270,65 @@ class DeviceShadowService:
         # Ensure MongoDB is initialized before use
         await self.ensure_initialized()
 
+        if hasattr(self.storage_provider, "apply_shadow_patch"):
+            # Merge, version bump and conflict check happen atomically in storage
+            try:
+                updated_shadow = await self.storage_provider.apply_shadow_patch(
+                    device_id,
+                    reported=reported_state,
+                    desired=desired_state,
+                    expected_version=version,
+                )
+            except ValueError as e:
+                if str(e).startswith("Version conflict"):
+                    raise
+                raise ValueError(f"No shadow document exists for device {device_id}")
+
+            new_version = updated_shadow["version"]
+            now = updated_shadow["metadata"]["last_updated"]
+        else:
+            new_version, now = await self._read_modify_write_shadow(
+                device_id, reported_state, desired_state, version
+            )
+
+        # Emit event if event bus is configured
+        if self.event_bus:
+            event_data = {
+                "device_id": device_id,
+                "timestamp": now,
+                "version": new_version,
+            }
+            if reported_state:
+                event_data["state"] = {"reported": reported_state}
+            if desired_state:
+                event_data["state"] = event_data.get("state", {})
+                event_data["state"]["desired"] = desired_state
+
+            await self.event_bus.publish("shadow.updated", event_data)
+
+        # Return result
+        result = {"device_id": device_id, "version": new_version, "state": {}}
+
+        if reported_state:
+            result["state"]["reported"] = reported_state
+        if desired_state:
+            result["state"]["desired"] = desired_state
+
+        return result
+
+    async def _read_modify_write_shadow(
+        self,
+        device_id: str,
+        reported_state: Optional[Dict[str, Any]],
+        desired_state: Optional[Dict[str, Any]],
+        version: Optional[int],
+    ) -> Tuple[int, str]:
+        """
+        Apply a shadow update for storage providers without apply_shadow_patch.
+
+        Returns:
+            Tuple of the new version and the update timestamp
+        """
         if not await self.storage_provider.shadow_exists(device_id):
             raise ValueError(f"No shadow document exists for device {device_id}")
 
@@ -257,35 +357,10 @@ class DeviceShadowService:
         current_shadow["version"] = new_version
         current_shadow["metadata"]["last_updated"] = now
 
-        # Save history if configured (not implemented yet)
-
         # Save updated shadow
         await self.storage_provider.save_shadow(device_id, current_shadow)
 
-        # Emit event if event bus is configured
-        if self.event_bus:
-            event_data = {
-                "device_id": device_id,
-                "timestamp": now,
-                "version": new_version,
-            }
-            if reported_state:
-                event_data["state"] = {"reported": reported_state}
-            if desired_state:
-                event_data["state"] = event_data.get("state", {})
-                event_data["state"]["desired"] = desired_state
-
-            await self.event_bus.publish("shadow.updated", event_data)
-
-        # Return result
-        result = {"device_id": device_id, "version": new_version, "state": {}}
-
-        if reported_state:
-            result["state"]["reported"] = reported_state
-        if desired_state:
-            result["state"]["desired"] = desired_state
-
-        return result
+        return new_version, now
 
     async def delete_device_shadow(self, device_id: str) -> bool:
         """
@@ -371,6 +446,47 @@ class DeviceShadowService:
         history = await self.storage_provider.get_shadow_history(device_id, limit)
         return history
 
+    async def get_shadow_history_rollups(
+        self,
+        device_id: str,
+        days: float,
+        metric: str = "temperature",
+        resolution: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get pre-aggregated history for a time window at a fitting resolution.
+
+        Args:
+            device_id: Unique identifier for the device
+            days: Length of the window ending now, in days
+            metric: Metric to aggregate
+            resolution: Bucket resolution ("1m", "1h" or "1d"); chosen from
+                the window length when omitted
+
+        Returns:
+            Dict with the chosen resolution and its buckets, or None if the
+            storage provider does not maintain rollups
+        """
+        await self.ensure_initialized()
+
+        if not hasattr(self.storage_provider, "get_shadow_history_rollups"):
+            return None
+
+        from src.infrastructure.device_shadow.history_rollups import (
+            select_rollup_resolution,
+        )
+
+        resolution = resolution or select_rollup_resolution(days)
+        end_time = datetime.utcnow()
+        buckets = await self.storage_provider.get_shadow_history_rollups(
+            device_id,
+            resolution,
+            start_time=end_time - timedelta(days=days),
+            end_time=end_time,
+            metric=metric,
+        )
+        return {"resolution": resolution, "buckets": buckets}
+
     async def get_device_shadow_history(self, device_id: str) -> List[Dict[str, Any]]:
         """
         Get complete historical data for a device shadow.
@@ -455,26 +571,45 @@ class DeviceShadowService:
 
         return True
 
-    async def list_all_shadows(self) -> List[Dict[str, Any]]:
+    async def iter_all_shadows(
+        self, fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all device shadows, each including its device_id.
+
+        Args:
+            fields: Optional field names or dotted paths to return
+
+        Yields:
+            Device shadow documents
+        """
+        await self.ensure_initialized()
+
+        if hasattr(self.storage_provider, "iter_shadows"):
+            async for shadow in self.storage_provider.iter_shadows(fields):
+                yield shadow
+            return
+
+        shadows = await self.storage_provider.list_all_shadows()
+        for device_id, shadow in shadows.items():
+            # Create a new object with the device_id added directly to the shadow
+            shadow_with_id = project_shadow(shadow, fields)
+            if "device_id" not in shadow_with_id:
+                shadow_with_id["device_id"] = device_id
+            yield shadow_with_id
+
+    async def list_all_shadows(
+        self, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
         """Get a list of all device shadows in the system.
 
+        Args:
+            fields: Optional field names or dotted paths to return
+
         Returns:
             List of device shadow documents
         """
         try:
-            # Get all shadows from storage provider
-            shadows = await self.storage_provider.list_all_shadows()
-
-            # Format the response to include the device_id with each shadow
-            result = []
-            for device_id, shadow in shadows.items():
-                # Create a new object with the device_id added directly to the shadow
-                shadow_with_id = shadow.copy()
-                if "device_id" not in shadow_with_id:
-                    shadow_with_id["device_id"] = device_id
-                result.append(shadow_with_id)
-
-            return result
+            return [shadow async for shadow in self.iter_all_shadows(fields)]
         except Exception as e:
             logger.error(f"Error listing all shadows: {e}")
             return []
@@ -502,6 +637,25 @@ class InMemoryShadowStorage:
             raise ValueError(f"No shadow found for device {device_id}")
         return self.shadows[device_id]
 
+    async def get_shadows(
+        self, device_ids: Sequence[str], fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get several shadow documents, omitting devices without a shadow."""
+        return {
+            device_id: project_shadow(self.shadows[device_id], fields)
+            for device_id in device_ids
+            if device_id in self.shadows
+        }
+
+    async def iter_shadows(
+        self, fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all shadow documents, each including its device_id."""
+        for device_id, shadow in list(self.shadows.items()):
+            projected = project_shadow(shadow, fields)
+            projected.setdefault("device_id", device_id)
+            yield projected
+
     async def save_shadow(self, device_id: str, shadow: Dict[str, Any]) -> None:
         """Save the shadow document."""
         # Keep a copy of current shadow in history if it exists
@@ -518,6 +672,34 @@ class InMemoryShadowStorage:
         # Save the new shadow
         self.shadows[device_id] = shadow.copy()
 
+    async def apply_shadow_patch(
+        self,
+        device_id: str,
+        reported: Optional[Dict[str, Any]] = None,
+        desired: Optional[Dict[str, Any]] = None,
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Merge state changes into a shadow and bump its version atomically."""
+        if device_id not in self.shadows:
+            raise ValueError(f"No shadow found for device {device_id}")
+
+        current = self.shadows[device_id]
+        if expected_version is not None and current["version"] != expected_version:
+            raise ValueError(
+                f"Version conflict: Document has been modified. Current version: {current['version']}, provided version: {expected_version}"
+            )
+
+        now = datetime.utcnow().isoformat() + "Z"
+        updated = current.copy()
+        updated["reported"] = {**current.get("reported", {}), **(reported or {})}
+        updated["desired"] = {**current.get("desired", {}), **(desired or {})}
+        updated["metadata"] = {**current.get("metadata", {}), "last_updated": now}
+        updated["version"] = current["version"] + 1
+
+        # No await between the version check and the write, so this is atomic
+        await self.save_shadow(device_id, updated)
+        return updated
+
     async def delete_shadow(self, device_id: str) -> bool:
         """Delete the shadow document."""
         if device_id not in self.shadows:
@@ -559,10 +741,30 @@ async def get_device_shadow_service() -> DeviceShadowService:
     global _device_shadow_service
 
     if _device_shadow_service is None:
+        from src.infrastructure.events.event_bus import global_event_bus
+
         # Create new instance
-        _device_shadow_service = DeviceShadowService()
+        _device_shadow_service = DeviceShadowService(event_bus=global_event_bus)
 
         # Ensure it's initialized
         await _device_shadow_service.ensure_initialized()
 
     return _device_shadow_service
+
+
+async def shutdown_device_shadow_service() -> None:
+    """
+    Close the shared DeviceShadowService storage, draining buffered writes.
+
+    Called from the application lifespan on shutdown.
+    """
+    global _device_shadow_service
+
+    if _device_shadow_service is None:
+        return
+
+    storage_provider = _device_shadow_service.storage_provider
+    if hasattr(storage_provider, "close"):
+        await storage_provider.close()
+
+    _device_shadow_service = None
@@ -1,28 +1,60 @@
 """
 Service for handling prediction operations
 """
+import asyncio
+import inspect
 import logging
 import os
+from concurrent.futures import Executor
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from src.predictions.advanced.anomaly_detection import AnomalyDetectionPredictor
 from src.predictions.advanced.multi_factor import MultiFactorPredictor
 from src.predictions.advanced.usage_patterns import UsagePatternPredictor
 from src.predictions.interfaces import PredictionResult
 from src.predictions.maintenance.lifespan_estimation import LifespanEstimationPrediction
+from src.services.prediction_cache import PredictionCache
+from src.services.telemetry_features import TelemetryFeatureEngine
 from src.services.water_heater import WaterHeaterService
 
 logger = logging.getLogger(__name__)
 
+# Prediction types shown together on the water heater detail page
+PREDICTION_TYPES = [
+    "lifespan_estimation",
+    "anomaly_detection",
+    "usage_patterns",
+    "multi_factor",
+]
+
 
 class PredictionService:
     """
     Service for handling prediction operations across the system
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        cache: Optional[PredictionCache] = None,
+        event_bus: Any = None,
+        feature_engine: Optional[TelemetryFeatureEngine] = None,
+    ):
+        """
+        Initialize the prediction service.
+
+        Args:
+            executor: Executor for synchronous (CPU-bound) models, defaults to
+                the event loop's default executor
+            cache: Prediction cache, a new one is created if not given
+            event_bus: Event bus whose device events invalidate the cache
+            feature_engine: Source of precomputed telemetry features for the
+                advanced models; without one they get full reading lists
+        """
         self.water_heater_service = WaterHeaterService()
+        self.executor = executor
+        self.feature_engine = feature_engine
 
         # Initialize prediction models
         self.prediction_models = {
@@ -33,10 +65,16 @@ class PredictionService:
         }
 
         # Cache for predictions to avoid unnecessary recalculations
-        self._prediction_cache = {}
+        self.cache = cache if cache is not None else PredictionCache()
+        if event_bus is not None:
+            self.cache.subscribe(event_bus)
 
     async def get_prediction(
-        self, device_id: str, prediction_type: str, force_refresh: bool = False
+        self,
+        device_id: str,
+        prediction_type: str,
+        force_refresh: bool = False,
+        device_data: Optional[Dict[str, Any]] = None,
     ) -> Optional[PredictionResult]:
         """
         Get a prediction for a specific device
@@ -45,45 +83,27 @@ class PredictionService:
             device_id: ID of the device to get prediction for
             prediction_type: Type of prediction to generate
             force_refresh: If True, invalidate cache and recalculate prediction
+            device_data: Features already loaded with load_device_data, to
+                avoid fetching the device again
 
         Returns:
             PredictionResult if successful, None otherwise
         """
-        cache_key = f"{device_id}_{prediction_type}"
-
-        # Return cached prediction if available and refresh not requested
-        if not force_refresh and cache_key in self._prediction_cache:
-            logger.info(f"Returning cached prediction for {cache_key}")
-            return self._prediction_cache[cache_key]
-
         # Get the appropriate prediction model
         if prediction_type not in self.prediction_models:
             logger.error(f"Unknown prediction type: {prediction_type}")
             return None
 
-        prediction_model = self.prediction_models[prediction_type]
-
-        # Get device data for prediction
-        device_data = await self._get_device_data(device_id, prediction_type)
-        if not device_data:
-            logger.error(f"Failed to get device data for prediction: {device_id}")
-            return None
-
-        # Generate prediction
         try:
-            # Default values for the prediction (used for fallback in case of errors)
-            default_prediction = self._create_default_prediction(
-                device_id, prediction_type
+            # Concurrent requests for the same prediction share one run
+            return await self.cache.get_or_compute(
+                device_id,
+                prediction_type,
+                lambda: self._compute_prediction(
+                    device_id, prediction_type, device_data
+                ),
+                force_refresh=force_refresh,
             )
-
-            # All prediction models should have async predict methods according to IPredictionModel
-            # interface, but we need to make sure we await the result properly
-            prediction = await prediction_model.predict(device_id, device_data)
-
-            # Cache the prediction
-            self._prediction_cache[cache_key] = prediction
-
-            return prediction
         except Exception as e:
             logger.error(
                 f"Failed to generate prediction for {prediction_type}: {str(e)}"
@@ -97,6 +117,117 @@ class PredictionService:
                 return self._create_default_prediction(device_id, prediction_type)
             return None
 
+    async def _compute_prediction(
+        self,
+        device_id: str,
+        prediction_type: str,
+        device_data: Optional[Dict[str, Any]] = None,
+    ) -> Optional[PredictionResult]:
+        """
+        Load device data if needed and run the prediction model
+
+        Args:
+            device_id: ID of the device to get prediction for
+            prediction_type: Type of prediction to generate
+            device_data: Features already loaded with load_device_data
+
+        Returns:
+            PredictionResult, or None if the device data is unavailable
+
+        Raises:
+            Exception: If the model fails
+        """
+        # Get device data for prediction
+        if device_data is None:
+            device_data = await self._get_device_data(device_id, prediction_type)
+        if not device_data:
+            logger.error(f"Failed to get device data for prediction: {device_id}")
+            return None
+
+        prediction_model = self.prediction_models[prediction_type]
+        return await self._run_model(prediction_model, device_id, device_data)
+
+    def get_cached_prediction(
+        self, device_id: str, prediction_type: str
+    ) -> Optional[PredictionResult]:
+        """
+        Get a cached prediction without computing one.
+
+        Args:
+            device_id: ID of the device
+            prediction_type: Type of prediction
+
+        Returns:
+            The cached PredictionResult, or None if there is none
+        """
+        return self.cache.get(device_id, prediction_type)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get prediction cache statistics.
+
+        Returns:
+            Dict with cache size, hit rate and eviction/invalidation counters
+        """
+        return self.cache.stats()
+
+    async def load_device_data(
+        self, device_id: str, prediction_types: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the features for several prediction types in one pass.
+
+        The water heater and its history are fetched once and the lifespan
+        features are shared by every type; each type gets its own copy to
+        extend.
+
+        Args:
+            device_id: ID of the water heater
+            prediction_types: Types of prediction to load data for
+
+        Returns:
+            Dict mapping each known prediction type to its device data, empty
+            if the water heater was not found
+        """
+        water_heater = await self.water_heater_service.get_water_heater(device_id)
+        if not water_heater:
+            return {}
+
+        base_data = await self._get_water_heater_lifespan_data(
+            device_id, water_heater=water_heater
+        )
+        if not base_data:
+            return {}
+
+        return {
+            prediction_type: self._add_advanced_features(
+                dict(base_data), water_heater, prediction_type
+            )
+            for prediction_type in prediction_types
+            if prediction_type in self.prediction_models
+        }
+
+    async def _run_model(
+        self, prediction_model: Any, device_id: str, device_data: Dict[str, Any]
+    ) -> PredictionResult:
+        """
+        Run a model's predict method.
+
+        Models implementing the async interface are awaited; synchronous
+        models are CPU-bound, so they run in the executor instead of blocking
+        the event loop.
+        """
+        if asyncio.iscoroutinefunction(prediction_model.predict):
+            return await prediction_model.predict(device_id, device_data)
+
+        loop = asyncio.get_running_loop()
+        prediction = await loop.run_in_executor(
+            self.executor, prediction_model.predict, device_id, device_data
+        )
+        if inspect.isawaitable(prediction):
+            prediction = await prediction
+        return prediction
+
     def _create_default_prediction(
         self, device_id: str, prediction_type: str
     ) -> PredictionResult:
@@ -281,42 +412,50 @@ class PredictionService:
         Returns:
             Dict with advanced water heater data if successful, None otherwise
         """
-        # Start with base water heater data
-        base_data = await self._get_water_heater_lifespan_data(device_id)
-        if not base_data:
-            return None
-
         # Get water heater from service for additional details
         water_heater = await self.water_heater_service.get_water_heater(device_id)
         if not water_heater:
             return None
 
+        # Start with base water heater data
+        base_data = await self._get_water_heater_lifespan_data(
+            device_id, water_heater=water_heater
+        )
+        if not base_data:
+            return None
+
+        return self._add_advanced_features(base_data, water_heater, prediction_type)
+
+    def _add_advanced_features(
+        self, base_data: Dict[str, Any], water_heater: Any, prediction_type: str
+    ) -> Dict[str, Any]:
+        """
+        Add the features an advanced prediction model needs to the base data
+
+        When a feature engine is configured, its rolling telemetry summary is
+        added instead of the full reading series.
+
+        Args:
+            base_data: Lifespan features, extended in place
+            water_heater: The water heater the features describe
+            prediction_type: Type of prediction to generate
+
+        Returns:
+            The extended base data
+        """
+        telemetry_summary = self._get_telemetry_summary(
+            base_data.get("device_id"), water_heater
+        )
+        if telemetry_summary is not None:
+            base_data["telemetry_summary"] = telemetry_summary
+
         # Add advanced features based on prediction type
         if prediction_type == "anomaly_detection":
             # Add telemetry data with timestamps for pattern recognition
-            # Handle the case where readings might be missing fields
-            base_data["telemetry_series"] = (
-                [
-                    {
-                        "timestamp": reading.timestamp,
-                        "temperature": reading.temperature,
-                        "pressure": reading.pressure
-                        if hasattr(reading, "pressure") and reading.pressure is not None
-                        else 0.0,
-                        "energy_usage": reading.energy_usage
-                        if hasattr(reading, "energy_usage")
-                        and reading.energy_usage is not None
-                        else 0.0,
-                        "flow_rate": reading.flow_rate
-                        if hasattr(reading, "flow_rate")
-                        and reading.flow_rate is not None
-                        else 0.0,
-                    }
-                    for reading in water_heater.readings
-                ]
-                if water_heater.readings
-                else []
-            )
+            if telemetry_summary is None:
+                base_data["telemetry_series"] = self._get_reading_series(
+                    water_heater
+                )
 
             # Add expected operating ranges
             base_data["expected_ranges"] = {
@@ -330,30 +469,8 @@ class PredictionService:
 
         elif prediction_type == "usage_patterns":
             # Add usage pattern data
-            # Convert the readings objects to dictionaries for consistent processing
-            # Handle the case where readings might be missing fields
-            base_data["usage_history"] = (
-                [
-                    {
-                        "timestamp": reading.timestamp,
-                        "temperature": reading.temperature,
-                        "pressure": reading.pressure
-                        if hasattr(reading, "pressure") and reading.pressure is not None
-                        else 0.0,
-                        "energy_usage": reading.energy_usage
-                        if hasattr(reading, "energy_usage")
-                        and reading.energy_usage is not None
-                        else 0.0,
-                        "flow_rate": reading.flow_rate
-                        if hasattr(reading, "flow_rate")
-                        and reading.flow_rate is not None
-                        else 0.0,
-                    }
-                    for reading in water_heater.readings
-                ]
-                if water_heater.readings
-                else []
-            )
+            if telemetry_summary is None:
+                base_data["usage_history"] = self._get_reading_series(water_heater)
             base_data["installation_location"] = getattr(
                 water_heater, "location", "Unknown"
             )
@@ -364,29 +481,10 @@ class PredictionService:
 
         elif prediction_type == "multi_factor":
             # Include all available data for multi-factor analysis
-            # Handle the case where readings might be missing fields
-            base_data["telemetry_series"] = (
-                [
-                    {
-                        "timestamp": reading.timestamp,
-                        "temperature": reading.temperature,
-                        "pressure": reading.pressure
-                        if hasattr(reading, "pressure") and reading.pressure is not None
-                        else 0.0,
-                        "energy_usage": reading.energy_usage
-                        if hasattr(reading, "energy_usage")
-                        and reading.energy_usage is not None
-                        else 0.0,
-                        "flow_rate": reading.flow_rate
-                        if hasattr(reading, "flow_rate")
-                        and reading.flow_rate is not None
-                        else 0.0,
-                    }
-                    for reading in water_heater.readings
-                ]
-                if water_heater.readings
-                else []
-            )
+            if telemetry_summary is None:
+                base_data["telemetry_series"] = self._get_reading_series(
+                    water_heater
+                )
             base_data["installation_location"] = getattr(
                 water_heater, "location", "Unknown"
             )
@@ -400,20 +498,85 @@ class PredictionService:
 
         return base_data
 
+    def _get_reading_series(self, water_heater: Any) -> List[Dict[str, Any]]:
+        """
+        Convert a water heater's readings to dictionaries
+
+        Args:
+            water_heater: The water heater whose readings to convert
+
+        Returns:
+            List of readings with missing metrics set to 0.0
+        """
+        # Convert the readings objects to dictionaries for consistent processing
+        # Handle the case where readings might be missing fields
+        return (
+            [
+                {
+                    "timestamp": reading.timestamp,
+                    "temperature": reading.temperature,
+                    "pressure": reading.pressure
+                    if hasattr(reading, "pressure") and reading.pressure is not None
+                    else 0.0,
+                    "energy_usage": reading.energy_usage
+                    if hasattr(reading, "energy_usage")
+                    and reading.energy_usage is not None
+                    else 0.0,
+                    "flow_rate": reading.flow_rate
+                    if hasattr(reading, "flow_rate") and reading.flow_rate is not None
+                    else 0.0,
+                }
+                for reading in water_heater.readings
+            ]
+            if water_heater.readings
+            else []
+        )
+
+    def _get_telemetry_summary(
+        self, device_id: Optional[str], water_heater: Any
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the rolling telemetry features for a water heater
+
+        The water heater's stored readings are merged into the feature
+        engine the first time a prediction needs the device, together with
+        any live telemetry received before then.
+
+        Args:
+            device_id: ID of the water heater
+            water_heater: The water heater, for its stored readings
+
+        Returns:
+            The feature summary, or None without a feature engine or telemetry
+        """
+        if self.feature_engine is None or not device_id:
+            return None
+
+        if water_heater is not None and not self.feature_engine.is_seeded(device_id):
+            self.feature_engine.seed(
+                device_id, getattr(water_heater, "readings", None) or []
+            )
+
+        return self.feature_engine.get_summary(device_id)
+
     async def _get_water_heater_lifespan_data(
-        self, device_id: str
+        self, device_id: str, water_heater: Any = None
     ) -> Optional[Dict[str, Any]]:
         """
         Get water heater data needed for lifespan prediction
 
         Args:
             device_id: ID of the water heater
+            water_heater: The water heater, if already fetched
 
         Returns:
             Dict with water heater data if successful, None otherwise
         """
         # Get water heater from service
-        water_heater = await self.water_heater_service.get_water_heater(device_id)
+        if water_heater is None:
+            water_heater = await self.water_heater_service.get_water_heater(
+                device_id
+            )
         if not water_heater:
             return None
 
@@ -0,0 +1,260 @@
+"""
+Cache for prediction results.
+
+Provides a bounded LRU cache with a TTL per prediction type. Entries for a
+device are dropped when events about new readings, shadow changes or
+maintenance records for it arrive on the event bus, and concurrent requests
+for the same prediction share one computation.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.predictions.interfaces import PredictionResult
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "2048"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+
+# Seconds a prediction stays valid, by type; anomalies track live telemetry
+# while lifespan estimates change slowly
+PREDICTION_TYPE_TTLS = {
+    "anomaly_detection": 60.0,
+    "usage_patterns": 900.0,
+    "multi_factor": 900.0,
+    "lifespan_estimation": 3600.0,
+}
+
+# Event bus topics after which a device's predictions are stale
+INVALIDATION_TOPICS = [
+    "water_heater.reading_added",
+    "shadow.updated",
+    "shadow.deleted",
+    "maintenance.record_added",
+]
+
+CacheKey = Tuple[str, str]
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prediction results with per-type expiry.
+
+    Invalidating a device detaches its running computations, so one that
+    started before the invalidation does not store its stale result.
+    """
+
+    def __init__(
+        self,
+        max_size: int = PREDICTION_CACHE_SIZE,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = PREDICTION_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the prediction cache.
+
+        Args:
+            max_size: Maximum number of predictions to keep
+            ttls: Seconds each prediction type stays valid, defaults to
+                PREDICTION_TYPE_TTLS
+            default_ttl: Seconds for prediction types not in ttls
+            clock: Monotonic time source (injectable for testing)
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.ttls = dict(PREDICTION_TYPE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, Tuple[float, PredictionResult]]" = (
+            OrderedDict()
+        )
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, device_id: str, prediction_type: str) -> Optional[PredictionResult]:
+        """
+        Get a cached prediction.
+
+        Args:
+            device_id: ID of the device
+            prediction_type: Type of prediction
+
+        Returns:
+            The cached prediction, or None if not cached or expired
+        """
+        key = (device_id, prediction_type)
+        entry = self._entries.get(key)
+        if entry is not None and self._clock() >= entry[0]:
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(
+        self, device_id: str, prediction_type: str, prediction: PredictionResult
+    ) -> None:
+        """
+        Store a prediction, evicting the least recently used entry.
+
+        Args:
+            device_id: ID of the device
+            prediction_type: Type of prediction
+            prediction: Prediction to cache
+        """
+        key = (device_id, prediction_type)
+        ttl = self.ttls.get(prediction_type, self.default_ttl)
+        self._entries[key] = (self._clock() + ttl, prediction)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        device_id: str,
+        prediction_type: str,
+        compute: Callable[[], Awaitable[Optional[PredictionResult]]],
+        force_refresh: bool = False,
+    ) -> Optional[PredictionResult]:
+        """
+        Get a cached prediction, computing it once if needed.
+
+        Callers asking for a prediction that is already being computed wait
+        for that computation instead of starting another. None results are
+        not cached; exceptions are raised to every waiting caller, and
+        waiters get None if the computing caller is cancelled.
+
+        Args:
+            device_id: ID of the device
+            prediction_type: Type of prediction
+            compute: Coroutine function producing the prediction
+            force_refresh: If True, skip the cached entry
+
+        Returns:
+            The prediction, or None if compute returned None
+        """
+        if not force_refresh:
+            cached = self.get(device_id, prediction_type)
+            if cached is not None:
+                return cached
+
+        key = (device_id, prediction_type)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.shared += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            prediction = await compute()
+        except asyncio.CancelledError:
+            # Waiting callers were not cancelled themselves
+            future.set_result(None)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure is not logged
+            future.exception()
+            raise
+        else:
+            if prediction is not None and self._inflight.get(key) is future:
+                self.put(device_id, prediction_type, prediction)
+            future.set_result(prediction)
+            return prediction
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate_device(self, device_id: str) -> int:
+        """
+        Drop every cached prediction for a device.
+
+        Computations already running for the device finish but do not store
+        their results.
+
+        Args:
+            device_id: ID of the device
+
+        Returns:
+            Number of entries removed
+        """
+        for key in [k for k in self._inflight if k[0] == device_id]:
+            del self._inflight[key]
+
+        keys = [key for key in self._entries if key[0] == device_id]
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove all cached predictions."""
+        self._entries.clear()
+
+    def subscribe(self, event_bus: Any) -> None:
+        """
+        Invalidate a device's predictions on events about it.
+
+        Args:
+            event_bus: EventBus to subscribe to INVALIDATION_TOPICS on
+        """
+        for topic in INVALIDATION_TOPICS:
+            event_bus.subscribe(topic, self._on_device_event)
+
+    async def _on_device_event(self, data: Dict[str, Any]) -> None:
+        """Handle an event bus event carrying a device_id."""
+        device_id = data.get("device_id") if isinstance(data, dict) else None
+        if device_id:
+            removed = self.invalidate_device(device_id)
+            if removed:
+                logger.debug(f"Invalidated {removed} cached predictions for {device_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict with size, configuration and hit/miss/eviction counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttls": dict(self.ttls),
+            "default_ttl": self.default_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "shared_computations": self.shared,
+            "in_flight": len(self._inflight),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
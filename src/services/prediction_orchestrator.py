@@ -0,0 +1,126 @@
+"""
+Orchestrates running several prediction models for one device.
+
+Used by the "all predictions" endpoints: device data is fetched once per
+request and shared, the models run concurrently, and a model that exceeds its
+timeout is left out instead of holding up the others.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from src.predictions.interfaces import PredictionResult
+from src.services.prediction import PREDICTION_TYPES, PredictionService
+
+logger = logging.getLogger(__name__)
+
+# Seconds each model may take before its result is dropped from the response
+PREDICTION_MODEL_TIMEOUT = float(os.getenv("PREDICTION_MODEL_TIMEOUT", "5.0"))
+
+
+class PredictionOrchestrator:
+    """
+    Runs the prediction models for a device concurrently.
+
+    Cached predictions are returned without loading anything. For the rest,
+    the water heater and its features are loaded once through
+    PredictionService.load_device_data and handed to every model.
+    """
+
+    def __init__(
+        self,
+        prediction_service: PredictionService,
+        timeout: float = PREDICTION_MODEL_TIMEOUT,
+    ):
+        """
+        Initialize the orchestrator.
+
+        Args:
+            prediction_service: Service that runs and caches the models
+            timeout: Seconds each model may take
+        """
+        self.prediction_service = prediction_service
+        self.timeout = timeout
+
+    async def get_all_predictions(
+        self,
+        device_id: str,
+        prediction_types: Optional[List[str]] = None,
+        force_refresh: bool = False,
+    ) -> Dict[str, Optional[PredictionResult]]:
+        """
+        Get several predictions for a device.
+
+        Args:
+            device_id: ID of the device
+            prediction_types: Types to run, defaults to PREDICTION_TYPES
+            force_refresh: If True, ignore cached predictions
+
+        Returns:
+            Dict mapping each prediction type to its result, or None if the
+            model failed, timed out or the device was not found
+        """
+        prediction_types = prediction_types or PREDICTION_TYPES
+        results: Dict[str, Optional[PredictionResult]] = {}
+
+        if not force_refresh:
+            for prediction_type in prediction_types:
+                cached = self.prediction_service.get_cached_prediction(
+                    device_id, prediction_type
+                )
+                if cached is not None:
+                    results[prediction_type] = cached
+
+        pending = [t for t in prediction_types if t not in results]
+        if not pending:
+            return results
+
+        started = time.monotonic()
+        device_data = await self.prediction_service.load_device_data(
+            device_id, pending
+        )
+        if not device_data:
+            logger.error(f"Failed to get device data for predictions: {device_id}")
+            return {t: results.get(t) for t in prediction_types}
+
+        tasks = {
+            prediction_type: asyncio.ensure_future(
+                self.prediction_service.get_prediction(
+                    device_id=device_id,
+                    prediction_type=prediction_type,
+                    force_refresh=True,
+                    device_data=device_data[prediction_type],
+                )
+            )
+            for prediction_type in pending
+            if prediction_type in device_data
+        }
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=self.timeout)
+
+        for prediction_type in pending:
+            task = tasks.get(prediction_type)
+            if task is None:
+                results[prediction_type] = None
+            elif not task.done():
+                task.cancel()
+                logger.warning(
+                    f"{prediction_type} prediction for {device_id} timed out "
+                    f"after {self.timeout}s"
+                )
+                results[prediction_type] = None
+            elif task.exception() is not None:
+                logger.error(
+                    f"Error getting {prediction_type} prediction: {task.exception()}"
+                )
+                results[prediction_type] = None
+            else:
+                results[prediction_type] = task.result()
+
+        logger.debug(
+            f"Ran {len(tasks)} prediction models for {device_id} in "
+            f"{(time.monotonic() - started) * 1000:.1f}ms"
+        )
+        return {t: results.get(t) for t in prediction_types}
@@ -8,8 +8,10 @@ import asyncio
 from datetime import datetime
 from typing import Any, Callable, Dict, List, Optional, Union
 
-from bson.timestamp import Timestamp
-from motor.motor_asyncio import AsyncIOMotorClient
+from src.infrastructure.device_shadow.change_stream_multiplexer import (
+    ChangeStreamMultiplexer,
+    get_change_stream_multiplexer,
+)
 
 
 class ShadowChangeEvent:
@@ -27,6 +29,7 @@ class ShadowChangeEvent:
         full_document: Optional[Dict[str, Any]] = None,
         changed_fields: Optional[Dict[str, Any]] = None,
         timestamp: Optional[str] = None,
+        removed_fields: Optional[List[str]] = None,
     ):
         """
         Initialize a ShadowChangeEvent.
@@ -37,11 +40,13 @@ class ShadowChangeEvent:
             full_document: The complete shadow document after the change.
             changed_fields: Fields that were changed in an update operation.
             timestamp: The timestamp of the change event.
+            removed_fields: Dotted paths removed in an update operation.
         """
         self.device_id = device_id
         self.operation_type = operation_type
         self.full_document = full_document
         self.changed_fields = changed_fields
+        self.removed_fields = removed_fields
 
         if timestamp is None:
             timestamp = datetime.now().isoformat()
@@ -59,6 +64,7 @@ class ShadowChangeEvent:
             "operation_type": self.operation_type,
             "full_document": self.full_document,
             "changed_fields": self.changed_fields,
+            "removed_fields": self.removed_fields,
             "timestamp": self.timestamp,
         }
 
@@ -79,6 +85,7 @@ class ShadowChangeEvent:
             full_document=data.get("full_document"),
             changed_fields=data.get("changed_fields"),
             timestamp=data.get("timestamp"),
+            removed_fields=data.get("removed_fields"),
         )
 
 
@@ -86,9 +93,10 @@ class ShadowChangeStreamListener:
     """
     Listens for changes to device shadows in MongoDB using change streams.
 
-    This class connects to a MongoDB collection and sets up a change stream
-    to monitor changes to device shadows. When changes occur, registered
-    handlers are notified with ShadowChangeEvent objects.
+    This class subscribes to the process-wide change-stream multiplexer for
+    the shadows collection. When changes occur, registered handlers are
+    notified with ShadowChangeEvent objects. Changes arrive in coalesced
+    batches and the stream resumes from its saved position after a restart.
     """
 
     def __init__(
@@ -96,6 +104,7 @@ class ShadowChangeStreamListener:
         mongo_uri: str = "mongodb://localhost:27017/",
         db_name: str = "iotsphere",
         collection_name: str = "device_shadows",
+        multiplexer: Optional[ChangeStreamMultiplexer] = None,
     ):
         """
         Initialize the ShadowChangeStreamListener.
@@ -104,48 +113,44 @@ class ShadowChangeStreamListener:
             mongo_uri: URI for connecting to MongoDB.
             db_name: Name of the database containing shadow data.
             collection_name: Name of the collection containing shadow data.
+            multiplexer: Change-stream multiplexer to subscribe to (defaults
+                to the shared one for mongo_uri and db_name).
         """
         self.mongo_uri = mongo_uri
         self.db_name = db_name
         self.collection_name = collection_name
-        self.mongo_client = None
-        self.change_stream = None
+        self.multiplexer = multiplexer
         self.initialized = False
         self.is_listening = False
         self.event_handlers = []
+        self._stopped = asyncio.Event()
 
     async def _connect(self) -> None:
         """
         Connect to MongoDB.
 
-        Establishes a connection to MongoDB using the configured URI.
+        Gets the shared change-stream multiplexer for the configured database.
         """
-        self.mongo_client = AsyncIOMotorClient(self.mongo_uri)
+        self.multiplexer = get_change_stream_multiplexer(self.mongo_uri, self.db_name)
 
     async def initialize(self) -> None:
         """
         Initialize the change stream listener.
 
-        Connects to MongoDB and sets up a change stream for the shadows collection.
+        Gets the change-stream multiplexer for the shadows collection.
         Must be called before start_listening.
         """
-        if self.mongo_client is None:
+        if self.multiplexer is None:
             await self._connect()
 
-        # Get the database and collection
-        db = self.mongo_client[self.db_name]
-        collection = db[self.collection_name]
-
-        # Create a change stream on the collection
-        self.change_stream = collection.watch()
         self.initialized = True
 
     async def start_listening(self) -> None:
         """
         Start listening for changes on the change stream.
 
-        Begins processing events from the change stream and notifying handlers.
-        The initialize method must be called before this method.
+        Subscribes to the multiplexer and keeps running until stop_listening
+        is called. The initialize method must be called before this method.
 
         Raises:
             RuntimeError: If the listener has not been initialized.
@@ -162,35 +167,38 @@ class ShadowChangeStreamListener:
         """
         Stop listening for changes on the change stream.
 
-        Stops processing events and closes the change stream.
+        Unsubscribes from the multiplexer, which closes the stream once no
+        other consumer needs it.
         """
-        if self.change_stream:
-            await self.change_stream.close()
+        if self.multiplexer:
+            await self.multiplexer.unsubscribe(
+                self.collection_name, self._handle_change_batch
+            )
         self.is_listening = False
+        self._stopped.set()
 
     async def _process_change_events(self) -> None:
         """
         Process events from the change stream.
 
-        Listens for events from the change stream and forwards them to handlers.
-        This method runs in a loop until stop_listening is called.
+        Subscribes to the shadows collection and waits until stop_listening
+        is called. The multiplexer reconnects and resumes on its own.
         """
-        while self.is_listening:
-            try:
-                async for change_event in self.change_stream:
-                    await self._handle_change_event(change_event)
-            except Exception as e:
-                # Log error and attempt to reconnect
-                print(f"Error processing change stream: {e}")
-                if self.is_listening:
-                    # Sleep briefly before reconnecting
-                    await asyncio.sleep(1)
-                    # Attempt to reinitialize the change stream
-                    try:
-                        await self.initialize()
-                    except Exception as reconnect_error:
-                        print(f"Error reconnecting to change stream: {reconnect_error}")
-                        self.is_listening = False
+        self._stopped.clear()
+        await self.multiplexer.subscribe(
+            self.collection_name, self._handle_change_batch
+        )
+        await self._stopped.wait()
+
+    async def _handle_change_batch(self, change_events: List[Dict[str, Any]]) -> None:
+        """
+        Handle a coalesced batch of change events from the multiplexer.
+
+        Args:
+            change_events: MongoDB change event dictionaries, one per shadow.
+        """
+        for change_event in change_events:
+            await self._handle_change_event(change_event)
 
     async def _handle_change_event(self, change_event: Dict[str, Any]) -> None:
         """
@@ -271,14 +279,15 @@ class ShadowChangeStreamListener:
 
         full_document = None
         changed_fields = None
+        removed_fields = None
 
         if operation_type in ["insert", "replace", "update"]:
             full_document = change_event.get("fullDocument")
 
         if operation_type == "update":
-            changed_fields = change_event.get("updateDescription", {}).get(
-                "updatedFields"
-            )
+            update_description = change_event.get("updateDescription", {})
+            changed_fields = update_description.get("updatedFields")
+            removed_fields = update_description.get("removedFields")
 
         return ShadowChangeEvent(
             device_id=device_id,
@@ -286,6 +295,7 @@ class ShadowChangeStreamListener:
             full_document=full_document,
             changed_fields=changed_fields,
             timestamp=timestamp,
+            removed_fields=removed_fields,
         )
 
     async def _notify_handlers(self, event: ShadowChangeEvent) -> None:
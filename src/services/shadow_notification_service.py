@@ -20,12 +20,22 @@ from src.services.shadow_change_stream_listener import (
 logger = logging.getLogger(__name__)
 
 
+SHADOW_SECTIONS = ("reported", "desired")
+
+
 class ShadowSubscription:
     """
     Represents a client subscription to shadow updates for a specific device.
 
     Handles filtering of updates based on the fields the client is interested in
     and manages the WebSocket connection for delivering notifications.
+
+    The field filter is compiled once when the subscription is created, so
+    receive_data_fields should be treated as read-only afterwards. A filter
+    entry matches the field itself and anything nested below it, so
+    'reported' or 'reported.*' subscribes to the whole reported section.
+    Values of a parent path, e.g. the 'reported.sensors' object for an
+    entry 'reported.sensors.inlet', are narrowed to the subscribed parts.
     """
 
     def __init__(
@@ -47,6 +57,21 @@ class ShadowSubscription:
         self.websocket = websocket
         self.receive_data_fields = receive_data_fields or ["*"]  # Default to all fields
 
+        # Compiled filter: a wildcard flag and the set of subscribed paths
+        self.all_fields = "*" in self.receive_data_fields
+        self._field_paths: Set[str] = {
+            field[:-2] if field.endswith(".*") else field
+            for field in self.receive_data_fields
+        }
+        # Strict ancestors of the subscribed paths, e.g. 'reported' and
+        # 'reported.sensors' for 'reported.sensors.inlet'
+        self._parent_paths: Set[str] = {
+            path[:index]
+            for path in self._field_paths
+            for index, char in enumerate(path)
+            if char == "."
+        }
+
     async def send_notification(self, notification_data: Dict[str, Any]) -> None:
         """
         Send a notification to the subscribed client.
@@ -99,10 +124,71 @@ class ShadowSubscription:
         Returns:
             True if this subscription includes the given field
         """
-        if "*" in self.receive_data_fields:
+        if self.all_fields:
             return True
 
-        return field in self.receive_data_fields
+        # Check the field and each of its parents, e.g. 'reported.temperature'
+        # then 'reported'
+        path = field
+        while True:
+            if path in self._field_paths:
+                return True
+            separator = path.rfind(".")
+            if separator < 0:
+                return False
+            path = path[:separator]
+
+    def field_is_affected(self, field: str) -> bool:
+        """
+        Check if a change to the given field touches a subscribed field.
+
+        Args:
+            field: The changed field (e.g., 'reported.sensors')
+
+        Returns:
+            True if the field or anything nested below it is subscribed
+        """
+        return self.field_is_subscribed(field) or field in self._parent_paths
+
+    def filter_nested(self, path: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Select the subscribed parts of an object whose own path is not subscribed.
+
+        Args:
+            path: Path of the object (e.g., 'reported.sensors')
+            value: The object's fields and values
+
+        Returns:
+            The subscribed fields, nested as in value; empty if none are subscribed
+        """
+        if path not in self._parent_paths:
+            return {}
+
+        selected = {}
+        for key, child in value.items():
+            child_path = f"{path}.{key}"
+            if self.field_is_subscribed(child_path):
+                selected[key] = child
+            elif isinstance(child, dict):
+                nested = self.filter_nested(child_path, child)
+                if nested:
+                    selected[key] = nested
+        return selected
+
+    def filter_section(self, section: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Select the subscribed fields of one shadow section.
+
+        Args:
+            section: 'reported' or 'desired'
+            state: The section's fields and values
+
+        Returns:
+            The subscribed fields; empty if none are subscribed
+        """
+        if self.all_fields or section in self._field_paths:
+            return dict(state)
+        return self.filter_nested(section, state)
 
 
 class NotificationManager:
@@ -201,7 +287,12 @@ class ShadowNotificationService:
             change_stream_listener: The change stream listener to get updates from
         """
         self.change_stream_listener = change_stream_listener
-        self.subscriptions = []  # List of ShadowSubscription objects
+        # device_id -> {websocket: ShadowSubscription}; each websocket has at
+        # most one subscription, found through _device_by_websocket
+        self._subscriptions_by_device: Dict[
+            str, Dict[WebSocket, ShadowSubscription]
+        ] = {}
+        self._device_by_websocket: Dict[WebSocket, str] = {}
         self.change_stream_listener.register_event_handler(
             self.handle_shadow_change_event
         )
@@ -209,6 +300,44 @@ class ShadowNotificationService:
             "Shadow Notification Service initialized with Change Stream Listener"
         )
 
+    @property
+    def subscriptions(self) -> List[ShadowSubscription]:
+        """All subscriptions, grouped by device."""
+        return [
+            subscription
+            for device_subscriptions in self._subscriptions_by_device.values()
+            for subscription in device_subscriptions.values()
+        ]
+
+    @subscriptions.setter
+    def subscriptions(self, subscriptions: List[ShadowSubscription]) -> None:
+        """Replace all subscriptions and rebuild the device index."""
+        self._subscriptions_by_device = {}
+        self._device_by_websocket = {}
+        for subscription in subscriptions:
+            self._add_subscription(subscription)
+
+    def _add_subscription(self, subscription: ShadowSubscription) -> None:
+        """Index a subscription, replacing any other one for its websocket."""
+        self._remove_subscription(subscription.websocket)
+        self._subscriptions_by_device.setdefault(subscription.device_id, {})[
+            subscription.websocket
+        ] = subscription
+        self._device_by_websocket[subscription.websocket] = subscription.device_id
+
+    def _remove_subscription(
+        self, websocket: WebSocket
+    ) -> Optional[ShadowSubscription]:
+        """Drop a websocket's subscription from the index, if it has one."""
+        device_id = self._device_by_websocket.pop(websocket, None)
+        if device_id is None:
+            return None
+        device_subscriptions = self._subscriptions_by_device[device_id]
+        subscription = device_subscriptions.pop(websocket)
+        if not device_subscriptions:
+            del self._subscriptions_by_device[device_id]
+        return subscription
+
     async def handle_shadow_change_event(self, event: ShadowChangeEvent) -> None:
         """
         Handle a shadow change event from the change stream.
@@ -222,9 +351,9 @@ class ShadowNotificationService:
         logger.debug(f"Shadow change event received for {device_id}")
 
         # Find all subscriptions for this device
-        matching_subscriptions = [
-            sub for sub in self.subscriptions if sub.matches_device_id(device_id)
-        ]
+        matching_subscriptions = list(
+            self._subscriptions_by_device.get(device_id, {}).values()
+        )
 
         # Notify each subscription
         for subscription in matching_subscriptions:
@@ -243,6 +372,8 @@ class ShadowNotificationService:
         try:
             # Extract relevant data based on the subscription's field filter
             notification_data = self._extract_notification_data(event, subscription)
+            if notification_data is None:
+                return
 
             # Send the notification
             await subscription.send_notification(notification_data)
@@ -257,16 +388,24 @@ class ShadowNotificationService:
 
     def _extract_notification_data(
         self, event: ShadowChangeEvent, subscription: ShadowSubscription
-    ) -> Dict[str, Any]:
+    ) -> Optional[Dict[str, Any]]:
         """
         Extract notification data based on the subscription's field filter.
 
+        Updates that carry the change stream's updated fields are sent as a
+        delta ("delta": true) holding only the subscribed fields that changed,
+        keyed by their path within the section (e.g. 'temperature' or
+        'sensors.inlet'), plus the subscribed paths that were removed; a delta
+        with none of either is not sent. Inserts, and updates without a field
+        list, carry the filtered full state.
+
         Args:
             event: The shadow change event
             subscription: The subscription to filter for
 
         Returns:
-            The filtered notification data
+            The filtered notification data, or None if nothing the
+            subscription covers changed
         """
         # Base notification data
         notification_data = {
@@ -275,36 +414,67 @@ class ShadowNotificationService:
             "timestamp": event.timestamp,
         }
 
-        # Add shadow state for insert/update operations
-        if event.operation_type in ["insert", "update"] and event.full_document:
-            # Extract reported state if appropriate
-            if "reported" in event.full_document and any(
-                subscription.field_is_subscribed(f"reported.{field}")
-                or subscription.field_is_subscribed("*")
-                for field in event.full_document["reported"]
+        if event.operation_type == "update" and event.changed_fields is not None:
+            notification_data["delta"] = True
+            self._add_changed_fields(notification_data, event, subscription)
+            if not any(
+                key in notification_data for key in (*SHADOW_SECTIONS, "removed")
             ):
-                notification_data["reported"] = {}
-                for field, value in event.full_document["reported"].items():
-                    if subscription.field_is_subscribed(
-                        f"reported.{field}"
-                    ) or subscription.field_is_subscribed("*"):
-                        notification_data["reported"][field] = value
-
-            # Extract desired state if appropriate
-            if "desired" in event.full_document and any(
-                subscription.field_is_subscribed(f"desired.{field}")
-                or subscription.field_is_subscribed("*")
-                for field in event.full_document["desired"]
-            ):
-                notification_data["desired"] = {}
-                for field, value in event.full_document["desired"].items():
-                    if subscription.field_is_subscribed(
-                        f"desired.{field}"
-                    ) or subscription.field_is_subscribed("*"):
-                        notification_data["desired"][field] = value
+                return None
+
+        # Add shadow state for insert/update operations
+        elif event.operation_type in ["insert", "update"] and event.full_document:
+            for section in SHADOW_SECTIONS:
+                state = event.full_document.get(section)
+                if state:
+                    fields = subscription.filter_section(section, state)
+                    if fields:
+                        notification_data[section] = fields
 
         return notification_data
 
+    @staticmethod
+    def _add_changed_fields(
+        notification_data: Dict[str, Any],
+        event: ShadowChangeEvent,
+        subscription: ShadowSubscription,
+    ) -> None:
+        """
+        Add the subscribed updated and removed fields of an update event.
+
+        Args:
+            notification_data: The notification being built
+            event: An update event with changed_fields
+            subscription: The subscription to filter for
+        """
+        for path, value in event.changed_fields.items():
+            section, _, field = path.partition(".")
+            if section not in SHADOW_SECTIONS:
+                continue
+
+            if not field:
+                # The whole section was replaced
+                if isinstance(value, dict):
+                    fields = subscription.filter_section(section, value)
+                    if fields:
+                        notification_data.setdefault(section, {}).update(fields)
+            elif subscription.field_is_subscribed(path):
+                notification_data.setdefault(section, {})[field] = value
+            elif isinstance(value, dict):
+                # A parent of subscribed fields was set as a whole
+                fields = subscription.filter_nested(path, value)
+                if fields:
+                    notification_data.setdefault(section, {})[field] = fields
+
+        removed = [
+            path
+            for path in getattr(event, "removed_fields", None) or ()
+            if path.partition(".")[0] in SHADOW_SECTIONS
+            and subscription.field_is_affected(path)
+        ]
+        if removed:
+            notification_data["removed"] = removed
+
     async def subscribe(
         self, device_id: str, websocket: WebSocket, data_fields: List[str] = None
     ) -> None:
@@ -316,20 +486,15 @@ class ShadowNotificationService:
             websocket: The client's WebSocket connection
             data_fields: List of fields to include in notifications (e.g., 'reported.temperature')
         """
-        # Check if this websocket is already subscribed
-        for i, sub in enumerate(self.subscriptions):
-            if sub.websocket == websocket:
-                # Update the existing subscription
-                self.subscriptions[i] = ShadowSubscription(
-                    device_id, websocket, data_fields
-                )
-                logger.debug(f"Updated subscription for {device_id}")
-                return
-
-        # Create a new subscription
+        # A websocket has one subscription; subscribing again replaces it
         subscription = ShadowSubscription(device_id, websocket, data_fields)
-        self.subscriptions.append(subscription)
-        logger.debug(f"New subscription created for {device_id}")
+        replaced = self._remove_subscription(websocket)
+        self._add_subscription(subscription)
+
+        if replaced is not None:
+            logger.debug(f"Updated subscription for {device_id}")
+        else:
+            logger.debug(f"New subscription created for {device_id}")
 
     async def unsubscribe(self, websocket: WebSocket) -> None:
         """
@@ -338,9 +503,7 @@ class ShadowNotificationService:
         Args:
             websocket: The client's WebSocket connection
         """
-        self.subscriptions = [
-            sub for sub in self.subscriptions if sub.websocket != websocket
-        ]
+        self._remove_subscription(websocket)
         logger.debug("Client unsubscribed from shadow updates")
 
     async def _check_connection(self, subscription: ShadowSubscription) -> bool:
@@ -357,14 +520,12 @@ class ShadowNotificationService:
 
     async def cleanup_disconnected_clients(self) -> None:
         """Remove subscriptions for disconnected clients."""
-        connected_subscriptions = []
+        removed_count = 0
 
         for subscription in self.subscriptions:
-            if await self._check_connection(subscription):
-                connected_subscriptions.append(subscription)
-
-        removed_count = len(self.subscriptions) - len(connected_subscriptions)
-        self.subscriptions = connected_subscriptions
+            if not await self._check_connection(subscription):
+                self._remove_subscription(subscription.websocket)
+                removed_count += 1
 
         if removed_count > 0:
             logger.debug(f"Removed {removed_count} disconnected client subscriptions")
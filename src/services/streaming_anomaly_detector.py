@@ -0,0 +1,419 @@
+"""
+Streaming anomaly detection for device telemetry.
+
+AnomalyDetectionPredictor only runs when a prediction is requested. The
+StreamingAnomalyDetector instead checks every device.telemetry message as it
+arrives, keeping a few running values per device and metric: an
+exponentially weighted mean and variance for a rolling z-score, an EWMA of
+the signal and two-sided CUSUM sums for slow drifts. Anomalies are published
+on the event bus and pushed to the alerts WebSocket channel as soon as they
+are found, so nothing has to poll predictions to surface them.
+"""
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.services.telemetry_features import METRIC_ALIASES
+
+logger = logging.getLogger(__name__)
+
+# Event bus topic and WebSocket channel anomalies are published on
+ANOMALY_TOPIC = "anomaly.detected"
+ALERTS_CHANNEL = "alerts"
+
+# Weight of the newest sample in the rolling mean, variance and EWMA
+ANOMALY_EWMA_ALPHA = float(os.getenv("ANOMALY_EWMA_ALPHA", "0.05"))
+
+# Samples per metric before anything is reported
+ANOMALY_WARMUP_SAMPLES = int(os.getenv("ANOMALY_WARMUP_SAMPLES", "20"))
+
+# Rolling z-score above which a single sample is a spike
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "4.0"))
+
+# CUSUM slack and decision threshold, in standard deviations
+ANOMALY_CUSUM_SLACK = float(os.getenv("ANOMALY_CUSUM_SLACK", "0.5"))
+ANOMALY_CUSUM_THRESHOLD = float(os.getenv("ANOMALY_CUSUM_THRESHOLD", "8.0"))
+
+# Smallest standard deviation used, as a fraction of the mean, so a flat
+# signal does not turn every small step into an anomaly
+ANOMALY_MIN_STD_FRACTION = float(os.getenv("ANOMALY_MIN_STD_FRACTION", "0.01"))
+
+# Seconds before the same kind of anomaly is reported again for a metric
+ANOMALY_COOLDOWN_SECONDS = float(os.getenv("ANOMALY_COOLDOWN_SECONDS", "60"))
+
+# Delivery bounds: anomalies waiting to be published, and the delay after
+# which a delivered anomaly counts as late
+ANOMALY_MAX_PENDING = int(os.getenv("ANOMALY_MAX_PENDING", "1000"))
+ANOMALY_MAX_DELAY_SECONDS = float(os.getenv("ANOMALY_MAX_DELAY_SECONDS", "1.0"))
+
+KIND_SPIKE = "spike"
+KIND_DRIFT = "drift"
+
+
+class _MetricDetector:
+    """
+    Rolling z-score, EWMA and CUSUM state for one metric of one device.
+
+    Each sample is scored against the statistics from before it, then folded
+    in, clipped to the z-score threshold. Until the warm-up is over the
+    weight of a new sample is 1/n, so the mean and variance start out as
+    plain averages.
+    """
+
+    __slots__ = ("count", "mean", "variance", "ewma", "cusum_high", "cusum_low")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.ewma = 0.0
+        self.cusum_high = 0.0
+        self.cusum_low = 0.0
+
+    def std(self) -> float:
+        """Standard deviation, floored relative to the mean."""
+        return max(
+            math.sqrt(self.variance), abs(self.mean) * ANOMALY_MIN_STD_FRACTION, 1e-6
+        )
+
+    def update(self, value: float) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Score a sample and add it to the running state.
+
+        Args:
+            value: The metric value
+
+        Returns:
+            (kind, details) for each anomaly the sample triggered
+        """
+        found = []
+        if self.count >= ANOMALY_WARMUP_SAMPLES:
+            std = self.std()
+            z_score = (value - self.mean) / std
+            if abs(z_score) > ANOMALY_Z_THRESHOLD:
+                found.append((KIND_SPIKE, {"z_score": z_score}))
+
+            # Spikes are already reported; clip them so one outlier does not
+            # also trip the drift detector
+            step = max(-ANOMALY_Z_THRESHOLD, min(ANOMALY_Z_THRESHOLD, z_score))
+            self.cusum_high = max(0.0, self.cusum_high + step - ANOMALY_CUSUM_SLACK)
+            self.cusum_low = max(0.0, self.cusum_low - step - ANOMALY_CUSUM_SLACK)
+            if max(self.cusum_high, self.cusum_low) > ANOMALY_CUSUM_THRESHOLD:
+                found.append(
+                    (
+                        KIND_DRIFT,
+                        {
+                            "cusum": max(self.cusum_high, self.cusum_low),
+                            "z_score": z_score,
+                        },
+                    )
+                )
+                self.cusum_high = self.cusum_low = 0.0
+
+            # Fold outliers in at the threshold so one spike does not
+            # inflate the variance and mask the next
+            delta = step * std
+        else:
+            delta = value - self.mean
+
+        self.count += 1
+        alpha = max(ANOMALY_EWMA_ALPHA, 1.0 / self.count)
+        self.mean += alpha * delta
+        self.variance = (1 - alpha) * (self.variance + alpha * delta * delta)
+        if self.count == 1:
+            self.ewma = value
+        else:
+            self.ewma += ANOMALY_EWMA_ALPHA * (value - self.ewma)
+        return found
+
+
+class StreamingAnomalyDetector:
+    """
+    Detects telemetry anomalies as messages arrive.
+
+    Message bus callbacks may run on broker threads, so detection state is
+    guarded by a lock and anomalies are handed to the event loop bound by
+    start() for publishing. At most max_pending anomalies wait for delivery;
+    further ones are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        cooldown: float = ANOMALY_COOLDOWN_SECONDS,
+        max_pending: int = ANOMALY_MAX_PENDING,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            cooldown: Seconds before an anomaly of the same kind is reported
+                again for a device metric
+            max_pending: Anomalies allowed to wait for delivery
+            clock: Monotonic clock, replaceable in tests
+        """
+        self.cooldown = cooldown
+        self.max_pending = max_pending
+        self.clock = clock
+        self.event_bus = None
+        self.websocket_manager = None
+
+        self._detectors: Dict[str, Dict[str, _MetricDetector]] = {}
+        self._last_reported: Dict[Tuple[str, str, str], float] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+
+        # Counters
+        self.samples = 0
+        self.detected = 0
+        self.suppressed = 0
+        self.published = 0
+        self.dropped = 0
+        self.late = 0
+        self.max_delay = 0.0
+
+    def __len__(self) -> int:
+        return len(self._detectors)
+
+    def subscribe(
+        self, message_bus: Any, event_bus: Any = None, websocket_manager: Any = None
+    ) -> None:
+        """
+        Start consuming device.telemetry messages.
+
+        Args:
+            message_bus: Message bus publishing device.telemetry messages
+            event_bus: EventBus anomalies are published on
+            websocket_manager: WebSocketManager used to reach alerts clients
+        """
+        if event_bus is not None:
+            self.event_bus = event_bus
+        if websocket_manager is not None:
+            self.websocket_manager = websocket_manager
+        message_bus.subscribe("device.telemetry", self._on_device_telemetry)
+
+    async def start(self) -> None:
+        """Bind to the running event loop so anomalies can be delivered."""
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        """Deliver anomalies already handed off, then stop accepting new ones."""
+        if self._loop is None:
+            return
+        # Let hand-offs already scheduled on the loop create their tasks
+        await asyncio.sleep(0)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._loop = None
+
+    def process(
+        self, device_id: str, values: Dict[str, Any], timestamp: Any = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Check one telemetry sample for anomalies.
+
+        Args:
+            device_id: ID of the device
+            values: Telemetry fields of the sample
+            timestamp: Time of the sample, passed through to the anomaly
+
+        Returns:
+            Anomalies to report, after the cooldown has been applied
+        """
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.isoformat()
+        anomalies = []
+        now = self.clock()
+        with self._lock:
+            detectors = self._detectors.get(device_id)
+            if detectors is None:
+                detectors = self._detectors[device_id] = {}
+            self.samples += 1
+
+            for metric, aliases in METRIC_ALIASES.items():
+                value = next(
+                    (values[name] for name in aliases if values.get(name) is not None),
+                    None,
+                )
+                if value is None or isinstance(value, bool):
+                    continue
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                if not math.isfinite(value):
+                    continue
+
+                detector = detectors.get(metric)
+                if detector is None:
+                    detector = detectors[metric] = _MetricDetector()
+                expected, std = detector.mean, detector.std()
+
+                for kind, details in detector.update(value):
+                    self.detected += 1
+                    key = (device_id, metric, kind)
+                    last = self._last_reported.get(key)
+                    if last is not None and now - last < self.cooldown:
+                        self.suppressed += 1
+                        continue
+                    self._last_reported[key] = now
+                    anomalies.append(
+                        self._make_anomaly(
+                            device_id,
+                            metric,
+                            kind,
+                            value,
+                            expected,
+                            std,
+                            detector.ewma,
+                            timestamp,
+                            details,
+                        )
+                    )
+        return anomalies
+
+    @staticmethod
+    def _make_anomaly(
+        device_id: str,
+        metric: str,
+        kind: str,
+        value: float,
+        expected: float,
+        std: float,
+        ewma: float,
+        timestamp: Any,
+        details: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Build the anomaly payload sent to subscribers."""
+        z_score = details["z_score"]
+        if kind == KIND_SPIKE:
+            severity = "high" if abs(z_score) > 2 * ANOMALY_Z_THRESHOLD else "medium"
+        else:
+            severity = "medium"
+        anomaly = {
+            "device_id": device_id,
+            "metric": metric,
+            "kind": kind,
+            "direction": "increase" if z_score > 0 else "decrease",
+            "severity": severity,
+            "value": value,
+            "expected": round(expected, 4),
+            "std": round(std, 4),
+            "ewma": round(ewma, 4),
+            "z_score": round(z_score, 2),
+            "timestamp": timestamp,
+            "detected_at": datetime.now().isoformat(),
+        }
+        if "cusum" in details:
+            anomaly["cusum"] = round(details["cusum"], 2)
+        return anomaly
+
+    def remove_device(self, device_id: str) -> bool:
+        """Forget a device's detection state."""
+        with self._lock:
+            for key in [k for k in self._last_reported if k[0] == device_id]:
+                del self._last_reported[key]
+            return self._detectors.pop(device_id, None) is not None
+
+    def _on_device_telemetry(self, topic: str, event: Dict[str, Any]) -> None:
+        """Handle a device.telemetry message; may run on a broker thread."""
+        try:
+            device_id = event.get("device_id")
+            if not device_id:
+                return
+            anomalies = self.process(
+                device_id, event.get("data") or {}, event.get("timestamp")
+            )
+        except Exception as e:
+            logger.error(f"Error checking telemetry for anomalies: {e}")
+            return
+
+        for anomaly in anomalies:
+            self._hand_off(anomaly)
+
+    def _hand_off(self, anomaly: Dict[str, Any]) -> None:
+        """Schedule an anomaly for delivery on the event loop."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self.dropped += 1
+            logger.warning(
+                f"Anomaly detector not started, dropping {anomaly['kind']} "
+                f"anomaly for {anomaly['device_id']}"
+            )
+            return
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                logger.warning(
+                    f"Anomaly delivery backlog full, dropping anomaly for "
+                    f"{anomaly['device_id']}"
+                )
+                return
+            self._pending += 1
+
+        try:
+            loop.call_soon_threadsafe(self._schedule, anomaly, self.clock())
+        except RuntimeError:
+            # Loop closed between the check and the call
+            with self._lock:
+                self._pending -= 1
+            self.dropped += 1
+
+    def _schedule(self, anomaly: Dict[str, Any], handed_off_at: float) -> None:
+        """Start publishing an anomaly; runs on the event loop thread."""
+        task = asyncio.create_task(self._publish(anomaly, handed_off_at))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, anomaly: Dict[str, Any], handed_off_at: float) -> None:
+        """Publish an anomaly to the event bus and the alerts channel."""
+        try:
+            if self.event_bus is not None:
+                await self.event_bus.publish(ANOMALY_TOPIC, anomaly)
+            if self.websocket_manager is not None:
+                message = {"type": "anomaly", **anomaly}
+                await self.websocket_manager.broadcast_to_device(
+                    anomaly["device_id"], message, ALERTS_CHANNEL
+                )
+                await self.websocket_manager.broadcast_to_topic(ALERTS_CHANNEL, message)
+            self.published += 1
+        except Exception as e:
+            logger.error(f"Error publishing anomaly for {anomaly['device_id']}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+            delay = self.clock() - handed_off_at
+            self.max_delay = max(self.max_delay, delay)
+            if delay > ANOMALY_MAX_DELAY_SECONDS:
+                self.late += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get detector statistics.
+
+        Returns:
+            Dict with devices tracked, samples checked and anomaly counters
+        """
+        return {
+            "devices": len(self._detectors),
+            "samples": self.samples,
+            "detected": self.detected,
+            "suppressed": self.suppressed,
+            "published": self.published,
+            "dropped": self.dropped,
+            "pending": self._pending,
+            "late": self.late,
+            "max_delay_ms": self.max_delay * 1000,
+        }
+
+
+# Shared detector fed by the application's message bus
+streaming_anomaly_detector = StreamingAnomalyDetector()
@@ -0,0 +1,199 @@
+"""
+Per-client conflation of real-time telemetry for the IoTSphere platform.
+
+Instead of dropping updates that arrive too quickly, the conflator keeps the
+latest value for every (client, device, metric) and flushes each client at
+its own rate. Intermediate values are superseded, but the most recent value
+is always delivered on the client's next flush, and per-client state is
+discarded once the client has nothing left to send.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get("TELEMETRY_FLUSH_INTERVAL", "0.5"))
+
+
+class _ClientState:
+    """Pending updates and flush timing for one client."""
+
+    __slots__ = ("pending", "last_flush", "handle")
+
+    def __init__(self):
+        # Latest point per (device_id, metric)
+        self.pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.last_flush = float("-inf")
+        self.handle: Optional[asyncio.Handle] = None
+
+
+class TelemetryConflator:
+    """
+    Conflating, rate-limited telemetry scheduler for WebSocket clients.
+
+    Each client receives at most one telemetry_batch message per device per
+    flush interval. A flush is scheduled when the first update arrives after
+    an idle period, so the trailing value is never lost; the client's state
+    is evicted one interval after its last flush if nothing new arrived.
+    """
+
+    def __init__(
+        self,
+        websocket_manager,
+        default_interval: float = DEFAULT_FLUSH_INTERVAL,
+        connection_type: str = "telemetry",
+    ):
+        """
+        Initialize the conflator.
+
+        Args:
+            websocket_manager: WebSocketManager used to find and reach clients
+            default_interval: Seconds between flushes for clients without
+                their own setting
+            connection_type: Connection type whose clients receive telemetry
+        """
+        if default_interval <= 0:
+            raise ValueError("Flush interval must be positive")
+
+        self.websocket_manager = websocket_manager
+        self.default_interval = default_interval
+        self.connection_type = connection_type
+        self._clients: Dict[WebSocket, _ClientState] = {}
+        self._intervals: Dict[WebSocket, float] = {}
+
+        # Counters
+        self.updates = 0
+        self.conflated = 0
+        self.messages_sent = 0
+
+    def set_client_interval(self, websocket: WebSocket, interval: float) -> None:
+        """
+        Set how often a client is flushed.
+
+        Args:
+            websocket: The client connection
+            interval: Seconds between flushes
+
+        Raises:
+            ValueError: If interval is not positive
+        """
+        if interval <= 0:
+            raise ValueError("Flush interval must be positive")
+        self._intervals[websocket] = interval
+
+    def get_client_interval(self, websocket: WebSocket) -> float:
+        """Get a client's flush interval in seconds."""
+        return self._intervals.get(websocket, self.default_interval)
+
+    def remove_client(self, websocket: WebSocket) -> None:
+        """Forget a client's settings and any unsent updates."""
+        self._intervals.pop(websocket, None)
+        state = self._clients.pop(websocket, None)
+        if state is not None and state.handle is not None:
+            state.handle.cancel()
+
+    def publish(self, device_id: str, points: Iterable[Dict[str, Any]]) -> int:
+        """
+        Record telemetry points for every client watching a device.
+
+        Args:
+            device_id: The device ID
+            points: Dicts with metric, value and timestamp; later points for
+                the same metric replace earlier ones
+
+        Returns:
+            int: Number of clients the points were scheduled for
+        """
+        points = list(points)
+        if not points:
+            return 0
+
+        connections = self.websocket_manager.active_connections.get(device_id, {})
+        clients = list(connections.get(self.connection_type, ()))
+        if not clients:
+            return 0
+
+        loop = asyncio.get_running_loop()
+        for websocket in clients:
+            state = self._clients.get(websocket)
+            if state is None:
+                state = self._clients[websocket] = _ClientState()
+            for point in points:
+                key = (device_id, point["metric"])
+                if key in state.pending:
+                    self.conflated += 1
+                state.pending[key] = point
+                self.updates += 1
+            self._schedule(loop, websocket, state)
+
+        return len(clients)
+
+    def _schedule(
+        self, loop: asyncio.AbstractEventLoop, websocket: WebSocket, state: _ClientState
+    ) -> None:
+        """Schedule the client's next flush unless one is already due."""
+        if state.handle is not None:
+            return
+        delay = (
+            state.last_flush + self.get_client_interval(websocket) - time.monotonic()
+        )
+        if delay > 0:
+            state.handle = loop.call_later(delay, self._flush, websocket)
+        else:
+            state.handle = loop.call_soon(self._flush, websocket)
+
+    def _flush(self, websocket: WebSocket) -> None:
+        """Send a client's pending updates, or evict it if there are none."""
+        state = self._clients.get(websocket)
+        if state is None:
+            return
+        state.handle = None
+
+        if not state.pending:
+            # Idle for a full interval
+            del self._clients[websocket]
+            return
+
+        by_device: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for (device_id, _), point in state.pending.items():
+            by_device[device_id].append(point)
+        state.pending = {}
+
+        for device_id, metrics in by_device.items():
+            sent = self.websocket_manager.send_to_websocket(
+                websocket,
+                {"type": "telemetry_batch", "device_id": device_id, "metrics": metrics},
+            )
+            if not sent:
+                # The connection is gone; drop its state
+                logger.debug(f"Dropping telemetry for closed client of {device_id}")
+                self.remove_client(websocket)
+                return
+            self.messages_sent += 1
+
+        state.last_flush = time.monotonic()
+        # Check back after one interval: flush new updates or evict
+        state.handle = asyncio.get_running_loop().call_later(
+            self.get_client_interval(websocket), self._flush, websocket
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get conflation statistics.
+
+        Returns:
+            Dict with tracked clients, pending points and update counters
+        """
+        return {
+            "clients": len(self._clients),
+            "pending": sum(len(s.pending) for s in self._clients.values()),
+            "updates": self.updates,
+            "conflated": self.conflated,
+            "messages_sent": self.messages_sent,
+        }
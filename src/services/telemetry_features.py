@@ -0,0 +1,676 @@
+"""
+Incrementally maintained telemetry features for the advanced predictors.
+
+The feature engine consumes telemetry as it arrives, from device.telemetry
+messages on the message bus and water_heater.reading_added events on the event
+bus, and folds each sample into a fixed-size record per device: running mean
+and variance, an exponentially weighted trend, spike counts, heating-cycle
+counts and daily water usage. Predictors read the record's summary instead of
+sorting and scanning the full reading history, so prediction cost does not
+grow with history length.
+"""
+import logging
+import math
+import os
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Deque, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Half-life of the exponentially weighted trend, in days
+FEATURE_TREND_HALF_LIFE_DAYS = float(
+    os.getenv("FEATURE_TREND_HALF_LIFE_DAYS", "3.0")
+)
+
+# Completed days of usage and anomalies per measurement kept per device
+FEATURE_RECENT_DAYS = int(os.getenv("FEATURE_RECENT_DAYS", "10"))
+FEATURE_RECENT_ANOMALIES = int(os.getenv("FEATURE_RECENT_ANOMALIES", "5"))
+
+# Live samples kept per device until its stored readings have been merged in,
+# how far back they reach and how many are kept across all unseeded devices
+FEATURE_PRESEED_SAMPLES = int(os.getenv("FEATURE_PRESEED_SAMPLES", "10000"))
+FEATURE_PRESEED_MAX_AGE_HOURS = float(
+    os.getenv("FEATURE_PRESEED_MAX_AGE_HOURS", "24")
+)
+FEATURE_PRESEED_TOTAL_SAMPLES = int(
+    os.getenv("FEATURE_PRESEED_TOTAL_SAMPLES", "100000")
+)
+
+# Thresholds shared with AnomalyDetectionPredictor's list-based analysis
+TEMPERATURE_SPIKE_DELTA = 5.0
+PRESSURE_SPIKE_DELTA = 10.0
+PRESSURE_DEVIATION_PERCENT = 5.0
+
+# Longest gap between samples counted towards water usage, in minutes
+MAX_USAGE_GAP_MINUTES = 60.0
+
+LITERS_PER_GALLON = 3.78541
+
+# Telemetry field names by metric; simulators and services use different names
+METRIC_ALIASES = {
+    "temperature": ("temperature", "temperature_current", "current_temperature"),
+    "pressure": ("pressure",),
+    "energy_usage": ("energy_usage", "power_consumption_watts"),
+    "flow_rate": ("flow_rate",),
+}
+
+HEATING_STATES = {"on", "true", "heating", "active"}
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """Convert a datetime or ISO string to a naive datetime."""
+    if isinstance(value, datetime):
+        timestamp = value
+    elif isinstance(value, str):
+        try:
+            timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+def _as_float(value: Any) -> Optional[float]:
+    """Convert a telemetry value to float, or None if it is not numeric."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+class _RunningStat:
+    """
+    Running statistics for one metric.
+
+    Mean and variance use Welford's algorithm over every sample. The trend is
+    the slope of an exponentially weighted least-squares fit against time,
+    kept as weighted sums centred on the latest sample so it stays accurate
+    however long the device runs.
+    """
+
+    __slots__ = (
+        "count",
+        "mean",
+        "m2",
+        "first",
+        "last",
+        "last_time",
+        "w",
+        "wt",
+        "wtt",
+        "wx",
+        "wtx",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.last_time: Optional[datetime] = None
+        # Exponentially weighted sums over (t, x), t in days before last_time
+        self.w = 0.0
+        self.wt = 0.0
+        self.wtt = 0.0
+        self.wx = 0.0
+        self.wtx = 0.0
+
+    def add(self, value: float, timestamp: datetime) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.first is None:
+            self.first = value
+
+        if self.last_time is not None and timestamp > self.last_time:
+            # Move the origin to the new sample, then age the old samples
+            dt = (timestamp - self.last_time).total_seconds() / 86400
+            self.wtt -= 2 * dt * self.wt - dt * dt * self.w
+            self.wt -= dt * self.w
+            self.wtx -= dt * self.wx
+            decay = 0.5 ** (dt / FEATURE_TREND_HALF_LIFE_DAYS)
+            self.w *= decay
+            self.wt *= decay
+            self.wtt *= decay
+            self.wx *= decay
+            self.wtx *= decay
+
+        if self.last_time is None or timestamp > self.last_time:
+            self.last_time = timestamp
+
+        self.w += 1.0
+        self.wx += value
+        self.last = value
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def trend_per_day(self) -> float:
+        denominator = self.w * self.wtt - self.wt * self.wt
+        if denominator <= 1e-12:
+            return 0.0
+        return (self.w * self.wtx - self.wt * self.wx) / denominator
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "variance": self.variance,
+            "std": math.sqrt(self.variance),
+            "ewma": self.wx / self.w if self.w else None,
+            "trend_per_day": self.trend_per_day,
+            "first": self.first,
+            "last": self.last,
+            "last_timestamp": self.last_time,
+        }
+
+
+class DeviceTelemetryFeatures:
+    """Rolling telemetry features for one device, updated one sample at a time."""
+
+    __slots__ = (
+        "device_id",
+        "stats",
+        "updated_at",
+        "prev_temperatures",
+        "temperature_spikes",
+        "pressure_baseline_sum",
+        "pressure_baseline_count",
+        "pressure_spikes",
+        "pressure_deviations",
+        "recent_anomalies",
+        "heating",
+        "cycle_start",
+        "cycle_count",
+        "cycle_durations",
+        "recent_cycle_minutes",
+        "last_sample_time",
+        "current_day",
+        "usage_today",
+        "cycles_today",
+        "completed_days",
+        "daily_cycles_mean",
+        "recent_daily_usage",
+        "weekday_usage_sum",
+        "weekday_days",
+        "weekend_usage_sum",
+        "weekend_days",
+    )
+
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.stats: Dict[str, _RunningStat] = {}
+        self.updated_at: Optional[datetime] = None
+
+        # Last two temperature samples, for three-point spike detection
+        self.prev_temperatures: Deque = deque(maxlen=2)
+        self.temperature_spikes = 0
+
+        # Pressure baseline is the average of the first three samples
+        self.pressure_baseline_sum = 0.0
+        self.pressure_baseline_count = 0
+        self.pressure_spikes = 0
+        self.pressure_deviations = 0
+
+        self.recent_anomalies: Dict[str, Deque[Dict[str, Any]]] = {}
+
+        # Heating cycles
+        self.heating: Optional[bool] = None
+        self.cycle_start: Optional[datetime] = None
+        self.cycle_count = 0
+        self.cycle_durations = _RunningStat()
+        self.recent_cycle_minutes: Optional[float] = None
+
+        # Daily usage
+        self.last_sample_time: Optional[datetime] = None
+        self.current_day: Optional[date] = None
+        self.usage_today = 0.0
+        self.cycles_today = 0
+        self.completed_days = 0
+        self.daily_cycles_mean = 0.0
+        self.recent_daily_usage: Deque = deque(maxlen=FEATURE_RECENT_DAYS)
+        self.weekday_usage_sum = 0.0
+        self.weekday_days = 0
+        self.weekend_usage_sum = 0.0
+        self.weekend_days = 0
+
+    def add_sample(self, timestamp: datetime, values: Dict[str, Any]) -> None:
+        """
+        Fold one telemetry sample into the record.
+
+        Args:
+            timestamp: Time of the sample
+            values: Telemetry fields of the sample
+        """
+        self._roll_day(timestamp)
+
+        for metric, aliases in METRIC_ALIASES.items():
+            value = next(
+                (_as_float(values[a]) for a in aliases if a in values), None
+            )
+            if value is None:
+                continue
+            if metric == "temperature":
+                self._check_temperature_spike(value, timestamp)
+            elif metric == "pressure":
+                self._check_pressure(value, timestamp)
+            self.stats.setdefault(metric, _RunningStat()).add(value, timestamp)
+
+        self._update_heating(values, timestamp)
+        self._update_usage(values, timestamp)
+
+        self.last_sample_time = max(
+            timestamp, self.last_sample_time or timestamp
+        )
+        self.updated_at = datetime.now()
+
+    def _add_anomaly(self, measurement: str, anomaly: Dict[str, Any]) -> None:
+        anomalies = self.recent_anomalies.get(measurement)
+        if anomalies is None:
+            anomalies = self.recent_anomalies[measurement] = deque(
+                maxlen=FEATURE_RECENT_ANOMALIES
+            )
+        anomalies.append(anomaly)
+
+    def _check_temperature_spike(self, value: float, timestamp: datetime) -> None:
+        # The previous sample is a spike if it rose above both neighbours
+        if len(self.prev_temperatures) == 2:
+            (_, before), (spike_time, candidate) = self.prev_temperatures
+            if (
+                candidate > before + TEMPERATURE_SPIKE_DELTA
+                and candidate > value + TEMPERATURE_SPIKE_DELTA
+            ):
+                self.temperature_spikes += 1
+                baseline = (before + value) / 2
+                self._add_anomaly(
+                    "temperature",
+                    {
+                        "measurement_type": "temperature",
+                        "anomaly_type": "spike",
+                        "timestamp": spike_time.isoformat(),
+                        "value": candidate,
+                        "baseline": baseline,
+                        "deviation_percent": (candidate / baseline - 1) * 100
+                        if baseline
+                        else 0.0,
+                    },
+                )
+        self.prev_temperatures.append((timestamp, value))
+
+    def _check_pressure(self, value: float, timestamp: datetime) -> None:
+        previous = self.stats.get("pressure")
+        spike = False
+        if previous is not None and previous.last is not None:
+            change = abs(value - previous.last)
+            if change > PRESSURE_SPIKE_DELTA:
+                spike = True
+                self.pressure_spikes += 1
+                self._add_anomaly(
+                    "pressure",
+                    {
+                        "measurement_type": "pressure",
+                        "anomaly_type": "spike",
+                        "timestamp": timestamp.isoformat(),
+                        "value": value,
+                        "previous_value": previous.last,
+                        "change_magnitude": change,
+                    },
+                )
+
+        if self.pressure_baseline_count < 3:
+            self.pressure_baseline_sum += value
+            self.pressure_baseline_count += 1
+            return
+
+        baseline = self.pressure_baseline_sum / self.pressure_baseline_count
+        if not baseline or spike:
+            return
+        deviation_percent = abs(value / baseline - 1) * 100
+        if deviation_percent > PRESSURE_DEVIATION_PERCENT:
+            self.pressure_deviations += 1
+            self._add_anomaly(
+                "pressure",
+                {
+                    "measurement_type": "pressure",
+                    "anomaly_type": "sustained_"
+                    + ("high" if value > baseline else "low"),
+                    "timestamp": timestamp.isoformat(),
+                    "value": value,
+                    "baseline": baseline,
+                    "deviation_percent": deviation_percent,
+                },
+            )
+
+    def _update_heating(self, values: Dict[str, Any], timestamp: datetime) -> None:
+        status = values.get("heating_status", values.get("heater_status"))
+        if status is None:
+            return
+        heating = (
+            status
+            if isinstance(status, bool)
+            else str(getattr(status, "value", status)).lower() in HEATING_STATES
+        )
+
+        if heating and not self.heating:
+            self.cycle_start = timestamp
+            self.cycle_count += 1
+            self.cycles_today += 1
+        elif not heating and self.heating and self.cycle_start is not None:
+            minutes = (timestamp - self.cycle_start).total_seconds() / 60
+            if minutes >= 0:
+                self.cycle_durations.add(minutes, timestamp)
+                # Weighted towards the last few cycles
+                self.recent_cycle_minutes = (
+                    minutes
+                    if self.recent_cycle_minutes is None
+                    else 0.5 * minutes + 0.5 * self.recent_cycle_minutes
+                )
+            self.cycle_start = None
+        self.heating = heating
+
+    def _update_usage(self, values: Dict[str, Any], timestamp: datetime) -> None:
+        flow = _as_float(values.get("flow_rate"))
+        if flow is None:
+            gpm = _as_float(values.get("water_flow_gpm"))
+            flow = gpm * LITERS_PER_GALLON if gpm is not None else None
+        if flow is None or self.last_sample_time is None:
+            return
+
+        minutes = (timestamp - self.last_sample_time).total_seconds() / 60
+        if 0 < minutes <= MAX_USAGE_GAP_MINUTES:
+            self.usage_today += max(flow, 0.0) * minutes
+
+    def _roll_day(self, timestamp: datetime) -> None:
+        day = timestamp.date()
+        if self.current_day is None:
+            self.current_day = day
+            return
+        if day <= self.current_day:
+            return
+
+        # Close out the finished day
+        self.completed_days += 1
+        self.daily_cycles_mean += (
+            self.cycles_today - self.daily_cycles_mean
+        ) / self.completed_days
+        self.recent_daily_usage.append((self.current_day, self.usage_today))
+        if self.current_day.weekday() < 5:
+            self.weekday_usage_sum += self.usage_today
+            self.weekday_days += 1
+        else:
+            self.weekend_usage_sum += self.usage_today
+            self.weekend_days += 1
+
+        self.current_day = day
+        self.usage_today = 0.0
+        self.cycles_today = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get the features as plain data.
+
+        Returns:
+            Dict with per-metric statistics, spike counts, recent anomalies,
+            heating-cycle and daily-usage features
+        """
+        recent_usage = [liters for _, liters in self.recent_daily_usage]
+        all_days = self.weekday_days + self.weekend_days
+        return {
+            "device_id": self.device_id,
+            "updated_at": self.updated_at,
+            "metrics": {
+                metric: stat.summary() for metric, stat in self.stats.items()
+            },
+            "spikes": {
+                "temperature": self.temperature_spikes,
+                "pressure": self.pressure_spikes,
+                "pressure_deviation": self.pressure_deviations,
+            },
+            "recent_anomalies": {
+                measurement: list(anomalies)
+                for measurement, anomalies in self.recent_anomalies.items()
+            },
+            "heating_cycles": {
+                "count": self.cycle_count,
+                "completed": self.cycle_durations.count,
+                "average_duration_minutes": self.cycle_durations.mean
+                if self.cycle_durations.count
+                else None,
+                "recent_duration_minutes": self.recent_cycle_minutes,
+                "today": self.cycles_today,
+                "per_day": self.daily_cycles_mean if self.completed_days else None,
+            },
+            "daily_usage": {
+                "today_liters": self.usage_today,
+                "days": self.completed_days,
+                "recent_liters": [
+                    {"date": day, "value": liters}
+                    for day, liters in self.recent_daily_usage
+                ],
+                "recent_average_liters": sum(recent_usage) / len(recent_usage)
+                if recent_usage
+                else None,
+                "average_liters": (self.weekday_usage_sum + self.weekend_usage_sum)
+                / all_days
+                if all_days
+                else None,
+                "weekday_average_liters": self.weekday_usage_sum / self.weekday_days
+                if self.weekday_days
+                else None,
+                "weekend_average_liters": self.weekend_usage_sum / self.weekend_days
+                if self.weekend_days
+                else None,
+            },
+        }
+
+
+class TelemetryFeatureEngine:
+    """
+    Maintains DeviceTelemetryFeatures for every device sending telemetry.
+
+    Updates may arrive on broker threads while predictions read summaries on
+    the event loop, so records are guarded by a lock.
+
+    Devices start out unseeded: live samples update their features right
+    away and are also buffered, so that when the device's stored readings
+    are seeded the record can be rebuilt from history and live samples in
+    timestamp order. Buffered samples older than FEATURE_PRESEED_MAX_AGE_HOURS
+    are dropped, and once FEATURE_PRESEED_TOTAL_SAMPLES are buffered the
+    oldest samples of the least recently updated device go first.
+    """
+
+    def __init__(self):
+        """Initialize the feature engine."""
+        self._records: Dict[str, DeviceTelemetryFeatures] = {}
+        self._seeded: Set[str] = set()
+        self._live: Dict[str, Deque[Tuple[datetime, Dict[str, Any]]]] = {}
+        self._live_samples = 0
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def has_device(self, device_id: str) -> bool:
+        """Check whether any telemetry has been recorded for a device."""
+        return device_id in self._records
+
+    def is_seeded(self, device_id: str) -> bool:
+        """Check whether a device's stored readings have been merged in."""
+        return device_id in self._seeded
+
+    def update(
+        self, device_id: str, values: Dict[str, Any], timestamp: Any = None
+    ) -> None:
+        """
+        Fold one telemetry sample into a device's features.
+
+        Args:
+            device_id: ID of the device
+            values: Telemetry fields of the sample
+            timestamp: Time of the sample (datetime or ISO string), defaults
+                to now
+        """
+        timestamp = _parse_timestamp(timestamp) or datetime.now()
+        with self._lock:
+            record = self._records.get(device_id)
+            if record is None:
+                record = self._records[device_id] = DeviceTelemetryFeatures(
+                    device_id
+                )
+            record.add_sample(timestamp, values)
+            self.samples += 1
+            if device_id not in self._seeded:
+                self._buffer_live(device_id, timestamp, values)
+
+    def _buffer_live(
+        self, device_id: str, timestamp: datetime, values: Dict[str, Any]
+    ) -> None:
+        """Buffer a sample of an unseeded device; called with the lock held."""
+        # Re-insert so the dict stays ordered by last update
+        live = self._live.pop(device_id, None)
+        if live is None:
+            live = deque(maxlen=FEATURE_PRESEED_SAMPLES)
+        self._live[device_id] = live
+        if len(live) == live.maxlen:
+            self._live_samples -= 1
+        live.append((timestamp, values))
+        self._live_samples += 1
+
+        cutoff = timestamp - timedelta(hours=FEATURE_PRESEED_MAX_AGE_HOURS)
+        while live and live[0][0] < cutoff:
+            live.popleft()
+            self._live_samples -= 1
+
+        while self._live_samples > FEATURE_PRESEED_TOTAL_SAMPLES:
+            stale_id = next(iter(self._live))
+            stale = self._live[stale_id]
+            stale.popleft()
+            self._live_samples -= 1
+            if not stale:
+                del self._live[stale_id]
+
+    def seed(self, device_id: str, readings: Iterable[Any]) -> int:
+        """
+        Merge a device's stored readings into its features.
+
+        Runs once per device. Live samples received before seeding are
+        replayed together with the stored readings in timestamp order; a
+        live sample and a stored reading with the same timestamp are combined
+        into one sample.
+
+        Args:
+            device_id: ID of the device
+            readings: Reading objects or dicts with a timestamp and metrics
+
+        Returns:
+            Number of stored readings folded in
+        """
+        stored: Dict[datetime, Dict[str, Any]] = {}
+        for reading in readings:
+            values = reading if isinstance(reading, dict) else vars(reading)
+            timestamp = _parse_timestamp(values.get("timestamp"))
+            if timestamp is not None:
+                stored[timestamp] = values
+
+        with self._lock:
+            if device_id in self._seeded:
+                return 0
+            self._seeded.add(device_id)
+
+            merged = dict(stored)
+            live = self._live.pop(device_id, ())
+            self._live_samples -= len(live)
+            for timestamp, values in live:
+                if timestamp in merged:
+                    values = {**merged[timestamp], **values}
+                merged[timestamp] = values
+
+            if not merged:
+                return 0
+            record = DeviceTelemetryFeatures(device_id)
+            for timestamp in sorted(merged):
+                record.add_sample(timestamp, merged[timestamp])
+            self._records[device_id] = record
+            self.samples += len(stored)
+        return len(stored)
+
+    def get_summary(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a device's features.
+
+        Args:
+            device_id: ID of the device
+
+        Returns:
+            The device's feature summary, or None if nothing was recorded
+        """
+        with self._lock:
+            record = self._records.get(device_id)
+            return record.summary() if record is not None else None
+
+    def remove_device(self, device_id: str) -> bool:
+        """Forget a device's features."""
+        with self._lock:
+            self._seeded.discard(device_id)
+            self._live_samples -= len(self._live.pop(device_id, ()))
+            return self._records.pop(device_id, None) is not None
+
+    def subscribe(self, event_bus: Any = None, message_bus: Any = None) -> None:
+        """
+        Start consuming telemetry.
+
+        Args:
+            event_bus: EventBus publishing water_heater.reading_added events
+            message_bus: Message bus publishing device.telemetry messages
+        """
+        if event_bus is not None:
+            event_bus.subscribe("water_heater.reading_added", self._on_reading_added)
+        if message_bus is not None:
+            message_bus.subscribe("device.telemetry", self._on_device_telemetry)
+
+    async def _on_reading_added(self, data: Dict[str, Any]) -> None:
+        """Handle a water_heater.reading_added event."""
+        if isinstance(data, dict) and data.get("device_id") and data.get("reading"):
+            self.update(data["device_id"], data["reading"], data.get("timestamp"))
+
+    def _on_device_telemetry(self, topic: str, event: Dict[str, Any]) -> None:
+        """Handle a device.telemetry message."""
+        try:
+            device_id = event.get("device_id")
+            if device_id:
+                self.update(device_id, event.get("data") or {}, event.get("timestamp"))
+        except Exception as e:
+            logger.error(f"Error updating telemetry features: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get engine statistics.
+
+        Returns:
+            Dict with the number of devices tracked, samples processed and
+            live samples buffered for unseeded devices
+        """
+        return {
+            "devices": len(self._records),
+            "samples": self.samples,
+            "buffered": self._live_samples,
+        }
+
+
+# Shared engine fed by the application's event and message buses
+telemetry_feature_engine = TelemetryFeatureEngine()
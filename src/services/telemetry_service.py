@@ -6,8 +6,9 @@ as well as real-time telemetry updates through WebSockets.
 """
 import asyncio
 import logging
+import os
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 from src.models.telemetry import (
     AggregationType,
@@ -17,11 +18,16 @@ from src.models.telemetry import (
     TelemetryQuery,
 )
 from src.services.database_service import get_db_service
+from src.services.telemetry_conflation import TelemetryConflator
 from src.services.websocket_manager import WebSocketManager, get_websocket_manager
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
+# Where aggregated telemetry is read from: "sqlite" (the local telemetry
+# store) or "timescale" (the hypertables and time_bucket() in TimescaleDB)
+TELEMETRY_READ_BACKEND = os.environ.get("TELEMETRY_READ_BACKEND", "sqlite").lower()
+
 # Global service instance for singleton pattern
 _telemetry_service = None
 
@@ -34,6 +40,41 @@ def get_telemetry_service():
     return _telemetry_service
 
 
+async def shutdown_telemetry_service() -> None:
+    """Close the TimescaleDB pool of the Telemetry service, if one was opened."""
+    if _telemetry_service is not None:
+        await _telemetry_service.close()
+
+
+def _create_timescale_repository():
+    """
+    Create the TimescaleDB repository when it is the configured read backend.
+
+    Returns:
+        TimescaleTelemetryRepository, or None when reads stay on SQLite or
+        asyncpg is not installed
+    """
+    if TELEMETRY_READ_BACKEND != "timescale":
+        return None
+
+    try:
+        from src.db.config import db_settings
+        from src.repositories.timescale_telemetry_repository import (
+            TimescaleTelemetryRepository,
+        )
+    except ImportError as e:
+        logger.warning(f"TimescaleDB telemetry reads unavailable: {e}")
+        return None
+
+    return TimescaleTelemetryRepository(
+        host=db_settings.DB_HOST,
+        port=db_settings.DB_PORT,
+        database=db_settings.DB_NAME,
+        user=db_settings.DB_USER,
+        password=db_settings.DB_PASSWORD,
+    )
+
+
 class TelemetryService:
     """
     Service for managing device telemetry data
@@ -46,16 +87,27 @@ class TelemetryService:
     5. Aggregating telemetry data for analysis
     """
 
-    def __init__(self):
-        """Initialize the Telemetry Service"""
+    def __init__(self, timescale_repository=None):
+        """
+        Initialize the Telemetry Service
+
+        Args:
+            timescale_repository: Repository for aggregated reads; created from
+                TELEMETRY_READ_BACKEND when omitted
+        """
         self.db_service = get_db_service()
         self.websocket_manager = get_websocket_manager()
+        self.timescale_repository = (
+            timescale_repository
+            if timescale_repository is not None
+            else _create_timescale_repository()
+        )
 
         # Cache for recent telemetry values
         self._telemetry_cache = {}
 
-        # Rate limiting for device updates
-        self._last_update_time = {}
+        # Latest-value-wins, per-client rate limiting for live updates
+        self.conflator = TelemetryConflator(self.websocket_manager)
 
         logger.info("Telemetry Service initialized")
 
@@ -111,19 +163,46 @@ class TelemetryService:
         """
         Process a batch of telemetry data
 
+        Points are stored in a single transaction, the cache is updated once
+        per metric and clients receive one combined message per batch.
+
         Args:
             batch: A batch of telemetry data points
 
         Returns:
             List of processed telemetry data points
         """
-        processed = []
-
-        for metric in batch.metrics:
-            metric_data = metric.dict()
-            metric_data["device_id"] = batch.device_id
-            result = await self.process_telemetry_data(metric_data)
-            processed.append(result)
+        if not batch.metrics:
+            return []
+
+        # The batch model already validated every point; only the owning
+        # device needs to be stamped on, which doesn't require re-validation
+        points = [
+            metric.copy(update={"device_id": batch.device_id})
+            for metric in batch.metrics
+        ]
+        processed = [point.dict() for point in points]
+
+        # One transaction for the whole batch
+        stored = await self.db_service.store_telemetry_batch(processed)
+        if stored != len(processed):
+            logger.warning(
+                f"Stored {stored} of {len(processed)} telemetry points "
+                f"for device {batch.device_id}"
+            )
+
+        # Coalesce to the newest point per metric before touching the cache
+        latest: Dict[str, TelemetryData] = {}
+        for point in points:
+            current = latest.get(point.metric)
+            if current is None or point.timestamp >= current.timestamp:
+                latest[point.metric] = point
+
+        device_cache = self._telemetry_cache.setdefault(batch.device_id, {})
+        for metric, point in latest.items():
+            device_cache[metric] = {"value": point.value, "timestamp": point.timestamp}
+
+        await self.broadcast_telemetry_batch(batch.device_id, list(latest.values()))
 
         return processed
 
@@ -225,6 +304,20 @@ class TelemetryService:
         Returns:
             List of aggregated data points
         """
+        if self.timescale_repository is not None:
+            try:
+                return await self.timescale_repository.get_aggregated_telemetry(
+                    device_id=device_id,
+                    metric=metric,
+                    aggregation=aggregation,
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+            except Exception as e:
+                logger.warning(
+                    f"TimescaleDB aggregation failed, falling back to SQLite: {e}"
+                )
+
         return await self.db_service.get_aggregated_telemetry(
             device_id=device_id,
             metric=metric,
@@ -233,48 +326,87 @@ class TelemetryService:
             end_time=end_time,
         )
 
-    async def should_throttle_update(
-        self, device_id: str, metric: str, min_interval: float = 0.5
-    ) -> bool:
+    async def iter_operational_summaries(
+        self, device_ids: Optional[List[str]] = None, include_maintenance: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
         """
-        Check if updates for this device/metric should be throttled
+        Stream 24-hour operational summaries for water heaters
+
+        The summaries are computed from the TimescaleDB continuous aggregates,
+        so they need TELEMETRY_READ_BACKEND=timescale.
 
         Args:
-            device_id: The device ID
-            metric: The metric name
-            min_interval: Minimum interval between updates in seconds
+            device_ids: Devices to summarize; all water heaters when omitted
+            include_maintenance: Whether to include the latest health assessment
 
-        Returns:
-            True if updates should be throttled, False otherwise
+        Yields:
+            Operational summaries ordered by device ID
+
+        Raises:
+            RuntimeError: If TimescaleDB is not the telemetry read backend
         """
-        now = datetime.utcnow()
-        key = f"{device_id}:{metric}"
+        if self.timescale_repository is None:
+            raise RuntimeError("Operational summaries require TimescaleDB")
 
-        if key in self._last_update_time:
-            last_time = self._last_update_time[key]
-            if (now - last_time).total_seconds() < min_interval:
-                return True
+        async for summary in self.timescale_repository.iter_operational_summaries(
+            device_ids=device_ids, include_maintenance=include_maintenance
+        ):
+            yield summary
 
-        self._last_update_time[key] = now
-        return False
+    async def close(self) -> None:
+        """Close the TimescaleDB connection pool."""
+        if self.timescale_repository is not None:
+            await self.timescale_repository.close()
 
     async def broadcast_telemetry(self, telemetry_data: Dict[str, Any]) -> None:
         """
         Broadcast telemetry data to WebSocket clients
 
+        Updates are conflated per client: a client flushed less often than the
+        device reports receives the latest value instead of every value.
+
         Args:
             telemetry_data: The telemetry data to broadcast
         """
-        device_id = telemetry_data["device_id"]
-        metric = telemetry_data["metric"]
+        timestamp = telemetry_data.get("timestamp")
+        self.conflator.publish(
+            telemetry_data["device_id"],
+            [
+                {
+                    "metric": telemetry_data["metric"],
+                    "value": telemetry_data["value"],
+                    "timestamp": (
+                        timestamp.isoformat()
+                        if isinstance(timestamp, datetime)
+                        else timestamp
+                    ),
+                }
+            ],
+        )
 
-        # Check for throttling to prevent flooding WebSocket clients
-        if await self.should_throttle_update(device_id, metric):
-            return
+    async def broadcast_telemetry_batch(
+        self, device_id: str, points: List[TelemetryData]
+    ) -> None:
+        """
+        Broadcast several telemetry points to WebSocket clients
 
-        # Broadcast to clients subscribed to this device's telemetry
-        await self.websocket_manager.broadcast_to_device(
-            device_id=device_id, message=telemetry_data, connection_type="telemetry"
+        Points are conflated with any updates still pending for each client,
+        which receives them as one telemetry_batch message on its next flush.
+
+        Args:
+            device_id: The device ID
+            points: Telemetry points, at most one per metric
+        """
+        self.conflator.publish(
+            device_id,
+            [
+                {
+                    "metric": point.metric,
+                    "value": point.value,
+                    "timestamp": point.timestamp.isoformat(),
+                }
+                for point in points
+            ],
         )
 
     async def clear_stale_cache(self, max_age_hours: int = 24) -> None:
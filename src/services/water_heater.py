@@ -11,6 +11,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 # Use absolute imports to work both from project root or from src/
+from src.infrastructure.events.event_bus import global_event_bus
 from src.models.device import DeviceStatus
 from src.models.water_heater import (
     WaterHeater,
@@ -270,7 +271,18 @@ class WaterHeaterService:
                 logger.error(f"Error adding reading to database: {e}")
 
             # Update water heater in repository
-            return await self.repository.update_water_heater(device_id, updates)
+            updated = await self.repository.update_water_heater(device_id, updates)
+            await self._publish_reading_added(
+                device_id,
+                now,
+                {
+                    "temperature": temperature,
+                    "pressure": pressure,
+                    "energy_usage": energy_usage,
+                    "flow_rate": flow_rate,
+                },
+            )
+            return updated
         except Exception as e:
             logger.error(f"Error adding temperature reading: {e}")
             # Fallback to dummy data
@@ -312,4 +324,31 @@ class WaterHeaterService:
             ):
                 updates["heater_status"] = WaterHeaterStatus.STANDBY
 
-            return dummy_data.update_water_heater(device_id, updates)
+            updated = dummy_data.update_water_heater(device_id, updates)
+            await self._publish_reading_added(
+                device_id,
+                now,
+                {
+                    "temperature": temperature,
+                    "pressure": pressure,
+                    "energy_usage": energy_usage,
+                    "flow_rate": flow_rate,
+                },
+            )
+            return updated
+
+    async def _publish_reading_added(
+        self,
+        device_id: str,
+        timestamp: datetime,
+        reading: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Announce a new reading so readers of derived data can refresh."""
+        await global_event_bus.publish(
+            "water_heater.reading_added",
+            {
+                "device_id": device_id,
+                "timestamp": timestamp.isoformat(),
+                "reading": reading,
+            },
+        )
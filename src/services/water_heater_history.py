@@ -37,6 +37,14 @@ class WaterHeaterHistoryService:
             try:
                 # Get the shadow and shadow history
                 shadow = await shadow_service.get_device_shadow(heater_id)
+
+                # Prefer pre-aggregated buckets when the storage maintains them
+                rollup = await shadow_service.get_shadow_history_rollups(
+                    heater_id, days
+                )
+                if rollup and rollup["buckets"]:
+                    return self._build_rollup_temperature_chart(shadow, rollup)
+
                 shadow_history = await shadow_service.get_shadow_history(
                     heater_id, limit=100
                 )
@@ -86,53 +94,11 @@ class WaterHeaterHistoryService:
                 ]
                 temperature_data = [entry["temperature"] for entry in filtered_history]
 
-                # Add target temperature as a separate line
-                # Get target temperature from current shadow if available
-                target_temperature = 120  # Default
-                if (
-                    shadow
-                    and "desired" in shadow
-                    and "target_temperature" in shadow["desired"]
-                ):
-                    target_temperature = shadow["desired"]["target_temperature"]
-                elif (
-                    shadow
-                    and "reported" in shadow
-                    and "target_temperature" in shadow["reported"]
-                ):
-                    target_temperature = shadow["reported"]["target_temperature"]
-
-                target_temperature_data = [target_temperature] * len(labels)
-
-                # Prepare datasets
-                datasets = [
-                    {
-                        "label": "Temperature (°C)",
-                        "data": temperature_data,
-                        "borderColor": "#FF6384",
-                        "backgroundColor": "rgba(255, 99, 132, 0.2)",
-                        "borderWidth": 2,
-                        "fill": False,
-                        "tension": 0.4,
-                    },
-                    {
-                        "label": "Target Temperature (°C)",
-                        "data": target_temperature_data,
-                        "borderColor": "#36A2EB",
-                        "backgroundColor": "rgba(54, 162, 235, 0.2)",
-                        "borderWidth": 2,
-                        "borderDash": [5, 5],
-                        "fill": False,
-                        "tension": 0,
-                    },
-                ]
-
                 # Format data for chart with source information
-                chart_data = {
-                    "labels": labels,
-                    "datasets": datasets,
-                    "source": "device_shadow",
-                }
+                chart_data = self._build_temperature_chart(
+                    labels, temperature_data, self._get_target_temperature(shadow)
+                )
+                chart_data["source"] = "device_shadow"
 
                 return chart_data
 
@@ -154,6 +120,90 @@ class WaterHeaterHistoryService:
                 return self._generate_mock_temperature_history(heater_id, days)
             return None
 
+    def _get_target_temperature(self, shadow: Optional[Dict[str, Any]]) -> float:
+        """Get the target temperature from a shadow, preferring the desired state."""
+        target_temperature = 120  # Default
+        if shadow and "desired" in shadow and "target_temperature" in shadow["desired"]:
+            target_temperature = shadow["desired"]["target_temperature"]
+        elif (
+            shadow
+            and "reported" in shadow
+            and "target_temperature" in shadow["reported"]
+        ):
+            target_temperature = shadow["reported"]["target_temperature"]
+        return target_temperature
+
+    def _build_temperature_chart(
+        self,
+        labels: List[str],
+        temperature_data: List[float],
+        target_temperature: float,
+    ) -> Dict[str, Any]:
+        """
+        Build temperature chart data with a constant target temperature line
+
+        Args:
+            labels: Chart labels, one per data point
+            temperature_data: Temperature value per label
+            target_temperature: Target temperature to draw as a reference line
+
+        Returns:
+            Chart data with temperature and target temperature datasets
+        """
+        target_temperature_data = [target_temperature] * len(labels)
+
+        # Prepare datasets
+        datasets = [
+            {
+                "label": "Temperature (°C)",
+                "data": temperature_data,
+                "borderColor": "#FF6384",
+                "backgroundColor": "rgba(255, 99, 132, 0.2)",
+                "borderWidth": 2,
+                "fill": False,
+                "tension": 0.4,
+            },
+            {
+                "label": "Target Temperature (°C)",
+                "data": target_temperature_data,
+                "borderColor": "#36A2EB",
+                "backgroundColor": "rgba(54, 162, 235, 0.2)",
+                "borderWidth": 2,
+                "borderDash": [5, 5],
+                "fill": False,
+                "tension": 0,
+            },
+        ]
+
+        return {"labels": labels, "datasets": datasets}
+
+    def _build_rollup_temperature_chart(
+        self, shadow: Optional[Dict[str, Any]], rollup: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Build temperature chart data from pre-aggregated history buckets
+
+        Args:
+            shadow: Current shadow document, used for the target temperature
+            rollup: Resolution and buckets from the shadow service
+
+        Returns:
+            Chart data plotting the average temperature per bucket
+        """
+        labels = []
+        temperature_data = []
+        for bucket in rollup["buckets"]:
+            bucket_time = datetime.fromisoformat(bucket["timestamp"].rstrip("Z"))
+            labels.append(bucket_time.strftime("%m/%d %H:%M"))
+            temperature_data.append(round(bucket["avg"], 1))
+
+        chart_data = self._build_temperature_chart(
+            labels, temperature_data, self._get_target_temperature(shadow)
+        )
+        chart_data["source"] = "device_shadow_rollup"
+        chart_data["resolution"] = rollup["resolution"]
+        return chart_data
+
     def _generate_mock_temperature_history(
         self, heater_id: str, days: int
     ) -> Dict[str, Any]:
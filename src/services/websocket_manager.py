@@ -5,12 +5,15 @@ This service manages WebSocket connections for real-time communication between
 the server and clients, handling connection lifecycle and message broadcasting.
 """
 import asyncio
-import json
 import logging
-from typing import Any, Awaitable, Callable, Dict, List, Set
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set
 
 from fastapi import WebSocket
 
+from src.services.websocket_outbound import POLICY_DROP_OLDEST, OutboundConnection
+from src.utils import json_codec
+
 logger = logging.getLogger(__name__)
 
 # Singleton instance of the WebSocketManager
@@ -25,18 +28,120 @@ class WebSocketManager:
     1. Tracking active connections by device ID and connection type
     2. Broadcasting messages to all clients or to specific device subscribers
     3. Connection lifecycle management (connect/disconnect)
+
+    Broadcasts encode each payload once and hand it to a per-connection
+    outbound queue, so slow clients only delay themselves and sockets that
+    fail to send are pruned right away.
     """
 
-    def __init__(self):
-        """Initialize the WebSocket manager."""
+    def __init__(
+        self,
+        max_queue_size: int = int(os.environ.get("WEBSOCKET_MAX_QUEUE_SIZE", "256")),
+        slow_consumer_policy: str = os.environ.get(
+            "WEBSOCKET_SLOW_CONSUMER_POLICY", POLICY_DROP_OLDEST
+        ),
+    ):
+        """
+        Initialize the WebSocket manager.
+
+        Args:
+            max_queue_size: Outbound messages buffered per connection
+            slow_consumer_policy: drop_oldest or disconnect when a queue is full
+        """
         # Active connections by device_id: {device_id: {connection_type: set(websockets)}}
         self.active_connections: Dict[str, Dict[str, Set[WebSocket]]] = {}
         # Active connections by client ID for individual targeting
         self.client_connections: Dict[str, WebSocket] = {}
         # Global subscriptions for broadcast topics
         self.global_subscriptions: Dict[str, Set[WebSocket]] = {}
+        # Outbound queue and writer task per connection
+        self.outbound: Dict[WebSocket, OutboundConnection] = {}
+        self.max_queue_size = max_queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        # Connections pruned after a failed send or as slow consumers
+        self.pruned_connections = 0
         logger.info("WebSocket Manager initialized")
 
+    def _get_outbound(self, websocket: WebSocket) -> OutboundConnection:
+        """Get or create the outbound queue for a connection."""
+        outbound = self.outbound.get(websocket)
+        if outbound is None:
+            outbound = OutboundConnection(
+                websocket,
+                on_close=self._prune,
+                max_queue_size=self.max_queue_size,
+                policy=self.slow_consumer_policy,
+            )
+            self.outbound[websocket] = outbound
+        return outbound
+
+    def _fan_out(self, websockets: Iterable[WebSocket], message: Any) -> int:
+        """
+        Encode a message once and queue it for each connection.
+
+        Returns:
+            int: Number of connections the message was queued for
+        """
+        # Convert message to JSON string if it's not already a string
+        if not isinstance(message, str):
+            message = json_codec.dumps(message)
+
+        # Snapshot first: pruning a failed connection mutates the sets
+        return sum(
+            self._get_outbound(websocket).enqueue(message)
+            for websocket in list(websockets)
+        )
+
+    def _is_registered(self, websocket: WebSocket) -> bool:
+        """
+        Whether a connection is still referenced by any subscription.
+
+        Scans every registry, so it is only used when a connection is
+        released, not on the send path.
+        """
+        if websocket in self.client_connections.values():
+            return True
+        if any(websocket in sockets for sockets in self.global_subscriptions.values()):
+            return True
+        return any(
+            websocket in sockets
+            for by_type in self.active_connections.values()
+            for sockets in by_type.values()
+        )
+
+    def _release_outbound(self, websocket: WebSocket) -> None:
+        """Stop a connection's writer once nothing references it."""
+        if websocket in self.outbound and not self._is_registered(websocket):
+            self.outbound.pop(websocket).close()
+
+    def _prune(self, websocket: WebSocket) -> None:
+        """Remove a dead or too-slow connection from every registry."""
+        outbound = self.outbound.pop(websocket, None)
+        if outbound is not None:
+            outbound.close()
+
+        for client_id in [
+            cid for cid, ws in self.client_connections.items() if ws is websocket
+        ]:
+            del self.client_connections[client_id]
+
+        for device_id in list(self.active_connections):
+            by_type = self.active_connections[device_id]
+            for conn_type in list(by_type):
+                by_type[conn_type].discard(websocket)
+                if not by_type[conn_type]:
+                    del by_type[conn_type]
+            if not by_type:
+                del self.active_connections[device_id]
+
+        for topic in list(self.global_subscriptions):
+            self.global_subscriptions[topic].discard(websocket)
+            if not self.global_subscriptions[topic]:
+                del self.global_subscriptions[topic]
+
+        self.pruned_connections += 1
+        logger.info("Pruned WebSocket connection")
+
     async def connect(
         self,
         websocket: WebSocket,
@@ -65,6 +170,7 @@ class WebSocketManager:
 
         # Add connection to the appropriate set
         self.active_connections[device_id][connection_type].add(websocket)
+        self._get_outbound(websocket)
 
         # Register client ID if provided
         if client_id:
@@ -131,6 +237,8 @@ class WebSocketManager:
                 if not self.global_subscriptions[topic]:
                     del self.global_subscriptions[topic]
 
+        self._release_outbound(websocket)
+
         logger.info(f"Client disconnected from {device_id}")
 
     async def broadcast_to_device(
@@ -150,36 +258,19 @@ class WebSocketManager:
         if device_id not in self.active_connections:
             return 0
 
-        # Convert message to JSON string if it's not already a string
-        if not isinstance(message, str):
-            message = json.dumps(message)
-
-        send_count = 0
-
         # If connection_type is specified, only broadcast to that type
         if connection_type:
-            if connection_type in self.active_connections[device_id]:
-                websockets = self.active_connections[device_id][connection_type]
-                for websocket in websockets:
-                    try:
-                        await websocket.send_text(message)
-                        send_count += 1
-                    except Exception as e:
-                        logger.error(f"Failed to send message to client: {e}")
-                        # Will be cleaned up on next receive attempt
+            websockets = self.active_connections[device_id].get(connection_type, ())
 
         # Otherwise, broadcast to all connection types
         else:
-            for conn_type, websockets in self.active_connections[device_id].items():
-                for websocket in websockets:
-                    try:
-                        await websocket.send_text(message)
-                        send_count += 1
-                    except Exception as e:
-                        logger.error(f"Failed to send message to client: {e}")
-                        # Will be cleaned up on next receive attempt
+            websockets = {
+                websocket
+                for sockets in self.active_connections[device_id].values()
+                for websocket in sockets
+            }
 
-        return send_count
+        return self._fan_out(websockets, message)
 
     async def broadcast_to_topic(self, topic: str, message: Any):
         """
@@ -195,21 +286,7 @@ class WebSocketManager:
         if topic not in self.global_subscriptions:
             return 0
 
-        # Convert message to JSON string if it's not already a string
-        if not isinstance(message, str):
-            message = json.dumps(message)
-
-        send_count = 0
-        websockets = self.global_subscriptions[topic]
-        for websocket in websockets:
-            try:
-                await websocket.send_text(message)
-                send_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send message to client: {e}")
-                # Will be cleaned up on next receive attempt
-
-        return send_count
+        return self._fan_out(self.global_subscriptions[topic], message)
 
     async def subscribe_to_topic(self, websocket: WebSocket, topic: str):
         """
@@ -226,6 +303,7 @@ class WebSocketManager:
             self.global_subscriptions[topic] = set()
 
         self.global_subscriptions[topic].add(websocket)
+        self._get_outbound(websocket)
         logger.info(f"Client subscribed to topic: {topic}")
 
     async def unsubscribe_from_topic(self, websocket: WebSocket, topic: str):
@@ -246,6 +324,7 @@ class WebSocketManager:
             if not self.global_subscriptions[topic]:
                 del self.global_subscriptions[topic]
 
+            self._release_outbound(websocket)
             logger.info(f"Client unsubscribed from topic: {topic}")
 
     async def send_to_client(self, client_id: str, message: Any):
@@ -262,17 +341,50 @@ class WebSocketManager:
         if client_id not in self.client_connections:
             return False
 
-        # Convert message to JSON string if it's not already a string
-        if not isinstance(message, str):
-            message = json.dumps(message)
+        return self._fan_out([self.client_connections[client_id]], message) == 1
 
-        try:
-            await self.client_connections[client_id].send_text(message)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send message to client {client_id}: {e}")
+    def send_to_websocket(self, websocket: WebSocket, message: Any) -> bool:
+        """
+        Queue a message for one connection without waiting for the send.
+
+        Args:
+            websocket: The WebSocket connection
+            message: The message to send (will be JSON serialized)
+
+        Returns:
+            bool: True if the message was queued
+        """
+        # Outbound queues exist exactly while a connection is registered:
+        # they are created on connect/subscribe and released or pruned once
+        # nothing references the connection, so this check is O(1)
+        if websocket not in self.outbound:
             return False
 
+        return self._fan_out([websocket], message) == 1
+
+    def close(self) -> None:
+        """Stop every outbound writer; queued messages are discarded."""
+        for outbound in self.outbound.values():
+            outbound.close()
+        self.outbound.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get broadcast metrics.
+
+        Returns:
+            Dict with connection count, queue depths and drop counts
+        """
+        connections = [outbound.get_stats() for outbound in self.outbound.values()]
+        return {
+            "connections": len(connections),
+            "max_queue_depth": max((c["queue_depth"] for c in connections), default=0),
+            "total_queued": sum(c["queue_depth"] for c in connections),
+            "total_dropped": sum(c["dropped"] for c in connections),
+            "pruned_connections": self.pruned_connections,
+            "per_connection": connections,
+        }
+
 
 def get_websocket_manager() -> WebSocketManager:
     """
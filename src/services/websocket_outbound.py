@@ -0,0 +1,144 @@
+"""
+Per-connection outbound queues for WebSocket broadcasting.
+
+Each connection gets a bounded queue drained by its own writer task, so a
+broadcast only enqueues an already-encoded payload and a slow or stalled
+client never delays delivery to the others.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# What to do when a connection's queue is full
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (POLICY_DROP_OLDEST, POLICY_DISCONNECT)
+
+
+class OutboundConnection:
+    """
+    Bounded send queue and writer task for one WebSocket.
+
+    With the drop_oldest policy a full queue discards its oldest message to
+    make room; with the disconnect policy the connection is dropped instead.
+    Send failures and disconnects are reported through on_close.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_close: Callable[[WebSocket], None],
+        max_queue_size: int = 256,
+        policy: str = POLICY_DROP_OLDEST,
+    ):
+        """
+        Initialize the outbound connection and start its writer.
+
+        Args:
+            websocket: The WebSocket to write to
+            on_close: Called once with the websocket when it must be pruned
+            max_queue_size: Messages buffered before the slow consumer policy applies
+            policy: Slow consumer policy, drop_oldest or disconnect
+        """
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"Unknown slow consumer policy '{policy}', expected one of "
+                f"{', '.join(SLOW_CONSUMER_POLICIES)}"
+            )
+
+        self.websocket = websocket
+        self.policy = policy
+        self._on_close = on_close
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._closed = False
+
+        # Counters
+        self.sent = 0
+        self.dropped = 0
+
+        self._task = asyncio.create_task(self._writer())
+
+    @property
+    def depth(self) -> int:
+        """Number of messages waiting to be written."""
+        return self._queue.qsize()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the connection has stopped accepting messages."""
+        return self._closed
+
+    def enqueue(self, message: str) -> bool:
+        """
+        Queue an encoded message without waiting.
+
+        Args:
+            message: Encoded payload
+
+        Returns:
+            bool: True if the message was queued
+        """
+        if self._closed:
+            return False
+
+        if self._queue.full():
+            if self.policy == POLICY_DISCONNECT:
+                self.dropped += 1
+                logger.warning("Disconnecting slow WebSocket consumer")
+                self._fail()
+                # 1013: try again later
+                asyncio.create_task(self._close_socket(code=1013))
+                return False
+
+            self._queue.get_nowait()
+            self.dropped += 1
+
+        self._queue.put_nowait(message)
+        return True
+
+    async def _writer(self) -> None:
+        """Write queued messages in order until closed or a send fails."""
+        while True:
+            message = await self._queue.get()
+            try:
+                await self.websocket.send_text(message)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"Pruning WebSocket after failed send: {e}")
+                self._fail()
+                return
+
+    async def _close_socket(self, code: int) -> None:
+        """Close the underlying socket, ignoring already-closed sockets."""
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def _fail(self) -> None:
+        """Stop the connection and ask the owner to prune it."""
+        if self._closed:
+            return
+        self.close()
+        self._on_close(self.websocket)
+
+    def close(self) -> None:
+        """Stop the writer; queued messages are discarded."""
+        self._closed = True
+        if self._task is not asyncio.current_task() and not self._task.done():
+            self._task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get connection statistics.
+
+        Returns:
+            Dict with queue depth, sent and dropped counts
+        """
+        return {"queue_depth": self.depth, "sent": self.sent, "dropped": self.dropped}
@@ -0,0 +1,81 @@
+"""
+Tests for the fleet operational summary endpoint
+"""
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes.manufacturer_water_heaters import router
+from src.services.telemetry_service import TelemetryService, get_telemetry_service
+
+API_PATH = "/api/manufacturer/water-heaters/fleet/operational-summary"
+
+
+class FakeRepository:
+    """Repository stand-in recording the summary requests it serves."""
+
+    def __init__(self, summaries):
+        self.summaries = summaries
+        self.calls = []
+
+    async def iter_operational_summaries(self, device_ids, include_maintenance):
+        self.calls.append((device_ids, include_maintenance))
+        for summary in self.summaries:
+            yield summary
+
+
+def make_client(repository):
+    """Create a client whose telemetry service reads from `repository`."""
+    service = TelemetryService.__new__(TelemetryService)
+    service.timescale_repository = repository
+    service.db_service = MagicMock()
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_telemetry_service] = lambda: service
+    return TestClient(app)
+
+
+@pytest.mark.unit
+class TestFleetOperationalSummaryAPI:
+    """Test cases for GET /fleet/operational-summary"""
+
+    def test_streams_summaries_for_listed_devices(self):
+        """Test that the listed devices are summarized in one repository call."""
+        summaries = [
+            {"device_id": "wh-001", "operational": {"heating_cycles_24h": 3}},
+            {"device_id": "wh-002", "operational": {"heating_cycles_24h": 5}},
+        ]
+        repository = FakeRepository(summaries)
+        client = make_client(repository)
+
+        response = client.get(
+            API_PATH,
+            params={
+                "device_ids": ["wh-001", "wh-002"],
+                "include_maintenance": "false",
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.json() == summaries
+        assert repository.calls == [(["wh-001", "wh-002"], False)]
+
+    def test_all_devices_when_none_listed(self):
+        """Test that omitting device_ids summarizes the whole fleet."""
+        repository = FakeRepository([])
+        client = make_client(repository)
+
+        response = client.get(API_PATH)
+
+        assert response.status_code == 200
+        assert repository.calls == [(None, True)]
+
+    def test_unavailable_without_timescale(self):
+        """Test that the endpoint reports 503 when TimescaleDB is not configured."""
+        client = make_client(None)
+
+        response = client.get(API_PATH)
+
+        assert response.status_code == 503
@@ -317,9 +317,13 @@ def test_get_multi_factor_prediction(mock_get_prediction, mock_multi_factor_pred
     assert "overall_evaluation" in data["raw_details"]
 
 
+@patch("src.api.predictions.PredictionService.load_device_data")
+@patch("src.api.predictions.PredictionService.get_cached_prediction", return_value=None)
 @patch("src.api.predictions.PredictionService.get_prediction")
 def test_get_all_predictions(
     mock_get_prediction,
+    mock_get_cached_prediction,
+    mock_load_device_data,
     mock_lifespan_prediction,
     mock_anomaly_detection_prediction,
     mock_usage_pattern_prediction,
@@ -338,10 +342,14 @@ def test_get_all_predictions(
     }
 
     # Create a side effect function that returns the appropriate mock
-    def side_effect(device_id, prediction_type, force_refresh=False):
+    def side_effect(device_id, prediction_type, force_refresh=False, device_data=None):
         return prediction_map.get(prediction_type, None)
 
     mock_get_prediction.side_effect = side_effect
+    mock_load_device_data.return_value = {
+        prediction_type: {"device_id": "test-wh-123"}
+        for prediction_type in prediction_map
+    }
 
     # Make the request
     response = client.get("/api/predictions/water-heaters/test-wh-123/all")
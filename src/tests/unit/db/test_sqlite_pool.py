@@ -0,0 +1,116 @@
+"""
+Tests for the pooled SQLite access layer.
+"""
+import asyncio
+import os
+import threading
+
+import pytest
+
+from src.db.sqlite_pool import SQLiteConnectionPool, get_sqlite_pool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """Create a pool with a small table."""
+    pool = SQLiteConnectionPool(os.path.join(tmp_path, "pool.db"), size=2)
+    pool.execute("CREATE TABLE readings (id INTEGER PRIMARY KEY, value REAL)")
+    yield pool
+    pool.close()
+
+
+@pytest.mark.unit
+class TestSQLiteConnectionPool:
+    """Test cases for SQLiteConnectionPool."""
+
+    def test_connections_use_wal(self, pool):
+        """Test that pooled connections are switched to WAL journaling."""
+        assert pool.fetchone("PRAGMA journal_mode")[0] == "wal"
+
+    def test_connections_are_reused(self, pool):
+        """Test that sequential queries share one long-lived connection."""
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert pool._opened == 1
+
+    def test_executemany_is_one_transaction(self, pool):
+        """Test that a failing row rolls back the whole batch."""
+        with pytest.raises(Exception):
+            pool.executemany(
+                "INSERT INTO readings (id, value) VALUES (?, ?)",
+                [(1, 1.0), (1, 2.0)],
+            )
+
+        assert pool.fetchone("SELECT COUNT(*) FROM readings")[0] == 0
+
+    def test_pool_is_bounded(self, pool):
+        """Test that a third borrower waits until a connection is returned."""
+        pool.timeout = 0.05
+        with pool.connection(), pool.connection():
+            with pytest.raises(TimeoutError):
+                with pool.connection():
+                    pass
+
+    @pytest.mark.asyncio
+    async def test_async_queries_run_off_the_loop(self, pool):
+        """Test that async helpers execute on the SQLite executor threads."""
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def insert(value):
+            threads.append(threading.get_ident())
+            return pool.execute("INSERT INTO readings (value) VALUES (?)", (value,))
+
+        await asyncio.gather(*(pool.run(insert, v) for v in range(5)))
+        rows = await pool.fetchall_async("SELECT value FROM readings")
+
+        assert len(rows) == 5
+        assert loop_thread not in threads
+
+    def test_shared_pool_per_path(self, tmp_path):
+        """Test that the registry hands out one pool per database file."""
+        path = os.path.join(tmp_path, "shared.db")
+        assert get_sqlite_pool(path) is get_sqlite_pool(path)
+        get_sqlite_pool(path).close()
+
+    @pytest.mark.asyncio
+    async def test_open_streams_do_not_starve_queries(self, tmp_path):
+        """Test that streams use their own connections and wait for a slot."""
+        pool = SQLiteConnectionPool(
+            os.path.join(tmp_path, "streams.db"), size=1, stream_size=2, timeout=1
+        )
+        pool.execute("CREATE TABLE readings (id INTEGER PRIMARY KEY, value REAL)")
+        await pool.executemany_async(
+            "INSERT INTO readings (value) VALUES (?)", [(v,) for v in range(10)]
+        )
+
+        streams = [
+            pool.iterate_async("SELECT value FROM readings", chunk_size=2)
+            for _ in range(3)
+        ]
+        # Two streams hold a connection each across awaits
+        assert await streams[0].__anext__() == (0.0,)
+        assert await streams[1].__anext__() == (0.0,)
+
+        # Regular queries still get the pool's own connection
+        counts = await asyncio.gather(
+            *(pool.fetchone_async("SELECT COUNT(*) FROM readings") for _ in range(8))
+        )
+        assert counts == [(10,)] * 8
+
+        # A third stream waits on the loop until a slot frees up
+        third = asyncio.create_task(streams[2].__anext__())
+        await asyncio.sleep(0.05)
+        assert not third.done()
+        await streams[0].aclose()
+        assert await asyncio.wait_for(third, timeout=1) == (0.0,)
+
+        await streams[1].aclose()
+        await streams[2].aclose()
+        assert pool._opened == 1
+        assert pool._stream_idle.qsize() == 2
+        pool.close()
@@ -0,0 +1,288 @@
+"""
+Unit tests for the shared change-stream multiplexer.
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.infrastructure.device_shadow.change_stream_multiplexer import (
+    CHANGE_STREAM_CONSUMER_ID,
+    ChangeStreamMultiplexer,
+    ResumeTokenStore,
+    coalesce_change_events,
+)
+
+
+def change(op, device_id, token, coll="device_shadows", **fields):
+    """Build a minimal change event."""
+    event = {
+        "_id": {"_data": token},
+        "operationType": op,
+        "ns": {"db": "iotsphere", "coll": coll},
+        "documentKey": {"_id": device_id},
+        "fullDocument": {"_id": device_id, "token": token},
+    }
+    event.update(fields)
+    return event
+
+
+def update(device_id, token, updated=None, removed=None, coll="device_shadows"):
+    """Build an update change event."""
+    return change(
+        "update",
+        device_id,
+        token,
+        coll=coll,
+        updateDescription={
+            "updatedFields": updated or {},
+            "removedFields": removed or [],
+        },
+    )
+
+
+class FakeChangeStream:
+    """Async change stream yielding queued events until closed."""
+
+    def __init__(self, events):
+        self.events = events
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.events:
+            await asyncio.sleep(0.001)
+        return self.events.pop(0)
+
+
+def make_database(events):
+    """Create a mock database whose watch() streams `events`."""
+    database = MagicMock()
+    database.name = "iotsphere"
+    database.watch = MagicMock(side_effect=lambda *a, **kw: FakeChangeStream(events))
+    return database
+
+
+@pytest.mark.unit
+class TestCoalesceChangeEvents:
+    """Tests for folding several changes to a document into one."""
+
+    def test_merges_consecutive_updates(self):
+        """Later writes win and superseded removals are dropped."""
+        events = [
+            update("wh-001", "1", {"reported.temperature": 70}, ["reported.mode"]),
+            update("wh-002", "2", {"reported.temperature": 60}),
+            update("wh-001", "3", {"reported.temperature": 71, "reported.mode": "eco"}),
+        ]
+
+        merged = coalesce_change_events(events)
+
+        assert [e["documentKey"]["_id"] for e in merged] == ["wh-001", "wh-002"]
+        assert merged[0]["_id"] == {"_data": "3"}
+        assert merged[0]["updateDescription"] == {
+            "updatedFields": {"reported.temperature": 71, "reported.mode": "eco"},
+            "removedFields": [],
+        }
+
+    def test_section_write_supersedes_nested_fields(self):
+        """A later write to a section replaces earlier writes below it."""
+        merged = coalesce_change_events(
+            [
+                update("wh-001", "1", {"reported.temperature": 70}),
+                update("wh-001", "2", {"reported": {"mode": "eco"}}),
+            ]
+        )
+
+        assert merged[0]["updateDescription"]["updatedFields"] == {
+            "reported": {"mode": "eco"}
+        }
+
+    def test_insert_then_update_stays_insert(self):
+        """Updates after an insert are folded into the inserted document."""
+        merged = coalesce_change_events(
+            [change("insert", "wh-001", "1"), update("wh-001", "2", {"a": 1})]
+        )
+
+        assert merged[0]["operationType"] == "insert"
+        assert merged[0]["fullDocument"]["token"] == "2"
+        assert "updateDescription" not in merged[0]
+
+    def test_delete_wins_and_reinsert_becomes_replace(self):
+        """A delete replaces earlier changes; an insert after it is a replace."""
+        deleted = coalesce_change_events(
+            [update("wh-001", "1", {"a": 1}), change("delete", "wh-001", "2")]
+        )
+        reinserted = coalesce_change_events(
+            [change("delete", "wh-001", "1"), change("insert", "wh-001", "2")]
+        )
+
+        assert deleted[0]["operationType"] == "delete"
+        assert reinserted[0]["operationType"] == "replace"
+
+    def test_same_id_in_different_collections_kept_apart(self):
+        """Documents are keyed by collection as well as id."""
+        merged = coalesce_change_events(
+            [
+                update("wh-001", "1", {"a": 1}),
+                update("wh-001", "2", {"a": 2}, coll="water_heaters"),
+            ]
+        )
+
+        assert len(merged) == 2
+
+
+@pytest.mark.unit
+class TestChangeStreamMultiplexer:
+    """Tests for ChangeStreamMultiplexer."""
+
+    @pytest.mark.asyncio
+    async def test_dispatches_coalesced_batches_per_collection(self):
+        """Handlers get one batch with one event per document of their collection."""
+        events = [
+            update("wh-001", "1", {"reported.temperature": 70}),
+            update("wh-001", "2", {"reported.temperature": 71}),
+            update("wh-002", "3", {"a": 1}, coll="water_heaters"),
+        ]
+        database = make_database(events)
+        multiplexer = ChangeStreamMultiplexer(database, coalesce_window=0.02)
+        shadow_batches, heater_batches = [], []
+
+        async def on_shadows(batch):
+            shadow_batches.append(batch)
+
+        async def on_heaters(batch):
+            heater_batches.append(batch)
+
+        await multiplexer.subscribe("device_shadows", on_shadows)
+        await multiplexer.subscribe("water_heaters", on_heaters)
+        await asyncio.sleep(0.1)
+        await multiplexer.stop()
+
+        shadow_events = [e for batch in shadow_batches for e in batch]
+        assert [e["_id"]["_data"] for e in shadow_events] == ["2"]
+        assert [e["_id"]["_data"] for b in heater_batches for e in b] == ["3"]
+        assert multiplexer.get_metrics()["events_coalesced"] == 1
+
+        # The second collection reopened the stream with a wider filter
+        pipeline = database.watch.call_args.args[0]
+        assert pipeline[0]["$match"]["ns.coll"]["$in"] == [
+            "device_shadows",
+            "water_heaters",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_resumes_from_saved_token(self):
+        """A new multiplexer resumes after the last dispatched event."""
+        token_store = ResumeTokenStore()
+        events = [update("wh-001", "1", {"a": 1}), update("wh-002", "2", {"a": 2})]
+        received = []
+
+        async def handler(batch):
+            received.extend(batch)
+
+        first = ChangeStreamMultiplexer(
+            make_database(events), token_store=token_store, coalesce_window=0.01
+        )
+        await first.subscribe("device_shadows", handler)
+        await asyncio.sleep(0.05)
+        await first.unsubscribe("device_shadows", handler)
+
+        assert not first.running
+        assert await token_store.load(f"iotsphere:{CHANGE_STREAM_CONSUMER_ID}") == {
+            "_data": "2"
+        }
+
+        database = make_database([])
+        second = ChangeStreamMultiplexer(database, token_store=token_store)
+        await second.subscribe("device_shadows", handler)
+        await asyncio.sleep(0.01)
+        await second.stop()
+
+        assert database.watch.call_args.kwargs["resume_after"] == {"_data": "2"}
+        assert len(received) == 2
+
+    @pytest.mark.asyncio
+    async def test_handler_error_does_not_block_others(self):
+        """A failing handler is counted and the other handlers still run."""
+        received = []
+
+        async def failing(batch):
+            raise RuntimeError("boom")
+
+        async def working(batch):
+            received.extend(batch)
+
+        multiplexer = ChangeStreamMultiplexer(
+            make_database([update("wh-001", "1", {"a": 1})]), coalesce_window=0.01
+        )
+        await multiplexer.subscribe("device_shadows", failing)
+        await multiplexer.subscribe("device_shadows", working)
+        await asyncio.sleep(0.05)
+        await multiplexer.stop()
+
+        assert len(received) == 1
+        assert multiplexer.get_metrics()["handler_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_instances_keep_separate_tokens(self):
+        """Instances watching one database resume from their own positions."""
+        token_store = ResumeTokenStore()
+
+        async def handler(batch):
+            pass
+
+        for consumer_id, token in (("app-1", "1"), ("app-2", "2")):
+            multiplexer = ChangeStreamMultiplexer(
+                make_database([update("wh-001", token, {"a": 1})]),
+                consumer_id=consumer_id,
+                token_store=token_store,
+                coalesce_window=0.01,
+            )
+            await multiplexer.subscribe("device_shadows", handler)
+            await asyncio.sleep(0.03)
+            await multiplexer.stop()
+
+        assert await token_store.load("iotsphere:app-1") == {"_data": "1"}
+        assert await token_store.load("iotsphere:app-2") == {"_data": "2"}
+
+    @pytest.mark.asyncio
+    async def test_token_not_advanced_past_failed_event(self):
+        """The saved token stops before an event whose handler failed."""
+        token_store = ResumeTokenStore()
+        calls = 0
+
+        async def flaky(batch):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise RuntimeError("boom")
+
+        events = [update("wh-001", "1", {"a": 1})]
+        database = make_database(events)
+        multiplexer = ChangeStreamMultiplexer(
+            database,
+            stream_name="shadows",
+            token_store=token_store,
+            coalesce_window=0.01,
+        )
+        await multiplexer.subscribe("device_shadows", flaky)
+        await asyncio.sleep(0.03)
+        assert await token_store.load("shadows") == {"_data": "1"}
+
+        # The second batch fails, and later successes must not move past it
+        events.append(update("wh-002", "2", {"a": 2}))
+        await asyncio.sleep(0.03)
+        events.append(update("wh-003", "3", {"a": 3}))
+        await asyncio.sleep(0.03)
+        await multiplexer.stop()
+
+        assert calls == 3
+        assert await token_store.load("shadows") == {"_data": "1"}
+        assert multiplexer.get_metrics()["resume_token_pinned"]
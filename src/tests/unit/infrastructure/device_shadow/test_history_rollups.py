@@ -0,0 +1,84 @@
+"""
+Unit tests for shadow history rollups.
+"""
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.infrastructure.device_shadow.history_rollups import (
+    ShadowHistoryRollups,
+    bucket_start,
+    extract_metric,
+    select_rollup_resolution,
+)
+
+
+@pytest.mark.unit
+class TestRollupHelpers:
+    """Tests for resolution selection and bucketing."""
+
+    def test_select_resolution_keeps_point_count_bounded(self):
+        """Test that longer windows use coarser buckets."""
+        assert select_rollup_resolution(0.5) == "1m"
+        assert select_rollup_resolution(7) == "1h"
+        assert select_rollup_resolution(30) == "1h"
+        assert select_rollup_resolution(365) == "1d"
+
+    def test_bucket_start_floors_timestamp(self):
+        """Test that timestamps are floored to their bucket start."""
+        ts = datetime(2025, 4, 9, 13, 47, 21)
+
+        assert bucket_start(ts, "1m") == datetime(2025, 4, 9, 13, 47)
+        assert bucket_start(ts, "1h") == datetime(2025, 4, 9, 13, 0)
+        assert bucket_start(ts, "1d") == datetime(2025, 4, 9)
+
+    def test_extract_metric_checks_known_layouts(self):
+        """Test that metrics are found under metrics, reported or top level."""
+        assert extract_metric({"metrics": {"temperature": 50}}, "temperature") == 50.0
+        assert extract_metric({"reported": {"temperature": 51}}, "temperature") == 51.0
+        assert extract_metric({"temperature": 52.5}, "temperature") == 52.5
+        assert extract_metric({"temperature": "hot"}, "temperature") is None
+
+
+@pytest.mark.unit
+class TestShadowHistoryRollups:
+    """Tests for rollup maintenance."""
+
+    @pytest.mark.asyncio
+    async def test_record_coalesces_batch_into_one_upsert_per_bucket(self):
+        """Test that a batch becomes one $inc/$min/$max upsert per bucket."""
+        collection = MagicMock()
+        collection.bulk_write = AsyncMock()
+        rollups = ShadowHistoryRollups(collection, resolutions=("1h",))
+
+        updated = await rollups.record(
+            [
+                {
+                    "device_id": "wh-001",
+                    "timestamp": datetime(2025, 4, 9, 13, 5),
+                    "metrics": {"temperature": 50.0},
+                },
+                {
+                    "device_id": "wh-001",
+                    "timestamp": datetime(2025, 4, 9, 13, 55),
+                    "metrics": {"temperature": 54.0},
+                },
+                {
+                    "device_id": "wh-002",
+                    "timestamp": datetime(2025, 4, 9, 13, 5),
+                    "metrics": {"pressure": 2.0},
+                },
+            ]
+        )
+
+        assert updated == 1
+        operations = collection.bulk_write.call_args.args[0]
+        assert collection.bulk_write.call_args.kwargs == {"ordered": False}
+        update = operations[0]._doc
+        assert update["$inc"] == {
+            "metrics.temperature.count": 2,
+            "metrics.temperature.sum": 104.0,
+        }
+        assert update["$min"] == {"metrics.temperature.min": 50.0}
+        assert update["$max"] == {"metrics.temperature.max": 54.0}
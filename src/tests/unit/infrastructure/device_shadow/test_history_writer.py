@@ -0,0 +1,103 @@
+"""
+Unit tests for the write-behind shadow history writer.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.infrastructure.device_shadow.history_writer import ShadowHistoryWriter
+
+
+def make_collection(delay: float = 0.0):
+    """Create a mock collection whose insert_many takes `delay` seconds."""
+    collection = MagicMock()
+    batches = []
+
+    async def insert_many(docs, ordered=True):
+        batches.append((list(docs), ordered))
+        await asyncio.sleep(delay)
+
+    collection.insert_many = AsyncMock(side_effect=insert_many)
+    return collection, batches
+
+
+@pytest.mark.unit
+class TestShadowHistoryWriter:
+    """Tests for ShadowHistoryWriter."""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_entries_across_devices(self):
+        """Test that entries from several devices share one unordered insert."""
+        collection, batches = make_collection()
+        writer = ShadowHistoryWriter(collection, max_batch_size=3, flush_interval=10)
+        await writer.start()
+
+        for device_id in ("wh-001", "wh-002", "wh-003"):
+            await writer.add({"device_id": device_id})
+        await asyncio.sleep(0.01)
+        await writer.stop()
+
+        assert len(batches) == 1
+        docs, ordered = batches[0]
+        assert [d["device_id"] for d in docs] == ["wh-001", "wh-002", "wh-003"]
+        assert ordered is False
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_interval(self):
+        """Test that a partial batch is written once the interval elapses."""
+        collection, batches = make_collection()
+        writer = ShadowHistoryWriter(
+            collection, max_batch_size=100, flush_interval=0.02
+        )
+        await writer.start()
+
+        await writer.add({"device_id": "wh-001"})
+        await asyncio.sleep(0.1)
+
+        assert writer.entries_written == 1
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_buffer(self):
+        """Test that stopping writes out everything still pending."""
+        collection, batches = make_collection()
+        writer = ShadowHistoryWriter(collection, max_batch_size=2, flush_interval=10)
+        await writer.start()
+
+        await writer.add_many({"device_id": f"wh-{i}"} for i in range(5))
+        await writer.stop()
+
+        assert writer.pending == 0
+        assert writer.entries_written == 5
+        assert all(len(docs) <= 2 for docs, _ in batches)
+
+    @pytest.mark.asyncio
+    async def test_backpressure_limits_pending(self):
+        """Test that producers wait while a slow database drains the buffer."""
+        collection, batches = make_collection(delay=0.02)
+        writer = ShadowHistoryWriter(
+            collection, max_batch_size=2, flush_interval=10, max_pending=4
+        )
+        await writer.start()
+
+        max_seen = 0
+        for i in range(20):
+            await writer.add({"device_id": f"wh-{i}"})
+            max_seen = max(max_seen, writer.pending)
+        await writer.stop()
+
+        assert max_seen <= 4
+        assert writer.entries_written == 20
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_counted(self):
+        """Test that insert errors are logged and counted rather than raised."""
+        collection = MagicMock()
+        collection.insert_many = AsyncMock(side_effect=Exception("down"))
+        writer = ShadowHistoryWriter(collection, max_batch_size=10, flush_interval=10)
+
+        await writer.add({"device_id": "wh-001"})
+        await writer.flush()
+
+        assert writer.get_stats()["entries_failed"] == 1
@@ -0,0 +1,163 @@
+"""
+Unit tests for the optimized MongoDB shadow storage.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.infrastructure.device_shadow.mongodb_shadow_listener import (
+    MongoDBShadowListener,
+)
+from src.infrastructure.device_shadow.optimized_mongodb_storage import (
+    OptimizedMongoDBShadowStorage,
+)
+
+
+@pytest.fixture
+def storage():
+    """Create an optimized storage instance with mocked collections."""
+    storage = OptimizedMongoDBShadowStorage()
+    storage.shadows = MagicMock()
+    storage.history = MagicMock()
+    return storage
+
+
+@pytest.mark.unit
+class TestApplyShadowPatch:
+    """Tests for atomic shadow patching."""
+
+    @pytest.mark.asyncio
+    async def test_patch_uses_single_find_one_and_update(self, storage):
+        """Test that the merge is expressed as dotted $set with a version filter."""
+        updated = {
+            "device_id": "wh-001",
+            "reported": {"temperature": 52.0},
+            "desired": {},
+            "version": 4,
+            "metadata": {"last_updated": "2025-01-01T00:00:00Z"},
+        }
+        storage.shadows.find_one_and_update = AsyncMock(return_value=updated)
+        storage.shadows.find_one = AsyncMock()
+
+        result = await storage.apply_shadow_patch(
+            "wh-001", reported={"temperature": 52.0}, expected_version=3
+        )
+
+        assert result == updated
+        storage.shadows.find_one.assert_not_called()
+        query, update = storage.shadows.find_one_and_update.call_args.args
+        assert query == {"device_id": "wh-001", "version": 3}
+        assert update["$set"]["reported.temperature"] == 52.0
+        assert "metadata.last_updated" in update["$set"]
+        assert update["$inc"] == {"version": 1}
+
+    @pytest.mark.asyncio
+    async def test_patch_version_mismatch_raises_conflict(self, storage):
+        """Test that a filtered-out update is reported as a version conflict."""
+        storage.shadows.find_one_and_update = AsyncMock(return_value=None)
+        storage.shadows.find_one = AsyncMock(return_value={"version": 5})
+
+        with pytest.raises(ValueError, match="Version conflict"):
+            await storage.apply_shadow_patch(
+                "wh-001", reported={"temperature": 52.0}, expected_version=3
+            )
+
+    @pytest.mark.asyncio
+    async def test_patch_missing_shadow_raises(self, storage):
+        """Test that patching an unknown device raises ValueError."""
+        storage.shadows.find_one_and_update = AsyncMock(return_value=None)
+        storage.shadows.find_one = AsyncMock(return_value=None)
+
+        with pytest.raises(ValueError, match="No shadow found"):
+            await storage.apply_shadow_patch("wh-001", reported={"temperature": 1})
+
+
+@pytest.mark.unit
+class TestShadowReadCache:
+    """Tests for the storage read cache."""
+
+    @pytest.mark.asyncio
+    async def test_cached_read_skips_database_and_is_isolated(self, storage):
+        """Test that repeat reads hit the cache and return independent copies."""
+        storage.shadows.find_one = AsyncMock(
+            return_value={"device_id": "wh-001", "reported": {"temperature": 50.0}}
+        )
+
+        first = await storage.get_shadow("wh-001")
+        first["reported"]["temperature"] = 99.0
+        second = await storage.get_shadow("wh-001")
+
+        storage.shadows.find_one.assert_awaited_once()
+        assert second["reported"]["temperature"] == 50.0
+        assert storage.get_cache_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_event_from_another_instance_evicts(self, storage):
+        """Test that a delete change event evicts the shadow by document key."""
+        document_id = "65f0c0ffee0000000000beef"
+        storage.shadows.find_one = AsyncMock(
+            return_value={"_id": document_id, "device_id": "wh-001", "version": 1}
+        )
+        await storage.get_shadow("wh-001")
+        storage.cache.put("wh-002", {"device_id": "wh-002", "version": 1})
+        listener = MongoDBShadowListener(storage, AsyncMock())
+
+        await listener._on_shadow_changes(
+            [
+                {"operationType": "delete", "documentKey": {"_id": document_id}},
+                {"operationType": "delete", "documentKey": {"_id": "unknown"}},
+            ]
+        )
+
+        assert not storage.cache.contains("wh-001")
+        assert storage.cache.contains("wh-002")
+
+
+class AsyncCursor:
+    """Minimal async cursor over a list of documents."""
+
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return self._docs.pop(0)
+
+
+@pytest.mark.unit
+class TestBulkShadowRead:
+    """Tests for bulk shadow reads."""
+
+    @pytest.mark.asyncio
+    async def test_get_shadows_uses_single_in_query_for_misses(self, storage):
+        """Test that cache misses are fetched with one projected $in query."""
+        storage.cache.put("wh-001", {"device_id": "wh-001", "reported": {"t": 1}})
+        storage.shadows.find = MagicMock(
+            return_value=AsyncCursor([{"device_id": "wh-002", "reported": {"t": 2}}])
+        )
+
+        result = await storage.get_shadows(
+            ["wh-001", "wh-002", "wh-003"], fields=["reported"]
+        )
+
+        assert set(result) == {"wh-001", "wh-002"}
+        query, projection = storage.shadows.find.call_args.args
+        assert query == {"device_id": {"$in": ["wh-002", "wh-003"]}}
+        assert projection == {"_id": False, "device_id": True, "reported": True}
+
+
+@pytest.mark.unit
+class TestHistoryRollups:
+    """Tests for the history rollup entry points."""
+
+    @pytest.mark.asyncio
+    async def test_rebuild_before_initialize_is_skipped(self, storage):
+        """Test that rebuilding without a rollups collection returns 0."""
+        assert storage.rollups is None
+
+        assert await storage.rebuild_history_rollups("wh-001") == 0
+        assert await storage.get_shadow_history_rollups("wh-001", "1h") == []
@@ -0,0 +1,77 @@
+"""
+Unit tests for the device shadow LRU/TTL cache.
+"""
+import pytest
+
+from src.infrastructure.device_shadow.shadow_cache import ShadowCache
+
+
+class FakeClock:
+    """Manually advanced time source."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestShadowCache:
+    """Tests for ShadowCache."""
+
+    def setup_method(self):
+        """Setup for each test method."""
+        self.clock = FakeClock()
+        self.cache = ShadowCache(max_size=2, ttl=10.0, clock=self.clock)
+
+    def test_get_returns_copy(self):
+        """Test that callers cannot mutate the cached document."""
+        self.cache.put("wh-001", {"reported": {"temperature": 50.0}, "version": 1})
+
+        shadow = self.cache.get("wh-001")
+        shadow["reported"]["temperature"] = 99.0
+
+        assert self.cache.get("wh-001")["reported"]["temperature"] == 50.0
+
+    def test_evicts_least_recently_used(self):
+        """Test that reads refresh recency so the coldest entry is evicted."""
+        self.cache.put("wh-001", {"version": 1})
+        self.cache.put("wh-002", {"version": 1})
+        self.cache.get("wh-001")
+
+        self.cache.put("wh-003", {"version": 1})
+
+        assert self.cache.contains("wh-001")
+        assert not self.cache.contains("wh-002")
+        assert self.cache.stats()["evictions"] == 1
+
+    def test_entries_expire_individually(self):
+        """Test that each entry expires on its own TTL."""
+        self.cache.put("wh-001", {"version": 1})
+        self.clock.now = 6.0
+        self.cache.put("wh-002", {"version": 1})
+        self.clock.now = 11.0
+
+        assert self.cache.get("wh-001") is None
+        assert self.cache.get("wh-002") is not None
+        assert self.cache.stats()["expirations"] == 1
+
+    def test_invalidate_keeps_newer_entry(self):
+        """Test that versioned invalidation only drops stale entries."""
+        self.cache.put("wh-001", {"version": 5})
+
+        assert self.cache.invalidate("wh-001", version=5) is False
+        assert self.cache.invalidate("wh-001", version=6) is True
+        assert not self.cache.contains("wh-001")
+
+    def test_stats_track_hits_and_misses(self):
+        """Test hit/miss counters and hit rate."""
+        self.cache.put("wh-001", {"version": 1})
+        self.cache.get("wh-001")
+        self.cache.get("wh-002")
+
+        stats = self.cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
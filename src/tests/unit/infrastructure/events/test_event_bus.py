@@ -0,0 +1,122 @@
+"""
+Unit tests for the queue-per-subscriber EventBus.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from src.infrastructure.events.event_bus import EventBus
+
+
+@pytest.mark.unit
+class TestEventBus:
+    """Tests for EventBus."""
+
+    @pytest.mark.asyncio
+    async def test_publish_does_not_wait_for_slow_subscribers(self):
+        """Test that publish returns before a slow subscriber finishes."""
+        bus = EventBus()
+        release = asyncio.Event()
+        received = []
+
+        async def slow(data):
+            await release.wait()
+            received.append(data)
+
+        bus.subscribe("shadow.updated", slow)
+        await asyncio.wait_for(bus.publish("shadow.updated", {"v": 1}), 0.1)
+
+        assert received == []
+        release.set()
+        await bus.drain()
+        assert received == [{"v": 1}]
+
+    @pytest.mark.asyncio
+    async def test_wildcard_subscriptions(self):
+        """Test that '*' matches one level and '#' any remaining levels."""
+        bus = EventBus()
+        single, multi = [], []
+
+        async def on_single(data):
+            single.append(data["topic"])
+
+        async def on_multi(data):
+            multi.append(data["topic"])
+
+        bus.subscribe("shadow.*", on_single)
+        bus.subscribe("asset.#", on_multi)
+        for topic in ("shadow.updated", "shadow.desired.updated", "asset.metadata.updated"):
+            await bus.publish(topic, {"topic": topic})
+        await bus.drain()
+
+        assert single == ["shadow.updated"]
+        assert multi == ["asset.metadata.updated"]
+
+    @pytest.mark.asyncio
+    async def test_sync_callbacks_run_in_executor(self):
+        """Test that sync callbacks run off the event loop thread."""
+        bus = EventBus()
+        threads = []
+        bus.subscribe("shadow.updated", lambda data: threads.append(threading.get_ident()))
+
+        await bus.publish("shadow.updated", {}, wait=True)
+
+        assert threads and threads[0] != threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_oldest(self):
+        """Test that a full subscriber queue drops its oldest event."""
+        bus = EventBus(max_queue_size=2)
+        release = asyncio.Event()
+        received = []
+
+        async def blocked(data):
+            await release.wait()
+            received.append(data["n"])
+
+        bus.subscribe("shadow.updated", blocked)
+        for n in range(4):
+            await bus.publish("shadow.updated", {"n": n})
+            await asyncio.sleep(0)
+        release.set()
+        await bus.drain()
+
+        # Event 0 was already being handled; 1 was dropped for 3
+        assert received == [0, 2, 3]
+        (metrics,) = bus.get_metrics()
+        assert metrics["dropped"] == 1
+        assert metrics["delivered"] == 3
+        assert metrics["backlog"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failing_subscriber_counted(self):
+        """Test that subscriber errors are counted and reported to waiting publishers."""
+        bus = EventBus()
+
+        async def failing(data):
+            raise RuntimeError("boom")
+
+        bus.subscribe("shadow.updated", failing)
+        await bus.publish("shadow.updated", {}, wait=True)
+
+        (metrics,) = bus.get_metrics()
+        assert metrics["errors"] == 1
+        assert metrics["delivered"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_stops_delivery(self):
+        """Test that unsubscribed callbacks get no further events."""
+        bus = EventBus()
+        received = []
+
+        async def handler(data):
+            received.append(data)
+
+        bus.subscribe("shadow.updated", handler)
+        bus.unsubscribe("shadow.updated", handler)
+        await bus.publish("shadow.updated", {})
+        await bus.drain()
+
+        assert received == []
+        assert bus.subscribers == {}
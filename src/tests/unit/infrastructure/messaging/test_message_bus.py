@@ -0,0 +1,154 @@
+"""
+Unit tests for the batching RabbitMQ message bus publisher.
+"""
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.infrastructure.messaging.message_bus import (
+    RabbitMqMessageBus,
+    RabbitMqPublisherChannel,
+    create_message_bus,
+)
+
+
+class FakeChannel:
+    """pika channel recording published batches per transaction."""
+
+    def __init__(self, fail_commits=0):
+        self.pending = []
+        self.committed = []
+        self.fail_commits = fail_commits
+
+    def exchange_declare(self, **kwargs):
+        pass
+
+    def tx_select(self):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.pending.append((routing_key, json.loads(body)))
+
+    def tx_commit(self):
+        batch, self.pending = self.pending, []
+        if self.fail_commits:
+            self.fail_commits -= 1
+            raise ConnectionError("connection lost")
+        self.committed.append(batch)
+
+
+def fake_connection_factory(channels):
+    """Patchable BlockingConnection handing out the given channels in order."""
+
+    def connect(params):
+        connection = MagicMock()
+        connection.is_open = True
+        connection.channel.return_value = channels.pop(0)
+        return connection
+
+    return connect
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert condition()
+
+
+@pytest.mark.unit
+class TestRabbitMqPublisherChannel:
+    """Tests for RabbitMqPublisherChannel."""
+
+    def test_sends_full_batch_in_one_transaction(self):
+        """Test that a full outbox is committed as one batch."""
+        channel = FakeChannel()
+        with patch(
+            "src.infrastructure.messaging.message_bus.pika.BlockingConnection",
+            side_effect=fake_connection_factory([channel]),
+        ):
+            publisher = RabbitMqPublisherChannel(
+                0, MagicMock(), batch_size=3, flush_interval=10
+            )
+            for n in range(3):
+                publisher.enqueue("device.telemetry", json.dumps({"n": n}))
+            publisher.start()
+            wait_for(lambda: publisher.published == 3)
+            publisher.stop()
+
+        assert [[m["n"] for _, m in batch] for batch in channel.committed] == [[0, 1, 2]]
+
+    def test_partial_batch_flushed_after_interval(self):
+        """Test that a partial batch is sent once the flush interval passes."""
+        channel = FakeChannel()
+        with patch(
+            "src.infrastructure.messaging.message_bus.pika.BlockingConnection",
+            side_effect=fake_connection_factory([channel]),
+        ):
+            publisher = RabbitMqPublisherChannel(
+                0, MagicMock(), batch_size=100, flush_interval=0.02
+            )
+            publisher.start()
+            publisher.enqueue("device.telemetry", "{}")
+            wait_for(lambda: publisher.published == 1)
+            publisher.stop()
+
+        assert len(channel.committed) == 1
+
+    def test_failed_batch_resent_after_reconnect(self):
+        """Test that messages from a failed batch are kept and resent in order."""
+        broken, healthy = FakeChannel(fail_commits=1), FakeChannel()
+        with patch(
+            "src.infrastructure.messaging.message_bus.pika.BlockingConnection",
+            side_effect=fake_connection_factory([broken, healthy]),
+        ):
+            publisher = RabbitMqPublisherChannel(
+                0, MagicMock(), batch_size=2, flush_interval=0.01
+            )
+            publisher.reconnect_delay = 0.01
+            for n in range(2):
+                publisher.enqueue("device.telemetry", json.dumps({"n": n}))
+            publisher.start()
+            wait_for(lambda: publisher.published == 2)
+            publisher.stop()
+
+        assert [[m["n"] for _, m in batch] for batch in healthy.committed] == [[0, 1]]
+        metrics = publisher.get_metrics()
+        assert metrics["failed_batches"] == 1
+        assert metrics["reconnects"] == 1
+
+    def test_full_outbox_rejects(self):
+        """Test that enqueue refuses messages once the outbox is full."""
+        publisher = RabbitMqPublisherChannel(0, MagicMock(), batch_size=2, max_outbox=2)
+
+        assert publisher.enqueue("a", "{}")
+        assert publisher.enqueue("a", "{}")
+        assert not publisher.enqueue("a", "{}")
+        assert publisher.get_metrics()["rejected"] == 1
+
+
+@pytest.mark.unit
+class TestRabbitMqMessageBusPublish:
+    """Tests for publishing through RabbitMqMessageBus."""
+
+    def test_publish_queues_without_connecting(self):
+        """Test that publish returns before anything is sent."""
+        with patch.object(RabbitMqPublisherChannel, "start"):
+            bus = create_message_bus("rabbitmq", publish_channels=2)
+
+            assert isinstance(bus, RabbitMqMessageBus)
+            assert bus.publish("device.telemetry", {"temperature": 50})
+
+        assert bus.get_metrics()["outbox"] == 1
+
+    def test_topic_stays_on_one_channel(self):
+        """Test that messages for a topic always use the same channel."""
+        with patch.object(RabbitMqPublisherChannel, "start"):
+            bus = RabbitMqMessageBus(publish_channels=4)
+            for n in range(5):
+                bus.publish("device.telemetry", {"n": n})
+
+        outboxes = [c["outbox"] for c in bus.get_metrics()["channels"]]
+        assert sorted(outboxes) == [0, 0, 0, 5]
@@ -0,0 +1,225 @@
+"""
+Unit tests for the MQTT ingestion queue between paho callbacks and asyncio.
+"""
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.infrastructure.messaging.mqtt_adapter import MqttAdapter
+from src.infrastructure.messaging.mqtt_ingest import (
+    OVERFLOW_DROP_NEWEST,
+    MqttFrame,
+    MqttIngestQueue,
+)
+from src.infrastructure.websocket.mqtt_websocket_bridge import (
+    ConnectionState,
+    MQTTWebSocketBridge,
+)
+
+
+def mqtt_message(topic, payload):
+    """Create a paho-like message."""
+    message = MagicMock()
+    message.topic = topic
+    message.payload = payload
+    return message
+
+
+def frame(payload, age=0.0):
+    """Create a frame received age seconds ago."""
+    return MqttFrame("a/b", payload, time.monotonic() - age)
+
+
+def from_thread(func, *args):
+    """Call func on a separate thread, like the paho network loop does."""
+    thread = threading.Thread(target=func, args=args)
+    thread.start()
+    thread.join()
+
+
+async def wait_for_processed(ingest, count):
+    """Wait until the consumers have handled count frames."""
+    for _ in range(100):
+        if ingest.processed + ingest.failed >= count:
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.unit
+class TestMqttIngestQueue:
+    """Tests for MqttIngestQueue."""
+
+    @pytest.mark.asyncio
+    async def test_frames_from_network_thread_reach_consumers(self):
+        """Messages submitted off the loop thread are handled on the loop."""
+        loop_thread = threading.get_ident()
+        seen = []
+
+        async def handler(frame):
+            seen.append((frame.topic, frame.payload, threading.get_ident()))
+
+        ingest = MqttIngestQueue(handler, consumers=2)
+        await ingest.start()
+        for i in range(3):
+            from_thread(ingest.on_message, None, None, mqtt_message(b"a/b", b"%d" % i))
+        await wait_for_processed(ingest, 3)
+        await ingest.stop()
+
+        assert sorted(payload for _, payload, _ in seen) == [b"0", b"1", b"2"]
+        assert {topic for topic, _, _ in seen} == {"a/b"}
+        assert {thread for _, _, thread in seen} == {loop_thread}
+        assert ingest.get_stats()["received"] == 3
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_keeps_newest_frames(self):
+        """A full queue discards its oldest frame under drop_oldest."""
+        seen = []
+        ingest = MqttIngestQueue(
+            lambda f: seen.append(f.payload), max_queue_size=2, consumers=1
+        )
+        await ingest.start()
+        # Enqueue synchronously so the consumers cannot run in between
+        for i in range(4):
+            ingest._enqueue(frame(i))
+        await ingest.stop()
+
+        assert seen == [2, 3]
+        assert ingest.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_drop_newest_keeps_oldest_frames(self):
+        """A full queue rejects the incoming frame under drop_newest."""
+        seen = []
+        ingest = MqttIngestQueue(
+            lambda f: seen.append(f.payload),
+            max_queue_size=2,
+            consumers=1,
+            overflow_policy=OVERFLOW_DROP_NEWEST,
+        )
+        await ingest.start()
+        for i in range(4):
+            ingest._enqueue(frame(i))
+        await ingest.stop()
+
+        assert seen == [0, 1]
+        assert ingest.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_topic_order_kept_across_consumers(self):
+        """Frames on one topic are handled in order even with many consumers."""
+        seen = {}
+
+        async def handler(frame):
+            # Later frames finish sooner, so any overlap would reorder them
+            await asyncio.sleep(0.001 * (10 - frame.payload))
+            seen.setdefault(frame.topic, []).append(frame.payload)
+
+        ingest = MqttIngestQueue(handler, consumers=4)
+        await ingest.start()
+        for i in range(10):
+            for device in range(3):
+                ingest._enqueue(MqttFrame(f"devices/wh-{device}/telemetry", i, 0.0))
+        await ingest.stop()
+
+        assert len(seen) == 3
+        assert all(payloads == list(range(10)) for payloads in seen.values())
+
+    @pytest.mark.asyncio
+    async def test_late_frames_counted(self):
+        """Frames that waited longer than late_after are counted as late."""
+        ingest = MqttIngestQueue(lambda f: None, late_after=0.5)
+        await ingest.start()
+        ingest._enqueue(frame(0, age=1.0))
+        ingest._enqueue(frame(1))
+        await ingest.stop()
+
+        assert ingest.late == 1
+        assert ingest.processed == 2
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_counted(self):
+        """A failing handler does not stop the consumers."""
+
+        def handler(frame):
+            if frame.payload == 0:
+                raise ValueError("bad frame")
+
+        ingest = MqttIngestQueue(handler, consumers=1)
+        await ingest.start()
+        ingest._enqueue(frame(0))
+        ingest._enqueue(frame(1))
+        await ingest.stop()
+
+        assert ingest.failed == 1
+        assert ingest.processed == 1
+
+    def test_submit_before_start_drops(self):
+        """Messages arriving before start() are dropped, not raised."""
+        ingest = MqttIngestQueue(lambda f: None)
+
+        assert not ingest.submit("a/b", b"{}")
+        assert ingest.dropped == 1
+
+    def test_invalid_options_rejected(self):
+        """Unknown overflow policies and empty consumer pools are rejected."""
+        with pytest.raises(ValueError):
+            MqttIngestQueue(lambda f: None, overflow_policy="block")
+        with pytest.raises(ValueError):
+            MqttIngestQueue(lambda f: None, consumers=0)
+
+    @pytest.mark.asyncio
+    async def test_adapter_hands_off_to_consumers(self):
+        """With ingest started the adapter decodes off the network thread."""
+        message_bus = MagicMock()
+        adapter = MqttAdapter(mqtt_client=MagicMock(), message_bus=message_bus)
+        await adapter.start_ingest(consumers=1)
+
+        payload = json.dumps({"temperature_current": 120.5}).encode("utf-8")
+        from_thread(
+            adapter.on_message,
+            None,
+            None,
+            mqtt_message("iotsphere/devices/wh-1/telemetry", payload),
+        )
+        message_bus.publish.assert_not_called()
+        await wait_for_processed(adapter.ingest, 1)
+        await adapter.stop_ingest()
+
+        topic, event = message_bus.publish.call_args.args
+        assert topic == "device.telemetry"
+        assert event["device_id"] == "wh-1"
+        assert event["data"] == {"temperature_current": 120.5}
+        assert not adapter.ingest.running
+
+    @pytest.mark.asyncio
+    async def test_bridge_disconnect_drains_queue(self):
+        """Disconnecting the bridge forwards queued messages, then stops consumers."""
+        with patch(
+            "src.infrastructure.websocket.mqtt_websocket_bridge."
+            "WebSocketServiceManager.get_instance"
+        ):
+            bridge = MQTTWebSocketBridge(MagicMock())
+        handler = AsyncMock()
+        bridge.register_message_handler("devices/+/telemetry", handler)
+        await bridge._ingest.start()
+        bridge.connection_state = ConnectionState.CONNECTED
+
+        payload = json.dumps({"temperature_current": 120.5}).encode("utf-8")
+        from_thread(
+            bridge._on_mqtt_message,
+            None,
+            None,
+            mqtt_message("devices/wh-1/telemetry", payload),
+        )
+        await bridge.disconnect()
+
+        handler.assert_awaited_once_with(
+            "devices/wh-1/telemetry", {"temperature_current": 120.5}
+        )
+        assert not bridge._ingest.running
+        assert bridge.connection_state == ConnectionState.DISCONNECTED
+        bridge.mqtt_client.disconnect.assert_called_once()
@@ -0,0 +1,131 @@
+"""
+Unit tests for AMQP topic matching: the shared trie index, compiled
+TopicPattern and routing of received messages in MessageBrokerAdapter.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.infrastructure.messaging.message_broker_adapter import (
+    MessageBrokerAdapter,
+    MessageSubscriptionRequest,
+    TopicPattern,
+)
+from src.infrastructure.messaging.topic_trie import amqp_topic_trie, levels_match
+
+AMQP_CASES = [
+    ("devices.wh-1.shadow", "devices.wh-1.shadow", True),
+    ("devices.*.shadow", "devices.wh-1.shadow", True),
+    ("devices.*.shadow", "devices.shadow", False),
+    ("devices.#", "devices", True),
+    ("devices.#", "devices.wh-1.shadow.field.temperature", True),
+    ("devices.#.temperature", "devices.wh-1.shadow.field.temperature", True),
+    ("devices.#.temperature", "devices.temperature", True),
+    ("devices.#.temperature", "devices.wh-1.temperature.mode", False),
+    ("#.field.#", "devices.wh-1.shadow.field.mode", True),
+    ("#.field.#", "devices.wh-1.shadow.reported", False),
+    ("*.#.*", "devices", False),
+    ("*.#.*", "devices.wh-1", True),
+    ("#", "alerts.high", True),
+]
+
+
+@pytest.mark.unit
+class TestAmqpTopicMatching:
+    """Tests that the trie and single-pattern matcher follow AMQP rules."""
+
+    @pytest.mark.parametrize("pattern,topic,expected", AMQP_CASES)
+    def test_trie_match(self, pattern, topic, expected):
+        """The AMQP trie allows '#' at any level."""
+        trie = amqp_topic_trie()
+        trie.add(pattern, "sub")
+
+        assert (trie.match(topic) == {"sub"}) is expected
+
+    @pytest.mark.parametrize("pattern,topic,expected", AMQP_CASES)
+    def test_levels_match(self, pattern, topic, expected):
+        """levels_match agrees with the trie."""
+        assert levels_match(pattern.split("."), topic.split(".")) is expected
+
+    @pytest.mark.parametrize("pattern,topic,expected", AMQP_CASES)
+    def test_topic_pattern(self, pattern, topic, expected):
+        """TopicPattern uses the compiled levels."""
+        assert TopicPattern(pattern).matches_topic(topic) is expected
+
+    def test_remove_inner_wildcard_prunes(self):
+        """Removing the last pattern through an inner '#' empties the trie."""
+        trie = amqp_topic_trie()
+        trie.add("devices.#.temperature", "sub")
+        trie.remove("devices.#.temperature", "sub")
+
+        assert len(trie) == 0
+        assert trie.match("devices.wh-1.temperature") == set()
+
+
+@pytest.mark.unit
+class TestMessageBrokerAdapterRouting:
+    """Tests for routing received messages to subscription callbacks."""
+
+    @pytest.fixture
+    def adapter(self):
+        adapter = MessageBrokerAdapter()
+        adapter.initialized = True
+        adapter.channel = MagicMock()
+        adapter.channel.basic_cancel = AsyncMock()
+        queue = MagicMock()
+        queue.bind = AsyncMock()
+        queue.consume = AsyncMock(side_effect=["tag-reported", "tag-desired"])
+        adapter.channel.declare_queue = AsyncMock(return_value=queue)
+        return adapter
+
+    @staticmethod
+    def message(routing_key, consumer_tag):
+        message = MagicMock()
+        message.routing_key = routing_key
+        message.consumer_tag = consumer_tag
+        message.content_type = "application/json"
+        message.body = json.dumps({"temperature": 50}).encode()
+        message.ack = AsyncMock()
+        return message
+
+    async def subscribe(self, adapter, pattern, callback):
+        return await adapter.subscribe(
+            MessageSubscriptionRequest(
+                topic_pattern=TopicPattern(pattern),
+                queue_name="shadow-events",
+                callback=callback,
+            )
+        )
+
+    @pytest.mark.asyncio
+    async def test_shared_queue_routed_by_routing_key(self, adapter):
+        """A message delivered to any consumer of a queue reaches the right callback."""
+        on_reported, on_desired = AsyncMock(), AsyncMock()
+        await self.subscribe(adapter, "devices.*.shadow.reported", on_reported)
+        await self.subscribe(adapter, "devices.*.shadow.desired", on_desired)
+
+        # The broker picked the "desired" consumer for a reported update
+        await adapter._process_message(
+            self.message("devices.wh-1.shadow.reported", "tag-desired"), None
+        )
+
+        on_reported.assert_awaited_once_with({"temperature": 50})
+        on_desired.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unsubscribed_pattern_no_longer_routed(self, adapter):
+        """Unsubscribing removes the pattern from the routing index."""
+        on_reported, on_desired = AsyncMock(), AsyncMock()
+        reported = await self.subscribe(
+            adapter, "devices.*.shadow.reported", on_reported
+        )
+        await self.subscribe(adapter, "devices.#", on_desired)
+        await adapter.unsubscribe(reported)
+
+        await adapter._process_message(
+            self.message("devices.wh-1.shadow.reported", "tag-desired"), None
+        )
+
+        on_reported.assert_not_awaited()
+        on_desired.assert_awaited_once()
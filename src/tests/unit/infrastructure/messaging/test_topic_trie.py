@@ -0,0 +1,295 @@
+"""
+Unit tests for the topic trie subscription index and its use by the
+MQTT-WebSocket bridge for routing and forwarding.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.infrastructure.messaging.topic_trie import TopicTrie
+from src.infrastructure.websocket.mqtt_websocket_bridge import (
+    MQTTWebSocketBridge,
+    device_topic_patterns,
+)
+from src.infrastructure.websocket.websocket_service import (
+    WebSocketClient,
+    WebSocketService,
+)
+from src.utils import json_codec
+
+
+@pytest.mark.unit
+class TestTopicTrie:
+    """Tests for wildcard matching and incremental updates."""
+
+    @pytest.mark.parametrize(
+        "pattern,topic,expected",
+        [
+            ("devices/wh-1/telemetry", "devices/wh-1/telemetry", True),
+            ("devices/wh-1/telemetry", "devices/wh-2/telemetry", False),
+            ("devices/+/telemetry", "devices/wh-1/telemetry", True),
+            ("devices/+/telemetry", "devices/wh-1/shadow/update", False),
+            ("devices/+", "devices", False),
+            ("devices/#", "devices/wh-1/shadow/update", True),
+            ("devices/#", "devices", True),
+            ("devices/#", "alerts/high", False),
+            ("#", "alerts/high", True),
+            ("+/+/shadow/#", "devices/wh-1/shadow/delta", True),
+            ("+/+/shadow/#", "devices/wh-1/telemetry", False),
+        ],
+    )
+    def test_match_follows_mqtt_wildcards(self, pattern, topic, expected):
+        """'+' matches one level and '#' the parent and any levels below."""
+        trie = TopicTrie()
+        trie.add(pattern, "client-1")
+
+        assert (trie.match(topic) == {"client-1"}) is expected
+
+    def test_match_returns_exact_recipient_set(self):
+        """One lookup returns every subscriber once, and only those."""
+        trie = TopicTrie()
+        trie.add("devices/+/telemetry", "a")
+        trie.add("devices/wh-1/#", "a")
+        trie.add("devices/wh-1/telemetry", "b")
+        trie.add("devices/wh-2/telemetry", "c")
+        trie.add("alerts/#", "d")
+
+        assert trie.match("devices/wh-1/telemetry") == {"a", "b"}
+
+    def test_remove_prunes_branches(self):
+        """Removing the last subscriber of a pattern drops it from the index."""
+        trie = TopicTrie()
+        trie.add("devices/+/telemetry", "a")
+        trie.add("devices/+/telemetry", "b")
+
+        assert trie.remove("devices/+/telemetry", "a")
+        assert trie.match("devices/wh-1/telemetry") == {"b"}
+        assert trie.remove("devices/+/telemetry", "b")
+        assert not trie.remove("devices/+/telemetry", "b")
+        assert len(trie) == 0
+        assert trie._root.is_empty()
+
+    def test_add_is_idempotent(self):
+        """Adding the same subscription twice reports it as existing."""
+        trie = TopicTrie()
+
+        assert trie.add("alerts/#", "a")
+        assert not trie.add("alerts/#", "a")
+        assert trie.subscribers("alerts/#") == {"a"}
+
+    @pytest.mark.parametrize("pattern", ["devices/#/telemetry", "alerts/high#"])
+    def test_invalid_multi_level_wildcard_rejected(self, pattern):
+        """'#' must be the whole last level."""
+        with pytest.raises(ValueError):
+            TopicTrie().add(pattern, "a")
+
+    def test_custom_separator_and_wildcards(self):
+        """AMQP-style topics use '.' and '*'."""
+        trie = TopicTrie(separator=".", single_wildcard="*")
+        trie.add("devices.*.shadow.#", "a")
+
+        assert trie.match("devices.wh-1.shadow.reported") == {"a"}
+        assert trie.match("devices.wh-1.telemetry") == set()
+
+    def test_clear_value(self):
+        """Clearing a subscriber removes all of its patterns only."""
+        trie = TopicTrie()
+        trie.add("alerts/#", "a")
+        trie.add("devices/+/status", "a")
+        trie.add("alerts/#", "b")
+
+        trie.clear("a")
+
+        assert trie.match("alerts/high") == {"b"}
+        assert trie.match("devices/wh-1/status") == set()
+
+
+@pytest.mark.unit
+class TestBridgeTopicRouting:
+    """Tests for MQTT-WebSocket bridge routing through the topic tries."""
+
+    @pytest.fixture
+    def websocket_service(self):
+        """Create a WebSocket service with two connected clients."""
+        service = MagicMock()
+        service.loop = None
+        service.clients = {
+            "client-1": MagicMock(is_connected=True, send=AsyncMock()),
+            "client-2": MagicMock(is_connected=True, send=AsyncMock()),
+        }
+        return service
+
+    @pytest.fixture
+    def bridge(self, websocket_service):
+        """Create a bridge whose WebSocket manager returns the mock service."""
+        with patch(
+            "src.infrastructure.websocket.mqtt_websocket_bridge."
+            "WebSocketServiceManager.get_instance"
+        ) as get_instance:
+            get_instance.return_value = websocket_service
+            yield MQTTWebSocketBridge(MagicMock())
+
+    @staticmethod
+    def message(topic, payload=b'{"temperature": 50}'):
+        msg = MagicMock()
+        msg.topic = topic
+        msg.payload = payload
+        return msg
+
+    @pytest.mark.asyncio
+    async def test_forwards_only_to_subscribed_clients(self, bridge, websocket_service):
+        """Messages reach only clients with a matching subscription."""
+        bridge.add_client_subscription("client-1", "devices/+/telemetry")
+        bridge.add_client_subscription("client-2", "alerts/#")
+
+        await bridge._handle_mqtt_message(self.message("devices/wh-1/telemetry"))
+
+        clients = websocket_service.clients
+        clients["client-1"].send.assert_awaited_once()
+        clients["client-2"].send.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unsubscribed_client_not_forwarded(self, bridge, websocket_service):
+        """Removing a client drops it from routing immediately."""
+        bridge.set_client_subscriptions("client-1", ["devices/#", "alerts/#"])
+        bridge.set_client_subscriptions("client-1", ["alerts/#"])
+        assert bridge.get_client_subscriptions("client-1") == {"alerts/#"}
+        bridge.remove_client("client-1")
+
+        await bridge._handle_mqtt_message(self.message("alerts/high"))
+
+        clients = websocket_service.clients
+        clients["client-1"].send.assert_not_awaited()
+        assert bridge.get_client_subscriptions("client-1") == set()
+
+    def test_invalid_client_subscription_ignored(self, bridge):
+        """Invalid client patterns are rejected without raising."""
+        assert not bridge.add_client_subscription("client-1", "devices/#/status")
+
+    @pytest.mark.asyncio
+    async def test_handlers_called_for_matching_patterns(self, bridge):
+        """Exact and wildcard handlers run once each for a matching topic."""
+        exact, wildcard, other = AsyncMock(), AsyncMock(), AsyncMock()
+        bridge.register_message_handler("devices/wh-1/status", exact)
+        bridge.register_message_handler("devices/+/status", wildcard)
+        bridge.register_message_handler("alerts/#", other)
+
+        await bridge._call_topic_handlers("devices/wh-1/status", {"online": True})
+
+        exact.assert_awaited_once_with("devices/wh-1/status", {"online": True})
+        wildcard.assert_awaited_once_with("devices/wh-1/status", {"online": True})
+        other.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unregistered_handler_not_called(self, bridge):
+        """Unregistering the last handler removes the pattern from the index."""
+        handler = AsyncMock()
+        bridge.register_message_handler("devices/+/status", handler)
+        bridge.unregister_message_handler("devices/+/status", handler)
+
+        await bridge._call_topic_handlers("devices/wh-1/status", {})
+
+        handler.assert_not_awaited()
+        assert len(bridge._handler_index) == 0
+
+    @pytest.mark.asyncio
+    async def test_splice_mode_keeps_original_payload(self, bridge, websocket_service):
+        """Splice mode appends _meta to the payload text without re-encoding."""
+        bridge.add_client_subscription("client-1", "devices/#")
+
+        with patch.object(json_codec, "dumps", wraps=json_codec.dumps) as dumps:
+            await bridge._handle_mqtt_message(
+                self.message("devices/wh-1/telemetry", b'{"temperature": 50}')
+            )
+
+        dumps.assert_not_called()
+        sent = websocket_service.clients["client-1"].send
+        text = sent.await_args.args[0]
+        assert text.startswith('{"temperature": 50,"_meta":')
+        assert json.loads(text)["_meta"]["topic"] == "devices/wh-1/telemetry"
+
+    @pytest.mark.asyncio
+    async def test_payload_parsed_once_for_handlers(self, bridge, websocket_service):
+        """With a matching handler the payload is decoded once and reused."""
+        handler = AsyncMock()
+        bridge.register_message_handler("devices/+/telemetry", handler)
+        bridge.add_client_subscription("client-1", "devices/#")
+
+        with patch.object(json_codec, "loads", wraps=json_codec.loads) as loads:
+            await bridge._handle_mqtt_message(
+                self.message("devices/wh-1/telemetry", b'{"temperature": 50}')
+            )
+
+        assert loads.call_count == 1
+        handler.assert_awaited_once_with("devices/wh-1/telemetry", {"temperature": 50})
+        sent = websocket_service.clients["client-1"].send
+        assert json.loads(sent.await_args.args[0])["temperature"] == 50
+
+    @pytest.mark.asyncio
+    async def test_splice_mode_forwards_malformed_payload_unchanged(
+        self, bridge, websocket_service
+    ):
+        """A truncated object is forwarded as text, without a _meta envelope."""
+        bridge.add_client_subscription("client-1", "devices/#")
+
+        await bridge._handle_mqtt_message(
+            self.message("devices/wh-1/telemetry", b'{"temperature": 5')
+        )
+
+        sent = websocket_service.clients["client-1"].send
+        sent.assert_awaited_once_with('{"temperature": 5')
+
+    @pytest.mark.asyncio
+    async def test_non_json_payload_forwarded_unchanged(
+        self, bridge, websocket_service
+    ):
+        """Payloads that are not JSON objects are forwarded as text."""
+        bridge.add_client_subscription("client-1", "devices/#")
+
+        await bridge._handle_mqtt_message(
+            self.message("devices/wh-1/status", b"online")
+        )
+
+        sent = websocket_service.clients["client-1"].send
+        sent.assert_awaited_once_with("online")
+
+    @pytest.mark.asyncio
+    async def test_clients_registered_when_they_connect(self):
+        """Clients of the WebSocket service are routed by the devices they follow."""
+        service = WebSocketService()
+        with patch(
+            "src.infrastructure.websocket.mqtt_websocket_bridge."
+            "WebSocketServiceManager.get_instance",
+            return_value=service,
+        ):
+            bridge = MQTTWebSocketBridge(MagicMock())
+        client = WebSocketClient(
+            MagicMock(), "client-1", on_subscriptions_changed=service._notify_subscriptions
+        )
+        client.send = AsyncMock()
+        service.clients["client-1"] = client
+
+        service._notify_subscriptions(client)
+        assert bridge.get_client_subscriptions("client-1") == set(
+            device_topic_patterns(set())
+        )
+
+        client.subscriptions.add("wh-1")
+        client._subscriptions_changed()
+        await bridge._handle_mqtt_message(self.message("devices/wh-2/telemetry"))
+        await bridge._handle_mqtt_message(self.message("devices/wh-1/telemetry"))
+
+        client.send.assert_awaited_once()
+        assert json.loads(client.send.await_args.args[0])["_meta"]["topic"] == (
+            "devices/wh-1/telemetry"
+        )
+
+        client.is_connected = False
+        service._notify_subscriptions(client)
+        assert bridge.get_client_subscriptions("client-1") == set()
+
+    def test_unknown_forward_mode_rejected(self):
+        """Only splice and parse forwarding modes are accepted."""
+        with pytest.raises(ValueError):
+            MQTTWebSocketBridge(MagicMock(), forward_mode="raw")
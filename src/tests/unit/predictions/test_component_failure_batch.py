@@ -0,0 +1,164 @@
+"""
+Tests for fleet-wide component failure scoring.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.predictions.maintenance.component_failure import (
+    COMPONENT_FAILURE_PROPERTY,
+    DEFAULT_COMPONENT_PROBABILITIES,
+    ComponentFailurePrediction,
+)
+
+
+def make_device_features(rng, device_id, periods):
+    """Random telemetry and metadata for one device."""
+    timestamps = pd.date_range(end=datetime.now(), periods=periods, freq="h")
+    temperatures = np.linspace(60, 60 + rng.normal(0, 8), periods) + rng.normal(
+        0, rng.uniform(0.5, 5), periods
+    )
+    pressures = 2.5 + rng.normal(0, rng.uniform(0.05, 0.6), periods)
+    return {
+        "device_id": device_id,
+        "timestamp": timestamps.tolist(),
+        "temperature": temperatures.tolist(),
+        "pressure": pressures.tolist(),
+        "energy_usage": (1200 + rng.normal(0, 50, periods)).tolist(),
+        "flow_rate": (10 + rng.normal(0, 0.3, periods)).tolist(),
+        "heating_cycles": (15 + rng.normal(0, 1, periods)).tolist(),
+        "total_operation_hours": float(rng.uniform(0, 100000)),
+        "maintenance_history": [
+            {
+                "type": "anode_inspection",
+                "date": datetime.now() - timedelta(days=int(rng.integers(1, 400))),
+            }
+        ],
+        "heater_type": "COMMERCIAL" if rng.random() < 0.5 else "RESIDENTIAL",
+        "diagnostic_codes": [
+            {
+                "code": "T001",
+                "description": "Thermostat calibration drift",
+                "severity": "WARNING",
+                "timestamp": datetime.now() - timedelta(days=10),
+            }
+        ]
+        if rng.random() < 0.5
+        else [],
+    }
+
+
+def to_fleet_frame(devices):
+    """Stack per-device telemetry into one frame, shuffled."""
+    columns = [
+        "timestamp",
+        "temperature",
+        "pressure",
+        "energy_usage",
+        "flow_rate",
+        "heating_cycles",
+    ]
+    frames = [
+        pd.DataFrame({c: d[c] for c in columns}).assign(device_id=d["device_id"])
+        for d in devices
+    ]
+    return pd.concat(frames).sample(frac=1, random_state=0)
+
+
+@pytest.mark.unit
+class TestComponentFailureBatch:
+    """Tests for ComponentFailurePrediction batch scoring."""
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_per_device_predictions(self):
+        """Grouped scoring gives the same result as scoring each device alone."""
+        rng = np.random.default_rng(42)
+        devices = [
+            make_device_features(rng, f"wh-{i}", int(rng.integers(2, 60)))
+            for i in range(25)
+        ]
+        model = ComponentFailurePrediction()
+
+        batch = model.score_batch(
+            to_fleet_frame(devices), {d["device_id"]: d for d in devices}
+        )
+
+        for device in devices:
+            single = await model.predict(device["device_id"], device)
+            result = batch[device["device_id"]]
+            assert result.predicted_value == pytest.approx(single.predicted_value)
+            assert result.confidence == pytest.approx(single.confidence)
+            assert result.raw_details["heater_type"] == single.raw_details["heater_type"]
+            for component, probability in single.raw_details["components"].items():
+                assert result.raw_details["components"][component] == pytest.approx(
+                    probability
+                )
+
+    def test_device_without_telemetry_gets_defaults(self):
+        """Devices with no readings keep the default component probabilities."""
+        model = ComponentFailurePrediction()
+
+        results = model.score_batch(
+            pd.DataFrame(columns=["device_id", "timestamp", "temperature"]),
+            {"wh-1": {"heater_type": "RESIDENTIAL", "diagnostic_codes": []}},
+        )
+
+        assert results["wh-1"].raw_details["components"] == (
+            DEFAULT_COMPONENT_PROBABILITIES
+        )
+
+    def test_pivot_readings(self):
+        """Long-format readings become one column per metric."""
+        model = ComponentFailurePrediction()
+        now = datetime.now()
+
+        df = model._pivot_readings(
+            [
+                ("wh-1", now, "temperature", 60.5),
+                ("wh-1", now, "pressure", "2.5"),
+                ("wh-2", now, "temperature", 55.0),
+            ]
+        )
+
+        assert len(df) == 2
+        row = df[df["device_id"] == "wh-1"].iloc[0]
+        assert row["temperature"] == 60.5
+        assert row["pressure"] == 2.5
+        assert np.isnan(df[df["device_id"] == "wh-2"].iloc[0]["pressure"])
+
+    @pytest.mark.asyncio
+    async def test_predict_batch_writes_results_in_bulk(self):
+        """Loaded devices are scored together and updated with one statement."""
+        rng = np.random.default_rng(7)
+        devices = [make_device_features(rng, f"wh-{i}", 30) for i in range(3)]
+        model = ComponentFailurePrediction()
+        model._fetch_fleet_data_from_db = AsyncMock(
+            return_value=(
+                to_fleet_frame(devices),
+                {d["device_id"]: d for d in devices},
+                {d["device_id"]: {"heater_type": d["heater_type"]} for d in devices},
+            )
+        )
+
+        session = AsyncMock()
+
+        async def fake_session():
+            yield session
+
+        with patch(
+            "src.predictions.maintenance.component_failure.get_db_session",
+            fake_session,
+        ):
+            results = await model.predict_batch(["wh-0", "wh-1", "wh-2", "wh-0"])
+
+        assert list(results) == ["wh-0", "wh-1", "wh-2"]
+        model._fetch_fleet_data_from_db.assert_awaited_once()
+        session.execute.assert_awaited_once()
+        rows = session.execute.await_args.args[1]
+        assert [row["id"] for row in rows] == ["wh-0", "wh-1", "wh-2"]
+        stored = rows[0]["properties"][COMPONENT_FAILURE_PROPERTY]
+        assert stored["probability"] == results["wh-0"].predicted_value
+        assert rows[0]["properties"]["heater_type"] == devices[0]["heater_type"]
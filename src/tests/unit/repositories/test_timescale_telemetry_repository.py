@@ -0,0 +1,58 @@
+"""
+Unit tests for the TimescaleDB telemetry repository queries.
+"""
+import pytest
+
+from src.repositories.timescale_telemetry_repository import (
+    format_operational_summary,
+    operational_summary_sql,
+)
+
+
+@pytest.mark.unit
+class TestOperationalSummarySql:
+    """Tests for operational_summary_sql."""
+
+    def test_cycle_starts_counted_from_raw_readings(self):
+        """Cycle starts come from lag() over raw readings, so late rows count."""
+        query = operational_summary_sql(
+            "$1", all_devices=False, include_maintenance=False
+        )
+
+        assert "LAG(heating_status)" in query
+        assert "FROM water_heater_telemetry\n" in query
+        assert "heating_cycle_start" not in query
+        # Both the aggregate and the raw scan are limited to the listed devices
+        assert query.count("device_id = ANY($1)") == 2
+
+    def test_all_devices_scope(self):
+        """Without a device list every registered water heater is summarized."""
+        query = operational_summary_sql(
+            "$1", all_devices=True, include_maintenance=True
+        )
+
+        assert "$1" not in query
+        assert query.count("device_registry") == 2
+        assert "LATERAL" in query
+
+    def test_format_without_maintenance(self):
+        """Rows without maintenance columns produce only the operational section."""
+        row = {
+            "device_id": "wh-1",
+            "avg_temperature": 60.0,
+            "heating_cycles_24h": 3,
+            "total_heating_time_24h": 120,
+            "energy_used_24h": 9.0,
+        }
+
+        summary = format_operational_summary(row, include_maintenance=False)
+
+        assert summary == {
+            "device_id": "wh-1",
+            "operational": {
+                "avg_temperature": 60.0,
+                "heating_cycles_24h": 3,
+                "total_heating_time_24h": 120,
+                "energy_used_24h": 9.0,
+            },
+        }
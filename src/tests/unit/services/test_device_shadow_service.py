@@ -0,0 +1,123 @@
+"""
+Tests for the device shadow service update path
+"""
+import asyncio
+
+import pytest
+
+from src.services.device_shadow import DeviceShadowService, InMemoryShadowStorage
+
+
+class TestDeviceShadowServiceUpdate:
+    """Test cases for atomic shadow updates"""
+
+    def setup_method(self):
+        """Setup for each test method."""
+        self.storage = InMemoryShadowStorage()
+        self.service = DeviceShadowService(storage_provider=self.storage)
+
+    @pytest.mark.asyncio
+    async def test_update_merges_state_and_bumps_version(self):
+        """Test that reported and desired fields are merged into the shadow."""
+        await self.service.create_device_shadow(
+            "wh-001", {"temperature": 50.0, "status": "ONLINE"}, {"mode": "ECO"}
+        )
+
+        result = await self.service.update_device_shadow(
+            "wh-001",
+            reported_state={"temperature": 52.0},
+            desired_state={"mode": "VACATION"},
+        )
+
+        shadow = await self.service.get_device_shadow("wh-001")
+        assert result["version"] == 2
+        assert shadow["version"] == 2
+        assert shadow["reported"] == {"temperature": 52.0, "status": "ONLINE"}
+        assert shadow["desired"] == {"mode": "VACATION"}
+
+    @pytest.mark.asyncio
+    async def test_update_keeps_previous_version_in_history(self):
+        """Test that the pre-update document is preserved unchanged in history."""
+        await self.service.create_device_shadow("wh-001", {"temperature": 50.0})
+
+        await self.service.update_device_shadow("wh-001", {"temperature": 52.0})
+
+        history = await self.storage.get_shadow_history("wh-001", 10)
+        assert history[-1]["version"] == 1
+        assert history[-1]["reported"]["temperature"] == 50.0
+
+    @pytest.mark.asyncio
+    async def test_update_with_stale_version_raises_conflict(self):
+        """Test that a stale expected version is rejected."""
+        await self.service.create_device_shadow("wh-001", {"temperature": 50.0})
+        await self.service.update_device_shadow("wh-001", {"temperature": 51.0})
+
+        with pytest.raises(ValueError, match="Version conflict"):
+            await self.service.update_device_shadow(
+                "wh-001", {"temperature": 52.0}, version=1
+            )
+
+        shadow = await self.service.get_device_shadow("wh-001")
+        assert shadow["reported"]["temperature"] == 51.0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_updates_are_not_lost(self):
+        """Test that concurrent updates each produce their own version."""
+        await self.service.create_device_shadow("wh-001", {})
+
+        await asyncio.gather(
+            *[
+                self.service.update_device_shadow("wh-001", {f"sensor_{i}": i})
+                for i in range(10)
+            ]
+        )
+
+        shadow = await self.service.get_device_shadow("wh-001")
+        assert shadow["version"] == 11
+        assert len(shadow["reported"]) == 10
+
+    @pytest.mark.asyncio
+    async def test_update_missing_shadow_raises(self):
+        """Test that updating an unknown device raises ValueError."""
+        with pytest.raises(ValueError, match="No shadow document exists"):
+            await self.service.update_device_shadow("missing", {"temperature": 1})
+
+
+class TestDeviceShadowServiceBulkRead:
+    """Test cases for bulk and streaming shadow reads"""
+
+    def setup_method(self):
+        """Setup for each test method."""
+        self.service = DeviceShadowService(storage_provider=InMemoryShadowStorage())
+
+    @pytest.mark.asyncio
+    async def test_get_device_shadows_projects_fields(self):
+        """Test that only requested fields are returned and missing ids skipped."""
+        await self.service.create_device_shadow(
+            "wh-001", {"temperature": 50.0, "pressure": 2.1}, {"mode": "ECO"}
+        )
+        await self.service.create_device_shadow("wh-002", {"temperature": 60.0})
+
+        shadows = await self.service.get_device_shadows(
+            ["wh-001", "wh-002", "missing"], fields=["reported.temperature"]
+        )
+
+        assert set(shadows) == {"wh-001", "wh-002"}
+        assert shadows["wh-001"] == {
+            "device_id": "wh-001",
+            "reported": {"temperature": 50.0},
+        }
+
+    @pytest.mark.asyncio
+    async def test_iter_all_shadows_streams_every_shadow(self):
+        """Test that the streaming iterator yields each shadow with its id."""
+        for i in range(3):
+            await self.service.create_device_shadow(f"wh-00{i}", {"temperature": i})
+
+        device_ids = [
+            shadow["device_id"]
+            async for shadow in self.service.iter_all_shadows(fields=["version"])
+        ]
+
+        assert sorted(device_ids) == ["wh-000", "wh-001", "wh-002"]
+        assert len(await self.service.list_all_shadows()) == 3
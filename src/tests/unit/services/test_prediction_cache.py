@@ -0,0 +1,152 @@
+"""
+Unit tests for the bounded, event-invalidated prediction cache.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.infrastructure.events.event_bus import EventBus
+from src.predictions.interfaces import PredictionResult
+from src.services.prediction_cache import PredictionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_result(device_id, prediction_type="anomaly_detection"):
+    return PredictionResult(
+        prediction_type=prediction_type,
+        device_id=device_id,
+        predicted_value=1.0,
+        confidence=0.9,
+        features_used=[],
+        timestamp=datetime.now(),
+        recommended_actions=[],
+        raw_details={},
+    )
+
+
+@pytest.mark.unit
+class TestPredictionCache:
+    """Tests for PredictionCache."""
+
+    def test_ttl_per_prediction_type(self):
+        """Each prediction type expires after its own TTL."""
+        clock = FakeClock()
+        cache = PredictionCache(
+            ttls={"anomaly_detection": 10, "lifespan_estimation": 100}, clock=clock
+        )
+        cache.put("wh-1", "anomaly_detection", make_result("wh-1"))
+        cache.put("wh-1", "lifespan_estimation", make_result("wh-1"))
+
+        clock.now = 50
+        assert cache.get("wh-1", "anomaly_detection") is None
+        assert cache.get("wh-1", "lifespan_estimation") is not None
+        assert cache.stats()["expirations"] == 1
+
+    def test_evicts_least_recently_used(self):
+        """The cache never holds more than max_size predictions."""
+        cache = PredictionCache(max_size=2)
+        cache.put("wh-1", "anomaly_detection", make_result("wh-1"))
+        cache.put("wh-2", "anomaly_detection", make_result("wh-2"))
+        cache.get("wh-1", "anomaly_detection")
+        cache.put("wh-3", "anomaly_detection", make_result("wh-3"))
+
+        assert len(cache) == 2
+        assert cache.get("wh-2", "anomaly_detection") is None
+        assert cache.get("wh-1", "anomaly_detection") is not None
+        assert cache.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_compute_once(self):
+        """Requests for the same prediction share one computation."""
+        cache = PredictionCache()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return make_result("wh-1")
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("wh-1", "anomaly_detection", compute) for _ in range(5))
+        )
+
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        stats = cache.stats()
+        assert stats["shared_computations"] == 4
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failure_raised_to_waiters_and_not_cached(self):
+        """A failing computation raises for every caller and caches nothing."""
+        cache = PredictionCache()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("model failed")
+
+        results = await asyncio.gather(
+            cache.get_or_compute("wh-1", "anomaly_detection", compute),
+            cache.get_or_compute("wh-1", "anomaly_detection", compute),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_computation_discards_result(self):
+        """A result computed from data older than an invalidation is not stored."""
+        cache = PredictionCache()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return make_result("wh-1")
+
+        task = asyncio.create_task(
+            cache.get_or_compute("wh-1", "anomaly_detection", compute)
+        )
+        await asyncio.sleep(0)
+        cache.invalidate_device("wh-1")
+        release.set()
+
+        assert await task is not None
+        assert cache.get("wh-1", "anomaly_detection") is None
+
+    @pytest.mark.asyncio
+    async def test_device_events_invalidate(self):
+        """Reading, shadow and maintenance events drop the device's predictions."""
+        bus = EventBus()
+        cache = PredictionCache()
+        cache.subscribe(bus)
+
+        for topic in ("water_heater.reading_added", "shadow.updated", "maintenance.record_added"):
+            cache.put("wh-1", "anomaly_detection", make_result("wh-1"))
+            cache.put("wh-2", "anomaly_detection", make_result("wh-2"))
+
+            await bus.publish(topic, {"device_id": "wh-1"}, wait=True)
+
+            assert cache.get("wh-1", "anomaly_detection") is None
+            assert cache.get("wh-2", "anomaly_detection") is not None
+
+    def test_hit_rate(self):
+        """Hit rate counts lookups that found a live entry."""
+        cache = PredictionCache()
+        cache.put("wh-1", "anomaly_detection", make_result("wh-1"))
+
+        cache.get("wh-1", "anomaly_detection")
+        cache.get("wh-1", "anomaly_detection")
+        cache.get("wh-1", "multi_factor")
+        cache.get("wh-2", "anomaly_detection")
+
+        assert cache.stats()["hit_rate"] == 0.5
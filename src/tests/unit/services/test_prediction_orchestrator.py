@@ -0,0 +1,149 @@
+"""
+Unit tests for running all prediction models for a device concurrently.
+"""
+import asyncio
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.predictions.interfaces import PredictionResult
+from src.services.prediction import PREDICTION_TYPES, PredictionService
+from src.services.prediction_orchestrator import PredictionOrchestrator
+
+
+def make_result(device_id, prediction_type):
+    return PredictionResult(
+        prediction_type=prediction_type,
+        device_id=device_id,
+        predicted_value=1.0,
+        confidence=0.9,
+        features_used=[],
+        timestamp=datetime.now(),
+        recommended_actions=[],
+        raw_details={},
+    )
+
+
+class AsyncModel:
+    """Async model that waits `delay` seconds and records its input."""
+
+    def __init__(self, prediction_type, delay=0.0):
+        self.prediction_type = prediction_type
+        self.delay = delay
+        self.features = None
+
+    async def predict(self, device_id, features):
+        self.features = features
+        await asyncio.sleep(self.delay)
+        return make_result(device_id, self.prediction_type)
+
+
+class SyncModel:
+    """Synchronous model recording the thread it ran on."""
+
+    def __init__(self, prediction_type):
+        self.prediction_type = prediction_type
+        self.thread = None
+
+    def predict(self, device_id, features):
+        self.thread = threading.get_ident()
+        return make_result(device_id, self.prediction_type)
+
+
+@pytest.fixture
+def service():
+    service = PredictionService()
+    water_heater = SimpleNamespace(
+        name="Heater",
+        target_temperature=50.0,
+        min_temperature=40.0,
+        max_temperature=80.0,
+        readings=[],
+    )
+    service.water_heater_service = SimpleNamespace(
+        get_water_heater=AsyncMock(return_value=water_heater),
+        get_history=AsyncMock(return_value=[]),
+    )
+    service.prediction_models = {
+        "lifespan_estimation": AsyncModel("lifespan_estimation", delay=0.05),
+        "anomaly_detection": SyncModel("anomaly_detection"),
+        "usage_patterns": AsyncModel("usage_patterns", delay=0.05),
+        "multi_factor": SyncModel("multi_factor"),
+    }
+    return service
+
+
+@pytest.mark.unit
+class TestPredictionOrchestrator:
+    """Tests for PredictionOrchestrator."""
+
+    @pytest.mark.asyncio
+    async def test_fetches_device_once_and_runs_models_concurrently(self, service):
+        """The device is loaded once and the models overlap."""
+        orchestrator = PredictionOrchestrator(service)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await orchestrator.get_all_predictions("wh-001")
+        elapsed = loop.time() - started
+
+        assert list(results) == PREDICTION_TYPES
+        assert all(result is not None for result in results.values())
+        service.water_heater_service.get_water_heater.assert_awaited_once_with("wh-001")
+        service.water_heater_service.get_history.assert_awaited_once()
+        # Two 50ms models ran side by side
+        assert elapsed < 0.09
+
+    @pytest.mark.asyncio
+    async def test_sync_models_run_in_executor(self, service):
+        """Synchronous models do not run on the event loop thread."""
+        await PredictionOrchestrator(service).get_all_predictions("wh-001")
+
+        model = service.prediction_models["anomaly_detection"]
+        assert model.thread is not None
+        assert model.thread != threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_models_get_their_own_features(self, service):
+        """Advanced features are added to per-model copies of the base data."""
+        await PredictionOrchestrator(service).get_all_predictions("wh-001")
+
+        lifespan = service.prediction_models["lifespan_estimation"].features
+        usage = service.prediction_models["usage_patterns"].features
+        assert "user_preferences" in usage
+        assert "user_preferences" not in lifespan
+        assert lifespan["device_id"] == usage["device_id"] == "wh-001"
+
+    @pytest.mark.asyncio
+    async def test_slow_model_left_out(self, service):
+        """A model exceeding the timeout is None; the others still return."""
+        service.prediction_models["usage_patterns"].delay = 1.0
+        orchestrator = PredictionOrchestrator(service, timeout=0.1)
+
+        results = await orchestrator.get_all_predictions("wh-001")
+
+        assert results["usage_patterns"] is None
+        assert results["lifespan_estimation"] is not None
+        assert results["multi_factor"] is not None
+
+    @pytest.mark.asyncio
+    async def test_cached_predictions_skip_loading(self, service):
+        """Nothing is fetched when every prediction is cached."""
+        orchestrator = PredictionOrchestrator(service)
+        await orchestrator.get_all_predictions("wh-001")
+
+        await orchestrator.get_all_predictions("wh-001")
+
+        service.water_heater_service.get_water_heater.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_unknown_device(self, service):
+        """Every prediction is None when the device is not found."""
+        service.water_heater_service.get_water_heater.return_value = None
+
+        results = await PredictionOrchestrator(service).get_all_predictions("missing")
+
+        assert results == {t: None for t in PREDICTION_TYPES}
@@ -0,0 +1,245 @@
+"""
+Unit tests for delta shadow notifications and the subscription index.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.services.shadow_change_stream_listener import (
+    ShadowChangeEvent,
+    ShadowChangeStreamListener,
+)
+from src.services.shadow_notification_service import (
+    ShadowNotificationService,
+    ShadowSubscription,
+)
+
+FULL_DOCUMENT = {
+    "_id": "wh-001",
+    "reported": {"temperature": 75, "humidity": 50, "mode": "eco"},
+    "desired": {"temperature": 72},
+}
+
+
+def update_event(changed_fields, removed_fields=None):
+    return ShadowChangeEvent(
+        device_id="wh-001",
+        operation_type="update",
+        full_document=FULL_DOCUMENT,
+        changed_fields=changed_fields,
+        removed_fields=removed_fields,
+    )
+
+
+def sent(websocket):
+    """Notifications sent on a mock websocket."""
+    return [json.loads(c.args[0]) for c in websocket.send_text.await_args_list]
+
+
+@pytest.fixture
+def service():
+    return ShadowNotificationService(MagicMock())
+
+
+@pytest.mark.unit
+class TestShadowSubscriptionFilter:
+    """Tests for the compiled field filter."""
+
+    def test_exact_fields(self):
+        """Listed fields match; siblings do not."""
+        subscription = ShadowSubscription("wh-001", MagicMock(), ["reported.mode"])
+
+        assert subscription.field_is_subscribed("reported.mode")
+        assert not subscription.field_is_subscribed("reported.temperature")
+        assert not subscription.field_is_subscribed("desired.mode")
+
+    @pytest.mark.parametrize("entry", ["reported", "reported.*"])
+    def test_section_prefix(self, entry):
+        """A section entry covers every field and nested path below it."""
+        subscription = ShadowSubscription("wh-001", MagicMock(), [entry])
+
+        assert subscription.field_is_subscribed("reported.temperature")
+        assert subscription.field_is_subscribed("reported.sensors.inlet")
+        assert not subscription.field_is_subscribed("desired.temperature")
+        assert subscription.filter_section("reported", {"a": 1}) == {"a": 1}
+
+    def test_nested_field_under_subscribed_field(self):
+        """Paths below a subscribed field are included."""
+        subscription = ShadowSubscription("wh-001", MagicMock(), ["reported.sensors"])
+
+        assert subscription.field_is_subscribed("reported.sensors.inlet")
+        assert not subscription.field_is_subscribed("reported.sensorsx")
+
+    def test_parent_value_narrowed_to_subscribed_field(self):
+        """An object holding a subscribed nested field is narrowed to it."""
+        subscription = ShadowSubscription(
+            "wh-001", MagicMock(), ["reported.sensors.inlet"]
+        )
+        state = {"sensors": {"inlet": 40, "outlet": 60}, "mode": "eco"}
+
+        assert subscription.field_is_affected("reported.sensors")
+        assert not subscription.field_is_affected("reported.mode")
+        assert subscription.filter_section("reported", state) == {
+            "sensors": {"inlet": 40}
+        }
+
+
+@pytest.mark.unit
+class TestDeltaNotifications:
+    """Tests for notifications built from the change stream's updated fields."""
+
+    def test_update_carries_only_changed_fields(self, service):
+        """Unchanged fields of the full document are not sent."""
+        subscription = ShadowSubscription("wh-001", MagicMock())
+
+        data = service._extract_notification_data(
+            update_event({"reported.temperature": 76, "version": 3}), subscription
+        )
+
+        assert data["delta"] is True
+        assert data["reported"] == {"temperature": 76}
+        assert "desired" not in data
+
+    def test_update_filtered_by_subscription(self, service):
+        """Changed fields outside the subscription are left out."""
+        subscription = ShadowSubscription(
+            "wh-001", MagicMock(), ["reported.temperature"]
+        )
+        event = update_event(
+            {"reported.humidity": 55, "desired.temperature": 70},
+            removed_fields=["reported.temperature", "reported.mode"],
+        )
+
+        data = service._extract_notification_data(event, subscription)
+
+        assert "reported" not in data
+        assert "desired" not in data
+        assert data["removed"] == ["reported.temperature"]
+
+    def test_update_outside_subscription_not_sent(self, service):
+        """An update touching no subscribed field produces no notification."""
+        subscription = ShadowSubscription(
+            "wh-001", MagicMock(), ["reported.temperature"]
+        )
+        event = update_event(
+            {"reported.humidity": 55, "version": 4},
+            removed_fields=["reported.mode"],
+        )
+
+        assert service._extract_notification_data(event, subscription) is None
+
+    def test_updated_parent_matches_nested_subscription(self, service):
+        """An updated parent object carries only the subscribed nested field."""
+        subscription = ShadowSubscription(
+            "wh-001", MagicMock(), ["reported.sensors.inlet"]
+        )
+        event = update_event(
+            {"reported.sensors": {"inlet": 41, "outlet": 61}, "reported.mode": "eco"},
+            removed_fields=["reported.sensors", "reported.humidity"],
+        )
+
+        data = service._extract_notification_data(event, subscription)
+
+        assert data["delta"] is True
+        assert data["reported"] == {"sensors": {"inlet": 41}}
+        assert data["removed"] == ["reported.sensors"]
+
+    def test_replaced_section_filtered(self, service):
+        """A section replaced as a whole is filtered field by field."""
+        subscription = ShadowSubscription("wh-001", MagicMock(), ["reported.mode"])
+
+        data = service._extract_notification_data(
+            update_event({"reported": {"mode": "boost", "humidity": 40}}),
+            subscription,
+        )
+
+        assert data["reported"] == {"mode": "boost"}
+
+    def test_update_without_changed_fields_sends_state(self, service):
+        """Without a field list the filtered full state is sent."""
+        subscription = ShadowSubscription("wh-001", MagicMock(), ["desired"])
+
+        data = service._extract_notification_data(update_event(None), subscription)
+
+        assert "delta" not in data
+        assert data["desired"] == {"temperature": 72}
+        assert "reported" not in data
+
+    def test_listener_keeps_removed_fields(self):
+        """The listener passes updatedFields and removedFields through."""
+        listener = ShadowChangeStreamListener()
+
+        event = listener._create_shadow_change_event(
+            {
+                "operationType": "update",
+                "documentKey": {"_id": "wh-001"},
+                "fullDocument": FULL_DOCUMENT,
+                "updateDescription": {
+                    "updatedFields": {"reported.temperature": 76},
+                    "removedFields": ["reported.mode"],
+                },
+            }
+        )
+
+        assert event.changed_fields == {"reported.temperature": 76}
+        assert event.removed_fields == ["reported.mode"]
+
+
+@pytest.mark.unit
+class TestSubscriptionIndex:
+    """Tests for looking up subscriptions by device."""
+
+    @pytest.mark.asyncio
+    async def test_only_device_subscribers_notified(self, service):
+        """Events reach the subscribers of their device only."""
+        watcher, other = AsyncMock(), AsyncMock()
+        await service.subscribe("wh-001", watcher)
+        await service.subscribe("wh-002", other)
+
+        await service.handle_shadow_change_event(
+            update_event({"reported.temperature": 76})
+        )
+
+        (notification,) = sent(watcher)
+        assert notification["reported"] == {"temperature": 76}
+        other.send_text.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_empty_delta_not_sent(self, service):
+        """Subscribers whose fields did not change receive nothing."""
+        websocket = AsyncMock()
+        await service.subscribe("wh-001", websocket, ["desired.temperature"])
+
+        await service.handle_shadow_change_event(
+            update_event({"reported.temperature": 76})
+        )
+
+        websocket.send_text.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_resubscribe_moves_websocket(self, service):
+        """Subscribing again replaces the websocket's previous subscription."""
+        websocket = AsyncMock()
+        await service.subscribe("wh-002", websocket)
+        await service.subscribe("wh-001", websocket, ["reported.temperature"])
+
+        assert [s.device_id for s in service.subscriptions] == ["wh-001"]
+        assert "wh-002" not in service._subscriptions_by_device
+
+        await service.unsubscribe(websocket)
+
+        assert service.subscriptions == []
+        assert service._subscriptions_by_device == {}
+
+    @pytest.mark.asyncio
+    async def test_cleanup_removes_from_index(self, service):
+        """Disconnected clients are dropped from the device index."""
+        alive, dead = AsyncMock(), AsyncMock()
+        dead.send_text.side_effect = RuntimeError("closed")
+        await service.subscribe("wh-001", alive)
+        await service.subscribe("wh-001", dead)
+
+        await service.cleanup_disconnected_clients()
+
+        assert list(service._subscriptions_by_device["wh-001"]) == [alive]
@@ -0,0 +1,203 @@
+"""
+Unit tests for streaming telemetry anomaly detection.
+"""
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from src.infrastructure.events.event_bus import EventBus
+from src.infrastructure.messaging.message_bus import LocalMessageBus
+from src.infrastructure.messaging.mqtt_adapter import MqttAdapter
+from src.utils import json_codec
+from src.services.streaming_anomaly_detector import (
+    ALERTS_CHANNEL,
+    ANOMALY_TOPIC,
+    StreamingAnomalyDetector,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def feed(detector, values, device_id="wh-1", metric="temperature"):
+    """Process a series of values, returning every anomaly reported."""
+    anomalies = []
+    for value in values:
+        anomalies.extend(detector.process(device_id, {metric: value}))
+    return anomalies
+
+
+@pytest.mark.unit
+class TestStreamingAnomalyDetector:
+    """Tests for StreamingAnomalyDetector."""
+
+    def test_steady_signal_is_quiet(self):
+        """Ordinary noise does not raise anomalies."""
+        detector = StreamingAnomalyDetector(cooldown=0)
+        values = np.random.default_rng(1).normal(60, 0.5, 2000)
+
+        assert feed(detector, values) == []
+        assert detector.stats()["samples"] == 2000
+
+    def test_spike_detected(self):
+        """A single outlier is reported as a spike with its z-score."""
+        detector = StreamingAnomalyDetector(cooldown=0)
+        values = list(np.random.default_rng(2).normal(60, 0.5, 100))
+
+        feed(detector, values)
+        anomalies = detector.process("wh-1", {"temperature_current": 70.0})
+
+        assert len(anomalies) == 1
+        anomaly = anomalies[0]
+        assert anomaly["kind"] == "spike"
+        assert anomaly["metric"] == "temperature"
+        assert anomaly["direction"] == "increase"
+        assert anomaly["severity"] == "high"
+        assert anomaly["expected"] == pytest.approx(60, abs=0.5)
+
+    def test_gradual_drift_detected(self):
+        """A small sustained shift too slight to spike is caught by CUSUM."""
+        detector = StreamingAnomalyDetector(cooldown=0)
+        rng = np.random.default_rng(3)
+        feed(detector, rng.normal(2.5, 0.05, 200), metric="pressure")
+
+        anomalies = feed(detector, rng.normal(2.6, 0.05, 30), metric="pressure")
+
+        assert [a["kind"] for a in anomalies][:1] == ["drift"]
+        assert anomalies[0]["direction"] == "increase"
+        assert all(a["kind"] != "spike" for a in anomalies)
+
+    def test_cooldown_suppresses_repeats(self):
+        """The same kind of anomaly is reported once per cooldown."""
+        clock = FakeClock()
+        detector = StreamingAnomalyDetector(cooldown=60, clock=clock)
+        feed(detector, np.random.default_rng(4).normal(60, 0.5, 100))
+
+        assert len(detector.process("wh-1", {"temperature": 75.0})) == 1
+        assert detector.process("wh-1", {"temperature": 45.0}) == []
+        clock.now = 61
+        assert len(detector.process("wh-1", {"temperature": 75.0})) == 1
+        assert detector.stats()["suppressed"] == 1
+
+    def test_state_per_device(self):
+        """Each device keeps its own baseline."""
+        detector = StreamingAnomalyDetector(cooldown=0)
+        rng = np.random.default_rng(5)
+        feed(detector, rng.normal(60, 0.5, 100), device_id="wh-1")
+        feed(detector, rng.normal(45, 0.5, 100), device_id="wh-2")
+
+        assert detector.process("wh-2", {"temperature": 60.0})
+        assert detector.process("wh-1", {"temperature": 60.0}) == []
+        assert len(detector) == 2
+        assert detector.remove_device("wh-2")
+        assert len(detector) == 1
+
+    @pytest.mark.asyncio
+    async def test_publishes_from_broker_thread(self):
+        """Anomalies found on another thread reach the event bus and alerts."""
+        event_bus = EventBus()
+        message_bus = LocalMessageBus()
+        websocket_manager = AsyncMock()
+        detector = StreamingAnomalyDetector(cooldown=0)
+        detector.subscribe(
+            message_bus, event_bus=event_bus, websocket_manager=websocket_manager
+        )
+        received = []
+
+        async def on_anomaly(anomaly):
+            received.append(anomaly)
+
+        event_bus.subscribe(ANOMALY_TOPIC, on_anomaly)
+        await detector.start()
+
+        def broker():
+            for value in list(np.random.default_rng(6).normal(60, 0.5, 50)) + [72.0]:
+                message_bus.publish(
+                    "device.telemetry",
+                    {"device_id": "wh-1", "data": {"temperature_current": value}},
+                )
+
+        thread = threading.Thread(target=broker)
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+        await detector.stop()
+        await event_bus.close()
+
+        assert [a["value"] for a in received] == [72.0]
+        message = websocket_manager.broadcast_to_device.await_args.args
+        assert message[0] == "wh-1"
+        assert message[1]["type"] == "anomaly"
+        assert message[2] == ALERTS_CHANNEL
+        websocket_manager.broadcast_to_topic.assert_awaited_once()
+        stats = detector.stats()
+        assert stats["published"] == 1
+        assert stats["pending"] == 0
+
+    def test_dropped_when_not_started(self):
+        """Without a bound event loop anomalies are counted as dropped."""
+        message_bus = LocalMessageBus()
+        detector = StreamingAnomalyDetector(cooldown=0)
+        detector.subscribe(message_bus)
+
+        for value in list(np.random.default_rng(7).normal(60, 0.5, 50)) + [72.0]:
+            message_bus.publish(
+                "device.telemetry", {"device_id": "wh-1", "data": {"temperature": value}}
+            )
+
+        assert detector.stats()["dropped"] == 1
+
+    def test_water_heater_service_payload(self):
+        """Telemetry as the water heater service publishes it is checked."""
+        message_bus = LocalMessageBus()
+        detector = StreamingAnomalyDetector(cooldown=0)
+        detector.subscribe(message_bus)
+
+        for value in list(np.random.default_rng(8).normal(60, 0.5, 50)) + [72.0]:
+            message_bus.publish(
+                "device.telemetry",
+                {
+                    "device_id": "wh-1",
+                    "timestamp": "2025-01-01T00:00:00",
+                    "data": {
+                        "current_temperature": value,
+                        "target_temperature": 60.0,
+                        "mode": "ECO",
+                        "heater_status": "HEATING",
+                        "status": "ONLINE",
+                    },
+                    "simulated": False,
+                },
+            )
+
+        stats = detector.stats()
+        assert stats["detected"] == 1
+        assert stats["dropped"] == 1
+
+    def test_mqtt_adapter_feeds_detector(self):
+        """Telemetry arriving over MQTT reaches the detector via the bus."""
+        message_bus = LocalMessageBus()
+        detector = StreamingAnomalyDetector(cooldown=0)
+        detector.subscribe(message_bus)
+        adapter = MqttAdapter(mqtt_client=MagicMock(), message_bus=message_bus)
+
+        for value in list(np.random.default_rng(9).normal(60, 0.5, 50)) + [72.0]:
+            payload = {
+                "device_id": "wh-1",
+                "timestamp": "2025-01-01T00:00:00",
+                "data": {"current_temperature": float(value), "status": "ONLINE"},
+                "simulated": True,
+            }
+            adapter.process_message(
+                "iotsphere/devices/wh-1/telemetry", json_codec.dumps(payload)
+            )
+
+        assert detector.stats()["detected"] == 1
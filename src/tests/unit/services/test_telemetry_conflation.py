@@ -0,0 +1,125 @@
+"""
+Unit tests for per-client telemetry conflation.
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.telemetry_conflation import TelemetryConflator
+
+
+def point(metric, value):
+    return {"metric": metric, "value": value, "timestamp": "2025-01-01T12:00:00"}
+
+
+@pytest.fixture
+def clients():
+    return [MagicMock(name="fast"), MagicMock(name="slow")]
+
+
+@pytest.fixture
+def manager(clients):
+    """A WebSocketManager stand-in with two telemetry clients on wh-001."""
+    manager = MagicMock()
+    manager.active_connections = {"wh-001": {"telemetry": set(clients)}}
+    manager.send_to_websocket = MagicMock(return_value=True)
+    return manager
+
+
+def sent_to(manager, websocket):
+    """Messages sent to one client, in order."""
+    return [
+        c.args[1]
+        for c in manager.send_to_websocket.call_args_list
+        if c.args[0] is websocket
+    ]
+
+
+@pytest.mark.unit
+class TestTelemetryConflator:
+    """Tests for TelemetryConflator."""
+
+    @pytest.mark.asyncio
+    async def test_first_update_sent_immediately(self, manager, clients):
+        """An idle client gets the first update on the next loop iteration."""
+        conflator = TelemetryConflator(manager, default_interval=10)
+
+        assert conflator.publish("wh-001", [point("temperature", 50)]) == 2
+        await asyncio.sleep(0)
+
+        for websocket in clients:
+            (message,) = sent_to(manager, websocket)
+            assert message["type"] == "telemetry_batch"
+            assert message["metrics"] == [point("temperature", 50)]
+
+    @pytest.mark.asyncio
+    async def test_latest_value_delivered_after_interval(self, manager, clients):
+        """Updates inside the interval collapse to the latest value per metric."""
+        conflator = TelemetryConflator(manager, default_interval=0.05)
+        conflator.publish("wh-001", [point("temperature", 50)])
+        await asyncio.sleep(0)
+
+        for value in (51, 52, 53):
+            conflator.publish("wh-001", [point("temperature", value)])
+        conflator.publish("wh-001", [point("pressure", 2.0)])
+        await asyncio.sleep(0.1)
+
+        messages = sent_to(manager, clients[0])
+        assert len(messages) == 2
+        values = {m["metric"]: m["value"] for m in messages[1]["metrics"]}
+        assert values == {"temperature": 53, "pressure": 2.0}
+        assert conflator.conflated == 4
+
+    @pytest.mark.asyncio
+    async def test_per_client_interval(self, manager, clients):
+        """A slower client is flushed less often than a faster one."""
+        fast, slow = clients
+        conflator = TelemetryConflator(manager, default_interval=0.02)
+        conflator.set_client_interval(slow, 10)
+
+        for value in range(5):
+            conflator.publish("wh-001", [point("temperature", value)])
+            await asyncio.sleep(0.03)
+
+        assert len(sent_to(manager, fast)) == 5
+        (only,) = sent_to(manager, slow)
+        assert only["metrics"][0]["value"] == 0
+        conflator.remove_client(slow)
+
+    @pytest.mark.asyncio
+    async def test_idle_client_state_evicted(self, manager):
+        """State is dropped one interval after the last flush."""
+        conflator = TelemetryConflator(manager, default_interval=0.02)
+        conflator.publish("wh-001", [point("temperature", 50)])
+        await asyncio.sleep(0)
+        assert conflator.get_stats()["clients"] == 2
+
+        await asyncio.sleep(0.05)
+
+        assert conflator.get_stats()["clients"] == 0
+
+    @pytest.mark.asyncio
+    async def test_closed_client_dropped(self, manager, clients):
+        """A client the manager can no longer reach is forgotten."""
+        manager.send_to_websocket.return_value = False
+        conflator = TelemetryConflator(manager, default_interval=10)
+
+        conflator.publish("wh-001", [point("temperature", 50)])
+        await asyncio.sleep(0)
+
+        assert conflator.get_stats()["clients"] == 0
+
+    def test_no_clients_no_state(self, manager):
+        """Devices nobody watches create no state."""
+        conflator = TelemetryConflator(manager)
+
+        assert conflator.publish("wh-999", [point("temperature", 50)]) == 0
+        assert conflator.get_stats()["clients"] == 0
+
+    def test_invalid_interval_rejected(self, manager, clients):
+        """Flush intervals must be positive."""
+        with pytest.raises(ValueError):
+            TelemetryConflator(manager, default_interval=0)
+        with pytest.raises(ValueError):
+            TelemetryConflator(manager).set_client_interval(clients[0], -1)
@@ -0,0 +1,319 @@
+"""
+Unit tests for the incrementally maintained telemetry features.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.infrastructure.events.event_bus import EventBus
+from src.infrastructure.messaging.message_bus import LocalMessageBus
+from src.predictions.advanced.anomaly_detection import AnomalyDetectionPredictor
+from src.predictions.advanced.multi_factor import MultiFactorPredictor
+from src.predictions.advanced.usage_patterns import UsagePatternPredictor
+from src.services import telemetry_features
+from src.services.prediction import PredictionService
+from src.services.telemetry_features import TelemetryFeatureEngine
+
+START = datetime(2025, 3, 3)  # A Monday
+
+
+@pytest.mark.unit
+class TestTelemetryFeatureEngine:
+    """Tests for TelemetryFeatureEngine."""
+
+    def test_running_mean_and_variance(self):
+        """Mean and variance match the full series."""
+        engine = TelemetryFeatureEngine()
+        values = np.random.default_rng(0).normal(60, 3, 500)
+        for i, value in enumerate(values):
+            engine.update("wh-1", {"temperature": value}, START + timedelta(minutes=i))
+
+        temperature = engine.get_summary("wh-1")["metrics"]["temperature"]
+        assert temperature["count"] == 500
+        assert temperature["mean"] == pytest.approx(values.mean())
+        assert temperature["variance"] == pytest.approx(values.var(ddof=1))
+        assert temperature["last"] == values[-1]
+
+    def test_trend_follows_recent_slope(self):
+        """The weighted trend reports the current change per day."""
+        engine = TelemetryFeatureEngine()
+        # Flat for ten days, then rising 2 degrees a day
+        for hour in range(20 * 24):
+            day = hour / 24
+            value = 60 + max(0.0, day - 10) * 2
+            engine.update(
+                "wh-1", {"temperature": value}, START + timedelta(hours=hour)
+            )
+
+        trend = engine.get_summary("wh-1")["metrics"]["temperature"]["trend_per_day"]
+        assert 1.5 < trend < 2.1
+
+    def test_spikes_and_recent_anomalies(self):
+        """Three-point temperature spikes are counted and the latest kept."""
+        engine = TelemetryFeatureEngine()
+        values = [60, 61, 70, 60, 61, 72, 61, 60]
+        for i, value in enumerate(values):
+            engine.update("wh-1", {"temperature": value}, START + timedelta(hours=i))
+
+        summary = engine.get_summary("wh-1")
+        assert summary["spikes"]["temperature"] == 2
+        spikes = summary["recent_anomalies"]["temperature"]
+        assert [a["value"] for a in spikes] == [70, 72]
+        assert spikes[0]["timestamp"] == (START + timedelta(hours=2)).isoformat()
+
+    def test_heating_cycles_and_daily_usage(self):
+        """Heating cycles and water usage are rolled up per day."""
+        engine = TelemetryFeatureEngine()
+        for day in range(3):
+            for minute in range(0, 24 * 60, 10):
+                heating = minute % 240 < 30  # A 30 minute cycle every 4 hours
+                engine.update(
+                    "wh-1",
+                    {"heating_status": heating, "flow_rate": 1.0},
+                    START + timedelta(days=day, minutes=minute),
+                )
+
+        summary = engine.get_summary("wh-1")
+        cycles = summary["heating_cycles"]
+        assert cycles["per_day"] == 6
+        assert cycles["average_duration_minutes"] == pytest.approx(30)
+        usage = summary["daily_usage"]
+        assert usage["days"] == 2
+        # 10 litres per interval, minus the first interval of the first day
+        assert usage["recent_liters"][0]["value"] == pytest.approx(24 * 60 - 10)
+        assert usage["recent_liters"][1]["value"] == pytest.approx(24 * 60)
+
+    def test_memory_does_not_grow_with_history(self):
+        """Recent anomaly and usage buffers stay bounded."""
+        engine = TelemetryFeatureEngine()
+        for i in range(3000):
+            value = 80 if i % 2 else 60
+            engine.update(
+                "wh-1",
+                {"temperature": value, "flow_rate": 1.0},
+                START + timedelta(hours=i),
+            )
+
+        summary = engine.get_summary("wh-1")
+        assert summary["spikes"]["temperature"] > 1000
+        assert len(summary["recent_anomalies"]["temperature"]) <= 5
+        assert len(summary["daily_usage"]["recent_liters"]) <= 10
+
+    @pytest.mark.asyncio
+    async def test_consumes_bus_telemetry(self):
+        """Readings arrive from the event bus and the message bus."""
+        engine = TelemetryFeatureEngine()
+        event_bus = EventBus()
+        message_bus = LocalMessageBus()
+        engine.subscribe(event_bus=event_bus, message_bus=message_bus)
+
+        await event_bus.publish(
+            "water_heater.reading_added",
+            {
+                "device_id": "wh-1",
+                "timestamp": START.isoformat(),
+                "reading": {"temperature": 60.0, "pressure": None},
+            },
+            wait=True,
+        )
+        message_bus.publish(
+            "device.telemetry",
+            {
+                "device_id": "wh-1",
+                "timestamp": (START + timedelta(minutes=5)).isoformat(),
+                "data": {"temperature_current": 62.0, "heating_status": True},
+            },
+        )
+
+        await event_bus.close()
+
+        summary = engine.get_summary("wh-1")
+        assert summary["metrics"]["temperature"]["count"] == 2
+        assert summary["heating_cycles"]["count"] == 1
+        assert "pressure" not in summary["metrics"]
+
+    def test_water_heater_service_telemetry(self):
+        """current_temperature from the water heater service feeds the stats."""
+        engine = TelemetryFeatureEngine()
+        message_bus = LocalMessageBus()
+        engine.subscribe(message_bus=message_bus)
+
+        message_bus.publish(
+            "device.telemetry",
+            {
+                "device_id": "wh-1",
+                "timestamp": START.isoformat(),
+                "data": {
+                    "current_temperature": 61.0,
+                    "target_temperature": 60.0,
+                    "mode": "ECO",
+                    "heater_status": "STANDBY",
+                    "status": "ONLINE",
+                },
+                "simulated": False,
+            },
+        )
+
+        summary = engine.get_summary("wh-1")
+        assert summary["metrics"]["temperature"]["last"] == 61.0
+
+    def test_preseed_buffer_bounded(self, monkeypatch):
+        """Unseeded devices buffer only recent samples, within a total budget."""
+        monkeypatch.setattr(telemetry_features, "FEATURE_PRESEED_MAX_AGE_HOURS", 2)
+        monkeypatch.setattr(telemetry_features, "FEATURE_PRESEED_TOTAL_SAMPLES", 6)
+        engine = TelemetryFeatureEngine()
+
+        for i in range(5):
+            engine.update("wh-1", {"temperature": 60.0}, START + timedelta(hours=i))
+        # Samples more than two hours older than the newest are dropped
+        assert engine.stats()["buffered"] == 3
+
+        for i in range(5):
+            engine.update("wh-2", {"temperature": 60.0}, START + timedelta(minutes=i))
+        # The budget is reclaimed from the least recently updated device
+        assert engine.stats()["buffered"] == 6
+        assert len(engine._live["wh-1"]) == 1
+        assert len(engine._live["wh-2"]) == 5
+
+        engine.seed("wh-2", [])
+        assert engine.stats()["buffered"] == 1
+        engine.remove_device("wh-1")
+        assert engine.stats()["buffered"] == 0
+        assert engine.stats()["devices"] == 1
+
+    def test_seed_only_once(self):
+        """Stored readings seed a device that has not sent telemetry yet."""
+        engine = TelemetryFeatureEngine()
+        readings = [
+            SimpleNamespace(timestamp=START + timedelta(hours=i), temperature=60.0 + i)
+            for i in range(5)
+        ]
+
+        assert engine.seed("wh-1", reversed(readings)) == 5
+        assert engine.seed("wh-1", readings) == 0
+        assert engine.get_summary("wh-1")["metrics"]["temperature"]["last"] == 64.0
+
+
+@pytest.mark.unit
+class TestPredictorsUseSummary:
+    """Tests for the advanced predictors reading precomputed features."""
+
+    @staticmethod
+    def summary_for(updates):
+        engine = TelemetryFeatureEngine()
+        for timestamp, values in updates:
+            engine.update("wh-1", values, timestamp)
+        return engine.get_summary("wh-1")
+
+    def test_anomaly_detection_from_summary(self):
+        """Trends and spikes come from the summary without reading lists."""
+        temperatures = [50 + i / 4 for i in range(48)]
+        temperatures[20] += 9
+        summary = self.summary_for(
+            [
+                (START + timedelta(hours=i), {"temperature": value})
+                for i, value in enumerate(temperatures)
+            ]
+        )
+
+        result = AnomalyDetectionPredictor().predict(
+            "wh-1", {"telemetry_summary": summary}
+        )
+
+        trend = result.raw_details["trend_analysis"]["temperature"]
+        assert trend["trend_direction"] == "increasing"
+        assert trend["rate_of_change_per_day"] == pytest.approx(6, rel=0.1)
+        anomalies = result.raw_details["detected_anomalies"]
+        assert len(anomalies) == 1
+        assert anomalies[0]["potential_components"] == ["thermostat", "heating_element"]
+
+    @pytest.mark.asyncio
+    async def test_usage_patterns_from_summary(self):
+        """Daily usage and cycle counts classify usage without history."""
+        updates = []
+        for day in range(15):
+            for minute in range(0, 24 * 60, 10):
+                updates.append(
+                    (
+                        START + timedelta(days=day, minutes=minute),
+                        {"flow_rate": 0.25, "heating_status": minute % 120 < 20},
+                    )
+                )
+        summary = self.summary_for(updates)
+
+        result = await UsagePatternPredictor().predict(
+            "wh-1", {"telemetry_summary": summary}
+        )
+
+        # 360 litres and 12 cycles a day
+        assert result.raw_details["usage_classification"] == "heavy"
+        assert "weekly" in result.raw_details["usage_patterns"]
+        assert result.raw_details["usage_patterns"]["trend"]["direction"] == "stable"
+
+    def test_multi_factor_scores_usage(self):
+        """The usage factor is scored from the summary."""
+        summary = {
+            "daily_usage": {"recent_average_liters": 250.0},
+            "heating_cycles": {"per_day": 5.0},
+            "spikes": {"temperature": 0},
+        }
+
+        result = MultiFactorPredictor().predict("wh-1", {"telemetry_summary": summary})
+
+        assert result.raw_details["factor_scores"]["usage_patterns"] == 0.5
+
+    def test_prediction_service_passes_summary(self):
+        """With a feature engine, models get the summary instead of readings."""
+        service = PredictionService(feature_engine=TelemetryFeatureEngine())
+        water_heater = SimpleNamespace(
+            readings=[
+                SimpleNamespace(timestamp=START + timedelta(hours=i), temperature=60.0)
+                for i in range(3)
+            ],
+            min_temperature=40.0,
+            max_temperature=80.0,
+        )
+
+        features = service._add_advanced_features(
+            {"device_id": "wh-1"}, water_heater, "anomaly_detection"
+        )
+
+        assert "telemetry_series" not in features
+        assert features["telemetry_summary"]["metrics"]["temperature"]["count"] == 3
+
+    def test_live_telemetry_before_first_prediction_keeps_history(self):
+        """Stored readings are merged even if live telemetry arrived first."""
+        engine = TelemetryFeatureEngine()
+        service = PredictionService(feature_engine=engine)
+        history = [
+            SimpleNamespace(timestamp=START + timedelta(hours=i), temperature=50.0 + i)
+            for i in range(10)
+        ]
+        water_heater = SimpleNamespace(
+            readings=history, min_temperature=40.0, max_temperature=80.0
+        )
+        # One sample shares a timestamp with a stored reading
+        engine.update("wh-1", {"temperature": 59.0}, history[-1].timestamp)
+        engine.update(
+            "wh-1",
+            {"temperature": 70.0, "heating_status": True},
+            START + timedelta(hours=12),
+        )
+
+        features = service._add_advanced_features(
+            {"device_id": "wh-1"}, water_heater, "anomaly_detection"
+        )
+        temperature = features["telemetry_summary"]["metrics"]["temperature"]
+
+        assert temperature["count"] == 11
+        assert temperature["first"] == 50.0
+        assert temperature["last"] == 70.0
+        assert engine.is_seeded("wh-1")
+
+        # Later samples update incrementally without re-seeding
+        engine.update("wh-1", {"temperature": 71.0}, START + timedelta(hours=13))
+        assert engine.seed("wh-1", history) == 0
+        summary = engine.get_summary("wh-1")
+        assert summary["metrics"]["temperature"]["count"] == 12
@@ -0,0 +1,302 @@
+"""
+Tests for the batched telemetry ingest path
+"""
+import asyncio
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.models.telemetry import TelemetryBatch
+from src.db.sqlite_pool import SQLiteConnectionPool
+from src.services.database_service import DatabaseService
+from src.services.telemetry_service import TelemetryService
+
+
+def make_batch(device_id="wh-001", count=3):
+    """Create a batch with `count` temperature points plus one pressure point."""
+    start = datetime(2025, 1, 1, 12, 0, 0)
+    metrics = [
+        {
+            "device_id": "ignored",
+            "metric": "temperature",
+            "value": 50.0 + i,
+            "timestamp": start + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+    metrics.append(
+        {
+            "device_id": "ignored",
+            "metric": "pressure",
+            "value": 30.0,
+            "timestamp": start,
+        }
+    )
+    return TelemetryBatch(device_id=device_id, metrics=metrics)
+
+
+@pytest.mark.unit
+class TestTelemetryServiceBatch:
+    """Test cases for TelemetryService.process_telemetry_batch"""
+
+    def setup_method(self):
+        """Setup for each test method."""
+        self.db_service = MagicMock()
+        self.db_service.store_telemetry = AsyncMock(return_value=True)
+        self.db_service.store_telemetry_batch = AsyncMock(
+            side_effect=lambda records: len(records)
+        )
+        self.websocket = MagicMock()
+        self.websocket_manager = MagicMock()
+        self.websocket_manager.active_connections = {
+            "wh-001": {"telemetry": {self.websocket}}
+        }
+        self.websocket_manager.send_to_websocket = MagicMock(return_value=True)
+
+        with patch(
+            "src.services.telemetry_service.get_db_service",
+            return_value=self.db_service,
+        ), patch(
+            "src.services.telemetry_service.get_websocket_manager",
+            return_value=self.websocket_manager,
+        ):
+            self.service = TelemetryService()
+
+    @pytest.mark.asyncio
+    async def test_batch_is_stored_in_one_call(self):
+        """Test that the whole batch goes to the database at once."""
+        processed = await self.service.process_telemetry_batch(make_batch())
+
+        assert len(processed) == 4
+        assert all(p["device_id"] == "wh-001" for p in processed)
+        self.db_service.store_telemetry_batch.assert_awaited_once()
+        self.db_service.store_telemetry.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_cache_keeps_latest_point_per_metric(self):
+        """Test that the cache holds the newest value for each metric."""
+        await self.service.process_telemetry_batch(make_batch(count=5))
+
+        latest = await self.service.get_latest_telemetry("wh-001", "temperature")
+        assert latest["value"] == 54.0
+        self.db_service.get_latest_telemetry = AsyncMock()
+        await self.service.get_latest_telemetry("wh-001", "pressure")
+        self.db_service.get_latest_telemetry.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_one_combined_broadcast(self):
+        """Test that clients receive a single message for the batch."""
+        await self.service.process_telemetry_batch(make_batch(count=5))
+        await asyncio.sleep(0)
+
+        self.websocket_manager.send_to_websocket.assert_called_once()
+        websocket, message = self.websocket_manager.send_to_websocket.call_args.args
+        assert websocket is self.websocket
+        assert message["type"] == "telemetry_batch"
+        assert message["device_id"] == "wh-001"
+        assert sorted(m["metric"] for m in message["metrics"]) == [
+            "pressure",
+            "temperature",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_batch_inside_interval_is_conflated(self):
+        """Test that a batch arriving inside the flush interval is delivered later."""
+        self.service.conflator.default_interval = 0.05
+        await self.service.process_telemetry_batch(make_batch(count=2))
+        await asyncio.sleep(0)
+        await self.service.process_telemetry_batch(make_batch(count=4))
+        await asyncio.sleep(0)
+
+        assert self.websocket_manager.send_to_websocket.call_count == 1
+
+        await asyncio.sleep(0.1)
+
+        assert self.websocket_manager.send_to_websocket.call_count == 2
+        message = self.websocket_manager.send_to_websocket.call_args.args[1]
+        values = {m["metric"]: m["value"] for m in message["metrics"]}
+        assert values["temperature"] == 53.0
+
+
+@pytest.mark.unit
+class TestDatabaseServiceTelemetryBatch:
+    """Test cases for DatabaseService.store_telemetry_batch"""
+
+    @pytest.mark.asyncio
+    async def test_batch_insert(self, tmp_path):
+        """Test that all records land in the telemetry table."""
+        with patch.object(DatabaseService, "__init__", return_value=None):
+            db_service = DatabaseService()
+        db_service.db_path = os.path.join(tmp_path, "telemetry.db")
+        db_service.pool = SQLiteConnectionPool(db_service.db_path)
+        db_service._init_db()
+
+        records = make_batch().dict()["metrics"]
+        for record in records:
+            record["timestamp"] = record["timestamp"].isoformat()
+
+        stored = await db_service.store_telemetry_batch(records)
+
+        conn = sqlite3.connect(db_service.db_path)
+        count = conn.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0]
+        conn.close()
+        assert stored == 4
+        assert count == 4
+
+
+@pytest.mark.unit
+class TestDatabaseServiceAggregation:
+    """Test cases for DatabaseService.get_aggregated_telemetry"""
+
+    @pytest.fixture
+    async def db_service(self, tmp_path):
+        """Create a service backed by a temporary database with two days of data."""
+        with patch.object(DatabaseService, "__init__", return_value=None):
+            db_service = DatabaseService()
+        db_service.db_path = os.path.join(tmp_path, "telemetry.db")
+        db_service.pool = SQLiteConnectionPool(db_service.db_path)
+        db_service._init_db()
+
+        start = datetime(2025, 1, 6, 0, 0, 0)  # a Monday
+        records = [
+            {
+                "device_id": "wh-001",
+                "metric": "temperature",
+                "value": float(hour),
+                "timestamp": (start + timedelta(minutes=30 * i)).isoformat(),
+            }
+            for i, hour in enumerate(h for h in range(48) for _ in range(2))
+        ]
+        await db_service.store_telemetry_batch(records)
+        yield db_service
+        db_service.pool.close()
+
+    @pytest.mark.asyncio
+    async def test_hourly_buckets(self, db_service):
+        """Test that hourly aggregation returns per-hour statistics."""
+        buckets = await db_service.get_aggregated_telemetry(
+            "wh-001",
+            "temperature",
+            "hourly",
+            datetime(2025, 1, 6),
+            datetime(2025, 1, 6, 23, 59, 59),
+        )
+
+        assert len(buckets) == 24
+        assert buckets[0]["timestamp"] == "2025-01-06T00:00:00"
+        assert buckets[3]["count"] == 2
+        assert buckets[3]["avg"] == buckets[3]["last"] == 3.0
+
+    @pytest.mark.asyncio
+    async def test_daily_buckets(self, db_service):
+        """Test that daily aggregation splits the range by day."""
+        buckets = await db_service.get_aggregated_telemetry(
+            "wh-001",
+            "temperature",
+            "daily",
+            datetime(2025, 1, 6),
+            datetime(2025, 1, 8),
+        )
+
+        assert [b["timestamp"] for b in buckets] == [
+            "2025-01-06T00:00:00",
+            "2025-01-07T00:00:00",
+        ]
+        assert buckets[1]["min"] == 24.0
+        assert buckets[1]["max"] == buckets[1]["last"] == 47.0
+        assert buckets[1]["count"] == 48
+
+    @pytest.mark.asyncio
+    async def test_weekly_buckets_start_on_monday(self, db_service):
+        """Test that weekly buckets align to the Monday of each week."""
+        buckets = await db_service.get_aggregated_telemetry(
+            "wh-001",
+            "temperature",
+            "weekly",
+            datetime(2025, 1, 1),
+            datetime(2025, 1, 31),
+        )
+
+        assert len(buckets) == 1
+        assert buckets[0]["timestamp"] == "2025-01-06T00:00:00"
+        assert buckets[0]["count"] == 96
+
+    @pytest.mark.asyncio
+    async def test_unknown_aggregation_is_rejected(self, db_service):
+        """Test that an unsupported interval raises from the streaming API."""
+        with pytest.raises(ValueError):
+            async for _ in db_service.iter_aggregated_telemetry(
+                "wh-001", "temperature", "yearly", datetime(2025, 1, 1), datetime.now()
+            ):
+                pass
+
+
+@pytest.mark.unit
+class TestTelemetryServiceAggregationBackend:
+    """Test cases for TelemetryService.get_aggregated_telemetry"""
+
+    def make_service(self, repository):
+        """Create a service reading aggregates through `repository`."""
+        self.db_service = MagicMock()
+        self.db_service.get_aggregated_telemetry = AsyncMock(
+            return_value=[{"value": 1.0}]
+        )
+        with patch(
+            "src.services.telemetry_service.get_db_service",
+            return_value=self.db_service,
+        ), patch(
+            "src.services.telemetry_service.get_websocket_manager",
+            return_value=MagicMock(),
+        ):
+            return TelemetryService(timescale_repository=repository)
+
+    @pytest.mark.asyncio
+    async def test_reads_from_timescale_when_configured(self):
+        """Test that aggregates come from TimescaleDB when it is configured."""
+        repository = MagicMock()
+        repository.get_aggregated_telemetry = AsyncMock(return_value=[{"value": 2.0}])
+        service = self.make_service(repository)
+        start = datetime(2025, 1, 6)
+
+        buckets = await service.get_aggregated_telemetry(
+            "wh-001", "temperature", "hourly", start, start + timedelta(days=1)
+        )
+
+        assert buckets == [{"value": 2.0}]
+        repository.get_aggregated_telemetry.assert_awaited_once_with(
+            device_id="wh-001",
+            metric="temperature",
+            aggregation="hourly",
+            start_time=start,
+            end_time=start + timedelta(days=1),
+        )
+        self.db_service.get_aggregated_telemetry.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_sqlite_when_timescale_fails(self):
+        """Test that a TimescaleDB error falls back to the SQLite aggregation."""
+        repository = MagicMock()
+        repository.get_aggregated_telemetry = AsyncMock(
+            side_effect=ConnectionError("refused")
+        )
+        repository.close = AsyncMock()
+        service = self.make_service(repository)
+        start = datetime(2025, 1, 6)
+
+        buckets = await service.get_aggregated_telemetry(
+            "wh-001", "temperature", "hourly", start, start + timedelta(days=1)
+        )
+        await service.close()
+
+        assert buckets == [{"value": 1.0}]
+        self.db_service.get_aggregated_telemetry.assert_awaited_once()
+        repository.close.assert_awaited_once()
+
+    def test_sqlite_is_the_default_backend(self):
+        """Test that no TimescaleDB repository is created by default."""
+        service = self.make_service(None)
+
+        assert service.timescale_repository is None
@@ -2,7 +2,7 @@
 Tests for the water heater history service
 """
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -334,3 +334,47 @@ class TestWaterHeaterHistoryService:
             mock_temp.assert_called_once_with(heater_id, days)
             mock_energy.assert_called_once_with(heater_id, days)
             mock_pressure.assert_called_once_with(heater_id, days)
+
+    @pytest.mark.asyncio
+    async def test_get_temperature_history_uses_rollups(self):
+        """Test that long windows are served from pre-aggregated buckets."""
+        heater_id = "test-heater-123"
+        shadow = {"desired": {"target_temperature": 125.0}, "reported": {}}
+        rollup = {
+            "resolution": "1h",
+            "buckets": [
+                {
+                    "timestamp": "2025-04-01T10:00:00Z",
+                    "avg": 120.04,
+                    "min": 119.0,
+                    "max": 121.0,
+                    "count": 60,
+                },
+                {
+                    "timestamp": "2025-04-01T11:00:00Z",
+                    "avg": 121.5,
+                    "min": 120.0,
+                    "max": 123.0,
+                    "count": 60,
+                },
+            ],
+        }
+
+        with patch(
+            "src.services.device_shadow.DeviceShadowService.get_device_shadow",
+            new=AsyncMock(return_value=shadow),
+        ), patch(
+            "src.services.device_shadow.DeviceShadowService.get_shadow_history_rollups",
+            new=AsyncMock(return_value=rollup),
+        ), patch(
+            "src.services.device_shadow.DeviceShadowService.get_shadow_history",
+            new=AsyncMock(),
+        ) as mock_raw_history:
+            result = await self.service.get_temperature_history(heater_id, 30)
+
+        assert result["source"] == "device_shadow_rollup"
+        assert result["resolution"] == "1h"
+        assert result["labels"] == ["04/01 10:00", "04/01 11:00"]
+        assert result["datasets"][0]["data"] == [120.0, 121.5]
+        assert result["datasets"][1]["data"] == [125.0, 125.0]
+        mock_raw_history.assert_not_called()
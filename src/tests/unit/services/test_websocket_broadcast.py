@@ -0,0 +1,204 @@
+"""
+Unit tests for WebSocketManager fan-out through per-connection queues.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.services.websocket_manager import WebSocketManager
+from src.services.websocket_outbound import POLICY_DISCONNECT, OutboundConnection
+from src.utils import json_codec
+
+
+def make_socket(send_text=None):
+    """Create a mock WebSocket with an async send_text."""
+    websocket = MagicMock()
+    websocket.accept = AsyncMock()
+    websocket.close = AsyncMock()
+    websocket.send_text = send_text or AsyncMock()
+    return websocket
+
+
+async def drain():
+    """Let writer tasks run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+async def manager_factory():
+    """Create WebSocketManagers and stop their writers after the test."""
+    managers = []
+
+    def factory(**kwargs):
+        manager = WebSocketManager(**kwargs)
+        managers.append(manager)
+        return manager
+
+    yield factory
+
+    for manager in managers:
+        manager.close()
+    await drain()
+
+
+@pytest.mark.unit
+class TestWebSocketBroadcast:
+    """Tests for serialize-once, queued broadcasting."""
+
+    @pytest.mark.asyncio
+    async def test_slow_socket_does_not_block_others(self, manager_factory):
+        """A stalled client must not delay delivery to other subscribers."""
+        manager = manager_factory()
+        stalled = asyncio.Event()
+
+        async def never_returns(message):
+            await stalled.wait()
+
+        slow = make_socket(AsyncMock(side_effect=never_returns))
+        fast = make_socket()
+        await manager.connect(slow, "wh-001", "telemetry")
+        await manager.connect(fast, "wh-001", "telemetry")
+
+        sent = await asyncio.wait_for(
+            manager.broadcast_to_device("wh-001", {"temperature": 50}), timeout=1
+        )
+        await drain()
+
+        assert sent == 2
+        fast.send_text.assert_awaited_once_with(json_codec.dumps({"temperature": 50}))
+        stalled.set()
+
+    @pytest.mark.asyncio
+    async def test_payload_encoded_once(self, manager_factory):
+        """The message is serialized once regardless of subscriber count."""
+        manager = manager_factory()
+        sockets = [make_socket() for _ in range(3)]
+        for websocket in sockets:
+            await manager.connect(websocket, "wh-001")
+
+        with patch(
+            "src.services.websocket_manager.json_codec.dumps", wraps=json_codec.dumps
+        ) as dumps:
+            await manager.broadcast_to_device("wh-001", {"status": "ok"})
+
+        assert dumps.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_counts_drops(self, manager_factory):
+        """A full queue drops its oldest message and reports it."""
+        manager = manager_factory(max_queue_size=2)
+        stalled = asyncio.Event()
+
+        async def blocked(message):
+            await stalled.wait()
+
+        websocket = make_socket(AsyncMock(side_effect=blocked))
+        await manager.connect(websocket, "wh-001")
+        await drain()
+
+        # The first message is held by the writer, the next two fill the queue
+        await manager.broadcast_to_device("wh-001", {"seq": 0})
+        await drain()
+        for i in range(1, 5):
+            await manager.broadcast_to_device("wh-001", {"seq": i})
+
+        metrics = manager.get_metrics()
+        assert metrics["connections"] == 1
+        assert metrics["max_queue_depth"] == 2
+        assert metrics["total_dropped"] == 2
+        assert metrics["per_connection"][0]["dropped"] == 2
+        stalled.set()
+
+    @pytest.mark.asyncio
+    async def test_disconnect_policy_prunes_slow_consumer(self, manager_factory):
+        """With the disconnect policy a full queue closes the connection."""
+        manager = manager_factory(
+            max_queue_size=1, slow_consumer_policy=POLICY_DISCONNECT
+        )
+        stalled = asyncio.Event()
+
+        async def blocked(message):
+            await stalled.wait()
+
+        websocket = make_socket(AsyncMock(side_effect=blocked))
+        await manager.connect(websocket, "wh-001", client_id="client-1")
+        await drain()
+
+        await manager.broadcast_to_device("wh-001", {"seq": 1})
+        await drain()
+        await manager.broadcast_to_device("wh-001", {"seq": 2})
+        sent = await manager.broadcast_to_device("wh-001", {"seq": 3})
+        await drain()
+
+        assert sent == 0
+        assert "wh-001" not in manager.active_connections
+        assert "client-1" not in manager.client_connections
+        assert manager.pruned_connections == 1
+        websocket.close.assert_awaited_once_with(code=1013)
+
+    @pytest.mark.asyncio
+    async def test_failed_socket_pruned(self, manager_factory):
+        """A socket whose send fails is removed from every registry."""
+        manager = manager_factory()
+        broken = make_socket(AsyncMock(side_effect=RuntimeError("closed")))
+        healthy = make_socket()
+        await manager.connect(broken, "wh-001")
+        await manager.connect(healthy, "wh-001")
+        await manager.subscribe_to_topic(broken, "alerts")
+
+        await manager.broadcast_to_device("wh-001", {"seq": 1})
+        await drain()
+
+        assert manager.active_connections["wh-001"]["state"] == {healthy}
+        assert "alerts" not in manager.global_subscriptions
+        assert broken not in manager.outbound
+        assert await manager.broadcast_to_device("wh-001", {"seq": 2}) == 1
+
+    @pytest.mark.asyncio
+    async def test_disconnect_stops_writer(self, manager_factory):
+        """Disconnecting the last registration closes the outbound queue."""
+        manager = manager_factory()
+        websocket = make_socket()
+        await manager.connect(websocket, "wh-001")
+        outbound = manager.outbound[websocket]
+
+        await manager.disconnect(websocket, "wh-001")
+
+        assert outbound.closed
+        assert websocket not in manager.outbound
+
+    @pytest.mark.asyncio
+    async def test_unknown_policy_rejected(self):
+        """Only known slow consumer policies are accepted."""
+        with pytest.raises(ValueError):
+            OutboundConnection(make_socket(), on_close=MagicMock(), policy="block")
+
+    @pytest.mark.asyncio
+    async def test_messages_written_in_order(self, manager_factory):
+        """Each connection receives its messages in broadcast order."""
+        manager = manager_factory()
+        websocket = make_socket()
+        await manager.connect(websocket, "wh-001")
+
+        for i in range(3):
+            await manager.broadcast_to_device("wh-001", {"seq": i})
+        await drain()
+
+        assert [c.args[0] for c in websocket.send_text.await_args_list] == [
+            json_codec.dumps({"seq": i}) for i in range(3)
+        ]
+        assert manager.outbound[websocket].sent == 3
+
+    @pytest.mark.asyncio
+    async def test_send_to_websocket_requires_registration(self, manager_factory):
+        """Direct sends only reach connections the manager still tracks."""
+        manager = manager_factory()
+        websocket = make_socket()
+        await manager.connect(websocket, "wh-001", "telemetry")
+
+        assert manager.send_to_websocket(websocket, {"seq": 1})
+        await manager.disconnect(websocket, "wh-001", "telemetry")
+        assert not manager.send_to_websocket(websocket, {"seq": 2})
+        assert websocket not in manager.outbound
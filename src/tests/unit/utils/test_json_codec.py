@@ -0,0 +1,78 @@
+"""
+Unit tests for the shared JSON codec.
+"""
+import importlib
+import json
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from src.utils import json_codec
+
+
+@pytest.fixture(params=["default", "stdlib"])
+def codec(request):
+    """The codec with its default backend and forced onto the stdlib fallback."""
+    if request.param == "default":
+        yield json_codec
+        return
+
+    with patch.dict(sys.modules, {"orjson": None}):
+        yield importlib.reload(json_codec)
+    importlib.reload(json_codec)
+
+
+@pytest.mark.unit
+class TestJsonCodec:
+    """Tests for encoding, decoding and metadata splicing."""
+
+    def test_round_trip(self, codec):
+        """Encoded objects decode to the same value from str or bytes."""
+        obj = {"device_id": "wh-1", "temperature": 50.5, "tags": ["a", "b"]}
+
+        assert codec.loads(codec.dumps(obj)) == obj
+        assert codec.loads(codec.dumpb(obj)) == obj
+
+    def test_compact_output(self, codec):
+        """Both backends produce the same compact wire format."""
+        assert codec.dumps({"a": 1, "b": [1, 2]}) == '{"a":1,"b":[1,2]}'
+
+    def test_datetime_encoded_as_iso(self, codec):
+        """Datetimes are encoded as ISO 8601 strings."""
+        ts = datetime(2025, 4, 10, 15, 32, 0)
+
+        assert codec.loads(codec.dumps({"ts": ts})) == {"ts": ts.isoformat()}
+
+    def test_decode_error_is_json_decode_error(self, codec):
+        """Invalid input raises json.JSONDecodeError on every backend."""
+        with pytest.raises(json.JSONDecodeError):
+            codec.loads(b"{not json")
+
+    def test_splice_meta_appends_member(self, codec):
+        """Metadata is appended to the original object bytes."""
+        spliced = codec.splice_meta(b'{"temperature": 50}', {"topic": "a/b"})
+
+        assert spliced == b'{"temperature": 50,"_meta":{"topic":"a/b"}}'
+        assert json.loads(spliced) == {"temperature": 50, "_meta": {"topic": "a/b"}}
+
+    def test_splice_meta_empty_object(self, codec):
+        """An empty object gets _meta as its only member."""
+        assert json.loads(codec.splice_meta(" {  } ", {"n": 1})) == {"_meta": {"n": 1}}
+
+    def test_splice_meta_overrides_existing_meta(self, codec):
+        """The spliced _meta wins over one already in the payload."""
+        spliced = codec.splice_meta(b'{"_meta": "old"}', {"n": 1})
+
+        assert json.loads(spliced)["_meta"] == {"n": 1}
+
+    @pytest.mark.parametrize("payload", [b"[1, 2]", b"42", b"plain text", b""])
+    def test_splice_meta_non_object(self, codec, payload):
+        """Payloads that are not JSON objects are left to the caller."""
+        assert codec.splice_meta(payload, {"n": 1}) is None
+
+    @pytest.mark.parametrize("payload", [b'{"a": 1', b'"a": 1}', b"{}{}", b"{ },{}"])
+    def test_splice_meta_malformed_object(self, codec, payload):
+        """Payloads not shaped like a single object are rejected."""
+        assert codec.splice_meta(payload, {"n": 1}) is None
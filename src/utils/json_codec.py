@@ -0,0 +1,128 @@
+"""
+JSON encoding and decoding for the messaging and WebSocket layers.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both backends produce compact output and encode datetimes as ISO
+8601 strings, so callers get the same wire format either way. Decode errors
+are raised as json.JSONDecodeError (orjson's error subclasses it).
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+JSONDecodeError = json.JSONDecodeError
+
+_META_SEPARATOR = b',"_meta":'
+
+
+def _default(obj: Any) -> Any:
+    """Encode types the standard library does not handle."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumpb(obj: Any) -> bytes:
+        """
+        Encode an object as UTF-8 JSON bytes.
+
+        Args:
+            obj: Object to encode
+
+        Returns:
+            bytes: Compact JSON
+        """
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        """
+        Decode JSON from text or UTF-8 bytes.
+
+        Raises:
+            json.JSONDecodeError: If data is not valid JSON
+        """
+        return orjson.loads(data)
+
+else:
+
+    def dumpb(obj: Any) -> bytes:
+        """
+        Encode an object as UTF-8 JSON bytes.
+
+        Args:
+            obj: Object to encode
+
+        Returns:
+            bytes: Compact JSON
+        """
+        return dumps(obj).encode("utf-8")
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        """
+        Decode JSON from text or UTF-8 bytes.
+
+        Raises:
+            json.JSONDecodeError: If data is not valid JSON
+        """
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Encode an object as a JSON string, e.g. for WebSocket text frames.
+
+    Args:
+        obj: Object to encode
+
+    Returns:
+        str: Compact JSON
+    """
+    if orjson is not None:
+        return dumpb(obj).decode("utf-8")
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def splice_meta(payload: Union[str, bytes], meta: Any) -> Optional[bytes]:
+    """
+    Add a "_meta" member to an encoded JSON object without re-encoding it.
+
+    The payload is never parsed: it only has to look like an object, i.e.
+    start with "{" and end with "}" once surrounding whitespace is stripped,
+    and not start with an empty object such as b"{}{...}". Malformed content
+    between the braces is passed through for the receiver to reject. The
+    metadata is appended as the object's last member, so it takes precedence
+    over an existing "_meta" key when the result is parsed.
+
+    Args:
+        payload: Encoded JSON object
+        meta: Metadata to embed
+
+    Returns:
+        bytes: The enriched object, or None if payload is not a JSON object
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+
+    body = payload.strip()
+    if len(body) < 2 or body[:1] != b"{" or body[-1:] != b"}":
+        return None
+
+    encoded_meta = dumpb(meta)
+    inner = body[1:-1].strip()
+    if not inner:
+        return b'{"_meta":' + encoded_meta + b"}"
+    if inner[:1] == b"}":
+        return None
+    return body[:-1] + _META_SEPARATOR + encoded_meta + b"}"
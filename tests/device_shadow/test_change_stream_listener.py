@@ -26,23 +26,15 @@ class TestShadowChangeStreamListener(unittest.TestCase):
 
     def setUp(self):
         """Set up test fixtures."""
-        self.mock_mongo_client = AsyncMock()
-        self.mock_db = AsyncMock()
-        self.mock_collection = AsyncMock()
-        self.mock_change_stream = AsyncMock()
-
-        # Configure mocks
-        self.mock_mongo_client.__getitem__.return_value = self.mock_db
-        self.mock_db.__getitem__.return_value = self.mock_collection
-        self.mock_collection.watch.return_value = self.mock_change_stream
+        self.mock_multiplexer = AsyncMock()
 
         # Set up the listener
         self.listener = ShadowChangeStreamListener(
             mongo_uri="mongodb://localhost:27017",
             db_name="test_db",
             collection_name="device_shadows",
+            multiplexer=self.mock_multiplexer,
         )
-        self.listener.mongo_client = self.mock_mongo_client
 
         # Mock event handler
         self.mock_event_handler = MagicMock()
@@ -65,13 +57,13 @@ class TestShadowChangeStreamListener(unittest.TestCase):
         self.assertFalse(listener.is_listening)
 
     @pytest.mark.asyncio
-    async def test_connect_establishes_mongo_client(self):
-        """Test that _connect creates a MongoDB client connection."""
+    async def test_connect_gets_shared_multiplexer(self):
+        """Test that _connect gets the shared multiplexer for the database."""
         # Arrange
         with patch(
-            "src.services.shadow_change_stream_listener.AsyncIOMotorClient"
-        ) as mock_client:
-            mock_client.return_value = self.mock_mongo_client
+            "src.services.shadow_change_stream_listener.get_change_stream_multiplexer"
+        ) as mock_get_multiplexer:
+            mock_get_multiplexer.return_value = self.mock_multiplexer
             listener = ShadowChangeStreamListener(
                 mongo_uri="mongodb://testhost:27017",
                 db_name="test_database",
@@ -82,36 +74,10 @@ class TestShadowChangeStreamListener(unittest.TestCase):
             await listener._connect()
 
             # Assert
-            mock_client.assert_called_once_with("mongodb://testhost:27017")
-            self.assertEqual(listener.mongo_client, self.mock_mongo_client)
-
-    @pytest.mark.asyncio
-    async def test_initialize_gets_database(self):
-        """Test that initialize gets the correct database."""
-        # Act
-        await self.listener.initialize()
-
-        # Assert
-        self.mock_mongo_client.__getitem__.assert_called_once_with("test_db")
-
-    @pytest.mark.asyncio
-    async def test_initialize_gets_collection(self):
-        """Test that initialize gets the correct collection."""
-        # Act
-        await self.listener.initialize()
-
-        # Assert
-        self.mock_db.__getitem__.assert_called_once_with("device_shadows")
-
-    @pytest.mark.asyncio
-    async def test_initialize_creates_change_stream(self):
-        """Test that initialize sets up a change stream on the shadows collection."""
-        # Act
-        await self.listener.initialize()
-
-        # Assert
-        self.mock_collection.watch.assert_called_once()
-        self.assertEqual(self.listener.change_stream, self.mock_change_stream)
+            mock_get_multiplexer.assert_called_once_with(
+                "mongodb://testhost:27017", "test_database"
+            )
+            self.assertEqual(listener.multiplexer, self.mock_multiplexer)
 
     @pytest.mark.asyncio
     async def test_initialize_sets_initialized_flag(self):
@@ -127,7 +93,6 @@ class TestShadowChangeStreamListener(unittest.TestCase):
         """Test that start_listening calls the event processing method."""
         # Arrange
         self.listener.initialized = True
-        self.listener.change_stream = self.mock_change_stream
         self.listener._process_change_events = AsyncMock()
 
         # Act
@@ -141,7 +106,6 @@ class TestShadowChangeStreamListener(unittest.TestCase):
         """Test that start_listening sets the listening flag."""
         # Arrange
         self.listener.initialized = True
-        self.listener.change_stream = self.mock_change_stream
         self.listener._process_change_events = AsyncMock()
 
         # Act
@@ -161,24 +125,24 @@ class TestShadowChangeStreamListener(unittest.TestCase):
             await self.listener.start_listening()
 
     @pytest.mark.asyncio
-    async def test_stop_listening_closes_change_stream(self):
-        """Test that stop_listening closes the change stream."""
+    async def test_stop_listening_unsubscribes(self):
+        """Test that stop_listening unsubscribes from the multiplexer."""
         # Arrange
         self.listener.is_listening = True
-        self.listener.change_stream = self.mock_change_stream
 
         # Act
         await self.listener.stop_listening()
 
         # Assert
-        self.mock_change_stream.close.assert_called_once()
+        self.mock_multiplexer.unsubscribe.assert_called_once_with(
+            "device_shadows", self.listener._handle_change_batch
+        )
 
     @pytest.mark.asyncio
     async def test_stop_listening_clears_listening_flag(self):
         """Test that stop_listening clears the listening flag."""
         # Arrange
         self.listener.is_listening = True
-        self.listener.change_stream = self.mock_change_stream
 
         # Act
         await self.listener.stop_listening()
@@ -137,8 +137,7 @@ class TestShadowNotificationService(unittest.TestCase):
         # Verify desired state is excluded completely
         self.assertNotIn("desired", notification_data)
 
-    @pytest.mark.asyncio
-    async def test_extract_notification_data_includes_all_fields_for_wildcard(self):
+    def test_extract_notification_data_includes_all_fields_for_wildcard(self):
         """Test that _extract_notification_data includes all fields for wildcard subscriptions."""
         # Arrange
         device_id = "device123"
@@ -155,12 +154,12 @@ class TestShadowNotificationService(unittest.TestCase):
         # Assert
         self.assertEqual(notification_data["device_id"], device_id)
         self.assertEqual(notification_data["operation"], "update")
-        # Verify all fields are included
-        self.assertIn("reported", notification_data)
-        self.assertIn("temperature", notification_data["reported"])
-        self.assertIn("humidity", notification_data["reported"])
-        self.assertIn("desired", notification_data)
-        self.assertIn("temperature", notification_data["desired"])
+        # Updates are sent as a delta of every changed field
+        self.assertTrue(notification_data["delta"])
+        self.assertEqual(notification_data["reported"], {"temperature": 75})
+        # Unchanged fields are not repeated
+        self.assertNotIn("desired", notification_data)
+        self.assertNotIn("removed", notification_data)
 
     @pytest.mark.asyncio
     async def test_extract_notification_data_for_delete_operation(self):
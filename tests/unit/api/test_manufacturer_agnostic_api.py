@@ -157,74 +157,51 @@ class TestManufacturerAgnosticAPI(unittest.TestCase):
 
     def test_get_operational_summary(self):
         """Test getting operational summary with maintenance predictions"""
-        # Sample water heater IDs
-        water_heater_ids = ["wh-rheem-001", "wh-aosmith-001"]
-
-        # Setup cursor to return device IDs
-        device_cursor_mock = MagicMock()
-        device_cursor_mock.fetchall.return_value = [
-            {"device_id": id} for id in water_heater_ids
-        ]
-
-        # Setup cursor for operational data
-        op_cursor_mock = MagicMock()
-        op_cursor_mock.fetchall.return_value = [
-            {
-                "device_id": "wh-rheem-001",
-                "avg_temperature": 125.5,
-                "heating_cycles_24h": 12,
-                "total_heating_time_24h": 120,  # minutes
-                "energy_used_24h": 12.5,  # kWh
-            },
-            {
-                "device_id": "wh-aosmith-001",
-                "avg_temperature": 130.2,
-                "heating_cycles_24h": 15,
-                "total_heating_time_24h": 150,  # minutes
-                "energy_used_24h": 15.2,  # kWh
-            },
-        ]
-
-        # Setup cursor for maintenance data
-        maint_cursor_mock = MagicMock()
-        maint_cursor_mock.fetchall.return_value = [
-            {
-                "device_id": "wh-rheem-001",
-                "health_score": 0.92,
-                "estimated_remaining_life": 1825,  # days
-                "maintenance_due": False,
-                "next_maintenance_date": "2025-10-15",
-                "issues": json.dumps(
-                    [
-                        {"component": "heating_element", "status": "good"},
-                        {"component": "thermostat", "status": "good"},
-                    ]
-                ),
-            },
-            {
-                "device_id": "wh-aosmith-001",
-                "health_score": 0.78,
-                "estimated_remaining_life": 1095,  # days
-                "maintenance_due": True,
-                "next_maintenance_date": "2025-04-30",
-                "issues": json.dumps(
-                    [
-                        {"component": "heating_element", "status": "good"},
-                        {
-                            "component": "thermostat",
-                            "status": "warning",
-                            "details": "Showing signs of inconsistent temperature control",
-                        },
-                    ]
-                ),
-            },
-        ]
-
-        self.db_connection.cursor.side_effect = [
-            device_cursor_mock,
-            op_cursor_mock,
-            maint_cursor_mock,
-        ]
+        # One row per device with the latest assessment already joined in
+        cursor_mock = MagicMock()
+        cursor_mock.__iter__.return_value = iter(
+            [
+                {
+                    "device_id": "wh-aosmith-001",
+                    "avg_temperature": 130.2,
+                    "heating_cycles_24h": 15,
+                    "total_heating_time_24h": 150,  # minutes
+                    "energy_used_24h": 15.2,  # kWh
+                    "health_score": 0.78,
+                    "estimated_remaining_life": 1095,  # days
+                    "maintenance_due": True,
+                    "next_maintenance_date": "2025-04-30",
+                    "issues": json.dumps(
+                        [
+                            {"component": "heating_element", "status": "good"},
+                            {
+                                "component": "thermostat",
+                                "status": "warning",
+                                "details": "Showing signs of inconsistent temperature control",
+                            },
+                        ]
+                    ),
+                },
+                {
+                    "device_id": "wh-rheem-001",
+                    "avg_temperature": 125.5,
+                    "heating_cycles_24h": 12,
+                    "total_heating_time_24h": 120,  # minutes
+                    "energy_used_24h": 12.5,  # kWh
+                    "health_score": 0.92,
+                    "estimated_remaining_life": 1825,  # days
+                    "maintenance_due": False,
+                    "next_maintenance_date": "2025-10-15",
+                    "issues": json.dumps(
+                        [
+                            {"component": "heating_element", "status": "good"},
+                            {"component": "thermostat", "status": "good"},
+                        ]
+                    ),
+                },
+            ]
+        )
+        self.db_connection.cursor.return_value = cursor_mock
 
         # Call method
         result = self.api.get_operational_summary()
@@ -243,9 +220,30 @@ class TestManufacturerAgnosticAPI(unittest.TestCase):
         self.assertEqual(device2["operational"]["energy_used_24h"], 15.2)
         self.assertEqual(device2["maintenance"]["health_score"], 0.78)
         self.assertTrue(device2["maintenance"]["maintenance_due"])
+        self.assertEqual(len(device2["maintenance"]["issues"]), 2)
+
+        # Verify a single server-side query covers devices and maintenance
+        self.assertEqual(self.db_connection.cursor.call_count, 1)
+        self.assertEqual(
+            self.db_connection.cursor.call_args.kwargs["name"], "operational_summary"
+        )
+        query = cursor_mock.execute.call_args[0][0]
+        self.assertIn("device_registry", query)
+        self.assertIn("LATERAL", query)
+
+    def test_operational_summary_query_is_parameterized(self):
+        """Test that device IDs are bound as an array, not spliced into SQL"""
+        cursor_mock = MagicMock()
+        cursor_mock.__iter__.return_value = iter([])
+        self.db_connection.cursor.return_value = cursor_mock
+        device_ids = [f"wh-{i:04d}" for i in range(2000)]
+
+        self.api.get_operational_summary(device_ids=device_ids)
 
-        # Verify database queries
-        self.assertEqual(self.db_connection.cursor.call_count, 3)
+        query, params = cursor_mock.execute.call_args[0]
+        self.assertIn("= ANY(%(device_ids)s)", query)
+        self.assertNotIn("wh-0001", query)
+        self.assertEqual(params, {"device_ids": device_ids})
 
     def test_send_command_to_device(self):
         """Test sending command to device"""